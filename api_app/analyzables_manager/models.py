@@ -1,5 +1,5 @@
 import logging
-from typing import Type, Union
+from typing import Type
 
 from django.core.exceptions import ValidationError
 from django.db import models
@@ -11,7 +11,7 @@ from api_app.choices import Classification
 from api_app.data_model_manager.models import BaseDataModel
 from api_app.data_model_manager.queryset import BaseDataModelQuerySet
 from api_app.defaults import file_directory_path
-from api_app.helpers import calculate_md5, calculate_sha1, calculate_sha256
+from api_app.helpers import FileHashes, calculate_hashes
 from certego_saas.models import User
 
 logger = logging.getLogger(__name__)
@@ -80,15 +80,13 @@ class Analyzable(models.Model):
     def get_data_model_class(self) -> Type[BaseDataModel]:
         return self.CLASSIFICATIONS.get_data_model_class(self.classification)
 
-    def _set_hashes(self, value: Union[str, bytes]):
-        if isinstance(value, str):
-            value = value.encode("utf-8")
+    def _set_hashes(self, hashes: FileHashes):
         if not self.md5:
-            self.md5 = calculate_md5(value)
+            self.md5 = hashes.md5
         if not self.sha256:
-            self.sha256 = calculate_sha256(value)
+            self.sha256 = hashes.sha256
         if not self.sha1:
-            self.sha1 = calculate_sha1(value)
+            self.sha1 = hashes.sha1
 
     def clean(self):
         if self.file:
@@ -100,14 +98,17 @@ class Analyzable(models.Model):
 
             if not self.file:
                 raise ValidationError("File must be set for samples")
-            content = self.read()
+            if self.mimetype and self.md5 and self.sha256 and self.sha1:
+                return
+            # the file is read in chunks: big samples are never loaded in memory
+            hashes = calculate_hashes(self.file.chunks())
             if not self.mimetype:
-                self.mimetype = MimeTypes.calculate(content, self.name)
+                self.mimetype = MimeTypes.calculate(hashes.head, self.name)
         else:
             if self.mimetype or self.file:
                 raise ValidationError("Mimetype and file must not be set for observables")
-            content = self.name
-        self._set_hashes(content)
+            hashes = calculate_hashes([self.name.encode("utf-8")])
+        self._set_hashes(hashes)
 
     def read(self) -> bytes:
         if self.classification == Classification.FILE.value:
@@ -9,7 +9,6 @@ from pathlib import PosixPath
 from typing import Dict, Tuple
 
 import requests
-from django.conf import settings
 
 from api_app.decorators import classproperty
 from certego_saas.apps.user.models import User
@@ -231,7 +230,9 @@ class FileAnalyzer(BaseAnalyzerMixin, metaclass=ABCMeta):
         """
         if not self.__filepath:
             self.__filepath = self._job.analyzable.file.storage.retrieve(
-                file=self._job.analyzable.file, analyzer=self.analyzer_name
+                file=self._job.analyzable.file,
+                analyzer=self.analyzer_name,
+                sha256=self._job.analyzable.sha256,
             )
         return self.__filepath
 
@@ -241,16 +242,15 @@ class FileAnalyzer(BaseAnalyzerMixin, metaclass=ABCMeta):
 
     def after_run(self):
         super().after_run()
-        # We delete the file only if we have single copy for analyzer
-        # and the file has been saved locally.
-        # Otherwise we would remove the single file that we have on the server
-        if not settings.LOCAL_STORAGE and self.filepath is not None:
-            import os
-
-            try:
-                os.remove(self.filepath)
-            except OSError:
-                logger.warning(f"Filepath {self.filepath} does not exists")
+        # The sample is shared with the other analyzers of the node:
+        # we only drop our reference, the storage evicts it when no longer used.
+        # If the file was never retrieved, there is nothing to release
+        if self.__filepath is not None:
+            self._job.analyzable.file.storage.release(
+                file=self._job.analyzable.file,
+                analyzer=self.analyzer_name,
+                sha256=self._job.analyzable.sha256,
+            )
 
         logger.info(f"FINISHED analyzer: {self.__repr__()} -> File: ({self.filename}, md5: {self.md5})")
 
@@ -267,9 +267,9 @@ class DockerBasedAnalyzer(BaseAnalyzerMixin, metaclass=ABCMeta):
         The name of the analyzer service as defined in compose file
         and log directory
     :param max_tries: int
-        maximum no. of tries when HTTP polling for result.
+        together with ``poll_distance``, the maximum time spent polling for result.
     :param poll_distance: int
-        interval between HTTP polling.
+        maximum interval between HTTP polling.
     """
 
     name: str
@@ -277,6 +277,9 @@ class DockerBasedAnalyzer(BaseAnalyzerMixin, metaclass=ABCMeta):
     max_tries: int
     poll_distance: int
     key_not_found_max_retries: int = 10
+    # seconds the integration holds a result request while the analysis is running:
+    # it must stay below the 30 seconds after which gunicorn restarts a busy worker
+    long_poll_timeout: int = 15
 
     @staticmethod
     def __raise_in_case_bad_request(name, resp, params_to_check=None) -> bool:
@@ -310,14 +313,14 @@ class DockerBasedAnalyzer(BaseAnalyzerMixin, metaclass=ABCMeta):
         return True
 
     @staticmethod
-    def __query_for_result(url: str, key: str) -> Tuple[int, dict]:
+    def __query_for_result(url: str, key: str, wait_timeout: int = 0) -> Tuple[int, dict]:
         headers = {"Accept": "application/json"}
-        resp = requests.get(f"{url}?key={key}", headers=headers)
+        resp = requests.get(f"{url}?key={key}&wait_timeout={wait_timeout}", headers=headers)
         return resp.status_code, resp.json()
 
-    def __polling(self, req_key: str, chance: int, re_poll_try: int = 0):
+    def __polling(self, req_key: str, chance: int, wait_timeout: int = 0, re_poll_try: int = 0):
         try:
-            status_code, json_data = self.__query_for_result(self.url, req_key)
+            status_code, json_data = self.__query_for_result(self.url, req_key, wait_timeout)
         except (requests.RequestException, json.JSONDecodeError) as e:
             raise AnalyzerRunException(e)
         if status_code == 404:
@@ -333,7 +336,7 @@ class DockerBasedAnalyzer(BaseAnalyzerMixin, metaclass=ABCMeta):
             )
             if self.key_not_found_max_retries == re_poll_try:
                 raise AnalyzerRunException(f"not found key {req_key} in any server after maximum retries")
-            return self.__polling(req_key, chance, re_poll_try=re_poll_try + 1)
+            return self.__polling(req_key, chance, wait_timeout, re_poll_try=re_poll_try + 1)
         else:
             status = json_data.get("status", None)
             if status and status == self._job.STATUSES.RUNNING.value:
@@ -343,18 +346,31 @@ class DockerBasedAnalyzer(BaseAnalyzerMixin, metaclass=ABCMeta):
         return False, json_data
 
     def __poll_for_result(self, req_key: str) -> dict:
-        got_result = False
-        json_data = {}
-        for chance in range(self.max_tries):
-            time.sleep(self.poll_distance)
+        """
+        The integrations answer as soon as the analysis finishes,
+        holding every request up to ``long_poll_timeout`` seconds.
+        The ones that answer right away that the analysis is running
+        are polled again with an exponential backoff up to ``poll_distance`` seconds.
+        The polling lasts at most ``max_tries * poll_distance`` seconds.
+        """
+        deadline = time.monotonic() + self.max_tries * self.poll_distance
+        delay = 1
+        chance = 0
+        while True:
+            wait_timeout = max(1, min(self.long_poll_timeout, int(deadline - time.monotonic())))
             logger.info(f"Result Polling. Try #{chance + 1}. Starting the query...<-- {self.__repr__()}")
-            got_result, json_data = self.__polling(req_key, chance)
+            start = time.monotonic()
+            got_result, json_data = self.__polling(req_key, chance, wait_timeout)
             if got_result:
-                break
-
-        if not got_result:
-            raise AnalyzerRunException("max polls tried without getting any result.")
-        return json_data
+                return json_data
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise AnalyzerRunException("max polls tried without getting any result.")
+            if time.monotonic() - start < wait_timeout:
+                # the integration does not support long polling
+                time.sleep(min(delay, remaining))
+                delay = min(delay * 2, max(self.poll_distance, 1))
+            chance += 1
 
     def _raise_container_not_running(self) -> None:
         raise AnalyzerConfigurationException(
@@ -0,0 +1,68 @@
+# This file is a part of IntelOwl https://github.com/intelowlproject/IntelOwl
+# See the file 'LICENSE' for copying permission.
+
+import json
+import logging
+import os
+from typing import Any, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class FeedCache:
+    """
+    Per worker process cache of file backed threat feeds.
+
+    Each feed is parsed once by its loader into an optimized structure (set, dict, index...)
+    and kept in memory until the file modification time changes,
+    that is until the analyzer update() rewrites it.
+    """
+
+    def __init__(self):
+        # path -> (mtime, loaded object)
+        self._feeds: Dict[str, Tuple[int, Any]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, path: str, loader: Callable[[str], Any]) -> Optional[Any]:
+        """
+        Return loader(path), calling the loader only if the file changed
+        since the last call.
+        Return None if the file does not exist.
+        """
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            self._feeds.pop(path, None)
+            return None
+        cached = self._feeds.get(path)
+        if cached and cached[0] == mtime:
+            self.hits += 1
+            return cached[1]
+        self.misses += 1
+        logger.info(f"loading feed {path}")
+        obj = loader(path)
+        self._feeds[path] = (mtime, obj)
+        return obj
+
+    def invalidate(self, path: str = None) -> None:
+        """
+        Drop a feed (or every feed) from the cache
+        """
+        if path is None:
+            self._feeds.clear()
+        else:
+            self._feeds.pop(path, None)
+
+
+feed_cache = FeedCache()
+
+
+def load_json(path: str) -> Any:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_lines(path: str) -> frozenset:
+    with open(path, "r", encoding="utf-8") as f:
+        return frozenset(f.read().split("\n"))
@@ -27,8 +27,8 @@ class LnkInfo(FileAnalyzer):
         else:
             if arguments := getattr(parsed, "arguments", None):
                 args = arguments.split()
-                for a in args:
-                    if Classification.calculate_observable(a) == Classification.URL:
+                for a, classification in zip(args, Classification.calculate_observables(args)):
+                    if classification == Classification.URL:
                         # remove strings delimiters used in commands
                         a = re.sub(r"[\"\']", "", a)
                         result["uris"].append(a)
@@ -83,8 +83,10 @@ class StringsInfo(FileAnalyzer, DockerBasedAnalyzer):
         ]:
             import re
 
-            for d in result["data"]:
-                if Classification.calculate_observable(d) == Classification.URL:
+            for d, classification in zip(
+                result["data"], Classification.calculate_observables(result["data"])
+            ):
+                if classification == Classification.URL:
                     extracted_urls = re.findall(
                         r"[a-z]{1,5}://[a-z\d-]{1,200}"
                         r"(?:\.[a-zA-Z\d\u2044\u2215!#$&(-;=?-\[\]_~]{1,200})+"
@@ -1,11 +1,15 @@
 # This file is a part of IntelOwl https://github.com/intelowlproject/IntelOwl
 # See the file 'LICENSE' for copying permission.
 import dataclasses
+import hashlib
 import io
 import logging
 import math
 import os
+import threading
+import time
 import zipfile
+from collections import OrderedDict
 from pathlib import PosixPath
 from typing import Dict, List, Optional, Tuple, Union
 from urllib.parse import urlparse
@@ -33,11 +37,107 @@ class YaraMatchMock:
     strings: List = dataclasses.field(default_factory=list)
     tags: List = dataclasses.field(default_factory=list)
     meta: Dict = dataclasses.field(default_factory=dict)
+    namespace: str = ""
 
     def __str__(self):
         return self.match
 
 
+def match_rules(rules: yara.Rules, file_path: str, filename: str) -> List[Union[yara.Match, YaraMatchMock]]:
+    try:
+        return rules.match(file_path, externals={"filename": filename})
+    except yara.Error as e:
+        if "internal error" in str(e):
+            _, code = str(e).split(":")
+            if int(code.strip()) == 30:
+                message = f"Too many matches for {filename}"
+                logger.warning(message)
+                return [YaraMatchMock(message)]
+        raise e
+
+
+class CompiledRulesCache:
+    """
+    Per worker process cache of the compiled yara rules, keyed by the path of the compiled file.
+
+    An entry is valid while the compiled file keeps the same mtime and size,
+    so the rules recompiled by `YaraScan.update` (run by the `update_plugin` control command)
+    are reloaded by the next scan.
+    When the compiled files of the cached rules exceed YARA_RULES_CACHE_MAX_BYTES,
+    the least recently used rules are evicted.
+    """
+
+    def __init__(self):
+        # path -> ((mtime, size), rules)
+        self._entries: OrderedDict[str, Tuple[Tuple[int, int], yara.Rules]] = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    @property
+    def max_bytes(self) -> int:
+        return settings.YARA_RULES_CACHE_MAX_BYTES
+
+    @staticmethod
+    def _version(path: PosixPath) -> Tuple[int, int]:
+        stat = path.stat()
+        return stat.st_mtime_ns, stat.st_size
+
+    def get(self, path: PosixPath) -> Optional[yara.Rules]:
+        """
+        Returns the rules compiled at path, loading them if needed, or None if there is no compiled file.
+        """
+        try:
+            version = self._version(path)
+        except FileNotFoundError:
+            self.discard(path)
+            return None
+        if not self.max_bytes:
+            # the cache has been disabled: the rules loaded before are not kept anymore
+            self.clear()
+        with self._lock:
+            entry = self._entries.get(str(path))
+            if entry and entry[0] == version:
+                self._entries.move_to_end(str(path))
+                return entry[1]
+        logger.info(f"Loading compiled yara rules {path}")
+        rules = yara.load(str(path))
+        self._put(str(path), version, rules)
+        return rules
+
+    def put(self, path: PosixPath, rules: yara.Rules) -> None:
+        """
+        Caches rules that have just been compiled and saved at path.
+        """
+        self._put(str(path), self._version(path), rules)
+
+    def _put(self, path: str, version: Tuple[int, int], rules: yara.Rules) -> None:
+        if not self.max_bytes:
+            return
+        with self._lock:
+            self._pop(path)
+            self._entries[path] = (version, rules)
+            self._size += version[1]
+            while self._size > self.max_bytes and len(self._entries) > 1:
+                self._pop(next(iter(self._entries)))
+
+    def _pop(self, path: str) -> None:
+        entry = self._entries.pop(path, None)
+        if entry:
+            self._size -= entry[0][1]
+
+    def discard(self, path: PosixPath) -> None:
+        with self._lock:
+            self._pop(str(path))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+
+compiled_rules_cache = CompiledRulesCache()
+
+
 class YaraRepo:
     def __init__(
         self,
@@ -157,6 +257,10 @@ class YaraRepo:
     def compiled_file_name(self):
         return "intel_owl_compiled.yas"
 
+    @property
+    def valid_rules_file_name(self):
+        return "intel_owl_valid_rules.txt"
+
     @cached_property
     def first_level_directories(self) -> List[PosixPath]:
         paths = []
@@ -183,13 +287,35 @@ class YaraRepo:
             if not self.directory.exists():
                 self.update()
             for compiled_path in self.compiled_paths:
-                if compiled_path.exists():
-                    self._rules.append(yara.load(str(compiled_path)))
-                else:
+                rules = compiled_rules_cache.get(compiled_path)
+                if rules is None:
                     self._rules = self.compile()
                     break
+                self._rules.append(rules)
         return self._rules
 
+    def ensure_compiled(self) -> None:
+        """
+        Downloads and compiles the repo if needed, without loading its rules.
+        """
+        if not self.directory.exists():
+            self.update()
+        if not all(compiled_path.exists() for compiled_path in self.compiled_paths):
+            self.compile()
+
+    def valid_rules(self) -> List[str]:
+        """
+        Returns the rule files of the repo that compile, as found by the last compile.
+        """
+        paths = []
+        for directory in self.first_level_directories + [self.directory]:
+            valid_rules_file = directory / self.valid_rules_file_name
+            if valid_rules_file.exists():
+                paths.extend(filter(None, valid_rules_file.read_text().splitlines()))
+            else:
+                paths.extend(self._valid_rules(directory))
+        return paths
+
     def rule_url(self, namespace: str) -> Optional[str]:
         if self.is_zip():
             return None
@@ -202,79 +328,72 @@ class YaraRepo:
             logger.error(f"Unable to calculate url from {namespace}")
         return None
 
+    def _valid_rules(self, directory: PosixPath) -> List[str]:
+        if directory != self.directory:
+            # recursive
+            rules = directory.rglob("*")
+        else:
+            # not recursive
+            rules = directory.glob("*")
+        valid_rules_path = []
+        for rule in rules:
+            if rule.stem.endswith("index") or rule.stem.startswith("index"):
+                continue
+            if rule.suffix in [".yara", ".yar", ".rule"]:
+                try:
+                    yara.compile(str(rule))
+                except yara.SyntaxError:
+                    continue
+                else:
+                    valid_rules_path.append(str(rule))
+        return valid_rules_path
+
     def compile(self) -> List[yara.Rules]:
         logger.info(f"Starting compile for {self}")
         compiled_rules = []
 
         for directory in self.first_level_directories + [self.directory]:
-            if directory != self.directory:
-                # recursive
-                rules = directory.rglob("*")
-            else:
-                # not recursive
-                rules = directory.glob("*")
-            valid_rules_path = []
-            for rule in rules:
-                if rule.stem.endswith("index") or rule.stem.startswith("index"):
-                    continue
-                if rule.suffix in [".yara", ".yar", ".rule"]:
-                    try:
-                        yara.compile(str(rule))
-                    except yara.SyntaxError:
-                        continue
-                    else:
-                        valid_rules_path.append(str(rule))
+            valid_rules_path = self._valid_rules(directory)
             logger.info(f"Compiling {len(valid_rules_path)} rules for {self} at {directory}")
             compiled_rule = yara.compile(filepaths={str(path): str(path) for path in valid_rules_path})
             compiled_rule.save(str(directory / self.compiled_file_name))
+            # used by the merged rules of YaraStorage
+            (directory / self.valid_rules_file_name).write_text("\n".join(valid_rules_path))
+            compiled_rules_cache.put(directory / self.compiled_file_name, compiled_rule)
             compiled_rules.append(compiled_rule)
             logger.info(f"Rules {self} saved on file")
         return compiled_rules
 
+    def format_match(self, match: Union[yara.Match, YaraMatchMock], filename: str) -> Dict:
+        logger.info(f"{self} analyzing strings analysis of {filename} for match {match}")
+        strings = []
+        # limited to 20 strings reasons because it could be a very long list
+        for string in match.strings[:20]:
+            string: yara.StringMatch
+            entry = {
+                "identifier": string.identifier,
+                "plaintext": [str(i) for i in string.instances[:20]],
+            }
+            strings.append(entry)
+            logger.debug(f"{strings=}")
+
+        logger.info(f"{self} found {len(strings)} strings for {filename}for match {match}")
+        return {
+            "match": str(match),
+            "strings": strings,
+            "tags": match.tags,
+            "meta": match.meta,
+            "path": match.namespace,
+            "url": self.url,
+            "rule_url": self.rule_url(match.namespace),
+        }
+
     def analyze(self, file_path: str, filename: str) -> List[Dict]:
         logger.info(f"{self} starting analysis of {filename} for file path {file_path}")
         result = []
         for rule in self.rules:
-            rule: yara.Match
-            try:
-                matches = rule.match(file_path, externals={"filename": filename})
-            except yara.Error as e:
-                if "internal error" in str(e):
-                    _, code = str(e).split(":")
-                    if int(code.strip()) == 30:
-                        message = f"Too many matches for {filename}"
-                        logger.warning(message)
-                        matches = [YaraMatchMock(message)]
-                    else:
-                        raise e
-                else:
-                    raise e
-
-            for match in matches:
-                logger.info(f"{self} analyzing strings analysis of {filename} for match {match}")
-                strings = []
-                # limited to 20 strings reasons because it could be a very long list
-                for string in match.strings[:20]:
-                    string: yara.StringMatch
-                    entry = {
-                        "identifier": string.identifier,
-                        "plaintext": [str(i) for i in string.instances[:20]],
-                    }
-                    strings.append(entry)
-                    logger.debug(f"{strings=}")
-
-                logger.info(f"{self} found {len(strings)} strings for {filename}for match {match}")
-                result.append(
-                    {
-                        "match": str(match),
-                        "strings": strings,
-                        "tags": match.tags,
-                        "meta": match.meta,
-                        "path": match.namespace,
-                        "url": self.url,
-                        "rule_url": self.rule_url(match.namespace),
-                    }
-                )
+            for match in match_rules(rule, file_path, filename):
+                result.append(self.format_match(match, filename))
         return result
 
 
@@ -294,14 +413,102 @@ class YaraStorage:
                 return
         self.repos.append(new_repo)
 
-    def analyze(self, file_path: str, filename: str) -> Dict:
+    @staticmethod
+    def merged_directory() -> PosixPath:
+        return settings.YARA_RULES_PATH / "intel_owl_merged"
+
+    @property
+    def merged_path(self) -> PosixPath:
+        directories = "\n".join(sorted(str(repo.directory) for repo in self.repos))
+        return self.merged_directory() / f"{hashlib.sha256(directories.encode()).hexdigest()}.yas"
+
+    @classmethod
+    def prune_merged(cls, max_age: int) -> List[PosixPath]:
+        """
+        Deletes the merged rules not scanned in the last max_age seconds:
+        every set of repos, e.g. with the custom rules of a user, has its own copy of all the rules.
+        The access time of a merged ruleset is its last scan.
+        """
+        deleted = []
+        if not cls.merged_directory().exists():
+            return deleted
+        limit = time.time() - max_age
+        for path in cls.merged_directory().iterdir():
+            try:
+                if path.stat().st_atime < limit:
+                    path.unlink()
+                    compiled_rules_cache.discard(path)
+                    deleted.append(path)
+            except FileNotFoundError:
+                # deleted concurrently
+                continue
+        return deleted
+
+    @staticmethod
+    def _mark_scanned(path: PosixPath) -> None:
+        # set explicitly: the filesystem could be mounted with noatime.
+        # The mtime is left unchanged, it is the version of the compiled rules
+        stat = path.stat()
+        if time.time() - stat.st_atime > 3600:
+            os.utime(path, ns=(time.time_ns(), stat.st_mtime_ns))
+
+    def merged_rules(self) -> yara.Rules:
+        """
+        Returns the rules of every repo compiled in a single ruleset,
+        namespaced by rule file like the rules compiled for every single repo.
+        The ruleset is saved once for every set of repos
+        and compiled again when one of the repos has been compiled again.
+        The rulesets not scanned for YARA_MERGED_RULES_MAX_AGE_DAYS are deleted by `YaraScan.update`.
+        """
+        for repo in self.repos:
+            repo.ensure_compiled()
+        path = self.merged_path
+        newest = max(
+            (compiled.stat().st_mtime_ns for repo in self.repos for compiled in repo.compiled_paths),
+            default=0,
+        )
+        if not path.exists() or path.stat().st_mtime_ns < newest:
+            filepaths = {rule: rule for repo in self.repos for rule in repo.valid_rules()}
+            logger.info(f"Compiling {len(filepaths)} rules of {len(self.repos)} repos at {path}")
+            path.parent.mkdir(parents=True, exist_ok=True)
+            temporary = path.with_suffix(f".{os.getpid()}.tmp")
+            yara.compile(filepaths=filepaths).save(str(temporary))
+            # the workers that are loading the previous ruleset keep reading the old file
+            os.replace(temporary, path)
+        self._mark_scanned(path)
+        return compiled_rules_cache.get(path)
+
+    def _analyze_merged(self, file_path: str, filename: str) -> Dict:
+        result = {str(repo.directory.name): [] for repo in self.repos}
+        # the deepest directories first, for the repos inside the directory of another one
+        repos = sorted(self.repos, key=lambda repo: len(str(repo.directory)), reverse=True)
+        for match in match_rules(self.merged_rules(), file_path, filename):
+            for repo in repos:
+                if not match.namespace:
+                    # too many matches: reported by every repo, as when they are scanned one by one
+                    result[str(repo.directory.name)].append(repo.format_match(match, filename))
+                elif match.namespace.startswith(f"{repo.directory}/"):
+                    result[str(repo.directory.name)].append(repo.format_match(match, filename))
+                    break
+        return result
+
+    def analyze(self, file_path: str, filename: str, merged: bool = False) -> Tuple[Dict, List[str]]:
+        """
+        Scans the file with the rules of every repo.
+        With merged, the file is scanned once with the merged rules of all the repos,
+        falling back to a scan for every repo if they can't be merged.
+        """
+        if merged and self.repos:
+            try:
+                return self._analyze_merged(file_path, filename), []
+            except Exception as e:
+                logger.warning(f"{filename} merged rules analysis failed: {e}", stack_info=True)
         result = {}
         errors = []
         for repo in self.repos:
             try:
+                # the rules stay in the compiled rules cache for the next scans
                 result[str(repo.directory.name)] = repo.analyze(file_path, filename)
-                # free some memory
-                repo._rules = []
             except Exception as e:
                 logger.warning(f"{filename} rules analysis failed: {e}", stack_info=True)
                 errors.append(str(e))
@@ -316,6 +523,7 @@ class YaraScan(FileAnalyzer):
     repositories: list
     _private_repositories: dict = {}
     local_rules: str
+    merged_scan: bool = False
 
     def _get_owner_and_key(self, url: str) -> Tuple[Union[str, None], Union[str, None]]:
         if url in self._private_repositories:
@@ -359,7 +567,7 @@ class YaraScan(FileAnalyzer):
                     "",
                     directory=settings.YARA_RULES_PATH / self._job.user.username / "custom_rule",
                 )
-        report, errors = storage.analyze(self.filepath, self.filename)
+        report, errors = storage.analyze(self.filepath, self.filename, merged=self.merged_scan)
         if errors:
             self.report.errors.extend(errors)
             self.report.save()
@@ -403,6 +611,9 @@ class YaraScan(FileAnalyzer):
             logger.info(f"Going to update {repo.url} yara repo")
             repo.update()
             repo.compile()
+        pruned = YaraStorage.prune_merged(settings.YARA_MERGED_RULES_MAX_AGE_DAYS * 24 * 3600)
+        if pruned:
+            logger.info(f"Deleted {len(pruned)} merged yara rules not scanned recently")
         logger.info("Finished updating yara rules")
         set_permissions(settings.YARA_RULES_PATH)
         return True
@@ -0,0 +1,175 @@
+# This file is a part of IntelOwl https://github.com/intelowlproject/IntelOwl
+# See the file 'LICENSE' for copying permission.
+
+import bisect
+import ipaddress
+import json
+import logging
+import os
+import struct
+import tempfile
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+from api_app.analyzers_manager.feed_cache import feed_cache
+
+logger = logging.getLogger(__name__)
+
+IPAddress = Union[ipaddress.IPv4Address, ipaddress.IPv6Address]
+
+
+def atomic_write(path: str, content: bytes) -> None:
+    """
+    Write content to path through a temporary file,
+    so that concurrent readers never see a partially written file.
+    """
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp_")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class IPRangeIndex:
+    """
+    Sorted interval index over IPv4/IPv6 networks.
+
+    Every network is stored as an integer (start, end) pair, sorted by start,
+    together with the running maximum of the ends: a lookup is a bisect
+    followed by a backward walk that stops as soon as no earlier range
+    can contain the address, so it costs O(log n + matches).
+    Each range may carry an arbitrary JSON-serializable payload.
+    """
+
+    MAGIC = b"IOIDX1"
+    _HEADER = struct.Struct(">6sII")
+    _ADDRESS_SIZE = {4: 4, 6: 16}
+
+    def __init__(
+        self,
+        ranges: Dict[int, List[Tuple[int, int, int]]],
+        payloads: Optional[List[Any]] = None,
+    ):
+        self.payloads = payloads or []
+        self._starts: Dict[int, List[int]] = {}
+        self._ends: Dict[int, List[int]] = {}
+        self._max_ends: Dict[int, List[int]] = {}
+        self._payload_ids: Dict[int, List[int]] = {}
+        for version in (4, 6):
+            version_ranges = sorted(ranges.get(version, []))
+            self._starts[version] = [start for start, _, _ in version_ranges]
+            self._ends[version] = [end for _, end, _ in version_ranges]
+            self._payload_ids[version] = [payload_id for _, _, payload_id in version_ranges]
+            max_ends, current = [], -1
+            for end in self._ends[version]:
+                current = max(current, end)
+                max_ends.append(current)
+            self._max_ends[version] = max_ends
+
+    def __len__(self) -> int:
+        return len(self._starts[4]) + len(self._starts[6])
+
+    def __contains__(self, ip: Union[str, IPAddress]) -> bool:
+        return next(self._iter_matches(ip), None) is not None
+
+    @classmethod
+    def from_networks(cls, networks: Iterable[Union[str, Tuple[str, Any]]]) -> "IPRangeIndex":
+        """
+        Build the index from an iterable of CIDRs/IPs, optionally paired with a payload.
+        Invalid networks are skipped.
+        """
+        ranges = {4: [], 6: []}
+        payloads = []
+        for item in networks:
+            network, payload = item if isinstance(item, tuple) else (item, None)
+            try:
+                network = ipaddress.ip_network(network, strict=False)
+            except ValueError:
+                logger.debug(f"skipping invalid network {network}")
+                continue
+            ranges[network.version].append(
+                (
+                    int(network.network_address),
+                    int(network.broadcast_address),
+                    len(payloads),
+                )
+            )
+            payloads.append(payload)
+        return cls(ranges, payloads)
+
+    def _iter_matches(self, ip: Union[str, IPAddress]):
+        if not isinstance(ip, (ipaddress.IPv4Address, ipaddress.IPv6Address)):
+            ip = ipaddress.ip_address(ip)
+        value = int(ip)
+        starts = self._starts[ip.version]
+        ends = self._ends[ip.version]
+        max_ends = self._max_ends[ip.version]
+        position = bisect.bisect_right(starts, value) - 1
+        while position >= 0 and max_ends[position] >= value:
+            if ends[position] >= value:
+                yield self._payload_ids[ip.version][position]
+            position -= 1
+
+    def lookup(self, ip: Union[str, IPAddress]) -> List[Any]:
+        """
+        Return the payloads of every indexed network containing ip,
+        ordered by network start
+        """
+        return [self.payloads[payload_id] for payload_id in reversed(list(self._iter_matches(ip)))]
+
+    def dump(self, path: str) -> None:
+        """
+        Persist the index in a compact binary file
+        """
+        chunks = [self._HEADER.pack(self.MAGIC, len(self._starts[4]), len(self._starts[6]))]
+        for version in (4, 6):
+            size = self._ADDRESS_SIZE[version]
+            for start, end, payload_id in zip(
+                self._starts[version],
+                self._ends[version],
+                self._payload_ids[version],
+            ):
+                chunks.append(start.to_bytes(size, "big"))
+                chunks.append(end.to_bytes(size, "big"))
+                chunks.append(payload_id.to_bytes(4, "big"))
+        chunks.append(json.dumps(self.payloads).encode())
+        atomic_write(path, b"".join(chunks))
+
+    @classmethod
+    def load(cls, path: str) -> "IPRangeIndex":
+        with open(path, "rb") as f:
+            data = f.read()
+        magic, *counts = cls._HEADER.unpack_from(data)
+        if magic != cls.MAGIC:
+            raise ValueError(f"{path} is not a valid ip index")
+        offset = cls._HEADER.size
+        ranges = {}
+        for version, count in zip((4, 6), counts):
+            size = cls._ADDRESS_SIZE[version]
+            record = 2 * size + 4
+            version_ranges = []
+            for i in range(count):
+                base = offset + i * record
+                version_ranges.append(
+                    (
+                        int.from_bytes(data[base : base + size], "big"),
+                        int.from_bytes(data[base + size : base + 2 * size], "big"),
+                        int.from_bytes(data[base + 2 * size : base + record], "big"),
+                    )
+                )
+            ranges[version] = version_ranges
+            offset += count * record
+        return cls(ranges, json.loads(data[offset:]))
+
+
+def get_index(path: str) -> Optional[IPRangeIndex]:
+    """
+    Return the index persisted at path, loading it only once per process.
+    Return None if the index has not been built yet.
+    """
+    return feed_cache.get(path, IPRangeIndex.load)
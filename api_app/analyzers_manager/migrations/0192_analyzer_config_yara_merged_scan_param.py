@@ -0,0 +1,53 @@
+from django.db import migrations
+
+
+def migrate(apps, schema_editor):
+    Parameter = apps.get_model("api_app", "Parameter")
+    PluginConfig = apps.get_model("api_app", "PluginConfig")
+    PythonModule = apps.get_model("api_app", "PythonModule")
+    pm = PythonModule.objects.get(
+        module="yara_scan.YaraScan",
+        base_path="api_app.analyzers_manager.file_analyzers",
+    )
+    param = Parameter.objects.create(
+        name="merged_scan",
+        type="bool",
+        description=(
+            "Scan the file once with the rules of every repository compiled together, "
+            "instead of once for every repository. The report is the same."
+        ),
+        is_secret=False,
+        required=False,
+        python_module=pm,
+    )
+    for config in pm.analyzerconfigs.all():
+        PluginConfig.objects.create(
+            parameter=param,
+            analyzer_config=config,
+            value=False,
+            owner=None,
+            for_organization=False,
+        )
+
+
+def reverse_migrate(apps, schema_editor):
+    Parameter = apps.get_model("api_app", "Parameter")
+    PythonModule = apps.get_model("api_app", "PythonModule")
+    pm = PythonModule.objects.get(
+        module="yara_scan.YaraScan",
+        base_path="api_app.analyzers_manager.file_analyzers",
+    )
+    Parameter.objects.filter(
+        name="merged_scan",
+        python_module=pm,
+    ).delete()
+
+
+class Migration(migrations.Migration):
+    atomic = False
+    dependencies = [
+        ("api_app", "0062_alter_parameter_python_module"),
+        ("analyzers_manager", "0191_analyzerreport_report_size"),
+    ]
+
+    operations = [migrations.RunPython(migrate, reverse_migrate)]
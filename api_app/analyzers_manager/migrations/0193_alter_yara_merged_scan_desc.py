@@ -0,0 +1,38 @@
+from django.db import migrations
+
+description = (
+    "Scan the file once with the rules of every repository compiled together, "
+    "instead of once for every repository. The report is the same."
+)
+new_description = (
+    f"{description} Every set of repositories, e.g. with the custom rules or the private repositories of a user, "
+    "gets its own compiled copy of all the rules, on disk and in the memory of the workers: "
+    "the copies not used for YARA_MERGED_RULES_MAX_AGE_DAYS are deleted by the update of the rules."
+)
+
+
+def migrate(apps, schema_editor):
+    Parameter = apps.get_model("api_app", "Parameter")
+    Parameter.objects.filter(
+        name="merged_scan",
+        python_module__module="yara_scan.YaraScan",
+        python_module__base_path="api_app.analyzers_manager.file_analyzers",
+    ).update(description=new_description)
+
+
+def reverse_migrate(apps, schema_editor):
+    Parameter = apps.get_model("api_app", "Parameter")
+    Parameter.objects.filter(
+        name="merged_scan",
+        python_module__module="yara_scan.YaraScan",
+        python_module__base_path="api_app.analyzers_manager.file_analyzers",
+    ).update(description=description)
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ("analyzers_manager", "0192_analyzer_config_yara_merged_scan_param"),
+    ]
+    operations = [migrations.RunPython(migrate, reverse_migrate)]
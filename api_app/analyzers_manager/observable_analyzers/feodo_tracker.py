@@ -11,6 +11,7 @@ from django.conf import settings
 
 from api_app.analyzers_manager import classes
 from api_app.analyzers_manager.exceptions import AnalyzerRunException
+from api_app.analyzers_manager.feed_cache import feed_cache, load_json
 from api_app.decorators import classproperty
 from api_app.mixins import AbuseCHMixin
 from api_app.models import PluginConfig
@@ -27,6 +28,7 @@ class Feodo_Tracker(AbuseCHMixin, classes.ObservableAnalyzer):
 
     use_recommended_url: bool
     update_on_run: bool = True
+    supports_batch = True
 
     @classproperty
     def recommend_locations(cls) -> Tuple[str, str]:
@@ -46,13 +48,10 @@ class Feodo_Tracker(AbuseCHMixin, classes.ObservableAnalyzer):
         if self.update_on_run or not os.path.exists(db_location) and not self.update():
             raise AnalyzerRunException("Unable to update database")
         try:
-            with open(db_location, "r", encoding="utf-8") as f:
-                db = json.load(f)
-            # db is a list of dictionaries
-            for ip in db:
-                if ip["ip_address"] == self.observable_name:
-                    result["found"] = True
-                    break
+            ips = feed_cache.get(db_location, self._load_ips)
+            if ips is None:
+                raise FileNotFoundError(db_location)
+            result["found"] = self.observable_name in ips
         except json.JSONDecodeError as e:
             raise AnalyzerRunException(f"Decode JSON in run: {e}")
         except FileNotFoundError as e:
@@ -61,6 +60,11 @@ class Feodo_Tracker(AbuseCHMixin, classes.ObservableAnalyzer):
             raise AnalyzerRunException(f"Key error in run: {e}")
         return result
 
+    @staticmethod
+    def _load_ips(path: str) -> frozenset:
+        # db is a list of dictionaries
+        return frozenset(ip["ip_address"] for ip in load_json(path))
+
     # this is necessary because during the "update()" flow the config()
     # method is not called and the attributes would not be accessible by "cls"
     @classmethod
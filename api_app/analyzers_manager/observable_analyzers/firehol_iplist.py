@@ -6,6 +6,7 @@ import logging
 import traceback
 
 import requests
+from django.conf import settings
 from django.db import transaction
 from django.utils import timezone
 
@@ -14,12 +15,14 @@ from api_app.analyzers_manager.exceptions import (
     AnalyzerConfigurationException,
     AnalyzerRunException,
 )
+from api_app.analyzers_manager.ip_index import IPRangeIndex, get_index
 from api_app.analyzers_manager.models import FireholIPEntry
 
 logger = logging.getLogger(__name__)
 
 
 class FireHol_IPList(classes.ObservableAnalyzer):
+    supports_batch = True
     list_names: list
 
     def run(self):
@@ -37,23 +40,32 @@ class FireHol_IPList(classes.ObservableAnalyzer):
             )
 
         for list_name in self.list_names:
-            result[list_name] = False
-
             self.check_iplist_status(list_name)
+            result[list_name] = ip in self.get_list_index(list_name)
 
-            qs = FireholIPEntry.objects.filter(list_name=list_name).values_list("ip_or_subnet", flat=True)
+        return result
 
-            for ip_or_subnet in qs:
-                if ip_or_subnet:
-                    try:
-                        network = ipaddress.ip_network(ip_or_subnet)
-                        if ip in network:
-                            result[list_name] = True
-                            break
-                    except ValueError:
-                        pass
+    @staticmethod
+    def index_location(list_name: str) -> str:
+        return f"{settings.MEDIA_ROOT}/firehol_{list_name}.idx"
 
-        return result
+    @classmethod
+    def build_index(cls, list_name: str, networks) -> IPRangeIndex:
+        index = IPRangeIndex.from_networks(networks)
+        index.dump(cls.index_location(list_name))
+        return index
+
+    @classmethod
+    def get_list_index(cls, list_name: str) -> IPRangeIndex:
+        index = get_index(cls.index_location(list_name))
+        if index is None:
+            # the list was stored before the index existed: build it from the db
+            logger.info(f"building missing index for firehol list {list_name}")
+            index = cls.build_index(
+                list_name,
+                FireholIPEntry.objects.filter(list_name=list_name).values_list("ip_or_subnet", flat=True),
+            )
+        return index
 
     @classmethod
     def update(cls, list_name=None):
@@ -100,6 +112,7 @@ class FireHol_IPList(classes.ObservableAnalyzer):
             with transaction.atomic():
                 FireholIPEntry.objects.filter(list_name=list_name).delete()
                 FireholIPEntry.objects.bulk_create(db_entries, batch_size=1000, ignore_conflicts=True)
+            cls.build_index(list_name, [entry.ip_or_subnet for entry in db_entries])
 
             logger.info(
                 f"ended download of {list_name} from firehol iplist, inserted {len(db_entries)} entries"
@@ -5,12 +5,14 @@
 import json
 import logging
 import os
+from typing import Dict, List, Tuple
 
 import requests
 from django.conf import settings
 
 from api_app.analyzers_manager.classes import ObservableAnalyzer
 from api_app.analyzers_manager.exceptions import AnalyzerRunException
+from api_app.analyzers_manager.feed_cache import feed_cache, load_json
 from api_app.choices import Classification
 from api_app.mixins import AbuseCHMixin
 from api_app.models import PluginConfig
@@ -69,17 +71,21 @@ class HuntingAbuseAPI(AbuseCHMixin, ObservableAnalyzer):
             if not self.update():
                 raise AnalyzerRunException("Failed extraction of Hunting Abuse db")
 
-        with open(database_location, "r", encoding="utf-8") as f:
-            fp_list = json.load(f)
-
-        for _key, value_dict in fp_list.items():
+        entries, by_value = feed_cache.get(database_location, self._load_fp_list)
+        if self.observable_classification == Classification.IP:
             # Checking observable classification is IP, is necessary to handle cases where response contains
             # results in 'ip:port' format
-            is_match = self.observable_name == value_dict["entry_value"] or (
-                self.observable_classification == Classification.IP
-                and self.observable_name in value_dict["entry_value"]
-            )
-
-            if is_match:
-                return {"fp_status": True, "details": value_dict}
+            for value_dict in entries:
+                if self.observable_name in value_dict["entry_value"]:
+                    return {"fp_status": True, "details": value_dict}
+        elif self.observable_name in by_value:
+            return {"fp_status": True, "details": by_value[self.observable_name]}
         return {"fp_status": False}
+
+    @staticmethod
+    def _load_fp_list(path: str) -> Tuple[List[dict], Dict[str, dict]]:
+        entries = list(load_json(path).values())
+        by_value = {}
+        for value_dict in entries:
+            by_value.setdefault(value_dict["entry_value"], value_dict)
+        return entries, by_value
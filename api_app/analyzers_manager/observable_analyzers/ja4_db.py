@@ -11,6 +11,7 @@ logger = logging.getLogger(__name__)
 
 
 class Ja4DB(classes.ObservableAnalyzer):
+    supports_batch = True
     url = "https://ja4db.com/api/read/"
     fingerprint_fields = (
         "ja4_fingerprint",
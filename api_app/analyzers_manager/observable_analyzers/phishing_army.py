@@ -15,6 +15,7 @@ logger = logging.getLogger(__name__)
 
 
 class PhishingArmy(classes.ObservableAnalyzer):
+    supports_batch = True
     url = "https://phishing.army/download/phishing_army_blocklist.txt"
 
     def run(self):
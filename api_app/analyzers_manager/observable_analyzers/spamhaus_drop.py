@@ -1,13 +1,16 @@
-import bisect
 import ipaddress
 import json
 import logging
+from typing import Dict, List
 
 import requests
+from django.conf import settings
 from django.db import transaction
 
 from api_app.analyzers_manager import classes
 from api_app.analyzers_manager.exceptions import AnalyzerRunException
+from api_app.analyzers_manager.feed_cache import feed_cache, load_json
+from api_app.analyzers_manager.ip_index import IPRangeIndex, atomic_write, get_index
 from api_app.analyzers_manager.models import SpamhausDropItem
 from api_app.choices import Classification
 
@@ -15,10 +18,13 @@ logger = logging.getLogger(__name__)
 
 
 class SpamhausDropV4(classes.ObservableAnalyzer):
+    supports_batch = True
     url = "https://www.spamhaus.org/drop"
     ipv4_url = url + "/drop_v4.json"
     ipv6_url = url + "/drop_v6.json"
     asn_url = url + "/asndrop.json"
+    ip_index_location = f"{settings.MEDIA_ROOT}/spamhaus_drop_ip.idx"
+    asn_map_location = f"{settings.MEDIA_ROOT}/spamhaus_drop_asn.json"
 
     def run(self):
         if self.observable_classification == Classification.IP:
@@ -32,33 +38,12 @@ class SpamhausDropV4(classes.ObservableAnalyzer):
         else:
             raise AnalyzerRunException(f"Invalid observable: {self.observable_name}")
 
-        if not SpamhausDropItem.objects.exists():
-            logger.info("SpamhausDrop database is empty, initialising...")
-            self.update()
-
-        matches = []
-
         if data_type in ["ipv4", "ipv6"]:
             # IP Matching
-            qs = SpamhausDropItem.objects.filter(data_type=data_type)
-            db = [item.details for item in qs]
-            db.sort(key=lambda x: ipaddress.ip_network(x["cidr"]).network_address)
-
-            insertion = bisect.bisect_left(
-                db, ip, key=lambda x: ipaddress.ip_network(x["cidr"]).network_address
-            )
-
-            for i in range(insertion, len(db)):
-                network = ipaddress.ip_network(db[i]["cidr"])
-                if ip in network:
-                    matches.append(db[i])
-                elif network.network_address > ip:
-                    break
+            matches = self.get_ip_index().lookup(ip)
         elif data_type == "asn":
             # ASN Matching
-            qs_asn = SpamhausDropItem.objects.filter(data_type="asn", value=str(asn))
-            for item in qs_asn:
-                matches.append(item.details)
+            matches = self.get_asn_map().get(str(asn), [])
         else:
             raise AnalyzerRunException(f"Invalid data_type: {data_type}")
 
@@ -108,8 +93,50 @@ class SpamhausDropV4(classes.ObservableAnalyzer):
             SpamhausDropItem.objects.all().delete()
             SpamhausDropItem.objects.bulk_create(db_entries, batch_size=1000, ignore_conflicts=True)
 
+        cls.build_lookup_files(db_entries)
         logger.info(f"SpamhausDropItem database updated with {len(db_entries)} items.")
 
+    @classmethod
+    def build_lookup_files(cls, items) -> None:
+        """
+        Persist the ready-to-query structures used by run():
+        an interval index of the IPv4/IPv6 networks and an ASN -> details map
+        """
+        networks = []
+        asn_map: Dict[str, List[dict]] = {}
+        for item in items:
+            if item.data_type == "asn":
+                asn_map.setdefault(item.value, []).append(item.details)
+            else:
+                networks.append((item.value, item.details))
+        IPRangeIndex.from_networks(networks).dump(cls.ip_index_location)
+        atomic_write(cls.asn_map_location, json.dumps(asn_map).encode())
+
+    @classmethod
+    def _ensure_lookup_files(cls) -> None:
+        if SpamhausDropItem.objects.exists():
+            # the db was populated before the lookup files existed
+            cls.build_lookup_files(SpamhausDropItem.objects.all())
+        else:
+            logger.info("SpamhausDrop database is empty, initialising...")
+            cls.update()
+
+    @classmethod
+    def get_ip_index(cls) -> IPRangeIndex:
+        index = get_index(cls.ip_index_location)
+        if index is None:
+            cls._ensure_lookup_files()
+            index = get_index(cls.ip_index_location)
+        return index
+
+    @classmethod
+    def get_asn_map(cls) -> Dict[str, List[dict]]:
+        asn_map = feed_cache.get(cls.asn_map_location, load_json)
+        if asn_map is None:
+            cls._ensure_lookup_files()
+            asn_map = feed_cache.get(cls.asn_map_location, load_json)
+        return asn_map
+
     @staticmethod
     def convert_to_json(input_string) -> list:
         lines = input_string.strip().split("\n")
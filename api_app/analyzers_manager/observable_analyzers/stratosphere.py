@@ -14,6 +14,7 @@ logger = logging.getLogger(__name__)
 
 
 class Stratos(classes.ObservableAnalyzer):
+    supports_batch = True
     base_url = "https://mcfp.felk.cvut.cz"
     mid_url = "/publicDatasets/CTU-AIPP-BlackList/Todays-Blacklists/"
     priority_url = "AIP_historical_blacklist_prioritized_by_"
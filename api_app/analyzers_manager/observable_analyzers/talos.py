@@ -9,6 +9,7 @@ from django.conf import settings
 
 from api_app.analyzers_manager import classes
 from api_app.analyzers_manager.exceptions import AnalyzerRunException
+from api_app.analyzers_manager.feed_cache import feed_cache, load_lines
 
 logger = logging.getLogger(__name__)
 
@@ -17,6 +18,8 @@ database_location = f"{settings.MEDIA_ROOT}/{db_name}"
 
 
 class Talos(classes.ObservableAnalyzer):
+    supports_batch = True
+
     def run(self):
         result = {"found": False}
         if not os.path.isfile(database_location) and not self.update():
@@ -25,11 +28,7 @@ class Talos(classes.ObservableAnalyzer):
         if not os.path.exists(database_location):
             raise AnalyzerRunException(f"database location {database_location} does not exist")
 
-        with open(database_location, "r", encoding="utf-8") as f:
-            db = f.read()
-
-        db_list = db.split("\n")
-        if self.observable_name in db_list:
+        if self.observable_name in feed_cache.get(database_location, load_lines):
             result["found"] = True
 
         return result
@@ -14,6 +14,7 @@ logger = logging.getLogger(__name__)
 
 
 class Tor(classes.ObservableAnalyzer):
+    supports_batch = True
     url: str = "https://check.torproject.org/exit-addresses"
 
     def run(self):
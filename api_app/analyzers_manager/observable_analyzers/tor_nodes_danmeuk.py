@@ -13,6 +13,7 @@ logger = logging.getLogger(__name__)
 
 
 class TorNodesDanMeUK(classes.ObservableAnalyzer):
+    supports_batch = True
     url: str = "https://www.dan.me.uk/torlist/?full"
 
     def run(self):
@@ -15,6 +15,7 @@ class TweetFeeds(ObservableAnalyzer):
     """
 
     url = "https://api.tweetfeed.live/v1/"
+    supports_batch = True
     filter1: str = ""
     time: str = ""
 
@@ -102,6 +102,17 @@ class Status(models.TextChoices):
         ]
 
 
+# an url is anything followed by "://", a hostname with at least a dot and whatever else:
+# only the shortest mandatory prefix is matched, the optional port and path never change the result
+_URL_REGEX = re.compile(r"^.+?://[a-z\d-]{1,200}\.[a-zA-Z\d\u2044\u2215!#$&(-;=?-\[\]_~]")
+_DOMAIN_REGEX = re.compile(
+    r"^(?:[\[\\]?\.[\]\\]?)?[a-z\d\-_]{1,63}(?:(?:[\[\\]?\.[\]\\]?)[a-z\d\-_]{1,63})+$",
+    re.IGNORECASE,
+)
+# md5, sha1 or sha256
+_HASH_REGEX = re.compile(r"^(?:[a-f\d]{32}|[a-f\d]{40}|[a-f\d]{64})$", re.IGNORECASE)
+
+
 class Classification(models.TextChoices):
     IP = "ip"
     URL = "url"
@@ -122,39 +133,45 @@ class Classification(models.TextChoices):
         Returns:
             str: one of `ip`, `url`, `domain`, `hash` or 'generic'.
         """
-        try:
-            ipaddress.ip_address(value)
-        except ValueError:
-            if re.match(
-                r"^.+://[a-z\d-]{1,200}"
-                r"(?:\.[a-zA-Z\d\u2044\u2215!#$&(-;=?-\[\]_~]{1,200})+"
-                r"(?::\d{2,6})?"
-                r"(?:/[a-zA-Z\d\u2044\u2215!#$&(-;=?-\[\]_~]{1,200})*"
-                r"(?:\.\w+)?",
-                value,
-            ):
-                classification = cls.URL
-            elif re.match(
-                r"^([\[\\]?\.[\]\\]?)?[a-z\d\-_]{1,63}"
-                r"(([\[\\]?\.[\]\\]?)[a-z\d\-_]{1,63})+$",
-                value,
-                re.IGNORECASE,
-            ):
-                classification = cls.DOMAIN
-            elif (
-                re.match(r"^[a-f\d]{32}$", value, re.IGNORECASE)
-                or re.match(r"^[a-f\d]{40}$", value, re.IGNORECASE)
-                or re.match(r"^[a-f\d]{64}$", value, re.IGNORECASE)
-            ):
-                classification = cls.HASH
+        # every matcher runs only on values that contain its mandatory characters:
+        # an ip needs 3 dots or a colon, an url "://", a domain a dot
+        # and a hash (without dots) is never an url or a domain
+        if ":" in value or value.count(".") == 3:
+            try:
+                ipaddress.ip_address(value)
+            except ValueError:
+                pass
             else:
-                classification = cls.GENERIC
-                logger.info(f"Couldn't detect observable classification for {value}, setting as 'generic'")
-        else:
-            # it's a simple IP
-            classification = cls.IP
+                # it's a simple IP
+                return cls.IP
+        if "://" in value and _URL_REGEX.match(value):
+            return cls.URL
+        if "." in value:
+            if _DOMAIN_REGEX.match(value):
+                return cls.DOMAIN
+        elif _HASH_REGEX.match(value):
+            return cls.HASH
+        logger.info(f"Couldn't detect observable classification for {value}, setting as 'generic'")
+        return cls.GENERIC
+
+    @classmethod
+    def calculate_observables(cls, values: typing.Iterable[str]) -> typing.List[str]:
+        """Returns the observable classification of every value,
+        classifying repeated values only once.
 
-        return classification
+        Args:
+            values (Iterable[str]):
+                observable values
+        Returns:
+            List[str]: the classifications, in the same order of the values.
+        """
+        classifications = {}
+        result = []
+        for value in values:
+            if value not in classifications:
+                classifications[value] = cls.calculate_observable(value)
+            result.append(classifications[value])
+        return result
 
     @classmethod
     def get_data_model_class(cls, classification: str) -> typing.Type:
@@ -1,5 +1,6 @@
 import base64
 import logging
+import time
 import traceback
 import typing
 from abc import ABCMeta, abstractmethod
@@ -30,6 +31,10 @@ class Plugin(metaclass=ABCMeta):
         kwargs: Additional keyword arguments.
     """
 
+    # plugins that can process many jobs in a single worker task
+    # (local db lookups, services with bulk endpoints) set this to True
+    supports_batch: bool = False
+
     def __init__(
         self,
         config: PythonConfig,
@@ -146,7 +151,9 @@ class Plugin(metaclass=ABCMeta):
         Args:
             runtime_configuration (dict): Runtime configuration parameters.
         """
-        self.__parameters = self._config.read_configured_params(self._user, runtime_configuration)
+        from api_app.plugin_cache import plugin_cache
+
+        self.__parameters = plugin_cache.get_params(self._config, self._user, runtime_configuration)
         for parameter in self.__parameters:
             attribute_name = f"_{parameter.name}" if parameter.is_secret else parameter.name
             setattr(self, attribute_name, parameter.value)
@@ -287,6 +294,66 @@ class Plugin(metaclass=ABCMeta):
             # add end time of process
             self.after_run()
 
+    @classmethod
+    def before_batch(cls, plugins: typing.List["Plugin"]) -> None:
+        """
+        Function called once before the plugins of a batch run, with their parameters already set.
+        Plugins with a bulk endpoint can override it to query all the observables of the batch
+        with a single request (or with a shared session), keeping on every plugin
+        what its `run` has to return.
+        """
+
+    @classmethod
+    def start_batch(cls, config: PythonConfig, runs: typing.List[list]) -> None:
+        """
+        Entrypoint function to execute the plugin over many jobs in a single task,
+        used for plugins with `supports_batch`.
+        The class and its config are resolved only once for the whole batch,
+        then `before_batch` is called with all the plugins.
+        The batch stops after the `soft_time_limit` of the config, like a single run:
+        the runs left pending are executed by the pipelines of their jobs.
+
+        Args:
+            config (PythonConfig): Configuration for the plugin.
+            runs (list): list of [job_id, runtime_configuration, task_id]
+        """
+        deadline = time.monotonic() + config.soft_time_limit
+        plugins = []
+        for job_id, runtime_configuration, task_id in runs:
+            plugin = cls(config=config)
+            plugin.job_id = job_id
+            try:
+                plugin.config(runtime_configuration)
+            except Exception as e:
+                # the error is reported by the run of the plugin
+                logger.warning(f"Unable to configure {plugin}: {e}")
+            plugins.append((plugin, runtime_configuration, task_id))
+        try:
+            cls.before_batch([plugin for plugin, *_ in plugins])
+        except Exception as e:
+            logger.exception(e)
+        for plugin, runtime_configuration, task_id in plugins:
+            if time.monotonic() >= deadline:
+                logger.warning(f"Stopping batch of {cls.__name__} after {config.soft_time_limit} seconds")
+                break
+            # the job could have been killed while the batch was running
+            if config.reports.filter(
+                job__pk=plugin.job_id, status=AbstractReport.STATUSES.KILLED.value
+            ).exists():
+                logger.info(f"Skipping {plugin}: killed")
+                continue
+            try:
+                plugin.start(
+                    job_id=plugin.job_id,
+                    runtime_configuration=runtime_configuration,
+                    task_id=task_id,
+                )
+            except Exception as e:
+                logger.exception(e)
+                config.reports.filter(job__pk=plugin.job_id).update(
+                    status=cls.report_model.STATUSES.FAILED.value
+                )
+
     def _handle_exception(self, exc, is_base_err: bool = False) -> None:
         if not is_base_err:
             traceback.print_exc()
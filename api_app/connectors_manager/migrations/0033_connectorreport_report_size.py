@@ -0,0 +1,25 @@
+# This file is a part of IntelOwl https://github.com/intelowlproject/IntelOwl
+# See the file 'LICENSE' for copying permission.
+
+from django.db import migrations, models
+
+import api_app.fields
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("connectors_manager", "0032_more_params_emails"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="connectorreport",
+            name="report",
+            field=api_app.fields.OffloadableJSONField(default=dict),
+        ),
+        migrations.AddField(
+            model_name="connectorreport",
+            name="report_size",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
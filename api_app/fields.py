@@ -1,8 +1,23 @@
 # This file is a part of IntelOwl https://github.com/intelowlproject/IntelOwl
 # See the file 'LICENSE' for copying permission.
 
+import hashlib
+import json
+import logging
+import uuid
+import weakref
+from typing import Any, Callable, Optional
+
+import zstandard
 from django import forms
+from django.conf import settings
 from django.contrib.postgres.fields import ArrayField
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import models, transaction
+from django.db.models.query_utils import DeferredAttribute
+
+logger = logging.getLogger(__name__)
 
 
 class ChoiceArrayField(ArrayField):
@@ -16,3 +31,156 @@ class ChoiceArrayField(ArrayField):
         defaults.update(kwargs)
         # this super call parameter is required
         return super(ArrayField, self).formfield(**defaults)
+
+
+def on_commit_or_rollback(on_commit: Callable[[], None], on_rollback: Callable[[], None], using: str = None):
+    """
+    Calls on_commit when the current transaction is committed and on_rollback when it is rolled back.
+    Django has no rollback hook, but it drops the commit callbacks of the rolled back transactions:
+    on_rollback is called when the commit callback is discarded without having been called.
+    """
+    state = {"committed": False}
+
+    def callback():
+        state["committed"] = True
+        on_commit()
+
+    def discarded(state: dict, on_rollback: Callable[[], None]):
+        if not state["committed"]:
+            on_rollback()
+
+    finalizer = weakref.finalize(callback, discarded, state, on_rollback)
+    # the pending callbacks are not rollbacks when the process exits
+    finalizer.atexit = False
+    transaction.on_commit(callback, using=using)
+
+
+class OffloadedJSONAttribute(DeferredAttribute):
+    """
+    Loads the offloaded value from the file storage the first time it is accessed.
+    """
+
+    def __get__(self, instance, cls=None):
+        if instance is None:
+            return self
+        data = instance.__dict__
+        if self.field.attname not in data:
+            # deferred field: refresh_from_db would load the value on another instance
+            data[self.field.attname] = (
+                instance.__class__._base_manager.db_manager(instance._state.db)
+                .filter(pk=instance.pk)
+                .values_list(self.field.attname, flat=True)
+                .get()
+            )
+        value = data[self.field.attname]
+        if OffloadableJSONField.is_stub(value):
+            data[self.field.stub_attname] = value
+            value = self.field.load(value)
+            data[self.field.attname] = value
+        return value
+
+    def __set__(self, instance, value):
+        # a data descriptor, so that __get__ is called even if the stub is in __dict__
+        instance.__dict__[self.field.attname] = value
+
+
+class OffloadableJSONField(models.JSONField):
+    """
+    JSONField whose values bigger than REPORT_OFFLOAD_MIN_BYTES are stored
+    compressed with zstd in the file storage.
+    The column keeps only a stub with the name of the file and a summary of the value:
+    the value is loaded lazily, only when the attribute is accessed.
+
+    The values are offloaded by `offload`, that the model has to call before saving,
+    in the same transaction of the save.
+    """
+
+    descriptor_class = OffloadedJSONAttribute
+    OFFLOADED_KEY = "__offloaded__"
+
+    @property
+    def stub_attname(self) -> str:
+        return f"_{self.attname}_stub"
+
+    @classmethod
+    def is_stub(cls, value: Any) -> bool:
+        return isinstance(value, dict) and cls.OFFLOADED_KEY in value
+
+    @staticmethod
+    def summarize(value: Any) -> dict:
+        if isinstance(value, dict):
+            return {"keys": list(value)[:50]}
+        if isinstance(value, list):
+            return {"length": len(value)}
+        return {}
+
+    def load(self, stub: dict) -> Any:
+        try:
+            with default_storage.open(stub[self.OFFLOADED_KEY]) as file:
+                content = zstandard.ZstdDecompressor().decompress(file.read())
+        except FileNotFoundError:
+            logger.error(f"offloaded value {stub[self.OFFLOADED_KEY]} not found")
+            return stub["summary"]
+        return json.loads(content, cls=self.decoder)
+
+    def offload(self, instance: models.Model) -> int:
+        """
+        Offloads the value of the instance if it is big enough.
+        The file of the previous value is deleted when the transaction is committed,
+        the file of the new value if it is rolled back.
+
+        Returns:
+            int: the size of the value serialized as json
+        """
+        value = getattr(instance, self.attname)
+        content = json.dumps(value, cls=self.encoder).encode()
+        previous: Optional[dict] = instance.__dict__.pop(self.stub_attname, None)
+        stub = None
+        created = None
+        if 0 < settings.REPORT_OFFLOAD_MIN_BYTES <= len(content):
+            digest = hashlib.sha256(content).hexdigest()
+            if previous and previous["sha256"] == digest:
+                stub = previous
+            else:
+                created = default_storage.save(
+                    f"reports/{instance._meta.model_name}/{uuid.uuid4()}.json.zst",
+                    ContentFile(zstandard.ZstdCompressor().compress(content)),
+                )
+                stub = {self.OFFLOADED_KEY: created, "sha256": digest, "summary": self.summarize(value)}
+            instance.__dict__[self.stub_attname] = stub
+        obsolete = previous[self.OFFLOADED_KEY] if previous and previous is not stub else None
+
+        def commit():
+            if obsolete:
+                default_storage.delete(obsolete)
+
+        def rollback():
+            # the row still points to the previous file
+            instance.__dict__.pop(self.stub_attname, None)
+            if previous:
+                instance.__dict__[self.stub_attname] = previous
+            if created:
+                default_storage.delete(created)
+
+        if created or obsolete:
+            on_commit_or_rollback(commit, rollback, using=instance._state.db)
+        return len(content)
+
+    def pre_save(self, model_instance, add):
+        # the column stores the stub of the offloaded value
+        stub = model_instance.__dict__.get(self.stub_attname)
+        if stub is not None:
+            return stub
+        return super().pre_save(model_instance, add)
+
+    def delete_offloaded(self, instance: models.Model) -> None:
+        """
+        Deletes the file of the offloaded value of a deleted instance, once the deletion is committed.
+        """
+        stub = instance.__dict__.get(self.stub_attname)
+        value = instance.__dict__.get(self.attname)
+        if stub is None and self.is_stub(value):
+            stub = value
+        if stub is not None:
+            name = stub[self.OFFLOADED_KEY]
+            transaction.on_commit(lambda: default_storage.delete(name), using=instance._state.db)
@@ -3,6 +3,7 @@
 
 # general helper functions used by the Django API
 
+import dataclasses
 import hashlib
 import ipaddress
 import logging
@@ -88,6 +89,45 @@ def calculate_sha256(value: bytes) -> str:
     return hashlib.sha256(value).hexdigest()  # skipcq BAN-B324
 
 
+# libmagic only needs the start of a file to detect its mimetype
+MIMETYPE_HEAD_SIZE = 1024 * 1024
+
+
+@dataclasses.dataclass(frozen=True)
+class FileHashes:
+    md5: str
+    sha1: str
+    sha256: str
+    size: int
+    head: bytes
+
+
+def calculate_hashes(chunks: typing.Iterable[bytes], head_size: int = MIMETYPE_HEAD_SIZE) -> FileHashes:
+    """
+    Calculates md5, sha1 and sha256 of the chunks in a single pass,
+    keeping in memory only their first head_size bytes.
+    """
+    md5 = hashlib.md5()  # skipcq BAN-B324
+    sha1 = hashlib.sha1()  # skipcq BAN-B324
+    sha256 = hashlib.sha256()
+    size = 0
+    head = bytearray()
+    for chunk in chunks:
+        md5.update(chunk)
+        sha1.update(chunk)
+        sha256.update(chunk)
+        size += len(chunk)
+        if len(head) < head_size:
+            head += chunk[: head_size - len(head)]
+    return FileHashes(
+        md5=md5.hexdigest(),
+        sha1=sha1.hexdigest(),
+        sha256=sha256.hexdigest(),
+        size=size,
+        head=bytes(head),
+    )
+
+
 def get_ip_version(ip_value):
     """
     Returns ip version
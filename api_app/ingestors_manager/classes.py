@@ -1,14 +1,18 @@
 # This file is a part of IntelOwl https://github.com/intelowlproject/IntelOwl
 # See the file 'LICENSE' for copying permission.
 import abc
+import hashlib
 import logging
 import typing
 from collections import deque
-from typing import Any, Type
+from typing import Any, List, Type
 
+from django.conf import settings
+from django.core.files import File
 from django.utils.functional import cached_property
 
 from api_app.decorators import classproperty
+from api_app.helpers import calculate_sha256
 
 from ..choices import TLP, PythonModuleBasePaths
 from ..classes import Plugin
@@ -67,18 +71,29 @@ class Ingestor(Plugin, metaclass=abc.ABCMeta):
         self._config: IngestorConfig
         return self._config.playbooks_choice.first()
 
-    def after_run_success(self, content):
-        # exhaust generator
-        if isinstance(content, typing.Generator):
-            content = list(content)
-
-        super().after_run_success(content)
+    @staticmethod
+    def _get_reference(item: Any) -> typing.Tuple[Any, int]:
+        """
+        Return what is stored in the report for an item,
+        the sha256 for samples, and the size of the item
+        """
+        if isinstance(item, File):
+            sha256 = hashlib.sha256()
+            for chunk in item.chunks():
+                sha256.update(chunk)
+            item.seek(0)
+            return sha256.hexdigest(), item.size
+        if isinstance(item, bytes):
+            return calculate_sha256(item), len(item)
+        return item, len(str(item))
+
+    def _create_jobs(self, chunk: List[Any]) -> None:
         self._config: IngestorConfig
-        logger.info(f"creating {len(content)} jobs from ingestor {self.__repr__()}")
+        logger.info(f"creating {len(chunk)} jobs from ingestor {self.__repr__()}")
         deque(
             self._config.create_jobs(
                 # every job created from an ingestor
-                content,
+                chunk,
                 TLP.CLEAR.value,
                 self._user,
                 delay=self._config.delay,
@@ -87,6 +102,29 @@ class Ingestor(Plugin, metaclass=abc.ABCMeta):
             maxlen=0,
         )
 
+    def after_run_success(self, content):
+        """
+        Consume the items yielded by run() in chunks, creating the jobs of every chunk
+        as soon as it has INGESTOR_CHUNK_SIZE items or INGESTOR_CHUNK_MAX_BYTES bytes,
+        so that only a chunk of samples is kept in memory.
+        The report contains the sha256 of the samples instead of the samples.
+        """
+        references, chunk, chunk_size = [], [], 0
+        for item in content:
+            reference, size = self._get_reference(item)
+            references.append(reference)
+            chunk.append(item)
+            chunk_size += size
+            if len(chunk) >= settings.INGESTOR_CHUNK_SIZE or chunk_size >= settings.INGESTOR_CHUNK_MAX_BYTES:
+                self._create_jobs(chunk)
+                chunk, chunk_size = [], 0
+                # keep track of the progress
+                self.report.report = references
+                self.report.save(update_fields=["report"])
+        if chunk:
+            self._create_jobs(chunk)
+        super().after_run_success(references)
+
     def execute_pivots(self) -> None:
         # we do not have a job, meaning that we have no pivots
         return
@@ -0,0 +1,25 @@
+# This file is a part of IntelOwl https://github.com/intelowlproject/IntelOwl
+# See the file 'LICENSE' for copying permission.
+
+from django.db import migrations, models
+
+import api_app.fields
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("ingestors_manager", "0030_alter_ingestor_config_required_api_key_abuse_ch"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="ingestorreport",
+            name="report",
+            field=api_app.fields.OffloadableJSONField(default=list, validators=[]),
+        ),
+        migrations.AddField(
+            model_name="ingestorreport",
+            name="report_size",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
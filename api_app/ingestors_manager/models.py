@@ -10,6 +10,7 @@ from django_celery_beat.models import CrontabSchedule, PeriodicTask
 
 from api_app.choices import PythonModuleBasePaths
 from api_app.decorators import classproperty
+from api_app.fields import OffloadableJSONField
 from api_app.ingestors_manager.exceptions import IngestorConfigurationException
 from api_app.ingestors_manager.queryset import IngestorQuerySet, IngestorReportQuerySet
 from api_app.interfaces import CreateJobsFromPlaybookInterface
@@ -40,7 +41,7 @@ class IngestorReport(AbstractReport):
 
     objects = IngestorReportQuerySet.as_manager()
     config = models.ForeignKey("IngestorConfig", related_name="reports", on_delete=models.CASCADE)
-    report = models.JSONField(default=list, validators=[])
+    report = OffloadableJSONField(default=list, validators=[])
     name = models.CharField(blank=True, default="", max_length=50)
     task_id = models.UUIDField(null=True, blank=True)
     job = models.ForeignKey(
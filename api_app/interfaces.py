@@ -121,6 +121,7 @@ class CreateJobsFromPlaybookInterface:
                 #    because it'll be calculated later
                 "tlp": tlp,
                 "delay": int(delay.total_seconds()),  # datetime.timedelta serialization
+                "bulk": True,
             },
             context={"request": MockUpRequest(user=user)},
             many=True,
@@ -159,6 +160,7 @@ class CreateJobsFromPlaybookInterface:
             "playbook_requested": playbook_to_execute.name,
             "tlp": tlp,
             "delay": int(delay.total_seconds()),  # datetime.timedelta serialization
+            "bulk": True,
         }
         query_dict.update(data)
         query_dict.setlist("files", files)
@@ -4,7 +4,7 @@ from typing import List
 
 from django.conf import settings
 from django.db import models
-from django.db.models import QuerySet
+from django.db.models import Q, QuerySet
 from django.utils.timezone import now
 
 from api_app.choices import TLP
@@ -62,23 +62,22 @@ class Investigation(OwnershipAbstractModel, ListCachable):
     def set_correct_status(self, save: bool = True):
         logger.info(f"Setting status for investigation {self.pk}")
         # if I have some jobs
-        if self.jobs.exists():
-            # and at least one is running
-            for job in self.jobs.all():
-                job: Job
-                jobs = job.get_tree(job)
-                running_jobs_list = jobs.exclude(status__in=Job.STATUSES.final_statuses()).values_list(
-                    "pk", flat=True
-                )
-                running_jobs_count = len(running_jobs_list)
-                logger.info(
-                    f"{running_jobs_count} out of {self.jobs.count()} jobs are still running for investigation {self.pk}"
-                )
-                if running_jobs_count > 0:
-                    logger.info(f"Jobs {running_jobs_list} are still running for investigation {self.pk}")
-                    self.status = self.STATUSES.RUNNING.value
-                    self.end_time = None
-                    break
+        if root_paths := list(self.jobs.values_list("path", flat=True)):
+            # and at least one of their trees is running:
+            # every job of the tree has a path starting with the one of the root
+            # so we can check all of them with a single query
+            tree_filter = Q()
+            for root_path in root_paths:
+                tree_filter |= Q(path__startswith=root_path)
+            running_jobs_list = list(
+                Job.objects.filter(tree_filter)
+                .exclude(status__in=Job.STATUSES.final_statuses())
+                .values_list("pk", flat=True)[:10]
+            )
+            if running_jobs_list:
+                logger.info(f"Jobs {running_jobs_list} are still running for investigation {self.pk}")
+                self.status = self.STATUSES.RUNNING.value
+                self.end_time = None
             # and they are all completed
             else:
                 logger.info(f"Setting investigation {self.pk} to concluded")
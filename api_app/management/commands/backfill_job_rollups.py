@@ -0,0 +1,31 @@
+# This file is a part of IntelOwl https://github.com/intelowlproject/IntelOwl
+# See the file 'LICENSE' for copying permission.
+
+import datetime
+
+from django.core.management import BaseCommand, CommandError
+from django.utils.timezone import now
+
+from api_app.models import JobRollup
+
+
+class Command(BaseCommand):
+    help = "Rebuild the job rollups used by the job aggregation endpoints"
+
+    @staticmethod
+    def add_arguments(parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=None,
+            help="Rebuild only the rollups of the last days (default: every job)",
+        )
+
+    def handle(self, *args, **options):
+        since = None
+        if options["days"] is not None:
+            if options["days"] <= 0:
+                raise CommandError("--days must be a positive number")
+            since = now() - datetime.timedelta(days=options["days"])
+        created = JobRollup.objects.backfill(since)
+        self.stdout.write(self.style.SUCCESS(f"Created {created} job rollups"))
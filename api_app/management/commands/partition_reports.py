@@ -0,0 +1,21 @@
+# This file is a part of IntelOwl https://github.com/intelowlproject/IntelOwl
+# See the file 'LICENSE' for copying permission.
+
+from django.core.management import BaseCommand, CommandError
+from django.db import connection
+
+from api_app.partitions import ReportPartitions, partition_reports, report_tables
+
+
+class Command(BaseCommand):
+    help = "Partition the plugin report tables by start_time and create the partitions of the next periods"
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("Report partitioning requires postgres")
+        partition_reports()
+        for table in report_tables():
+            partitions = ReportPartitions(table).partitions()
+            self.stdout.write(
+                self.style.SUCCESS(f"{table}: {len(partitions)} partitions up to {partitions[-1].end}")
+            )
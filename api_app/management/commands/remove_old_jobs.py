@@ -0,0 +1,57 @@
+# This file is a part of IntelOwl https://github.com/intelowlproject/IntelOwl
+# See the file 'LICENSE' for copying permission.
+
+from django.conf import settings
+from django.core.management import BaseCommand, CommandError
+
+from api_app.retention import JobRetention
+from intel_owl import secrets
+
+
+class Command(BaseCommand):
+    help = "Delete the jobs older than the retention period, or estimate what would be deleted"
+
+    @staticmethod
+    def add_arguments(parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=None,
+            help="Retention period in days (default: OLD_JOBS_RETENTION_DAYS)",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=settings.JOBS_RETENTION_BATCH_SIZE,
+            help="Number of old jobs deleted at a time",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only count the jobs, analyzables and files that would be deleted",
+        )
+
+    def handle(self, *args, **options):
+        days = options["days"]
+        if days is None:
+            days = int(secrets.get_secret("OLD_JOBS_RETENTION_DAYS", 14))
+        if days <= 0:
+            raise CommandError("--days must be a positive number")
+        if options["batch_size"] <= 0:
+            raise CommandError("--batch-size must be a positive number")
+        retention = JobRetention(days, options["batch_size"])
+        if options["dry_run"]:
+            estimate = retention.estimate()
+            self.stdout.write(
+                f"Would delete {estimate['jobs']} jobs in {estimate['batches']} batches, "
+                f"{estimate['analyzables']} analyzables and {estimate['files']} files"
+            )
+            return
+        metrics = retention.run()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Deleted {metrics.get('jobs', 0)} jobs, {metrics.get('analyzables', 0)} analyzables, "
+                f"{metrics.get('files', 0)} files and {metrics.get('investigations', 0)} investigations "
+                f"in {metrics['seconds']}s"
+            )
+        )
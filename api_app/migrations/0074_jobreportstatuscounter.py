@@ -0,0 +1,88 @@
+# This file is a part of IntelOwl https://github.com/intelowlproject/IntelOwl
+# See the file 'LICENSE' for copying permission.
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def migrate(apps, schema_editor):
+    JobReportStatusCounter = apps.get_model("api_app", "JobReportStatusCounter")
+    counters = {}
+    for app_label, model_name in [
+        ("analyzers_manager", "AnalyzerReport"),
+        ("connectors_manager", "ConnectorReport"),
+        ("visualizers_manager", "VisualizerReport"),
+    ]:
+        Report = apps.get_model(app_label, model_name)
+        for row in (
+            Report.objects.order_by()
+            .values("job_id", "status")
+            .annotate(count=models.Count("pk"))
+            .iterator()
+        ):
+            key = (row["job_id"], row["status"])
+            counters[key] = counters.get(key, 0) + row["count"]
+    JobReportStatusCounter.objects.bulk_create(
+        [
+            JobReportStatusCounter(job_id=job_id, status=status, count=count)
+            for (job_id, status), count in counters.items()
+        ],
+        batch_size=1000,
+    )
+
+
+def reverse_migrate(apps, schema_editor):
+    JobReportStatusCounter = apps.get_model("api_app", "JobReportStatusCounter")
+    JobReportStatusCounter.objects.all().delete()
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api_app", "0073_alter_updatecheckstatus_last_checked_at_and_more"),
+        ("analyzers_manager", "0190_remove_greynoise_labs_analyzer"),
+        ("connectors_manager", "0032_more_params_emails"),
+        ("visualizers_manager", "0043_visualizer_config_sample_static_analysis"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="JobReportStatusCounter",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("FAILED", "Failed"),
+                            ("PENDING", "Pending"),
+                            ("RUNNING", "Running"),
+                            ("SUCCESS", "Success"),
+                            ("KILLED", "Killed"),
+                        ],
+                        max_length=50,
+                    ),
+                ),
+                ("count", models.IntegerField(default=0)),
+                (
+                    "job",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="report_status_counters",
+                        to="api_app.job",
+                    ),
+                ),
+            ],
+            options={
+                "unique_together": {("job", "status")},
+            },
+        ),
+        migrations.RunPython(migrate, reverse_migrate),
+    ]
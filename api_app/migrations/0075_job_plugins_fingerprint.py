@@ -0,0 +1,58 @@
+# This file is a part of IntelOwl https://github.com/intelowlproject/IntelOwl
+# See the file 'LICENSE' for copying permission.
+
+import django.contrib.postgres.fields
+from django.db import migrations, models
+
+# same keys and hash of Job.get_requested_plugins_keys and Job.get_plugins_fingerprint
+# the "C" collation sorts the keys like python does
+POPULATE = """
+UPDATE "api_app_job" AS "job"
+SET "requested_plugins" = "plugins"."keys",
+    "plugins_fingerprint" = encode(sha256(convert_to(array_to_string("plugins"."keys", ','), 'UTF8')), 'hex')
+FROM (
+    SELECT "job_id", array_agg("key" ORDER BY "key" COLLATE "C") AS "keys"
+    FROM (
+        SELECT "job_id", 'a' || "analyzerconfig_id" AS "key" FROM "api_app_job_analyzers_requested"
+        UNION ALL
+        SELECT "job_id", 'c' || "connectorconfig_id" AS "key" FROM "api_app_job_connectors_requested"
+        UNION ALL
+        SELECT "job_id", 'v' || "visualizerconfig_id" AS "key" FROM "api_app_job_visualizers_to_execute"
+    ) AS "job_plugins"
+    GROUP BY "job_id"
+) AS "plugins"
+WHERE "plugins"."job_id" = "job"."id";
+"""
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api_app", "0074_jobreportstatuscounter"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="job",
+            name="requested_plugins",
+            field=django.contrib.postgres.fields.ArrayField(
+                base_field=models.CharField(max_length=32),
+                blank=True,
+                default=list,
+                editable=False,
+                size=None,
+            ),
+        ),
+        migrations.AddField(
+            model_name="job",
+            name="plugins_fingerprint",
+            field=models.CharField(blank=True, default="", editable=False, max_length=64),
+        ),
+        migrations.RunSQL(POPULATE, migrations.RunSQL.noop),
+        migrations.AddIndex(
+            model_name="job",
+            index=models.Index(
+                fields=["analyzable", "plugins_fingerprint", "received_request_time"],
+                name="PreviousJobSearch",
+            ),
+        ),
+    ]
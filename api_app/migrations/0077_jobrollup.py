@@ -0,0 +1,145 @@
+# This file is a part of IntelOwl https://github.com/intelowlproject/IntelOwl
+# See the file 'LICENSE' for copying permission.
+
+import datetime
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models.functions import Coalesce, Trunc
+
+STATUSES = [
+    "pending",
+    "running",
+    "analyzers_running",
+    "analyzers_completed",
+    "connectors_running",
+    "connectors_completed",
+    "pivots_running",
+    "pivots_completed",
+    "visualizers_running",
+    "visualizers_completed",
+    "reported_without_fails",
+    "reported_with_fails",
+    "killed",
+    "failed",
+]
+
+
+def migrate(apps, schema_editor):
+    # same rollups of JobRollup.objects.backfill
+    Job = apps.get_model("api_app", "Job")
+    JobRollup = apps.get_model("api_app", "JobRollup")
+    rows = (
+        Job.objects.order_by()
+        .annotate(
+            hour=Trunc("received_request_time", "hour", tzinfo=datetime.timezone.utc),
+            classification=models.F("analyzable__classification"),
+            mimetype=Coalesce("analyzable__mimetype", models.Value("")),
+        )
+        .values("hour", "user_id", "status", "classification", "mimetype", "playbook_to_execute_id", "tlp")
+        .annotate(count=models.Count("pk"))
+    )
+    JobRollup.objects.bulk_create(
+        (
+            JobRollup(
+                hour=row["hour"],
+                user_id=row["user_id"],
+                status=row["status"],
+                classification=row["classification"],
+                mimetype=row["mimetype"],
+                playbook_id=row["playbook_to_execute_id"],
+                tlp=row["tlp"],
+                count=row["count"],
+            )
+            for row in rows.iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+def reverse_migrate(apps, schema_editor):
+    JobRollup = apps.get_model("api_app", "JobRollup")
+    JobRollup.objects.all().delete()
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api_app", "0076_lastelasticreportupdate"),
+        ("playbooks_manager", "0066_link_crawl_visualizer_to_playbook"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="JobRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("hour", models.DateTimeField()),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[(status, status) for status in STATUSES],
+                        max_length=32,
+                    ),
+                ),
+                (
+                    "classification",
+                    models.CharField(
+                        choices=[
+                            ("ip", "Ip"),
+                            ("url", "Url"),
+                            ("domain", "Domain"),
+                            ("hash", "Hash"),
+                            ("generic", "Generic"),
+                            ("file", "File"),
+                        ],
+                        max_length=100,
+                    ),
+                ),
+                ("mimetype", models.CharField(blank=True, default="", max_length=80)),
+                (
+                    "tlp",
+                    models.CharField(
+                        choices=[
+                            ("CLEAR", "Clear"),
+                            ("GREEN", "Green"),
+                            ("AMBER", "Amber"),
+                            ("RED", "Red"),
+                        ],
+                        max_length=8,
+                    ),
+                ),
+                ("count", models.IntegerField(default=0)),
+                (
+                    "playbook",
+                    models.ForeignKey(
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        to="playbooks_manager.playbookconfig",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "unique_together": {("hour", "user", "status", "classification", "mimetype", "playbook", "tlp")},
+                "indexes": [models.Index(fields=["hour"], name="JobRollupHour")],
+            },
+        ),
+        migrations.RunPython(migrate, reverse_migrate),
+    ]
@@ -0,0 +1,30 @@
+# This file is a part of IntelOwl https://github.com/intelowlproject/IntelOwl
+# See the file 'LICENSE' for copying permission.
+
+from django.conf import settings
+from django.db import migrations
+
+from api_app.partitions import partition_reports
+
+
+def migrate(apps, schema_editor):
+    # the report tables can be partitioned later with the partition_reports command
+    if not settings.REPORTS_PARTITIONING_ENABLED or schema_editor.connection.vendor != "postgresql":
+        return
+    partition_reports(connection=schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ("api_app", "0077_jobrollup"),
+        ("analyzers_manager", "0190_remove_greynoise_labs_analyzer"),
+        ("connectors_manager", "0032_more_params_emails"),
+        ("pivots_manager", "0037_pivot_config_expandedurlreputation"),
+        ("visualizers_manager", "0043_visualizer_config_sample_static_analysis"),
+    ]
+
+    operations = [
+        migrations.RunPython(migrate, migrations.RunPython.noop),
+    ]
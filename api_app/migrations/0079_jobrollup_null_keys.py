@@ -0,0 +1,52 @@
+# This file is a part of IntelOwl https://github.com/intelowlproject/IntelOwl
+# See the file 'LICENSE' for copying permission.
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+KEY_FIELDS = ("hour", "user_id", "status", "classification", "mimetype", "playbook_id", "tlp")
+
+
+def migrate(apps, schema_editor):
+    # the rollups with the same key, created concurrently when the user or the playbook is null
+    JobRollup = apps.get_model("api_app", "JobRollup")
+    duplicates = (
+        JobRollup.objects.order_by()
+        .values(*KEY_FIELDS)
+        .annotate(rollups=models.Count("pk"), total=models.Sum("count"))
+        .filter(rollups__gt=1)
+    )
+    for row in duplicates.iterator():
+        total = row.pop("total")
+        row.pop("rollups")
+        rollups = JobRollup.objects.filter(**row)
+        first = rollups.order_by("pk").values_list("pk", flat=True).first()
+        rollups.exclude(pk=first).delete()
+        JobRollup.objects.filter(pk=first).update(count=total)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api_app", "0078_partition_reports"),
+    ]
+
+    operations = [
+        migrations.RunPython(migrate, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name="jobrollup",
+            unique_together=set(),
+        ),
+        migrations.AddConstraint(
+            model_name="jobrollup",
+            constraint=models.UniqueConstraint(
+                models.F("hour"),
+                Coalesce("user", 0),
+                models.F("status"),
+                models.F("classification"),
+                models.F("mimetype"),
+                Coalesce("playbook", 0),
+                models.F("tlp"),
+                name="JobRollupKey",
+            ),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# This file is a part of IntelOwl https://github.com/intelowlproject/IntelOwl
+# See the file 'LICENSE' for copying permission.
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api_app", "0079_jobrollup_null_keys"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="lastelasticreportupdate",
+            name="retries",
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -3,16 +3,19 @@
 # pylint: disable=cyclic-import
 # Reason: Harmless in Django due to bidirectional model relationships; resolved lazily at runtime via app registry
 import datetime
+import hashlib
 import json
 import logging
 import typing
 import uuid
+from collections import Counter
 from typing import TYPE_CHECKING, Any, Dict, Optional, Type
 
 from django.contrib.contenttypes.fields import GenericForeignKey, GenericRelation
 from django.contrib.contenttypes.models import ContentType
 from django.utils.timezone import now
 from django_celery_beat.models import ClockedSchedule, CrontabSchedule, PeriodicTask
+from solo.models import SingletonModel
 from treebeard.mp_tree import MP_Node
 
 from api_app.analyzables_manager.models import Analyzable
@@ -29,8 +32,9 @@ from django.contrib.postgres import fields as pg_fields
 from django.core.cache import cache
 from django.core.exceptions import ObjectDoesNotExist, ValidationError
 from django.core.validators import MinLengthValidator, MinValueValidator, RegexValidator
-from django.db import models
+from django.db import models, router, transaction
 from django.db.models import BaseConstraint, Q, QuerySet, UniqueConstraint
+from django.db.models.functions import Coalesce
 from django.urls import reverse
 from django.utils import timezone
 from django.utils.functional import cached_property
@@ -38,6 +42,7 @@ from django.utils.module_loading import import_string
 
 from api_app.choices import (
     TLP,
+    Classification,
     ParamTypes,
     PythonModuleBasePaths,
     ReportStatus,
@@ -50,12 +55,15 @@ if typing.TYPE_CHECKING:
 
 from api_app.decorators import classproperty
 from api_app.defaults import default_runtime
+from api_app.fields import OffloadableJSONField
 from api_app.helpers import deprecated, get_now
 from api_app.queryset import (
     AbstractConfigQuerySet,
     AbstractReportQuerySet,
     CommentQuerySet,
     JobQuerySet,
+    JobReportStatusCounterQuerySet,
+    JobRollupQuerySet,
     OrganizationPluginConfigurationQuerySet,
     ParameterQuerySet,
     PluginConfigQuerySet,
@@ -103,6 +111,21 @@ class UpdateCheckStatus(models.Model):
         return f"Update check info (latest: {self.latest_version or 'unknown'})"
 
 
+class LastElasticReportUpdate(SingletonModel):
+    """
+    High-water mark of the plugin reports exported to elasticsearch:
+    every report that ended before last_update_datetime has already been sent,
+    so the export can restart from there after a missed run.
+    retries counts the consecutive runs held back at last_update_datetime by retryable indexing errors.
+    """
+
+    last_update_datetime = models.DateTimeField(null=True, blank=True)
+    retries = models.PositiveIntegerField(default=0)
+
+    def __str__(self) -> str:
+        return f"Last elastic report update: {self.last_update_datetime}"
+
+
 class PythonModule(models.Model):
     """
     Represents a Python module model used in the application.
@@ -375,6 +398,10 @@ class Job(MP_Node):
             # SELECT COUNT(*) AS "__count" FROM "api_app_job"
             # WHERE ("api_app_job"."depth" >= ? AND "api_app_job"."path"::text LIKE ? AND NOT ("api_app_job"."id" = ?))
             models.Index(fields=["depth", "path", "id"], name="MPNodeSearch"),
+            models.Index(
+                fields=["analyzable", "plugins_fingerprint", "received_request_time"],
+                name="PreviousJobSearch",
+            ),
         ]
 
     # constants
@@ -468,10 +495,127 @@ class Job(MP_Node):
     )
     data_model_object_id = models.IntegerField(null=True, editable=False, blank=True)
     data_model = GenericForeignKey("data_model_content_type", "data_model_object_id")
+    # sorted keys of the plugins of the fields in REQUESTED_PLUGINS_FIELDS and their hash,
+    # kept aligned by the m2m_changed signals and used to find the previous analyses
+    requested_plugins = pg_fields.ArrayField(
+        models.CharField(max_length=32), blank=True, default=list, editable=False
+    )
+    plugins_fingerprint = models.CharField(max_length=64, blank=True, default="", editable=False)
+
+    # fields of the job that are part of the key of its rollup
+    ROLLUP_FIELDS = (
+        "received_request_time",
+        "user_id",
+        "status",
+        "analyzable_id",
+        "playbook_to_execute_id",
+        "tlp",
+    )
+
+    # field -> prefix of the keys of its plugins in requested_plugins
+    REQUESTED_PLUGINS_FIELDS = {
+        "analyzers_requested": "a",
+        "connectors_requested": "c",
+        "visualizers_to_execute": "v",
+    }
 
     def __str__(self):
         return f'{self.__class__.__name__}(#{self.pk}, "{self.analyzable.name}")'
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # required to know how the rollup of the job changes when it is saved
+        if not instance.get_deferred_fields().intersection(cls.ROLLUP_FIELDS):
+            instance._loaded_rollup_fields = instance.get_rollup_fields()
+        return instance
+
+    def save(self, *args, **kwargs):
+        """
+        Saves the job, keeping the job rollups aligned.
+        """
+        if getattr(self, "_saving", False):
+            # post_save_job saves the job again: the change is counted by the outer save
+            return super().save(*args, **kwargs)
+        adding = self._state.adding
+        previous = getattr(self, "_loaded_rollup_fields", None)
+        if not adding and previous is None:
+            previous = self.__class__.objects.filter(pk=self.pk).values(*self.ROLLUP_FIELDS).first()
+        self._saving = True
+        try:
+            super().save(*args, **kwargs)
+        finally:
+            del self._saving
+        # post_save_job saves every field of the job, even if only some were updated
+        current = self.get_rollup_fields()
+        if adding or previous != current:
+            deltas = Counter({self.get_rollup_key(): 1})
+            if not adding and previous is not None:
+                deltas[self.get_rollup_key(previous)] -= 1
+            JobRollup.objects.adjust(deltas)
+        self._loaded_rollup_fields = current
+
+    def get_rollup_fields(self) -> typing.Dict[str, typing.Any]:
+        """
+        Returns the values of the fields of the job that are part of the key of its rollup.
+        """
+        return {field: getattr(self, field) for field in self.ROLLUP_FIELDS}
+
+    def get_rollup_key(self, fields: typing.Dict[str, typing.Any] = None) -> typing.Tuple:
+        """
+        Returns the key of the job rollup that counts the job,
+        optionally with the rollup fields of a previous version of the job.
+        """
+        fields = fields or self.get_rollup_fields()
+        if fields["analyzable_id"] == self.analyzable_id:
+            analyzable = self.analyzable
+        else:
+            analyzable = Analyzable.objects.get(pk=fields["analyzable_id"])
+        return (
+            JobRollup.truncate(fields["received_request_time"]),
+            fields["user_id"],
+            fields["status"],
+            analyzable.classification,
+            analyzable.mimetype or "",
+            fields["playbook_to_execute_id"],
+            fields["tlp"],
+        )
+
+    @classmethod
+    def get_requested_plugins_keys(cls, **plugins: typing.Iterable["AbstractConfig"]) -> typing.List[str]:
+        """
+        Return the sorted keys of the plugins, passed by field name.
+        """
+        return sorted(
+            f"{cls.REQUESTED_PLUGINS_FIELDS[field]}{plugin.pk}"
+            for field, field_plugins in plugins.items()
+            for plugin in field_plugins
+        )
+
+    @staticmethod
+    def get_plugins_fingerprint(keys: typing.List[str]) -> str:
+        """
+        Return the fingerprint of a set of requested plugins keys.
+        """
+        if not keys:
+            return ""
+        return hashlib.sha256(",".join(sorted(keys)).encode()).hexdigest()
+
+    def refresh_requested_plugins(self, field: str = None) -> None:
+        """
+        Recompute and save requested_plugins and plugins_fingerprint,
+        reading only the plugins of field if it is specified.
+        """
+        fields = [field] if field else list(self.REQUESTED_PLUGINS_FIELDS)
+        prefixes = {self.REQUESTED_PLUGINS_FIELDS[field] for field in fields}
+        keys = [key for key in self.requested_plugins if key[0] not in prefixes]
+        for field in fields:
+            prefix = self.REQUESTED_PLUGINS_FIELDS[field]
+            keys.extend(f"{prefix}{pk}" for pk in getattr(self, field).values_list("pk", flat=True))
+        self.requested_plugins = sorted(keys)
+        self.plugins_fingerprint = self.get_plugins_fingerprint(self.requested_plugins)
+        self.save(update_fields=["requested_plugins", "plugins_fingerprint"])
+
     def get_root(self):
         if self.is_root():
             return self
@@ -588,29 +732,15 @@ class Job(MP_Node):
     def __get_config_to_execute(self, config: typing.Type["AbstractConfig"]) -> QuerySet:
         return getattr(self, f"{config.__name__.split('Config')[0].lower()}s_to_execute")
 
-    def __get_single_config_reports_stats(self, config: typing.Type["AbstractConfig"]) -> typing.Dict:
-        reports = self.__get_config_reports(config)
-        aggregators = {
-            s.lower(): models.Count("status", filter=models.Q(status=s))
-            for s in AbstractReport.STATUSES.values
-        }
-        return reports.aggregate(
-            all=models.Count("status"),
-            **aggregators,
-        )
-
     def _get_config_reports_stats(self) -> typing.Dict:
-        from api_app.analyzers_manager.models import AnalyzerConfig
-        from api_app.connectors_manager.models import ConnectorConfig
-        from api_app.visualizers_manager.models import VisualizerConfig
-
-        result = {}
-        for config in [AnalyzerConfig, ConnectorConfig, VisualizerConfig]:
-            partial_result = self.__get_single_config_reports_stats(config)
-            # merge them
-            result = {
-                k: result.get(k, 0) + partial_result.get(k, 0) for k in set(result) | set(partial_result)
-            }
+        """
+        Returns the number of analyzer, connector and visualizer reports of the job
+        for every status, read from the report status counters.
+        """
+        result = {status.lower(): 0 for status in AbstractReport.STATUSES.values}
+        for status, count in self.report_status_counters.values_list("status", "count"):
+            result[status.lower()] = count
+        result["all"] = sum(result.values())
         return result
 
     def kill_if_ongoing(self):
@@ -629,11 +759,18 @@ class Job(MP_Node):
             )
 
             ids = list(reports.values_list("task_id", flat=True))
+            # the tasks of the batches run also for other jobs: they skip the killed reports
+            batched = (
+                reports.model.objects.filter(task_id__in=ids)
+                .exclude(job=self)
+                .values_list("task_id", flat=True)
+            )
+            ids = list(set(ids).difference(batched))
             logger.info(f"We are going to kill tasks {ids}")
             # kill celery tasks using task ids
             celery_app.control.revoke(ids, terminate=True)
 
-            reports.update(status=self.STATUSES.KILLED, end_time=now())
+            reports.update(status=AbstractReport.STATUSES.KILLED, end_time=now())
 
         self.status = self.STATUSES.KILLED
         self.save(update_fields=["status"])
@@ -696,11 +833,20 @@ class Job(MP_Node):
         connectors: PythonConfigQuerySet,
         visualizers: PythonConfigQuerySet,
     ) -> Signature:
-        runner = self._get_signatures(analyzers.distinct())
+        return self._get_signatures(analyzers.distinct()) | self._get_pipeline_after_analyzers(
+            pivots, connectors, visualizers
+        )
+
+    def _get_pipeline_after_analyzers(
+        self,
+        pivots: PythonConfigQuerySet,
+        connectors: PythonConfigQuerySet,
+        visualizers: PythonConfigQuerySet,
+    ) -> Signature:
+        runner = self._get_engine_signature()
         pivots_analyzers = pivots.filter(related_analyzer_configs__isnull=False).distinct()
         if pivots_analyzers.exists():
-            runner |= self._get_signatures(pivots_analyzers)
-        runner |= self._get_engine_signature()
+            runner = self._get_signatures(pivots_analyzers) | runner
         if connectors.exists():
             runner |= self._get_signatures(connectors)
             pivots_connectors = pivots.filter(related_connector_configs__isnull=False).distinct()
@@ -722,6 +868,98 @@ class Job(MP_Node):
         )
         runner()
 
+    @classmethod
+    def execute_batch(cls, jobs: typing.List["Job"]) -> None:
+        """
+        Execute many jobs together, in chunks of BATCH_PIPELINE_SIZE jobs.
+        Every analyzer declaring `supports_batch` requested by more than one job of a chunk
+        runs first in a single task for all of them;
+        then every job continues with its own pipeline (see `execute_after_batch`),
+        so that it never waits for the other analyzers of the other jobs.
+        """
+        from api_app.analyzers_manager.models import AnalyzerConfig
+
+        for job in jobs:
+            job.status = cls.STATUSES.RUNNING
+            job.save(update_fields=["status"])
+        for i in range(0, len(jobs), settings.BATCH_PIPELINE_SIZE):
+            chunk = jobs[i : i + settings.BATCH_PIPELINE_SIZE]
+            batches: typing.Dict[AnalyzerConfig, typing.List[Job]] = {}
+            for job in chunk:
+                analyzers = (
+                    job.analyzers_to_execute.all()
+                    .distinct()
+                    .annotate_runnable(job.user)
+                    .filter(runnable=True)
+                )
+                for config in analyzers:
+                    if config.python_module.python_class.supports_batch:
+                        batches.setdefault(config, []).append(job)
+            signatures = []
+            batched = []
+            for config, batch_jobs in batches.items():
+                if len(batch_jobs) < 2:
+                    # a single run is executed by the pipeline of its job
+                    continue
+                # the reports have the id of the batch task: see `kill_if_ongoing`
+                task_id = str(uuid.uuid4())
+                runs = []
+                for job in batch_jobs:
+                    if job not in batched:
+                        batched.append(job)
+                    config.generate_empty_report(job, task_id, AbstractReport.STATUSES.PENDING.value)
+                    runs.append([job.pk, job.get_config_runtime_configuration(config), task_id])
+                signatures.append(
+                    tasks.run_plugin_batch.signature(
+                        [config.python_module_id, config.pk, runs],
+                        {},
+                        queue=config.queue,
+                        soft_time_limit=config.soft_time_limit,
+                        task_id=task_id,
+                        immutable=True,
+                        MessageGroupId=task_id,
+                        priority=chunk[0].priority,
+                    )
+                )
+            logger.info(f"Batch of {len(chunk)} jobs: {len(signatures)} batched analyzers")
+            if signatures:
+                runner = group(signatures) | tasks.job_pipeline_after_batch.signature(
+                    [[job.pk for job in batched]],
+                    {},
+                    queue=get_queue_name(settings.CONFIG_QUEUE),
+                    immutable=True,
+                    MessageGroupId=str(uuid.uuid4()),
+                    priority=chunk[0].priority,
+                )
+                runner()
+            for job in chunk:
+                if job not in batched:
+                    job.execute_after_batch()
+
+    def execute_after_batch(self):
+        """
+        Execute the pipeline of a job of a batch, without the analyzers already run by the batch.
+        The batched analyzers still pending, because the batch stopped at its time limit,
+        run in the pipeline as usual.
+        """
+        from api_app.analyzers_manager.models import AnalyzerConfig
+
+        analyzers = self.analyzers_to_execute.exclude(
+            pk__in=self.analyzerreports.exclude(status=AbstractReport.STATUSES.PENDING.value).values("config")
+        )
+        pivots = self.pivots_to_execute.all()
+        connectors = self.connectors_to_execute.all()
+        visualizers = self.visualizers_to_execute.all()
+        if analyzers.annotate_runnable(self.user).filter(runnable=True).exists():
+            runner = self._get_pipeline(analyzers, pivots, connectors, visualizers)
+        else:
+            runner = (
+                AnalyzerConfig.signature_pipeline_running(self)
+                | AnalyzerConfig.signature_pipeline_completed(self)
+                | self._get_pipeline_after_analyzers(pivots, connectors, visualizers)
+            )
+        runner()
+
     def get_user_events_data_model(self) -> BaseDataModelQuerySet:
         return self.analyzable.get_all_user_events_data_model(self.user)
 
@@ -778,6 +1016,94 @@ class Job(MP_Node):
             )
 
 
+class JobReportStatusCounter(models.Model):
+    """
+    Number of analyzer, connector and visualizer reports of a job with a given status.
+
+    The counters are updated every time a report is created, deleted or changes status,
+    so that the final status of the job is computed without aggregating its reports.
+
+    Attributes:
+        job (ForeignKey): The job the reports belong to.
+        status (str): The status of the reports.
+        count (int): The number of reports of the job with that status.
+    """
+
+    objects = JobReportStatusCounterQuerySet.as_manager()
+    job = models.ForeignKey(Job, on_delete=models.CASCADE, related_name="report_status_counters")
+    status = models.CharField(max_length=50, choices=ReportStatus.choices)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = [("job", "status")]
+
+    def __str__(self):
+        return f"{self.job_id}: {self.status} -> {self.count}"
+
+
+class JobRollup(models.Model):
+    """
+    Number of jobs received in an hour, for every combination of the dimensions
+    used by the job aggregation endpoints.
+
+    The rollups are updated every time a job is created, deleted or changes status,
+    so that the aggregations do not scan the job table.
+
+    Attributes:
+        hour (datetime): The hour (UTC) the jobs have been received.
+        user (User): The user who created the jobs.
+        status (str): The status of the jobs.
+        classification (str): The classification of the analyzable of the jobs.
+        mimetype (str): The MIME type of the analyzable of the jobs, empty for observables.
+        playbook (PlaybookConfig): The playbook executed by the jobs.
+            The rollups of a deleted playbook are merged into the ones without playbook.
+        tlp (str): The TLP of the jobs.
+        count (int): The number of jobs.
+    """
+
+    KEY_FIELDS = ("hour", "user_id", "status", "classification", "mimetype", "playbook_id", "tlp")
+
+    objects = JobRollupQuerySet.as_manager()
+    hour = models.DateTimeField()
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, null=True)
+    status = models.CharField(max_length=32, choices=Status.choices)
+    classification = models.CharField(max_length=100, choices=Classification.choices)
+    mimetype = models.CharField(max_length=80, blank=True, default="")
+    playbook = models.ForeignKey(
+        "playbooks_manager.PlaybookConfig",
+        on_delete=models.SET_NULL,
+        null=True,
+    )
+    tlp = models.CharField(max_length=8, choices=TLP.choices)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            # a missing user or playbook is a value of the key too: NULLs would be distinct
+            UniqueConstraint(
+                "hour",
+                Coalesce("user", 0),
+                "status",
+                "classification",
+                "mimetype",
+                Coalesce("playbook", 0),
+                "tlp",
+                name="JobRollupKey",
+            )
+        ]
+        indexes = [models.Index(fields=["hour"], name="JobRollupHour")]
+
+    def __str__(self):
+        return f"{self.hour}: {self.status} {self.classification} -> {self.count}"
+
+    @staticmethod
+    def truncate(date: datetime.datetime) -> datetime.datetime:
+        """
+        Returns the hour (UTC) of a date
+        """
+        return date.astimezone(datetime.timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+
 class Parameter(models.Model):
     """
     Represents a parameter that can be configured for a Python module.
@@ -1163,9 +1489,8 @@ class ListCachable(models.Model):
             user (User): The user for whom the cache keys are being deleted.
         """
         base_key = f"{cls.__name__}_{user.username if user else ''}"
-        for key in cache.get_where(f"list_{base_key}").keys():
-            logger.debug(f"Deleting cache key {key}")
-            cache.delete(key)
+        deleted = cache.delete_where(f"list_{base_key}")
+        logger.debug(f"Deleted {deleted} cache keys starting with list_{base_key}")
 
     @classproperty
     def python_path(cls) -> str:
@@ -1299,7 +1624,8 @@ class AbstractReport(models.Model):
 
     Attributes:
         status (str): The status of the report.
-        report (JSONField): The actual report data.
+        report (OffloadableJSONField): The actual report data, stored in the file storage when it is big.
+        report_size (int): The size of the report serialized as json.
         errors (ArrayField): A list of errors encountered during report generation.
         start_time (DateTimeField): The start time of the report generation.
         end_time (DateTimeField): The end time of the report generation.
@@ -1312,10 +1638,13 @@ class AbstractReport(models.Model):
     objects = AbstractReportQuerySet.as_manager()
     # constants
     STATUSES = ReportStatus
+    # whether the reports contribute to the final status of the job
+    counted_in_job_status: bool = True
 
     # fields
     status = models.CharField(max_length=50, choices=STATUSES.choices)
-    report = models.JSONField(default=dict)
+    report = OffloadableJSONField(default=dict)
+    report_size = models.PositiveIntegerField(default=0, editable=False)
     errors = pg_fields.ArrayField(models.CharField(max_length=512), default=list, blank=True)
     start_time = models.DateTimeField(default=timezone.now)
     end_time = models.DateTimeField(default=timezone.now)
@@ -1333,6 +1662,50 @@ class AbstractReport(models.Model):
         """Returns a string representation of the report."""
         return f"{self.__class__.__name__}(job:#{self.job_id}, {self.config.name})"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # required to know how the status changes when the report is saved
+        instance._loaded_status = instance.__dict__.get("status")
+        return instance
+
+    def save(self, *args, **kwargs):
+        """
+        Saves the report, keeping the report status counters of the job aligned.
+        Big reports are offloaded to the file storage.
+        """
+        adding = self._state.adding
+        update_fields = kwargs.get("update_fields")
+        track = self.counted_in_job_status and (update_fields is None or "status" in update_fields)
+        previous = getattr(self, "_loaded_status", None)
+        if track and not adding and previous is None:
+            previous = self.__class__.objects.filter(pk=self.pk).values_list("status", flat=True).first()
+        if update_fields is None or "report" in update_fields:
+            if update_fields is not None:
+                kwargs["update_fields"] = [*update_fields, "report_size"]
+            # the offloaded files are deleted when the row is committed or rolled back
+            with transaction.atomic(using=kwargs.get("using") or router.db_for_write(self.__class__)):
+                self.report_size = self._meta.get_field("report").offload(self)
+                super().save(*args, **kwargs)
+        else:
+            super().save(*args, **kwargs)
+        if track and (adding or previous != self.status):
+            deltas = Counter({(self.job_id, self.status): 1})
+            if not adding and previous is not None:
+                deltas[(self.job_id, previous)] -= 1
+            JobReportStatusCounter.objects.adjust(deltas)
+        self._loaded_status = self.status
+
+    def delete(self, *args, **kwargs):
+        """
+        Deletes the report, keeping the report status counters of the job aligned.
+        """
+        result = super().delete(*args, **kwargs)
+        # the report could have already been deleted together with its job
+        if self.counted_in_job_status and result[1].get(self._meta.label):
+            JobReportStatusCounter.objects.adjust({(self.job_id, self.status): -1})
+        return result
+
     @classproperty
     def config(cls) -> "AbstractConfig":
         """
@@ -1514,9 +1887,11 @@ class PythonConfig(AbstractConfig):
         Returns:
             dict: The configured parameters.
         """
+        from api_app.plugin_cache import plugin_cache
+
         return {
             parameter.name: parameter.value
-            for parameter in self.read_configured_params(user, runtime_configuration)
+            for parameter in plugin_cache.get_params(self, user, runtime_configuration)
             if not parameter.is_secret
         }
 
@@ -1538,6 +1913,7 @@ class PythonConfig(AbstractConfig):
             defaults={
                 "status": status,
                 "task_id": task_id,
+                # on a partitioned table, the report of a new run is moved to the current partition
                 "start_time": now(),
                 "end_time": now(),
                 "parameters": self._get_params(job.user, job.get_config_runtime_configuration(self)),
@@ -1554,9 +1930,8 @@ class PythonConfig(AbstractConfig):
         from api_app.serializers.plugin import PythonConfigListSerializer
 
         base_key = f"{self.__class__.__name__}_{self.name}_{user.username if user else ''}"
-        for key in cache.get_where(f"serializer_{base_key}").keys():
-            logger.debug(f"Deleting cache key {key}")
-            cache.delete(key)
+        deleted = cache.delete_where(f"serializer_{base_key}")
+        logger.debug(f"Deleted {deleted} cache keys starting with serializer_{base_key}")
         if user:
             PythonConfigListSerializer(child=self.serializer_class()).to_representation_single_plugin(
                 self, user
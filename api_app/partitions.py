@@ -0,0 +1,347 @@
+# This file is a part of IntelOwl https://github.com/intelowlproject/IntelOwl
+# See the file 'LICENSE' for copying permission.
+
+import datetime
+import logging
+from dataclasses import dataclass
+from typing import Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import connection as default_connection
+from django.db import transaction
+
+from api_app.fields import OffloadableJSONField
+
+logger = logging.getLogger(__name__)
+
+EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+@dataclass(frozen=True)
+class Partition:
+    name: str
+    start: Optional[datetime.datetime]  # None for the legacy partition
+    end: datetime.datetime
+
+
+def report_tables() -> List[str]:
+    """
+    Tables of the plugin reports that can be partitioned by start_time.
+    """
+    from api_app.analyzers_manager.models import AnalyzerReport
+    from api_app.connectors_manager.models import ConnectorReport
+    from api_app.pivots_manager.models import PivotReport
+    from api_app.visualizers_manager.models import VisualizerReport
+
+    return [
+        model._meta.db_table for model in (AnalyzerReport, ConnectorReport, PivotReport, VisualizerReport)
+    ]
+
+
+def period_start(date: datetime.datetime, days: int) -> datetime.datetime:
+    """
+    Returns the start of the partition that contains the date:
+    partitions are aligned on multiples of `days` days from the epoch.
+    """
+    return EPOCH + datetime.timedelta(days=(date - EPOCH).days // days * days)
+
+
+class ReportPartitions:
+    """
+    Native postgres range partitions by ``start_time`` of a plugin report table.
+
+    Every partition covers REPORTS_PARTITION_DAYS days and is named after its first day.
+    The rows that existed before the partitioning are kept in the ``_legacy`` partition
+    and the rows outside every range end up in the ``_default`` partition.
+    """
+
+    def __init__(self, table: str, connection=None, days: int = None):
+        self.table = table
+        self.connection = connection or default_connection
+        self.days = days or settings.REPORTS_PARTITION_DAYS
+
+    def _quote(self, name: str) -> str:
+        return self.connection.ops.quote_name(name)
+
+    @staticmethod
+    def _legacy_name(name: str) -> str:
+        # postgres identifiers are at most 63 characters long
+        return f"{name[:56]}_legacy"
+
+    @staticmethod
+    def _part_name(constraint: str) -> str:
+        return f"{constraint[:58]}_part"
+
+    @staticmethod
+    def _keys_name(constraint: str) -> str:
+        return f"{constraint[:58]}_keys"
+
+    @staticmethod
+    def _columns(definition: str) -> List[str]:
+        # UNIQUE (config_id, job_id)
+        return [column.strip() for column in definition[definition.index("(") + 1 : -1].split(",")]
+
+    def _unique_keys(self, cursor) -> List[Tuple[str, List[str]]]:
+        """
+        Returns the tables that enforce the unique constraints of the partitioned table, with their columns.
+        """
+        cursor.execute(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = %s::regclass AND contype = 'u'",
+            [self.table],
+        )
+        # the unique constraints of the partitioned table end with the partition key
+        return [
+            (self._keys_name(name), self._columns(definition)[:-1]) for name, definition in cursor.fetchall()
+        ]
+
+    def _create_unique_keys(self, cursor, constraint: str, columns: List[str], source: str) -> None:
+        """
+        Enforces a unique constraint of the table without the partition key:
+        postgres can't, so the keys of the rows are kept in a plain table with that constraint,
+        updated by triggers.
+        """
+        table = self._quote(self.table)
+        keys = self._quote(self._keys_name(constraint))
+        function = self._quote(f"{constraint[:58]}_sync")
+        names = ", ".join(columns)
+        old = ", ".join(f"OLD.{column}" for column in columns)
+        new = ", ".join(f"NEW.{column}" for column in columns)
+        cursor.execute(f"CREATE TABLE {keys} AS SELECT {names} FROM {source} WITH NO DATA")
+        cursor.execute(f"INSERT INTO {keys} SELECT {names} FROM {source}")
+        cursor.execute(f"ALTER TABLE {keys} ADD PRIMARY KEY ({names})")
+        cursor.execute(
+            f"CREATE FUNCTION {function}() RETURNS trigger LANGUAGE plpgsql AS $$ BEGIN "
+            f"IF TG_OP IN ('DELETE', 'UPDATE') THEN DELETE FROM {keys} WHERE ({names}) = ({old}); END IF; "
+            f"IF TG_OP IN ('INSERT', 'UPDATE') THEN INSERT INTO {keys} ({names}) VALUES ({new}); END IF; "
+            "RETURN NULL; END $$"
+        )
+        cursor.execute(
+            f"CREATE TRIGGER {function} AFTER INSERT OR DELETE ON {table} "
+            f"FOR EACH ROW EXECUTE FUNCTION {function}()"
+        )
+        cursor.execute(
+            f"CREATE TRIGGER {self._quote(f'{constraint[:56]}_update')} AFTER UPDATE ON {table} "
+            f"FOR EACH ROW WHEN (({old}) IS DISTINCT FROM ({new})) EXECUTE FUNCTION {function}()"
+        )
+
+    def is_partitioned(self) -> bool:
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = %s::regclass)",
+                [self.table],
+            )
+            return cursor.fetchone()[0]
+
+    def partitions(self) -> List[Partition]:
+        """
+        Returns the range partitions of the table, sorted by start.
+        """
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT child.relname, pg_get_expr(child.relpartbound, child.oid) "
+                "FROM pg_inherits JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+                "WHERE pg_inherits.inhparent = %s::regclass",
+                [self.table],
+            )
+            rows = cursor.fetchall()
+        partitions = []
+        for name, bound in rows:
+            if bound == "DEFAULT":
+                continue
+            # FOR VALUES FROM ('2024-01-01 00:00:00+00') TO ('2024-01-08 00:00:00+00')
+            start, end = (value.strip("()' ") for value in bound.split("FROM", 1)[1].split(" TO "))
+            partitions.append(
+                Partition(
+                    name=name,
+                    start=None if start == "MINVALUE" else datetime.datetime.fromisoformat(start),
+                    end=datetime.datetime.fromisoformat(end),
+                )
+            )
+        return sorted(partitions, key=lambda partition: partition.end)
+
+    def partition(self, start: datetime.datetime) -> None:
+        """
+        Converts the table into a table partitioned by start_time.
+        The existing rows are not copied: the old table becomes the legacy partition,
+        that ends where the first partition starts, so every existing report must have started before.
+        The unique constraints are enforced by the tables of their keys.
+        """
+        table = self._quote(self.table)
+        legacy = self._quote(f"{self.table}_legacy")
+        sequence = f"{self.table}_partitioned_id_seq"
+        check = self._quote(f"{self.table[:51]}_range_check")
+        # concurrent operations can't run in a transaction
+        concurrently = "" if self.connection.in_atomic_block else "CONCURRENTLY"
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT conname, contype, pg_get_constraintdef(oid) FROM pg_constraint "
+                "WHERE conrelid = %s::regclass AND contype IN ('p', 'u', 'f')",
+                [self.table],
+            )
+            constraints = [
+                # the unique constraints of a partitioned table must include the partition key
+                (
+                    name,
+                    constraint_type,
+                    definition if constraint_type == "f" else f"{definition[:-1]}, start_time)",
+                )
+                for name, constraint_type, definition in cursor.fetchall()
+            ]
+            # the attach of the legacy partition does not lock the table while scanning it
+            # or building the indexes of the partitioned constraints: do both in advance, without blocking the writes.
+            # A valid check constraint matching the range of the partition lets the attach skip the scan
+            cursor.execute(f"ALTER TABLE {table} DROP CONSTRAINT IF EXISTS {check}")
+            cursor.execute(
+                f"ALTER TABLE {table} ADD CONSTRAINT {check} CHECK (start_time < %s) NOT VALID", [start]
+            )
+            cursor.execute(f"ALTER TABLE {table} VALIDATE CONSTRAINT {check}")
+            for name, constraint_type, definition in constraints:
+                if constraint_type != "f":
+                    index = self._quote(self._part_name(name))
+                    # an index left invalid by a failed build can't be used
+                    cursor.execute(f"DROP INDEX {concurrently} IF EXISTS {index}")
+                    cursor.execute(
+                        f"CREATE UNIQUE INDEX {concurrently} {index} ON {table} "
+                        f"({', '.join(self._columns(definition))})"
+                    )
+        with transaction.atomic(using=self.connection.alias), self.connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT indexname, indexdef FROM pg_indexes WHERE tablename = %s AND indexname NOT IN "
+                "(SELECT conname FROM pg_constraint WHERE conrelid = %s::regclass) AND NOT indexname = ANY(%s)",
+                [self.table, self.table, [self._part_name(name) for name, _, _ in constraints]],
+            )
+            indexes = cursor.fetchall()
+
+            # the names of the indexes are free for the partitioned table
+            for name, _ in indexes:
+                cursor.execute(
+                    f"ALTER INDEX {self._quote(name)} RENAME TO {self._quote(self._legacy_name(name))}"
+                )
+            for name, constraint_type, _ in constraints:
+                # the foreign keys of the partitioned table are cloned to every partition,
+                # the other constraints are replaced by the ones on the indexes built in advance
+                cursor.execute(f"ALTER TABLE {table} DROP CONSTRAINT {self._quote(name)}")
+                if constraint_type != "f":
+                    cursor.execute(
+                        f"ALTER TABLE {table} ADD CONSTRAINT {self._quote(self._legacy_name(name))} "
+                        f"{'PRIMARY KEY' if constraint_type == 'p' else 'UNIQUE'} "
+                        f"USING INDEX {self._quote(self._part_name(name))}"
+                    )
+            cursor.execute(f"ALTER TABLE {table} RENAME TO {legacy}")
+            # partitioned tables can't have identity columns before postgres 17
+            cursor.execute(f"ALTER TABLE {legacy} ALTER COLUMN id DROP IDENTITY IF EXISTS")
+            cursor.execute(f"ALTER TABLE {legacy} ALTER COLUMN id DROP DEFAULT")
+            cursor.execute(
+                f"CREATE TABLE {table} (LIKE {legacy} INCLUDING STORAGE) PARTITION BY RANGE (start_time)"
+            )
+            cursor.execute(f"CREATE SEQUENCE {self._quote(sequence)} OWNED BY {table}.id")
+            cursor.execute(
+                f"SELECT setval(%s, COALESCE((SELECT max(id) FROM {legacy}), 0) + 1, false)",
+                [sequence],
+            )
+            cursor.execute(f"ALTER TABLE {table} ALTER COLUMN id SET DEFAULT nextval('{sequence}'::regclass)")
+            for name, constraint_type, definition in constraints:
+                cursor.execute(f"ALTER TABLE {table} ADD CONSTRAINT {self._quote(name)} {definition}")
+                if constraint_type == "u":
+                    self._create_unique_keys(cursor, name, self._columns(definition)[:-1], legacy)
+            for _, definition in indexes:
+                cursor.execute(definition)
+            cursor.execute(
+                f"ALTER TABLE {table} ATTACH PARTITION {legacy} FOR VALUES FROM (MINVALUE) TO (%s)",
+                [start],
+            )
+            # redundant with the partition constraint
+            cursor.execute(f"ALTER TABLE {legacy} DROP CONSTRAINT {check}")
+            cursor.execute(
+                f"CREATE TABLE {self._quote(f'{self.table}_default')} PARTITION OF {table} DEFAULT"
+            )
+        logger.info(f"partitioned {self.table} from {start}")
+
+    def create(self, until: datetime.datetime) -> List[Partition]:
+        """
+        Creates the missing partitions up to the one that contains `until`.
+        """
+        partitions = self.partitions()
+        start = partitions[-1].end if partitions else period_start(until, self.days)
+        created = []
+        with self.connection.cursor() as cursor:
+            while start <= until:
+                partition = Partition(
+                    name=f"{self.table}_p{start:%Y%m%d}",
+                    start=start,
+                    end=start + datetime.timedelta(days=self.days),
+                )
+                cursor.execute(
+                    f"CREATE TABLE {self._quote(partition.name)} PARTITION OF {self._quote(self.table)} "
+                    "FOR VALUES FROM (%s) TO (%s)",
+                    [partition.start, partition.end],
+                )
+                created.append(partition)
+                start = partition.end
+        if created:
+            logger.info(f"created partitions {[partition.name for partition in created]}")
+        return created
+
+    def drop(self, date: datetime.datetime) -> List[Partition]:
+        """
+        Drops the partitions of the reports started before the date,
+        if every report of the partition belongs to a job finished before the date:
+        the retention would delete all of them.
+        """
+        dropped = []
+        with self.connection.cursor() as cursor:
+            for partition in self.partitions():
+                if partition.end > date:
+                    break
+                cursor.execute(
+                    f"SELECT EXISTS (SELECT 1 FROM {self._quote(partition.name)} report "
+                    "JOIN api_app_job job ON job.id = report.job_id "
+                    "WHERE job.finished_analysis_time IS NULL OR job.finished_analysis_time >= %s)",
+                    [date],
+                )
+                if cursor.fetchone()[0]:
+                    logger.info(f"partition {partition.name} has reports of recent jobs, not dropped")
+                    continue
+                # the reports of the partition are not deleted one by one: remove their offloaded files too
+                cursor.execute(
+                    f"SELECT report ->> %s FROM {self._quote(partition.name)} WHERE report ? %s",
+                    [OffloadableJSONField.OFFLOADED_KEY, OffloadableJSONField.OFFLOADED_KEY],
+                )
+                offloaded = [name for (name,) in cursor.fetchall()]
+                with transaction.atomic(using=self.connection.alias):
+                    # dropping the partition does not fire the triggers of its rows
+                    for keys, columns in self._unique_keys(cursor):
+                        names = ", ".join(columns)
+                        cursor.execute(
+                            f"DELETE FROM {self._quote(keys)} WHERE ({names}) IN "
+                            f"(SELECT {names} FROM {self._quote(partition.name)})"
+                        )
+                    cursor.execute(f"DROP TABLE {self._quote(partition.name)}")
+                for name in offloaded:
+                    default_storage.delete(name)
+                dropped.append(partition)
+        if dropped:
+            logger.info(f"dropped partitions {[partition.name for partition in dropped]}")
+        return dropped
+
+
+def partition_reports(tables: Iterable[str] = None, connection=None) -> None:
+    """
+    Partitions the report tables that are not partitioned yet
+    and creates the partitions of the next periods.
+    """
+    connection = connection or default_connection
+    if connection.vendor != "postgresql":
+        logger.warning("report partitioning requires postgres")
+        return
+    now = datetime.datetime.now(datetime.timezone.utc)
+    for table in tables or report_tables():
+        partitions = ReportPartitions(table, connection)
+        if not partitions.is_partitioned():
+            # the reports of the current period are in the legacy partition
+            partitions.partition(
+                period_start(now, partitions.days) + datetime.timedelta(days=partitions.days)
+            )
+        partitions.create(now + datetime.timedelta(days=2 * partitions.days))
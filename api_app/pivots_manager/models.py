@@ -26,6 +26,7 @@ logger = logging.getLogger(__name__)
 
 class PivotReport(AbstractReport):
     objects = PivotReportQuerySet.as_manager()
+    counted_in_job_status = False
     config = models.ForeignKey("PivotConfig", related_name="reports", null=False, on_delete=models.CASCADE)
 
     class Meta:
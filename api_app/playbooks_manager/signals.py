@@ -3,10 +3,11 @@ import uuid
 from typing import Type
 
 from django.conf import settings
-from django.db.models.signals import m2m_changed
+from django.db.models.signals import m2m_changed, pre_delete
 from django.dispatch import receiver
 from rest_framework.exceptions import ValidationError
 
+from api_app.models import JobRollup
 from api_app.pivots_manager.models import PivotConfig
 from api_app.playbooks_manager.models import PlaybookConfig
 from api_app.signals import migrate_finished
@@ -35,6 +36,12 @@ def post_migrate_playbooks_manager(
     )
 
 
+@receiver(pre_delete, sender=PlaybookConfig)
+def pre_delete_playbook_config(sender, instance: PlaybookConfig, **kwargs):
+    # the jobs of the playbook are left without playbook, their rollups too
+    JobRollup.objects.remove_playbook(instance.pk)
+
+
 @receiver(m2m_changed, sender=PlaybookConfig.analyzers.through)
 def m2m_changed_analyzers_playbook_config(
     sender, instance: PlaybookConfig, action, reverse, model, pk_set, *args, **kwargs
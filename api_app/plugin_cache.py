@@ -0,0 +1,175 @@
+# This file is a part of IntelOwl https://github.com/intelowlproject/IntelOwl
+# See the file 'LICENSE' for copying permission.
+
+import copy
+import json
+import logging
+import threading
+import time
+import typing
+import uuid
+from collections import Counter
+from typing import Any, Dict, Hashable, List, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+if typing.TYPE_CHECKING:
+    from api_app.classes import Plugin
+    from api_app.models import Parameter, PythonConfig
+    from certego_saas.apps.user.models import User
+
+logger = logging.getLogger(__name__)
+
+
+class PluginCache:
+    """
+    Per worker process cache of everything `run_plugin` resolves before running a plugin:
+    the plugin class, its config and the parameters configured for a (user, config) pair.
+
+    Entries expire after PLUGIN_CACHE_TIMEOUT seconds and are dropped
+    when a config, a parameter or a plugin config changes:
+    the workers by the `invalidate_plugin_cache` and `update_plugin` control commands,
+    every process (the API ones too) when it sees the new version of the plugins
+    in the shared cache, checked every PLUGIN_CACHE_VERSION_INTERVAL seconds.
+
+    The callers get a copy of the cached objects, so they can't change them.
+    """
+
+    KINDS = ("class", "config", "params")
+    VERSION_KEY = "plugin_cache_version"
+
+    def __init__(self):
+        # (kind, key) -> (expires, python_module_pk, value)
+        self._entries: Dict[Tuple[str, Hashable], Tuple[float, int, Any]] = {}
+        self._lock = threading.Lock()
+        self._version = None
+        self._version_checked = 0.0
+        self.hits = Counter()
+        self.misses = Counter()
+
+    @property
+    def timeout(self) -> int:
+        return settings.PLUGIN_CACHE_TIMEOUT
+
+    def _check_version(self) -> None:
+        if time.monotonic() - self._version_checked < settings.PLUGIN_CACHE_VERSION_INTERVAL:
+            return
+        try:
+            version = cache.get(self.VERSION_KEY)
+        except Exception as e:
+            # the entries still expire after PLUGIN_CACHE_TIMEOUT
+            logger.warning(f"Unable to read plugin cache version: {e}")
+            return
+        with self._lock:
+            if version != self._version:
+                self._entries.clear()
+                self._version = version
+            self._version_checked = time.monotonic()
+
+    def _get_or_set(self, kind: str, key: Hashable, python_module_pk: int, getter: typing.Callable):
+        if not self.timeout:
+            return getter()
+        self._check_version()
+        with self._lock:
+            entry = self._entries.get((kind, key))
+        if entry and entry[0] > time.monotonic():
+            self.hits[kind] += 1
+            # the classes are not copied
+            return copy.deepcopy(entry[2])
+        self.misses[kind] += 1
+        value = getter()
+        with self._lock:
+            self._entries[(kind, key)] = (time.monotonic() + self.timeout, python_module_pk, value)
+        return copy.deepcopy(value)
+
+    def get_class(self, python_module_pk: int) -> typing.Type["Plugin"]:
+        from api_app.models import PythonModule
+
+        return self._get_or_set(
+            "class",
+            python_module_pk,
+            python_module_pk,
+            lambda: PythonModule.objects.get(pk=python_module_pk).python_class,
+        )
+
+    def get_config(self, plugin_class: typing.Type["Plugin"], config_pk) -> "PythonConfig":
+        return self._get_or_set(
+            "config",
+            (plugin_class.config_model.__name__, config_pk),
+            None,
+            lambda: plugin_class.config_model.objects.select_related("python_module").get(pk=config_pk),
+        )
+
+    def get_params(
+        self, config: "PythonConfig", user: "User", runtime_configuration: Dict
+    ) -> List["Parameter"]:
+        key = (
+            config.__class__.__name__,
+            config.pk,
+            user.pk if user else None,
+            json.dumps(runtime_configuration or {}, sort_keys=True, default=str),
+        )
+        return self._get_or_set(
+            "params",
+            key,
+            config.python_module_id,
+            lambda: list(config.read_configured_params(user, runtime_configuration)),
+        )
+
+    def invalidate(self, python_module_pk: int = None) -> None:
+        """
+        Drop every entry, or only the ones related to a python module
+        """
+        with self._lock:
+            if python_module_pk is None:
+                self._entries.clear()
+            else:
+                for key in [
+                    key
+                    for key, (_, module_pk, value) in self._entries.items()
+                    if module_pk == python_module_pk
+                    or getattr(value, "python_module_id", None) == python_module_pk
+                ]:
+                    del self._entries[key]
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {
+            kind: {
+                "hits": self.hits[kind],
+                "misses": self.misses[kind],
+            }
+            for kind in self.KINDS
+        }
+
+
+plugin_cache = PluginCache()
+
+
+def _broadcast() -> None:
+    from intel_owl.celery import broadcast
+    from intel_owl.tasks import invalidate_plugin_cache
+
+    # the processes that do not receive the broadcast (or a lost one) see the new version
+    try:
+        cache.set(PluginCache.VERSION_KEY, uuid.uuid4().hex, timeout=None)
+    except Exception as e:
+        # e.g. the migrations run before the cache table is created
+        logger.warning(f"Unable to update plugin cache version: {e}")
+    if settings.AWS_SQS or settings.STAGE_CI:
+        # no broadcast available (or no workers)
+        return
+    try:
+        broadcast(invalidate_plugin_cache)
+    except Exception as e:
+        logger.warning(f"Unable to broadcast plugin cache invalidation: {e}")
+
+
+def broadcast_invalidation() -> None:
+    """
+    Drop the plugin cache of this process and,
+    once the current transaction is committed, of every process
+    """
+    plugin_cache.invalidate()
+    transaction.on_commit(_broadcast)
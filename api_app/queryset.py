@@ -8,29 +8,34 @@ query results specific to the needs of the IntelOwl application.
 import datetime
 import json
 import uuid
-from typing import TYPE_CHECKING, Generator, Type
+from collections import Counter
+from typing import TYPE_CHECKING, Dict, Generator, List, Optional, Tuple, Type
 
 from django.conf import settings
 from django.contrib.postgres.expressions import ArraySubquery
 from django.core.paginator import Paginator
+from treebeard.exceptions import PathOverflow
 from treebeard.mp_tree import MP_NodeQuerySet
 
 if TYPE_CHECKING:
-    from api_app.models import PythonConfig
+    from api_app.models import Job, PythonConfig
     from api_app.serializers import AbstractBIInterface
 
 import logging
 
 from celery.canvas import Signature
-from django.db import IntegrityError, models
+from django.db import IntegrityError, models, transaction
 from django.db.models import (
     BooleanField,
     Case,
+    CharField,
+    Count,
     Exists,
     F,
     Func,
     IntegerField,
     JSONField,
+    Max,
     OuterRef,
     Q,
     QuerySet,
@@ -38,7 +43,7 @@ from django.db.models import (
     Value,
     When,
 )
-from django.db.models.functions import Cast, Coalesce
+from django.db.models.functions import Cast, Coalesce, Concat, Trunc
 from django.db.models.lookups import Exact
 from django.utils.timezone import now
 
@@ -246,6 +251,7 @@ class JobQuerySet(MP_NodeQuerySet, CleanOnCreateQuerySet, SendToBiQuerySet):
 
     Methods:
     - create: Creates a job, setting it as a child of the specified parent if provided.
+    - bulk_add: Inserts many jobs with a single query, as children of the parent if provided.
     - delete: Deletes jobs, ensuring the correct method is called.
     - filter_completed: Filters jobs that have completed.
     - visible_for_user: Filters jobs visible to a specific user based on TLP and user organization.
@@ -253,6 +259,7 @@ class JobQuerySet(MP_NodeQuerySet, CleanOnCreateQuerySet, SendToBiQuerySet):
     - _annotate_importance_user: Annotates jobs with a weight based on the user and their organization.
     - annotate_importance: Annotates jobs with an overall importance score.
     - running: Filters jobs that are currently running.
+    - detail_state: Returns the state of a job that changes its detail, for conditional requests.
     """
 
     def create(self, parent=None, **kwargs):
@@ -278,6 +285,56 @@ class JobQuerySet(MP_NodeQuerySet, CleanOnCreateQuerySet, SendToBiQuerySet):
                 if attempt == total_attempt_number - 1:
                     raise
 
+    def bulk_add(self, jobs: List["Job"], parent: "Job" = None) -> List["Job"]:
+        """
+        Inserts the jobs with a single query, as children of the parent if provided
+        or as root nodes.
+
+        Args:
+            jobs (List[Job]): The jobs to insert.
+            parent (optional): The parent job, if any.
+
+        Returns:
+            The inserted jobs.
+        """
+        # try multiple times hoping to for no race conditions, like `create`
+        total_attempt_number = 5
+        for attempt in range(0, total_attempt_number):
+            try:
+                with transaction.atomic():
+                    self._set_paths(jobs, parent)
+                    jobs = self.bulk_create(jobs)
+                    if parent:
+                        self.filter(path=parent.path).update(numchild=F("numchild") + len(jobs))
+            except IntegrityError:
+                logger.warning(f"Found race condition for {len(jobs)} jobs. Trying again to calculate paths.")
+                if attempt == total_attempt_number - 1:
+                    raise
+            else:
+                if parent:
+                    parent.numchild += len(jobs)
+                return jobs
+
+    def _set_paths(self, jobs: List["Job"], parent: "Job" = None) -> None:
+        """
+        Sets the treebeard path of the jobs after the last sibling.
+        """
+        model = self.model
+        if parent:
+            depth = parent.depth + 1
+            last = parent.get_last_child()
+        else:
+            depth = 1
+            last = model.get_last_root_node()
+        step = model._str2int(last.path[-model.steplen :]) if last else 0
+        for job in jobs:
+            step += 1
+            job.depth = depth
+            job.numchild = 0
+            job.path = model._get_path(parent.path if parent else None, depth, step)
+            if len(job.path) > depth * model.steplen:
+                raise PathOverflow(f"No more paths available after {last.path}")
+
     def delete(self, *args, **kwargs):
         """
         Deletes jobs, ensuring the correct method is called.
@@ -404,6 +461,49 @@ class JobQuerySet(MP_NodeQuerySet, CleanOnCreateQuerySet, SendToBiQuerySet):
         difference = now() - datetime.timedelta(minutes=minutes_ago)
         return qs.filter(received_request_time__lte=difference)
 
+    def detail_state(self) -> Optional[Tuple]:
+        """
+        Returns, with a single query, the state of the first job that changes its detail:
+        the job fields, its tags, the comments of its analyzable and its report status counters.
+        The report rows are not read: the counters change every time a report changes status.
+
+        Returns:
+            The state of the job, or None if there is no job.
+        """
+        from api_app.models import Comment, JobReportStatusCounter
+
+        comments = Comment.objects.filter(analyzable=OuterRef("analyzable")).order_by().values("analyzable")
+        return (
+            self.annotate(
+                tag_ids=ArraySubquery(
+                    self.model.tags.through.objects.filter(job=OuterRef("pk")).order_by("tag").values("tag")
+                ),
+                report_counters=ArraySubquery(
+                    JobReportStatusCounter.objects.filter(job=OuterRef("pk"), count__gt=0)
+                    .order_by("status")
+                    .values(counter=Concat("status", Value(":"), Cast("count", CharField())))
+                ),
+                comments_count=Subquery(comments.annotate(total=Count("pk")).values("total")),
+                comments_updated=Subquery(comments.annotate(last=Max("updated_at")).values("last")),
+            )
+            .values_list(
+                "pk",
+                "status",
+                "finished_analysis_time",
+                "process_time",
+                "tlp",
+                "investigation",
+                "data_model_object_id",
+                "warnings",
+                "errors",
+                "tag_ids",
+                "report_counters",
+                "comments_count",
+                "comments_updated",
+            )
+            .first()
+        )
+
 
 class ParameterQuerySet(CleanOnCreateQuerySet):
     """
@@ -676,6 +776,183 @@ class AbstractReportQuerySet(SendToBiQuerySet):
         """
         return self.model.config.field.related_model.objects.filter(pk__in=self.values("config_id"))
 
+    def update(self, **kwargs) -> int:
+        """
+        Updates the reports, keeping the report status counters of their jobs aligned.
+
+        Returns:
+            int: The number of updated reports.
+        """
+        if "status" not in kwargs or not self.model.counted_in_job_status:
+            return super().update(**kwargs)
+        from api_app.models import JobReportStatusCounter
+
+        with transaction.atomic():
+            previous = list(self.select_for_update(of=("self",)).values_list("job_id", "status"))
+            updated = super().update(**kwargs)
+            deltas = Counter()
+            for job_id, status in previous:
+                deltas[(job_id, status)] -= 1
+                deltas[(job_id, kwargs["status"])] += 1
+            JobReportStatusCounter.objects.adjust(deltas)
+        return updated
+
+
+class JobReportStatusCounterQuerySet(models.QuerySet):
+    """
+    Custom queryset for the per job report status counters.
+
+    Methods:
+    - adjust: Atomically adds some deltas to the counters.
+    """
+
+    def adjust(self, deltas: Dict[Tuple[int, str], int]) -> None:
+        """
+        Atomically adds the deltas to the counters, creating the missing ones.
+
+        Args:
+            deltas (Dict[Tuple[int, str], int]): The deltas, keyed by (job id, report status).
+        """
+        for (job_id, status), delta in deltas.items():
+            if not delta:
+                continue
+            counter = self.filter(job_id=job_id, status=status)
+            if not counter.update(count=F("count") + delta):
+                try:
+                    with transaction.atomic():
+                        self.create(job_id=job_id, status=status, count=delta)
+                except IntegrityError:
+                    # the counter has been created concurrently
+                    counter.update(count=F("count") + delta)
+
+
+class JobRollupQuerySet(models.QuerySet):
+    """
+    Custom queryset for the hourly job rollups.
+
+    Methods:
+    - adjust: Atomically adds some deltas to the rollups.
+    - backfill: Rebuilds the rollups from the jobs.
+    - remove_playbook: Merges the rollups of a playbook into the ones without playbook.
+    - count_jobs: Counts the jobs of every rollup.
+    - aggregate_by_date: Sums the rollups for every date bucket.
+    - most_frequent: Retrieves the most frequent values of a dimension.
+    """
+
+    def adjust(self, deltas: Dict[Tuple, int]) -> None:
+        """
+        Atomically adds the deltas to the rollups, creating the missing ones.
+
+        Args:
+            deltas (Dict[Tuple, int]): The deltas, keyed by the values of `JobRollup.KEY_FIELDS`.
+        """
+        for key, delta in deltas.items():
+            if not delta:
+                continue
+            values = dict(zip(self.model.KEY_FIELDS, key))
+            rollup = self.filter(**values)
+            # a missing rollup is not decremented: it has been deleted with its user
+            if not rollup.update(count=F("count") + delta) and delta > 0:
+                try:
+                    with transaction.atomic():
+                        self.create(**values, count=delta)
+                except IntegrityError:
+                    # the rollup has been created concurrently
+                    rollup.update(count=F("count") + delta)
+
+    def remove_playbook(self, playbook_pk: int) -> None:
+        """
+        Moves the jobs of the rollups of a playbook to the rollups without playbook,
+        like the jobs of a deleted playbook.
+
+        Args:
+            playbook_pk (int): The primary key of the playbook.
+        """
+        deltas = Counter()
+        with transaction.atomic():
+            rollups = self.filter(playbook_id=playbook_pk)
+            for row in rollups.select_for_update().values(*self.model.KEY_FIELDS, "count"):
+                row["playbook_id"] = None
+                deltas[tuple(row[field] for field in self.model.KEY_FIELDS)] += row["count"]
+            rollups.delete()
+            self.adjust(deltas)
+
+    def backfill(self, since: datetime.datetime = None) -> int:
+        """
+        Rebuilds the rollups of the jobs received from `since` (every job if None)
+        with a single aggregation of the job table.
+
+        Returns:
+            int: The number of rollups created.
+        """
+        from api_app.models import Job
+
+        jobs = Job.objects.order_by()
+        rollups = self.all()
+        if since:
+            since = self.model.truncate(since)
+            jobs = jobs.filter(received_request_time__gte=since)
+            rollups = rollups.filter(hour__gte=since)
+        with transaction.atomic():
+            rollups.delete()
+            created = self.bulk_create(
+                (self.model(**row) for row in self.count_jobs(jobs).iterator()), batch_size=1000
+            )
+        return len(created)
+
+    def count_jobs(self, jobs: QuerySet) -> QuerySet:
+        """
+        Counts the jobs of every rollup with a single aggregation.
+
+        Returns:
+            QuerySet: The key fields and the count of every rollup.
+        """
+        return (
+            jobs.order_by()
+            .annotate(
+                hour=Trunc("received_request_time", "hour", tzinfo=datetime.timezone.utc),
+                classification=F("analyzable__classification"),
+                mimetype=Coalesce("analyzable__mimetype", Value("")),
+                playbook_id=F("playbook_to_execute"),
+            )
+            .values(*self.model.KEY_FIELDS)
+            .annotate(count=models.Count("pk"))
+        )
+
+    def aggregate_by_date(self, basis: str, annotations: Dict) -> QuerySet:
+        """
+        Sums the rollups for every hour truncated to `basis`.
+
+        Args:
+            basis (str): The truncation of the dates (hour, day, month...).
+            annotations (Dict): The sums to compute for every date.
+        """
+        return (
+            self.filter(count__gt=0)
+            .annotate(date=Trunc("hour", basis))
+            .values("date")
+            .annotate(**annotations)
+            .order_by("date")
+        )
+
+    def most_frequent(self, field_name: str, limit: int) -> list:
+        """
+        Retrieves the `limit` most frequent values of a dimension, the most frequent first.
+
+        Args:
+            field_name (str): The dimension.
+            limit (int): The maximum number of values.
+        """
+        return list(
+            self.filter(count__gt=0)
+            .exclude(**{f"{field_name}__isnull": True})
+            .exclude(**{f"{field_name}__exact": ""})
+            .values(field_name)
+            .annotate(total=models.Sum("count"))
+            .order_by("-total", field_name)
+            .values_list(field_name, flat=True)[:limit]
+        )
+
 
 class ModelWithOwnershipQuerySet:
     """
@@ -0,0 +1,165 @@
+# This file is a part of IntelOwl https://github.com/intelowlproject/IntelOwl
+# See the file 'LICENSE' for copying permission.
+
+import contextvars
+import datetime
+import functools
+import logging
+import math
+import operator
+import time
+from collections import Counter
+from typing import Dict, List
+
+from django.conf import settings
+from django.db import connection, models, transaction
+from django.db.models import F, Q
+from django.utils.timezone import now
+
+from api_app.analyzables_manager.models import Analyzable
+from api_app.investigations_manager.models import Investigation
+from api_app.models import Job, JobRollup
+from api_app.partitions import ReportPartitions, report_tables
+
+logger = logging.getLogger(__name__)
+
+# set while the retention deletes a batch of jobs:
+# the job rollups and the investigations are handled once for the whole batch
+_batch_deletion = contextvars.ContextVar("batch_deletion", default=False)
+
+
+def in_batch_deletion() -> bool:
+    return _batch_deletion.get()
+
+
+class JobRetention:
+    """
+    Deletes the jobs finished before the retention period in batches of ids,
+    with their descendants, their orphaned analyzables (and files)
+    and their empty investigations.
+
+    Every batch costs a fixed number of queries:
+    the rollups are decreased with one aggregation,
+    the orphans are found with one query and the parents of the deleted jobs
+    are updated with one query each.
+
+    When the report tables are partitioned, the old partitions are dropped first,
+    so that the reports are not deleted row by row with their jobs.
+    """
+
+    def __init__(self, days: int, batch_size: int = 1000):
+        self.date = now() - datetime.timedelta(days=days)
+        self.batch_size = batch_size
+
+    @property
+    def old_jobs(self) -> models.QuerySet:
+        return Job.objects.filter(finished_analysis_time__lt=self.date)
+
+    def estimate(self) -> Dict[str, int]:
+        """
+        Returns how many old jobs, orphaned analyzables and files would be deleted,
+        without deleting anything.
+        The descendants of the old jobs are not counted.
+        """
+        old_jobs = self.old_jobs
+        analyzables = Analyzable.objects.filter(pk__in=old_jobs.values("analyzable")).exclude(
+            pk__in=Job.objects.exclude(pk__in=old_jobs.values("pk")).values("analyzable")
+        )
+        jobs = old_jobs.count()
+        return {
+            "jobs": jobs,
+            "analyzables": analyzables.count(),
+            "files": analyzables.exclude(Q(file__isnull=True) | Q(file="")).count(),
+            "batches": math.ceil(jobs / self.batch_size),
+        }
+
+    def run(self) -> Dict[str, int]:
+        """
+        Deletes the old jobs, logging the progress after every batch.
+
+        Returns:
+            Dict[str, int]: The number of deleted jobs, analyzables, files and investigations,
+            the number of batches, the number of dropped report partitions and the elapsed seconds.
+        """
+        metrics = Counter()
+        start = time.monotonic()
+        if settings.REPORTS_PARTITIONING_ENABLED and connection.vendor == "postgresql":
+            for table in report_tables():
+                partitions = ReportPartitions(table)
+                if partitions.is_partitioned():
+                    metrics["report_partitions"] += len(partitions.drop(self.date))
+        last_pk = 0
+        token = _batch_deletion.set(True)
+        try:
+            while True:
+                pks = list(
+                    self.old_jobs.filter(pk__gt=last_pk)
+                    .order_by("pk")
+                    .values_list("pk", flat=True)[: self.batch_size]
+                )
+                if not pks:
+                    break
+                last_pk = pks[-1]
+                self._delete_batch(pks, metrics)
+                metrics["batches"] += 1
+                elapsed = time.monotonic() - start
+                logger.info(
+                    f"retention batch {metrics['batches']} up to job {last_pk}: "
+                    f"deleted {metrics['jobs']} jobs, {metrics['analyzables']} analyzables, "
+                    f"{metrics['files']} files in {elapsed:.1f}s "
+                    f"({metrics['jobs'] / max(elapsed, 0.001):.0f} jobs/s)"
+                )
+        finally:
+            _batch_deletion.reset(token)
+        metrics["seconds"] = round(time.monotonic() - start)
+        return dict(metrics)
+
+    @staticmethod
+    def _update_parents(nodes: List[Dict]) -> None:
+        # same bookkeeping of MP_NodeQuerySet.delete, grouped by parent
+        paths = {node["path"] for node in nodes}
+        children = Counter()
+        for node in nodes:
+            ancestors = [node["path"][: Job.steplen * depth] for depth in range(1, node["depth"])]
+            if ancestors and not paths.intersection(ancestors):
+                children[ancestors[-1]] += 1
+        for path, removed in children.items():
+            Job.objects.filter(path=path).update(numchild=F("numchild") - removed)
+
+    def _delete_batch(self, pks: List[int], metrics: Counter) -> None:
+        nodes = list(Job.objects.filter(pk__in=pks).values("path", "depth", "numchild"))
+        # the descendants are deleted with their ancestors, like Job.delete does
+        jobs = Job.objects.filter(
+            functools.reduce(
+                operator.or_,
+                (Q(path__startswith=node["path"]) for node in nodes if node["numchild"]),
+                Q(pk__in=pks),
+            )
+        )
+        related = list(jobs.values_list("analyzable_id", "investigation_id"))
+        with transaction.atomic():
+            JobRollup.objects.adjust(
+                Counter(
+                    {
+                        tuple(row[field] for field in JobRollup.KEY_FIELDS): -row["count"]
+                        for row in JobRollup.objects.count_jobs(jobs)
+                    }
+                )
+            )
+            self._update_parents(nodes)
+            # the tree has already been updated
+            _, deleted = models.QuerySet.delete(jobs)
+        metrics["jobs"] += deleted.get(Job._meta.label, 0)
+
+        # the files are deleted by the pre_delete signal of the analyzables
+        orphans = Analyzable.objects.filter(
+            pk__in={analyzable for analyzable, _ in related}, jobs__isnull=True
+        )
+        metrics["files"] += orphans.exclude(Q(file__isnull=True) | Q(file="")).count()
+        _, deleted = orphans.delete()
+        metrics["analyzables"] += deleted.get(Analyzable._meta.label, 0)
+
+        _, deleted = Investigation.objects.filter(
+            pk__in={investigation for _, investigation in related if investigation}, jobs__isnull=True
+        ).delete()
+        metrics["investigations"] += deleted.get(Investigation._meta.label, 0)
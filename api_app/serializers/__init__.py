@@ -1,4 +1,5 @@
 import logging
+from typing import Dict, Optional
 
 from django.conf import settings
 from rest_framework import serializers as rfs
@@ -85,3 +86,38 @@ class ModelWithOwnershipSerializer(rfs.ModelSerializer):
         result = super().to_representation(instance)
         result["owner"] = instance.owner.username if instance.owner else None
         return result
+
+
+class SparseFieldsetMixin:
+    """
+    Serializes only the requested fields.
+    ``sparse_fields`` maps every requested field to the requested fields
+    of its nested serializer, empty to request all of them.
+    """
+
+    def __init__(self, *args, sparse_fields: Optional[Dict] = None, **kwargs):
+        self.sparse_fields = sparse_fields
+        super().__init__(*args, **kwargs)
+
+    @staticmethod
+    def parse_sparse_fields(value: Optional[str]) -> Optional[Dict]:
+        """
+        Parses a comma separated list of fields, like ``status,analyzer_reports.status``.
+        """
+        if not value:
+            return None
+        result = {}
+        for path in value.split(","):
+            node = result
+            for name in filter(None, path.strip().split(".")):
+                node = node.setdefault(name, {})
+        return result or None
+
+    def get_nested_sparse_fields(self, name: str) -> Optional[Dict]:
+        return self.sparse_fields.get(name) if self.sparse_fields else None
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if self.sparse_fields:
+            fields = {name: field for name, field in fields.items() if name in self.sparse_fields}
+        return fields
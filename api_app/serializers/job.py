@@ -4,9 +4,11 @@ import ipaddress
 import logging
 import re
 import uuid
-from typing import Dict, Generator, List, Union
+from collections import Counter
+from typing import Callable, Dict, Generator, List, Tuple, Union
 
 import django.core
+from celery import group
 from django.conf import settings
 from django.db.models import Q, QuerySet
 from django.http import QueryDict
@@ -23,11 +25,11 @@ from api_app.choices import TLP, Classification, ScanMode
 from api_app.connectors_manager.exceptions import NotRunnableConnector
 from api_app.connectors_manager.models import ConnectorConfig
 from api_app.defaults import default_runtime
-from api_app.helpers import calculate_md5, gen_random_colorhex
+from api_app.helpers import calculate_hashes, calculate_md5, gen_random_colorhex
 from api_app.investigations_manager.models import Investigation
-from api_app.models import Comment, Job, Tag
+from api_app.models import Comment, Job, JobRollup, Tag
 from api_app.playbooks_manager.models import PlaybookConfig
-from api_app.serializers import AbstractBIInterface
+from api_app.serializers import AbstractBIInterface, SparseFieldsetMixin
 from api_app.serializers.report import AbstractReportSerializerInterface
 from api_app.visualizers_manager.models import VisualizerConfig
 from certego_saas.apps.organization.permissions import IsObjectOwnerOrSameOrgPermission
@@ -147,6 +149,9 @@ class _AbstractJobCreateSerializer(rfs.ModelSerializer):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.filter_warnings = []
+        # set by the list serializers while they validate their elements,
+        # that share the resolution of the plugins
+        self._resolved_plugins = None
 
     def validate_runtime_configuration(self, runtime_config: Dict):  # skipcq: PYL-R0201
         from api_app.validators import validate_runtime_configuration
@@ -215,9 +220,15 @@ class _AbstractJobCreateSerializer(rfs.ModelSerializer):
             if playbook.disabled:
                 raise ValidationError({"detail": "No playbooks can be run after filtering."})
             attrs["playbook_to_execute"] = playbook
-            attrs["analyzers_requested"] = list(playbook.analyzers.all())
-            attrs["connectors_requested"] = list(playbook.connectors.all())
-            attrs["tags_labels"] = list(attrs.get("tags_labels", [])) + list(playbook.tags.all())
+            attrs["analyzers_requested"] = self.resolve_once(
+                ("analyzers", playbook.pk), playbook.analyzers.all
+            )
+            attrs["connectors_requested"] = self.resolve_once(
+                ("connectors", playbook.pk), playbook.connectors.all
+            )
+            attrs["tags_labels"] = list(attrs.get("tags_labels", [])) + self.resolve_once(
+                ("tags", playbook.pk), playbook.tags.all
+            )
 
         analyzers_to_execute = attrs["analyzers_to_execute"] = self.set_analyzers_to_execute(**attrs)
         connectors_to_execute = attrs["connectors_to_execute"] = self.set_connectors_to_execute(**attrs)
@@ -238,11 +249,33 @@ class _AbstractJobCreateSerializer(rfs.ModelSerializer):
         playbook_requested: PlaybookConfig = None,
         **kwargs,
     ) -> List[VisualizerConfig]:
-        if playbook_requested:
-            visualizers = VisualizerConfig.objects.filter(playbooks__in=[playbook_requested], disabled=False)
+        if not playbook_requested:
+            return []
+        return self.resolve_once(
+            ("visualizers", playbook_requested.pk, tlp),
+            lambda: self.plugins_to_execute(
+                tlp,
+                VisualizerConfig.objects.filter(playbooks__in=[playbook_requested], disabled=False),
+            ),
+        )
+
+    def resolve_once(self, key: Tuple, resolve: Callable[[], Generator]) -> List:
+        """
+        Returns the plugins resolved by the callable.
+        While a list serializer validates its elements, the callable is called
+        only the first time the key is requested
+        and the filter warnings of the resolution are added again every time.
+        """
+        if self._resolved_plugins is None:
+            return list(resolve())
+        if key in self._resolved_plugins:
+            plugins, warnings = self._resolved_plugins[key]
+            self.filter_warnings.extend(warnings)
         else:
-            visualizers = []
-        return list(self.plugins_to_execute(tlp, visualizers))
+            warnings_number = len(self.filter_warnings)
+            plugins = list(resolve())
+            self._resolved_plugins[key] = (plugins, self.filter_warnings[warnings_number:])
+        return list(plugins)
 
     def set_connectors_to_execute(
         self, connectors_requested: List[ConnectorConfig], tlp: str, **kwargs
@@ -263,11 +296,18 @@ class _AbstractJobCreateSerializer(rfs.ModelSerializer):
         if not plugins_requested:
             return
         if isinstance(plugins_requested, QuerySet):
-            qs = plugins_requested
+            yield from self._plugins_to_execute(tlp, plugins_requested)
         else:
-            qs = plugins_requested[0].__class__.objects.filter(
-                pk__in=[plugin.pk for plugin in plugins_requested]
+            model = plugins_requested[0].__class__
+            pks = [plugin.pk for plugin in plugins_requested]
+            yield from self.resolve_once(
+                (model.__name__, tuple(sorted(pks)), tlp),
+                lambda: self._plugins_to_execute(tlp, model.objects.filter(pk__in=pks)),
             )
+
+    def _plugins_to_execute(
+        self, tlp, qs: QuerySet
+    ) -> Generator[Union[AnalyzerConfig, ConnectorConfig, VisualizerConfig], None, None]:
         for plugin_config in qs.annotate_runnable(self.context["request"].user):
             try:
                 if not plugin_config.runnable:
@@ -303,15 +343,37 @@ class _AbstractJobCreateSerializer(rfs.ModelSerializer):
             self.Meta.model.objects.visible_for_user(self.context["request"].user)
             .filter(received_request_time__gte=now() - validated_data["scan_check_time"])
             .filter(Q(analyzable__pk=validated_data["analyzable"].pk))
+            .exclude(status__in=status_to_exclude)
+        )
+        keys = Job.get_requested_plugins_keys(
+            analyzers_requested=validated_data.get("analyzers_to_execute", []),
+            connectors_requested=validated_data.get("connectors_to_execute", []),
+            visualizers_to_execute=validated_data.get("visualizers_to_execute", []),
         )
-        for analyzer in validated_data.get("analyzers_to_execute", []):
-            qs = qs.filter(analyzers_requested__in=[analyzer])
-        for connector in validated_data.get("connectors_to_execute", []):
-            qs = qs.filter(connectors_requested__in=[connector])
-        for visualizer in validated_data.get("visualizers_to_execute", []):
-            qs = qs.filter(visualizers_to_execute__in=[visualizer])
+        try:
+            # same plugins: indexed lookup
+            return qs.filter(plugins_fingerprint=Job.get_plugins_fingerprint(keys)).latest(
+                "received_request_time"
+            )
+        except self.Meta.model.DoesNotExist:
+            # more plugins than the requested ones
+            return qs.filter(requested_plugins__contains=keys).latest("received_request_time")
+
+    def get_analyzable(self, validated_data: Dict) -> Analyzable:
+        """
+        Returns the analyzable of the job, popping its values from the validated data.
+        """
+        raise NotImplementedError()
 
-        return qs.exclude(status__in=status_to_exclude).latest("received_request_time")
+    def _check_previous_analysis(self, validated_data: Dict) -> bool:
+        # if we have a parent job and a new playbook to excute force new analysis
+        # in order to avoid graph related issues
+        return validated_data["scan_mode"] == ScanMode.CHECK_PREVIOUS_ANALYSIS.value and not (
+            "parent" in validated_data
+            and validated_data["parent"]
+            and "playbook_to_execute" in validated_data
+            and validated_data["playbook_to_execute"]
+        )
 
     def create(self, validated_data: Dict) -> Job:
         # POP VALUES!
@@ -321,22 +383,22 @@ class _AbstractJobCreateSerializer(rfs.ModelSerializer):
         warnings = validated_data.pop("warnings")
         delay = validated_data.pop("delay")
         send_task = validated_data.pop("send_task", False)
+        batch_pipeline = validated_data.pop("batch_pipeline", False)
         parent_job = validated_data.pop("parent_job", None)
 
-        # if we have a parent job and a new playbook to excute force new analysis
-        # in order to avoid graph related issues
-        if validated_data["scan_mode"] == ScanMode.CHECK_PREVIOUS_ANALYSIS.value and not (
-            "parent" in validated_data
-            and validated_data["parent"]
-            and "playbook_to_execute" in validated_data
-            and validated_data["playbook_to_execute"]
-        ):
+        if self._check_previous_analysis(validated_data):
             try:
                 return self.check_previous_jobs(validated_data)
             except self.Meta.model.DoesNotExist:
-                job = super().create(validated_data)
-        else:
-            job = super().create(validated_data)
+                pass
+        # computed once here: the m2m_changed signals skip the plugins already in the keys
+        validated_data["requested_plugins"] = Job.get_requested_plugins_keys(
+            **{field: validated_data.get(field, []) for field in Job.REQUESTED_PLUGINS_FIELDS}
+        )
+        validated_data["plugins_fingerprint"] = Job.get_plugins_fingerprint(
+            validated_data["requested_plugins"]
+        )
+        job = super().create(validated_data)
         job.warnings = warnings
         job.save()
         logger.info(f"Job {job.pk} created")
@@ -345,7 +407,10 @@ class _AbstractJobCreateSerializer(rfs.ModelSerializer):
 
         if parent_job:
             PivotMap.objects.create(starting_job=validated_data["parent"], ending_job=job, pivot_config=None)
-        if send_task:
+        if send_task and batch_pipeline and not delay:
+            # the pipeline is sent for the whole batch by MultipleObservableJobSerializer
+            self.context.setdefault("batched_jobs", []).append(job)
+        elif send_task:
             from intel_owl.tasks import job_pipeline
 
             logger.info(f"Sending task for job {job.pk}")
@@ -361,6 +426,137 @@ class _AbstractJobCreateSerializer(rfs.ModelSerializer):
 
         return job
 
+    def bulk_create(self, items: List[Dict]) -> List[Job]:
+        """
+        Creates the jobs of a multiple request with the same semantic of ``create()``,
+        inserting the jobs, their many to many relations and their pivot maps in bulk
+        and publishing their pipelines together.
+        """
+        from api_app.pivots_manager.models import PivotMap
+
+        many_to_many = [field.name for field in Job._meta.many_to_many]
+        jobs = []
+        new_jobs = []
+        # new job -> many to many field -> related objects
+        relations = {}
+        delays = {}
+        pivoted = []
+        # previous analysis created by this same request
+        created = {}
+        parent = None
+        for validated_data in items:
+            validated_data["analyzable"] = self.get_analyzable(validated_data)
+            warnings = validated_data.pop("warnings")
+            delay = validated_data.pop("delay")
+            send_task = validated_data.pop("send_task", False)
+            validated_data.pop("batch_pipeline", None)
+            parent_job = validated_data.pop("parent_job", None)
+            if self._check_previous_analysis(validated_data):
+                keys = Job.get_requested_plugins_keys(
+                    analyzers_requested=validated_data.get("analyzers_to_execute", []),
+                    connectors_requested=validated_data.get("connectors_to_execute", []),
+                    visualizers_to_execute=validated_data.get("visualizers_to_execute", []),
+                )
+                key = (validated_data["analyzable"].pk, Job.get_plugins_fingerprint(keys))
+                if key in created:
+                    jobs.append(created[key])
+                    continue
+                try:
+                    jobs.append(self.check_previous_jobs(validated_data))
+                    continue
+                except self.Meta.model.DoesNotExist:
+                    pass
+            else:
+                key = None
+            parent = validated_data.pop("parent", None)
+            job_relations = {
+                field: list(validated_data.pop(field)) for field in many_to_many if field in validated_data
+            }
+            job = Job(**validated_data)
+            job.warnings = warnings
+            job.requested_plugins = Job.get_requested_plugins_keys(
+                **{field: job_relations.get(field, []) for field in Job.REQUESTED_PLUGINS_FIELDS}
+            )
+            job.plugins_fingerprint = Job.get_plugins_fingerprint(job.requested_plugins)
+            # same check of Job.objects.create
+            job.clean()
+            if key:
+                created[key] = job
+            relations[id(job)] = job_relations
+            if send_task:
+                delays[id(job)] = delay
+            if parent_job:
+                pivoted.append(job)
+            jobs.append(job)
+            new_jobs.append(job)
+
+        if not new_jobs:
+            return jobs
+        Job.objects.bulk_add(new_jobs, parent)
+        logger.info(f"Jobs {[job.pk for job in new_jobs]} created")
+        for field in many_to_many:
+            relation = Job._meta.get_field(field)
+            through = relation.remote_field.through
+            through.objects.bulk_create(
+                [
+                    through(
+                        **{
+                            f"{relation.m2m_field_name()}_id": job.pk,
+                            f"{relation.m2m_reverse_field_name()}_id": related.pk,
+                        }
+                    )
+                    for job in new_jobs
+                    for related in relations[id(job)].get(field, [])
+                ],
+                ignore_conflicts=True,
+            )
+        for job in new_jobs:
+            job._loaded_rollup_fields = job.get_rollup_fields()
+        JobRollup.objects.adjust(Counter(job.get_rollup_key() for job in new_jobs))
+        if pivoted:
+            PivotMap.objects.bulk_create(
+                [PivotMap(starting_job=parent, ending_job=job, pivot_config=None) for job in pivoted]
+            )
+        self.send_pipelines([(job, delays[id(job)]) for job in new_jobs if id(job) in delays])
+        return jobs
+
+    @staticmethod
+    def send_pipelines(jobs: List[Tuple[Job, int]]) -> None:
+        """
+        Publishes the pipelines of the jobs, with their delay, in one batch.
+        """
+        from intel_owl.tasks import job_pipeline, job_pipeline_batch
+
+        if not jobs:
+            return
+        # every job of a request has the same user
+        priority = jobs[0][0].priority
+        signatures = []
+        not_delayed = [job.pk for job, delay in jobs if not delay]
+        if settings.BATCH_PIPELINE_ENABLED and len(not_delayed) > 1:
+            for i in range(0, len(not_delayed), settings.BATCH_PIPELINE_SIZE):
+                signatures.append(
+                    job_pipeline_batch.signature(
+                        args=[not_delayed[i : i + settings.BATCH_PIPELINE_SIZE]],
+                        queue=get_queue_name(settings.DEFAULT_QUEUE),
+                        MessageGroupId=str(uuid.uuid4()),
+                        priority=priority,
+                    )
+                )
+            jobs = [(job, delay) for job, delay in jobs if delay]
+        for job, delay in jobs:
+            signatures.append(
+                job_pipeline.signature(
+                    args=[job.pk],
+                    queue=get_queue_name(settings.DEFAULT_QUEUE),
+                    MessageGroupId=str(uuid.uuid4()),
+                    priority=priority,
+                    eta=now() + datetime.timedelta(seconds=delay),
+                )
+            )
+        logger.info(f"Sending {len(signatures)} pipeline tasks")
+        group(signatures).apply_async()
+
 
 class CommentSerializer(rfs.ModelSerializer):
     """
@@ -494,7 +690,7 @@ class JobTreeSerializer(ModelSerializer):
         return data
 
 
-class JobSerializer(_AbstractJobViewSerializer):
+class JobSerializer(SparseFieldsetMixin, _AbstractJobViewSerializer):
     """
     Used for ``retrieve()``
     """
@@ -593,7 +789,11 @@ class JobSerializer(_AbstractJobViewSerializer):
             self._declared_fields[f"{field}_reports"] = serializer(
                 many=True, read_only=True, source=f"{field}reports"
             )
-        return super().get_fields()
+        fields = super().get_fields()
+        for name, field in fields.items():
+            if name.endswith("_reports"):
+                field.child.sparse_fields = self.get_nested_sparse_fields(name)
+        return fields
 
     def get_data_model(self, instance: Job):
         if instance.data_model:
@@ -629,6 +829,26 @@ class MultipleJobSerializer(rfs.ListSerializer):
     def update(self, instance, validated_data):
         raise NotImplementedError("This serializer does not support update().")
 
+    @property
+    def bulk(self) -> bool:
+        """
+        Whether the client opted in the bulk job creation with the ``bulk`` parameter.
+        """
+        data = getattr(self, "initial_data", None) or {}
+        return str(data.get("bulk", False)).lower() == "true"
+
+    def run_validation(self, data=empty):
+        self.child._resolved_plugins = {}
+        try:
+            return super().run_validation(data=data)
+        finally:
+            self.child._resolved_plugins = None
+
+    def create(self, validated_data: List[Dict]) -> List[Job]:
+        if self.bulk:
+            return self.child.bulk_create(validated_data)
+        return super().create(validated_data)
+
     def save(self, parent: Job = None, **kwargs):
         jobs = super().save(**kwargs, parent=parent)
         if parent:
@@ -667,10 +887,10 @@ class MultipleJobSerializer(rfs.ListSerializer):
                     name=f"Custom investigation: {len(jobs)} jobs",
                     owner=self.context["request"].user,
                 )
+                Job.objects.filter(pk__in=[job.pk for job in jobs]).update(investigation=investigation)
                 for job in jobs:
                     job: Job
                     job.investigation = investigation
-                    job.save()
                 investigation.start_time = now()
             else:
                 return jobs
@@ -683,7 +903,7 @@ class MultipleJobSerializer(rfs.ListSerializer):
     def validate(self, attrs: dict) -> dict:
         attrs = super().validate(attrs)
         # filter requests with more elements than this threshold
-        max_element_per_request_number = 200
+        max_element_per_request_number = settings.BULK_JOBS_MAX_ELEMENTS if self.bulk else 200
         if len(attrs) > max_element_per_request_number:
             raise ValidationError(
                 {
@@ -771,17 +991,17 @@ class FileJobSerializer(_AbstractJobCreateSerializer):
         # calculate ``file_mimetype``
         if "file_name" not in attrs:
             attrs["file_name"] = attrs["file"].name
-        # calculate ``md5``
-        file_obj = attrs["file"].file
-        file_obj.seek(0)
-        file_buffer = file_obj.read()
-        attrs["file_mimetype"] = MimeTypes.calculate(file_buffer, attrs["file_name"])
-        attrs["md5"] = calculate_md5(file_buffer)
+        # calculate the hashes, reading the file in chunks
+        hashes = calculate_hashes(attrs["file"].chunks())
+        attrs["file_mimetype"] = MimeTypes.calculate(hashes.head, attrs["file_name"])
+        attrs["md5"] = hashes.md5
+        attrs["sha1"] = hashes.sha1
+        attrs["sha256"] = hashes.sha256
         attrs = super().validate(attrs)
         logger.debug(f"after attrs: {attrs}")
         return attrs
 
-    def create(self, validated_data):
+    def get_analyzable(self, validated_data: Dict) -> Analyzable:
         md5 = validated_data.pop("md5")
         sample, created = Analyzable.objects.get_or_create(
             md5=md5,
@@ -790,13 +1010,19 @@ class FileJobSerializer(_AbstractJobCreateSerializer):
                 "file": validated_data.pop("file"),
                 "mimetype": validated_data.pop("file_mimetype"),
                 "md5": md5,
+                # already calculated: the sample is not read again by full_clean
+                "sha1": validated_data.pop("sha1"),
+                "sha256": validated_data.pop("sha256"),
                 "classification": Classification.FILE.value,
             },
         )
         if created:
             sample.full_clean()
             sample.save()
-        validated_data["analyzable"] = sample
+        return sample
+
+    def create(self, validated_data):
+        validated_data["analyzable"] = self.get_analyzable(validated_data)
         return super().create(validated_data)
 
     def set_analyzers_to_execute(
@@ -807,12 +1033,6 @@ class FileJobSerializer(_AbstractJobCreateSerializer):
         file_name: str,
         **kwargs,
     ) -> List[AnalyzerConfig]:
-        analyzers_to_execute = analyzers_requested.copy()
-
-        # get values from serializer
-        partially_filtered_analyzers_qs = AnalyzerConfig.objects.filter(
-            pk__in=[config.pk for config in analyzers_to_execute]
-        )
         if file_mimetype in [MimeTypes.ZIP1.value, MimeTypes.ZIP2.value]:
             EXCEL_OFFICE_FILES = r"\.[xl]\w{0,3}$"
             DOC_OFFICE_FILES = r"\.[doc]\w{0,3}$"
@@ -825,7 +1045,18 @@ class FileJobSerializer(_AbstractJobCreateSerializer):
             else:
                 # its an android file
                 file_mimetype = MimeTypes.APK.value
+        return self.resolve_once(
+            ("file_analyzers", tuple(config.pk for config in analyzers_requested), tlp, file_mimetype),
+            lambda: self._set_analyzers_to_execute(analyzers_requested, tlp, file_mimetype),
+        )
 
+    def _set_analyzers_to_execute(
+        self, analyzers_requested: List[AnalyzerConfig], tlp: str, file_mimetype: str
+    ) -> List[AnalyzerConfig]:
+        analyzers_to_execute = analyzers_requested.copy()
+        partially_filtered_analyzers_qs = AnalyzerConfig.objects.filter(
+            pk__in=[config.pk for config in analyzers_to_execute]
+        )
         supported_query = (
             Q(
                 supported_filetypes__len=0,
@@ -852,6 +1083,30 @@ class MultipleObservableJobSerializer(MultipleJobSerializer):
     def update(self, instance, validated_data):
         raise NotImplementedError("This serializer does not support update().")
 
+    def save(self, parent: Job = None, **kwargs):
+        # the bulk creation sends the pipelines by itself
+        batch_pipeline = (
+            not self.bulk
+            and kwargs.get("send_task", False)
+            and settings.BATCH_PIPELINE_ENABLED
+            and len(self.validated_data) > 1
+        )
+        if batch_pipeline:
+            kwargs["batch_pipeline"] = True
+        jobs = super().save(parent=parent, **kwargs)
+        batched_jobs = self.context.pop("batched_jobs", [])
+        if batched_jobs:
+            from intel_owl.tasks import job_pipeline_batch
+
+            logger.info(f"Sending batch task for {len(batched_jobs)} jobs")
+            job_pipeline_batch.apply_async(
+                args=[[job.pk for job in batched_jobs]],
+                queue=get_queue_name(settings.DEFAULT_QUEUE),
+                MessageGroupId=str(uuid.uuid4()),
+                priority=batched_jobs[0].priority,
+            )
+        return jobs
+
     def to_internal_value(self, data):
         ret = []
         errors = []
@@ -895,7 +1150,7 @@ class ObservableAnalysisSerializer(_AbstractJobCreateSerializer):
         )
         list_serializer_class = MultipleObservableJobSerializer
 
-    def create(self, validated_data):
+    def get_analyzable(self, validated_data: Dict) -> Analyzable:
         observable_classification = validated_data.pop("observable_classification")
         md5 = validated_data.pop("md5")
         obs, created = Analyzable.objects.get_or_create(
@@ -909,9 +1164,10 @@ class ObservableAnalysisSerializer(_AbstractJobCreateSerializer):
         if created:
             obs.full_clean()
             obs.save()
+        return obs
 
-        validated_data["analyzable"] = obs
-
+    def create(self, validated_data):
+        validated_data["analyzable"] = self.get_analyzable(validated_data)
         return super().create(validated_data)
 
     def validate(self, attrs: dict) -> dict:
@@ -968,6 +1224,22 @@ class ObservableAnalysisSerializer(_AbstractJobCreateSerializer):
         **kwargs,
     ) -> List[AnalyzerConfig]:
         logger.debug(f"{analyzers_requested=} {type(analyzers_requested)=}")
+        return self.resolve_once(
+            (
+                "observable_analyzers",
+                tuple(config.pk for config in analyzers_requested),
+                tlp,
+                observable_classification,
+            ),
+            lambda: self._set_analyzers_to_execute(analyzers_requested, tlp, observable_classification),
+        )
+
+    def _set_analyzers_to_execute(
+        self,
+        analyzers_requested: List[AnalyzerConfig],
+        tlp: str,
+        observable_classification: str,
+    ) -> List[AnalyzerConfig]:
         analyzers_to_execute = analyzers_requested.copy()
 
         partially_filtered_analyzers_qs = AnalyzerConfig.objects.filter(
@@ -1,7 +1,7 @@
 from rest_framework import serializers as rfs
 
 from api_app.models import AbstractReport
-from api_app.serializers import AbstractBIInterface
+from api_app.serializers import AbstractBIInterface, SparseFieldsetMixin
 
 
 class AbstractReportSerializerInterface(rfs.ModelSerializer):
@@ -40,12 +40,20 @@ class AbstractReportBISerializer(AbstractBIInterface):
         return super().get_class_instance(instance).split("report")[0]
 
 
-class AbstractReportSerializer(AbstractReportSerializerInterface):
+class AbstractReportSerializer(SparseFieldsetMixin, AbstractReportSerializerInterface):
     class Meta:
         fields = AbstractReportSerializerInterface.Meta.fields + [
             "id",
             "report",
+            "report_size",
             "errors",
             "start_time",
         ]
         list_serializer_class = AbstractReportSerializerInterface.Meta.list_serializer_class
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if self.context.get("exclude_report_bodies", False):
+            # the (possibly offloaded) bodies are not loaded at all
+            fields.pop("report", None)
+        return fields
@@ -9,16 +9,21 @@ from django.contrib.admin.models import LogEntry
 from django.db import models
 from django.dispatch import receiver
 
+from api_app.analyzables_manager.models import Analyzable
 from api_app.decorators import prevent_signal_recursion
 from api_app.investigations_manager.models import Investigation
 from api_app.models import (
+    AbstractReport,
     Job,
+    JobRollup,
     ListCachable,
     Parameter,
     PluginConfig,
     PythonConfig,
     PythonModule,
 )
+from api_app.plugin_cache import broadcast_invalidation
+from api_app.retention import in_batch_deletion
 
 migrate_finished = dispatch.Signal()
 
@@ -43,17 +48,80 @@ def post_save_job(sender, instance: Job, *args, **kwargs):
         instance.process_time = round(td.total_seconds(), 2)
 
 
+def _m2m_changed_job_requested_plugins(field: str, instance, action: str, reverse: bool, pk_set):
+    if reverse:
+        # the instance is a plugin config
+        if action == "pre_clear":
+            instance._cleared_jobs = list(Job.objects.filter(**{field: instance}))
+        elif action == "post_clear":
+            for job in getattr(instance, "_cleared_jobs", []):
+                job.refresh_requested_plugins(field)
+        elif action in ["post_add", "post_remove"]:
+            for job in Job.objects.filter(pk__in=pk_set):
+                job.refresh_requested_plugins(field)
+    elif action in ["post_add", "post_remove", "post_clear"]:
+        prefix = Job.REQUESTED_PLUGINS_FIELDS[field]
+        if action == "post_clear":
+            changed = any(key[0] == prefix for key in instance.requested_plugins)
+        else:
+            keys = {f"{prefix}{pk}" for pk in pk_set}
+            # the keys of a job being created are already computed by its serializer
+            changed = (
+                not keys.issubset(instance.requested_plugins)
+                if action == "post_add"
+                else not keys.isdisjoint(instance.requested_plugins)
+            )
+        if changed:
+            instance.refresh_requested_plugins(field)
+
+
+@receiver(models.signals.m2m_changed, sender=Job.analyzers_requested.through)
+def m2m_changed_job_analyzers_requested(sender, instance, action, reverse, model, pk_set, **kwargs):
+    """
+    Signal receiver for the m2m_changed signal of Job.analyzers_requested.
+    Keeps the plugins fingerprint of the job aligned.
+    """
+    _m2m_changed_job_requested_plugins("analyzers_requested", instance, action, reverse, pk_set)
+
+
+@receiver(models.signals.m2m_changed, sender=Job.connectors_requested.through)
+def m2m_changed_job_connectors_requested(sender, instance, action, reverse, model, pk_set, **kwargs):
+    """
+    Signal receiver for the m2m_changed signal of Job.connectors_requested.
+    Keeps the plugins fingerprint of the job aligned.
+    """
+    _m2m_changed_job_requested_plugins("connectors_requested", instance, action, reverse, pk_set)
+
+
+@receiver(models.signals.m2m_changed, sender=Job.visualizers_to_execute.through)
+def m2m_changed_job_visualizers_to_execute(sender, instance, action, reverse, model, pk_set, **kwargs):
+    """
+    Signal receiver for the m2m_changed signal of Job.visualizers_to_execute.
+    Keeps the plugins fingerprint of the job aligned.
+    """
+    _m2m_changed_job_requested_plugins("visualizers_to_execute", instance, action, reverse, pk_set)
+
+
 @receiver(models.signals.post_delete, sender=Job)
 def post_delete_job(sender, instance: Job, **kwargs):
     """
     Signal receiver for the post_delete signal of the Job model.
-    Deletes the associated investigation if no other jobs are linked to it.
+    Removes the job from the job rollups and
+    deletes the associated investigation if no other jobs are linked to it.
 
     Args:
         sender (Model): The model class sending the signal.
         instance (Job): The instance of the model being deleted.
         **kwargs: Additional keyword arguments.
     """
+    if in_batch_deletion():
+        # the retention updates the rollups and the investigations once per batch
+        return
+    try:
+        JobRollup.objects.adjust({instance.get_rollup_key(): -1})
+    except Analyzable.DoesNotExist:
+        # nothing to count, the rollups are rebuilt by the backfill_job_rollups command
+        pass
     # Try/catch is needed for multiple delete of jobs in the same investigation
     # because the signals is called _after_ every deletion
     try:
@@ -63,6 +131,21 @@ def post_delete_job(sender, instance: Job, **kwargs):
         pass
 
 
+@receiver(models.signals.post_delete)
+def post_delete_report(sender, instance, **kwargs):
+    """
+    Signal receiver for the post_delete signal of the report models.
+    Deletes the offloaded report from the file storage.
+
+    Args:
+        sender (Model): The model class sending the signal.
+        instance (AbstractReport): The instance of the model being deleted.
+        **kwargs: Additional keyword arguments.
+    """
+    if issubclass(sender, AbstractReport):
+        sender._meta.get_field("report").delete_offloaded(instance)
+
+
 @receiver(migrate_finished)
 def post_migrate_api_app(
     sender,
@@ -102,7 +185,8 @@ def post_migrate_api_app(
 def post_save_plugin_config(sender, instance: PluginConfig, *args, **kwargs):
     """
     Signal receiver for the post_save signal of the PluginConfig model.
-    Refreshes cache keys associated with the PluginConfig instance.
+    Refreshes cache keys associated with the PluginConfig instance
+    and invalidates the plugin cache of the workers.
 
     Args:
         sender (Model): The model class sending the signal.
@@ -111,13 +195,15 @@ def post_save_plugin_config(sender, instance: PluginConfig, *args, **kwargs):
         **kwargs: Additional keyword arguments.
     """
     instance.refresh_cache_keys()
+    broadcast_invalidation()
 
 
 @receiver(models.signals.post_delete, sender=PluginConfig)
 def post_delete_plugin_config(sender, instance: PluginConfig, *args, **kwargs):
     """
     Signal receiver for the post_delete signal of the PluginConfig model.
-    Refreshes cache keys associated with the PluginConfig instance after deletion.
+    Refreshes cache keys associated with the PluginConfig instance after deletion
+    and invalidates the plugin cache of the workers.
 
     Args:
         sender (Model): The model class sending the signal.
@@ -126,13 +212,15 @@ def post_delete_plugin_config(sender, instance: PluginConfig, *args, **kwargs):
         **kwargs: Additional keyword arguments.
     """
     instance.refresh_cache_keys()
+    broadcast_invalidation()
 
 
 @receiver(models.signals.post_save, sender=Parameter)
 def post_save_parameter(sender, instance: Parameter, *args, **kwargs):
     """
     Signal receiver for the post_save signal of the Parameter model.
-    Deletes the list view cache associated with the Parameter instance.
+    Deletes the list view cache associated with the Parameter instance
+    and invalidates the plugin cache of the workers.
 
     Args:
         sender (Model): The model class sending the signal.
@@ -142,13 +230,15 @@ def post_save_parameter(sender, instance: Parameter, *args, **kwargs):
     """
     # delete list view cache
     instance.refresh_cache_keys()
+    broadcast_invalidation()
 
 
 @receiver(models.signals.post_delete, sender=Parameter)
 def post_delete_parameter(sender, instance: Parameter, *args, **kwargs):
     """
     Signal receiver for the post_delete signal of the Parameter model.
-    Deletes the list view cache associated with the Parameter instance after deletion.
+    Deletes the list view cache associated with the Parameter instance after deletion
+    and invalidates the plugin cache of the workers.
 
     Args:
         sender (Model): The model class sending the signal.
@@ -158,6 +248,7 @@ def post_delete_parameter(sender, instance: Parameter, *args, **kwargs):
     """
     # delete list view cache
     instance.refresh_cache_keys()
+    broadcast_invalidation()
 
 
 @receiver(models.signals.post_save, sender=PythonModule)
@@ -228,7 +319,8 @@ def post_save_python_config_cache(sender, instance, *args, **kwargs):
     """
     Signal receiver for the post_save signal.
     Deletes class cache keys for instances of ListCachable models.
-    Refreshes cache keys associated with the PythonConfig instance.
+    Refreshes cache keys associated with the PythonConfig instance
+    and invalidates the plugin cache of the workers.
 
     Args:
         sender (Model): The model class sending the signal.
@@ -240,6 +332,7 @@ def post_save_python_config_cache(sender, instance, *args, **kwargs):
         instance.delete_class_cache_keys()
     if issubclass(sender, PythonConfig):
         instance.refresh_cache_keys()
+        broadcast_invalidation()
 
 
 @receiver(models.signals.post_delete)
@@ -261,6 +354,7 @@ def post_delete_python_config_cache(sender, instance, *args, **kwargs):
         instance.delete_class_cache_keys()
     if issubclass(sender, PythonConfig):
         instance.refresh_cache_keys()
+        broadcast_invalidation()
 
 
 @receiver(models.signals.post_save, sender=LogEntry)
@@ -2,15 +2,17 @@
 # See the file 'LICENSE' for copying permission.
 import copy
 import datetime
+import hashlib
 import logging
 import uuid
 from abc import ABCMeta
 
 from django.conf import settings
 from django.core.exceptions import ObjectDoesNotExist
-from django.db.models import Count, Q
-from django.db.models.functions import Trunc
+from django.db.models import Prefetch, Q, Sum, prefetch_related_objects
+from django.db.models.functions import Coalesce
 from django.http import FileResponse
+from django.utils.http import parse_etags
 from django.utils.timezone import now
 from elasticsearch_dsl import Q as QElastic
 from elasticsearch_dsl import Search
@@ -49,6 +51,7 @@ from .models import (
     AbstractReport,
     Comment,
     Job,
+    JobRollup,
     OrganizationPluginConfiguration,
     PluginConfig,
     PythonConfig,
@@ -394,6 +397,45 @@ class JobViewSet(ReadAndDeleteOnlyViewSet, SerializerActionMixin):
         logger.info(f"user: {user} request the jobs with params: {self.request.query_params}")
         return Job.objects.visible_for_user(user).order_by("-received_request_time")
 
+    @property
+    def exclude_report_bodies(self) -> bool:
+        return self.request.query_params.get("exclude_report_bodies", "false").lower() == "true"
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context["exclude_report_bodies"] = self.exclude_report_bodies
+        return context
+
+    def retrieve(self, request, *args, **kwargs):
+        """
+        Retrieve a job.
+
+        Query parameters:
+        - `fields`: comma separated fields to return, nested with dots, e.g. `status,analyzer_reports.status`.
+        - `exclude_report_bodies`: if `true`, the reports are returned without their `report`.
+
+        The response has an `ETag` derived from the state of the job:
+        requests with a matching `If-None-Match` return 304 without reading the reports.
+        """
+        instance = self.get_object()
+        state = Job.objects.filter(pk=instance.pk).detail_state()
+        # the detail depends on the user (permissions) and on the requested fields too
+        digest = hashlib.sha256(
+            repr((state, request.user.pk, sorted(request.query_params.lists()))).encode()
+        ).hexdigest()
+        etag = f'"{digest}"'
+        if_none_match = parse_etags(request.headers.get("If-None-Match", ""))
+        if any(tag.removeprefix("W/") in ("*", etag) for tag in if_none_match):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+        if self.exclude_report_bodies:
+            for relation in ["analyzerreports", "connectorreports", "pivotreports", "visualizerreports"]:
+                report_class = getattr(Job, relation).rel.related_model
+                prefetch_related_objects([instance], Prefetch(relation, report_class.objects.defer("report")))
+        serializer = self.get_serializer(
+            instance, sparse_fields=RestJobSerializer.parse_sparse_fields(request.query_params.get("fields"))
+        )
+        return Response(serializer.data, headers={"ETag": etag})
+
     @action(detail=False, methods=["post"])
     def recent_scans(self, request):
         """
@@ -580,7 +622,7 @@ class JobViewSet(ReadAndDeleteOnlyViewSet, SerializerActionMixin):
         - Aggregated count of jobs for each status.
         """
         annotations = {
-            key.lower(): Count("status", filter=Q(status=key))
+            key.lower(): Coalesce(Sum("count", filter=Q(status=key)), 0)
             for key in Job.STATUSES.values
             if key
             in [
@@ -606,8 +648,8 @@ class JobViewSet(ReadAndDeleteOnlyViewSet, SerializerActionMixin):
         - Aggregated count of jobs for each type.
         """
         annotations = {
-            "file": Count("pk", filter=Q(analyzable__classification=Classification.FILE.value)),
-            "observable": Count("pk", filter=~Q(analyzable__classification=Classification.FILE.value)),
+            "file": Coalesce(Sum("count", filter=Q(classification=Classification.FILE.value)), 0),
+            "observable": Coalesce(Sum("count", filter=~Q(classification=Classification.FILE.value)), 0),
         }
         return self.__aggregation_response_static(annotations, users=self.get_org_members(request))
 
@@ -625,7 +667,7 @@ class JobViewSet(ReadAndDeleteOnlyViewSet, SerializerActionMixin):
         - Aggregated count of jobs for each observable classification.
         """
         annotations = {
-            oc.lower(): Count("analyzable__classification", filter=Q(analyzable__classification=oc))
+            oc.lower(): Coalesce(Sum("count", filter=Q(classification=oc)), 0)
             for oc in [
                 Classification.DOMAIN,
                 Classification.IP,
@@ -649,9 +691,7 @@ class JobViewSet(ReadAndDeleteOnlyViewSet, SerializerActionMixin):
         Returns:
         - Aggregated count of jobs for each MIME type.
         """
-        return self.__aggregation_response_dynamic(
-            "analyzable__mimetype", users=self.get_org_members(request)
-        )
+        return self.__aggregation_response_dynamic("mimetype", users=self.get_org_members(request))
 
     @action(
         url_path="aggregate/top_playbook",
@@ -666,9 +706,7 @@ class JobViewSet(ReadAndDeleteOnlyViewSet, SerializerActionMixin):
         Returns:
         - Aggregated count of playbooks for each one.
         """
-        return self.__aggregation_response_dynamic(
-            "playbook_to_execute__name", users=self.get_org_members(request)
-        )
+        return self.__aggregation_response_dynamic("playbook__name", users=self.get_org_members(request))
 
     @action(
         url_path="aggregate/top_user",
@@ -725,30 +763,22 @@ class JobViewSet(ReadAndDeleteOnlyViewSet, SerializerActionMixin):
 
     def __aggregation_response_static(self, annotations: dict, users=None) -> Response:
         """
-        Generate a static aggregation of Job objects filtered by a time range.
+        Generate a static aggregation of the job rollups filtered by a time range.
 
-        This method applies the provided annotations to aggregate Job objects
+        This method applies the provided annotations to aggregate the JobRollup objects
         within the specified time range. Optionally, it filters the results by
         the given list of users.
 
         Args:
             annotations (dict): Annotations to apply for the aggregation.
-            users (list, optional): A list of users to filter the Job objects by.
+            users (list, optional): A list of users to filter the JobRollup objects by.
 
         Returns:
             Response: A Django REST framework Response object containing the aggregated data.
         """
-        delta, basis = self.__parse_range(self.request)
-        filter_kwargs = {"received_request_time__gte": delta}
-        if users:
-            filter_kwargs["user__in"] = users
-        qs = (
-            Job.objects.filter(**filter_kwargs)
-            .annotate(date=Trunc("received_request_time", basis))
-            .values("date")
-            .annotate(**annotations)
+        return Response(
+            self.__get_rollups(users).aggregate_by_date(self.__parse_range(self.request)[1], annotations)
         )
-        return Response(qs)
 
     def __aggregation_response_dynamic(
         self,
@@ -758,65 +788,47 @@ class JobViewSet(ReadAndDeleteOnlyViewSet, SerializerActionMixin):
         users=None,
     ) -> Response:
         """
-        Dynamically aggregate Job objects based on a specified field and time range.
+        Dynamically aggregate the job rollups based on a specified field and time range.
 
         This method identifies the most frequent values of a given field within
-        a specified time range and aggregates the Job objects accordingly.
+        a specified time range and aggregates the JobRollup objects accordingly.
         Optionally, it can group the results by date and limit the number of
         most frequent values.
 
         Args:
-            field_name (str): The name of the field to aggregate by.
+            field_name (str): The name of the JobRollup field to aggregate by.
             group_by_date (bool, optional): Whether to group the results by date. Defaults to True.
             limit (int, optional): The maximum number of most frequent values to retrieve. Defaults to 5.
-            users (list, optional): A list of users to filter the Job objects by.
+            users (list, optional): A list of users to filter the JobRollup objects by.
 
         Returns:
             Response: A Django REST framework Response object containing the most frequent values
             and the aggregated data.
         """
-        delta, basis = self.__parse_range(self.request)
-        logger.debug(f"{delta=}, {basis=}, {users=}")
-        filter_kwargs = {"received_request_time__gte": delta}
-        if users:
-            filter_kwargs["user__in"] = users
-
-        most_frequent_values = (
-            Job.objects.filter(**filter_kwargs)
-            .exclude(**{f"{field_name}__isnull": True})
-            .exclude(**{f"{field_name}__exact": ""})
+        basis = self.__parse_range(self.request)[1]
+        rollups = self.__get_rollups(users)
+        most_frequent_values = rollups.exclude(
             # excluding those because they could lead to SQL query errors
-            .exclude(
-                analyzable__classification__in=[
-                    Classification.URL,
-                    Classification.GENERIC,
-                ]
-            )
-            .annotate(count=Count(field_name))
-            .distinct()
-            .order_by("-count")[:limit]
-            .values_list(field_name, flat=True)
-        )
+            classification__in=[
+                Classification.URL,
+                Classification.GENERIC,
+            ]
+        ).most_frequent(field_name, limit)
 
         logger.info(f"request: {field_name} found most_frequent_values: {most_frequent_values}")
 
         if len(most_frequent_values):
             annotations = {
-                val.replace(" ", "").replace("?", "").replace(";", ""): Count(
-                    field_name, filter=Q(**{field_name: val})
+                val.replace(" ", "").replace("?", "").replace(";", ""): Coalesce(
+                    Sum("count", filter=Q(**{field_name: val})), 0
                 )
                 for val in most_frequent_values
             }
             logger.debug(f"request: {field_name} annotations: {annotations}")
             if group_by_date:
-                aggregation = (
-                    Job.objects.filter(**filter_kwargs)
-                    .annotate(date=Trunc("received_request_time", basis))
-                    .values("date")
-                    .annotate(**annotations)
-                )
+                aggregation = rollups.aggregate_by_date(basis, annotations)
             else:
-                aggregation = Job.objects.filter(**filter_kwargs).aggregate(**annotations)
+                aggregation = rollups.aggregate(**annotations)
         else:
             aggregation = {}
 
@@ -827,6 +839,24 @@ class JobViewSet(ReadAndDeleteOnlyViewSet, SerializerActionMixin):
             }
         )
 
+    def __get_rollups(self, users=None):
+        """
+        Retrieve the job rollups of the requested time range, optionally of some users only.
+
+        Args:
+            users (list, optional): A list of users to filter the JobRollup objects by.
+
+        Returns:
+            JobRollupQuerySet: The job rollups.
+        """
+        delta, basis = self.__parse_range(self.request)
+        logger.debug(f"{delta=}, {basis=}, {users=}")
+        # the rollups of the hour of delta are partially in the range: they are included
+        filter_kwargs = {"hour__gte": JobRollup.truncate(delta)}
+        if users:
+            filter_kwargs["user__in"] = users
+        return JobRollup.objects.filter(**filter_kwargs)
+
     @staticmethod
     def __parse_range(request):
         """
@@ -3,15 +3,16 @@
 import abc
 import logging
 from enum import Enum
-from typing import Any, Dict, List, Tuple, Type, Union
+from typing import Any, Dict, Iterable, List, Tuple, Type, Union
 
 from django.db.models import QuerySet
+from django.utils.functional import cached_property
 
-from api_app.analyzers_manager.models import MimeTypes
+from api_app.analyzers_manager.models import AnalyzerReport, MimeTypes
 from api_app.choices import PythonModuleBasePaths
 from api_app.classes import Plugin
 from api_app.decorators import classproperty
-from api_app.models import AbstractReport
+from api_app.models import AbstractReport, PythonModule
 from api_app.visualizers_manager.enums import (
     VisualizableAlignment,
     VisualizableColor,
@@ -544,6 +545,8 @@ class Visualizer(Plugin, metaclass=abc.ABCMeta):
 
     def before_run(self):
         super().before_run()
+        # the reports of a previous run are stale
+        self.__dict__.pop("analyzer_reports_index", None)
         logger.info(f"STARTED visualizer: {self.__repr__()}")
 
     def after_run_success(self, content):
@@ -574,10 +577,73 @@ class Visualizer(Plugin, metaclass=abc.ABCMeta):
         return report
 
     def get_analyzer_reports(self) -> QuerySet:
-        from api_app.analyzers_manager.models import AnalyzerReport
-
         return AnalyzerReport.objects.filter(job=self._job)
 
+    def build_reports_index(
+        self,
+        reports: QuerySet,
+        names: Iterable[str] = None,
+        fields: Iterable[str] = None,
+    ) -> Dict[str, AbstractReport]:
+        """
+        Retrieve the reports with a single query, keyed by config name.
+
+        Args:
+            reports (QuerySet): The reports of the job.
+            names (Iterable[str], optional): Retrieve only the reports of these configs.
+            fields (Iterable[str], optional): Retrieve only these fields of the reports.
+        """
+        reports = reports.select_related("config__python_module")
+        if names is not None:
+            reports = reports.filter(config__name__in=names)
+        if fields is not None:
+            reports = reports.only("job", "config__name", "config__python_module", *fields)
+        index = {}
+        for report in reports:
+            # the visualizables link the job of the report
+            report.job = self._job
+            index[report.config.name] = report
+        return index
+
+    @cached_property
+    def analyzer_reports_index(self) -> Dict[str, AnalyzerReport]:
+        """
+        Every analyzer report of the job, keyed by analyzer name.
+        """
+        return self.build_reports_index(self.get_analyzer_reports())
+
+    def get_analyzer_report(self, name: str) -> AnalyzerReport:
+        """
+        Returns the report of the analyzer of the job, from the analyzer reports index.
+
+        Raises:
+            AnalyzerReport.DoesNotExist: The analyzer has no report for the job.
+        """
+        try:
+            return self.analyzer_reports_index[name]
+        except KeyError:
+            raise AnalyzerReport.DoesNotExist(f"{name} report does not exist")
+
+    def get_analyzer_report_by_module(self, python_module: PythonModule) -> AnalyzerReport:
+        """
+        Returns the report of the only analyzer of the job with that python module,
+        from the analyzer reports index.
+
+        Raises:
+            AnalyzerReport.DoesNotExist: No analyzer of the job has that python module.
+            AnalyzerReport.MultipleObjectsReturned: More analyzers of the job have that python module.
+        """
+        reports = [
+            report
+            for report in self.analyzer_reports_index.values()
+            if report.config.python_module_id == python_module.pk
+        ]
+        if not reports:
+            raise AnalyzerReport.DoesNotExist(f"{python_module} report does not exist")
+        if len(reports) > 1:
+            raise AnalyzerReport.MultipleObjectsReturned(f"More {python_module} reports exist")
+        return reports[0]
+
     def get_connector_reports(self) -> QuerySet:
         from api_app.connectors_manager.models import ConnectorReport
 
@@ -590,5 +656,5 @@ class Visualizer(Plugin, metaclass=abc.ABCMeta):
 
     def get_data_models(self) -> QuerySet:
         data_model_class = self._job.analyzable.get_data_model_class()
-        analyzer_reports_pk = [report.pk for report in self.get_analyzer_reports()]
+        analyzer_reports_pk = [report.pk for report in self.analyzer_reports_index.values()]
         return data_model_class.objects.filter(analyzers_report__in=analyzer_reports_pk)
@@ -0,0 +1,28 @@
+# This file is a part of IntelOwl https://github.com/intelowlproject/IntelOwl
+# See the file 'LICENSE' for copying permission.
+
+from django.db import migrations, models
+
+import api_app.fields
+import api_app.visualizers_manager.validators
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("visualizers_manager", "0043_visualizer_config_sample_static_analysis"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="visualizerreport",
+            name="report",
+            field=api_app.fields.OffloadableJSONField(
+                default=list, validators=[api_app.visualizers_manager.validators.validate_report]
+            ),
+        ),
+        migrations.AddField(
+            model_name="visualizerreport",
+            name="report_size",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
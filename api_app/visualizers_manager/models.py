@@ -5,6 +5,7 @@ from django.db import models
 
 from api_app.choices import PythonModuleBasePaths
 from api_app.decorators import classproperty
+from api_app.fields import OffloadableJSONField
 from api_app.models import AbstractReport, PythonConfig, PythonModule
 from api_app.playbooks_manager.models import PlaybookConfig
 from api_app.visualizers_manager.exceptions import VisualizerConfigurationException
@@ -17,7 +18,7 @@ class VisualizerReport(AbstractReport):
     config = models.ForeignKey(
         "VisualizerConfig", related_name="reports", null=False, on_delete=models.CASCADE
     )
-    report = models.JSONField(default=list, validators=[validate_report])
+    report = OffloadableJSONField(default=list, validators=[validate_report])
     name = models.CharField(null=True, blank=True, default=None, max_length=50)
 
     class Meta:
@@ -21,12 +21,13 @@ class CrawlResults(Visualizer):
     def run(self):
         pages = []
 
-        analyzer_reports = self.get_analyzer_reports().filter(config__name="UrlScan_Submit_Result")
+        analyzer_report = self.build_reports_index(
+            self.get_analyzer_reports(), names=["UrlScan_Submit_Result"], fields=["status", "report"]
+        ).get("UrlScan_Submit_Result")
 
-        for analyzer_report in analyzer_reports:
-            if analyzer_report.status == ReportStatus.SUCCESS and analyzer_report.report:
-                page = self._create_urlscan_page(analyzer_report.report)
-                pages.append(page.to_dict())
+        if analyzer_report and analyzer_report.status == ReportStatus.SUCCESS and analyzer_report.report:
+            page = self._create_urlscan_page(analyzer_report.report)
+            pages.append(page.to_dict())
 
         if not pages:
             page = self._create_empty_page()
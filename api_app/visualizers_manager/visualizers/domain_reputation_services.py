@@ -1,8 +1,6 @@
 from logging import getLogger
 from typing import Dict, List
 
-from django.db.models import Q
-
 from api_app.analyzers_manager.models import AnalyzerReport
 from api_app.choices import ReportStatus
 from api_app.visualizers_manager.classes import Visualizer
@@ -22,7 +20,7 @@ class DomainReputationServices(Visualizer):
     @visualizable_error_handler_with_params("VirusTotal")
     def _vt3(self):
         try:
-            analyzer_report = self.get_analyzer_reports().get(config__name="VirusTotal_v3_Get_Observable")
+            analyzer_report = self.get_analyzer_report("VirusTotal_v3_Get_Observable")
         except AnalyzerReport.DoesNotExist:
             logger.warning("VirusTotal_v3_Get_Observable report does not exist")
             virustotal_report = self.Title(
@@ -56,7 +54,7 @@ class DomainReputationServices(Visualizer):
     @visualizable_error_handler_with_params("URLhaus")
     def _urlhaus(self):
         try:
-            analyzer_report = self.get_analyzer_reports().get(config__name="URLhaus")
+            analyzer_report = self.get_analyzer_report("URLhaus")
         except AnalyzerReport.DoesNotExist:
             logger.warning("URLhaus report does not exist")
         else:
@@ -80,7 +78,7 @@ class DomainReputationServices(Visualizer):
     @visualizable_error_handler_with_params("ThreatFox")
     def _threatfox(self):
         try:
-            analyzer_report = self.get_analyzer_reports().get(config__name="ThreatFox")
+            analyzer_report = self.get_analyzer_report("ThreatFox")
         except AnalyzerReport.DoesNotExist:
             logger.warning("Threatfox report does not exist")
         else:
@@ -106,7 +104,7 @@ class DomainReputationServices(Visualizer):
     @visualizable_error_handler_with_params("Tranco")
     def _tranco(self):
         try:
-            analyzer_report = self.get_analyzer_reports().get(config__name="Tranco")
+            analyzer_report = self.get_analyzer_report("Tranco")
         except AnalyzerReport.DoesNotExist:
             logger.warning("Tranco report does not exist")
         else:
@@ -128,7 +126,7 @@ class DomainReputationServices(Visualizer):
     @visualizable_error_handler_with_params("Phishtank")
     def _phishtank(self):
         try:
-            analyzer_report = self.get_analyzer_reports().get(config__name="Phishtank")
+            analyzer_report = self.get_analyzer_report("Phishtank")
         except AnalyzerReport.DoesNotExist:
             logger.warning("Phishtank report does not exist")
         else:
@@ -149,7 +147,7 @@ class DomainReputationServices(Visualizer):
     @visualizable_error_handler_with_params("PhishingArmy")
     def _phishing_army(self):
         try:
-            analyzer_report = self.get_analyzer_reports().get(config__name="PhishingArmy")
+            analyzer_report = self.get_analyzer_report("PhishingArmy")
         except AnalyzerReport.DoesNotExist:
             logger.warning("PhishingArmy report does not exist")
         else:
@@ -169,7 +167,7 @@ class DomainReputationServices(Visualizer):
     @visualizable_error_handler_with_params("InQuest")
     def _inquest_repdb(self):
         try:
-            analyzer_report = self.get_analyzer_reports().get(config__name="InQuest_REPdb")
+            analyzer_report = self.get_analyzer_report("InQuest_REPdb")
         except AnalyzerReport.DoesNotExist:
             logger.warning("InQuest_REPdb report does not exist")
         else:
@@ -190,7 +188,7 @@ class DomainReputationServices(Visualizer):
     @visualizable_error_handler_with_params("OTX Alienvault")
     def _otxquery(self):
         try:
-            analyzer_report = self.get_analyzer_reports().get(config__name="OTXQuery")
+            analyzer_report = self.get_analyzer_report("OTXQuery")
         except AnalyzerReport.DoesNotExist:
             logger.warning("OTXQuery report does not exist")
         else:
@@ -218,9 +216,9 @@ class DomainReputationServices(Visualizer):
         second_level_elements = []
         third_level_elements = []
 
-        for analyzer_report in self.get_analyzer_reports().filter(
-            Q(config__name__endswith="Malicious_Detector") | Q(config__name="GoogleSafebrowsing")
-        ):
+        for name, analyzer_report in self.analyzer_reports_index.items():
+            if not name.endswith("Malicious_Detector") and name != "GoogleSafebrowsing":
+                continue
             printable_analyzer_name = analyzer_report.config.name.replace("_", " ")
             third_level_elements.append(
                 self.Bool(
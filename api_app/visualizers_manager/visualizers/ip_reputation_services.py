@@ -20,7 +20,7 @@ class IPReputationServices(Visualizer):
     @visualizable_error_handler_with_params("VirusTotal")
     def _vt3(self):
         try:
-            analyzer_report = self.get_analyzer_reports().get(config__name="VirusTotal_v3_Get_Observable")
+            analyzer_report = self.get_analyzer_report("VirusTotal_v3_Get_Observable")
         except AnalyzerReport.DoesNotExist:
             logger.warning("VirusTotal_v3_Get_Observable report does not exist")
         else:
@@ -44,7 +44,7 @@ class IPReputationServices(Visualizer):
     @visualizable_error_handler_with_params("Greynoise")
     def _greynoise(self):
         try:
-            analyzer_report = self.get_analyzer_reports().get(config__name="GreyNoiseCommunity")
+            analyzer_report = self.get_analyzer_report("GreyNoiseCommunity")
         except AnalyzerReport.DoesNotExist:
             logger.warning("GreynoiseCommunity report does not exist")
         else:
@@ -74,7 +74,7 @@ class IPReputationServices(Visualizer):
     @visualizable_error_handler_with_params("URLhaus")
     def _urlhaus(self):
         try:
-            analyzer_report = self.get_analyzer_reports().get(config__name="URLhaus")
+            analyzer_report = self.get_analyzer_report("URLhaus")
         except AnalyzerReport.DoesNotExist:
             logger.warning("URLhaus report does not exist")
         else:
@@ -98,7 +98,7 @@ class IPReputationServices(Visualizer):
     @visualizable_error_handler_with_params("ThreatFox")
     def _threatfox(self):
         try:
-            analyzer_report = self.get_analyzer_reports().get(config__name="ThreatFox")
+            analyzer_report = self.get_analyzer_report("ThreatFox")
         except AnalyzerReport.DoesNotExist:
             logger.warning("Threatfox report does not exist")
         else:
@@ -120,7 +120,7 @@ class IPReputationServices(Visualizer):
     @visualizable_error_handler_with_params("InQuest")
     def _inquest_repdb(self):
         try:
-            analyzer_report = self.get_analyzer_reports().get(config__name="InQuest_REPdb")
+            analyzer_report = self.get_analyzer_report("InQuest_REPdb")
         except AnalyzerReport.DoesNotExist:
             logger.warning("InQuest_REPdb report does not exist")
         else:
@@ -141,7 +141,7 @@ class IPReputationServices(Visualizer):
     @visualizable_error_handler_with_params("AbuseIPDB Categories")
     def _abuse_ipdb(self):
         try:
-            analyzer_report = self.get_analyzer_reports().get(config__name="AbuseIPDB")
+            analyzer_report = self.get_analyzer_report("AbuseIPDB")
         except AnalyzerReport.DoesNotExist:
             logger.warning("AbuseIPDB report does not exist")
             return None, None
@@ -185,7 +185,7 @@ class IPReputationServices(Visualizer):
     @visualizable_error_handler_with_params("GreedyBear Honeypots")
     def _greedybear(self):
         try:
-            analyzer_report = self.get_analyzer_reports().get(config__name="GreedyBear")
+            analyzer_report = self.get_analyzer_report("GreedyBear")
         except AnalyzerReport.DoesNotExist:
             logger.warning("GreedyBear report does not exist")
         else:
@@ -218,7 +218,7 @@ class IPReputationServices(Visualizer):
     @visualizable_error_handler_with_params("Crowdsec Classifications", "Crowdsec Behaviors")
     def _crowdsec(self):
         try:
-            analyzer_report = self.get_analyzer_reports().get(config__name="Crowdsec")
+            analyzer_report = self.get_analyzer_report("Crowdsec")
         except AnalyzerReport.DoesNotExist:
             logger.warning("Crowdsec report does not exist")
             return None, None
@@ -264,7 +264,7 @@ class IPReputationServices(Visualizer):
     @visualizable_error_handler_with_params("OTX Alienvault")
     def _otxquery(self):
         try:
-            analyzer_report = self.get_analyzer_reports().get(config__name="OTXQuery")
+            analyzer_report = self.get_analyzer_report("OTXQuery")
         except AnalyzerReport.DoesNotExist:
             logger.warning("OTXQuery report does not exist")
         else:
@@ -296,7 +296,7 @@ class IPReputationServices(Visualizer):
     @visualizable_error_handler_with_params("FireHol")
     def _firehol(self):
         try:
-            analyzer_report = self.get_analyzer_reports().get(config__name="FireHol_IPList")
+            analyzer_report = self.get_analyzer_report("FireHol_IPList")
         except AnalyzerReport.DoesNotExist:
             logger.warning("FireHol_IPList report does not exist")
         else:
@@ -318,7 +318,7 @@ class IPReputationServices(Visualizer):
     @visualizable_error_handler_with_params("Tor Exit Node")
     def _tor(self):
         try:
-            analyzer_report = self.get_analyzer_reports().get(config__name="TorProject")
+            analyzer_report = self.get_analyzer_report("TorProject")
         except AnalyzerReport.DoesNotExist:
             logger.warning("TorProject report does not exist")
         else:
@@ -332,7 +332,7 @@ class IPReputationServices(Visualizer):
     @visualizable_error_handler_with_params("Talos Reputation")
     def _talos(self):
         try:
-            analyzer_report = self.get_analyzer_reports().get(config__name="TalosReputation")
+            analyzer_report = self.get_analyzer_report("TalosReputation")
         except AnalyzerReport.DoesNotExist:
             logger.warning("TalosReputation report does not exist")
         else:
@@ -7,8 +7,6 @@ import datetime
 import logging
 from typing import List
 
-from django.db.models import QuerySet
-
 from api_app.analyzers_manager.models import AnalyzerReport
 from api_app.analyzers_manager.observable_analyzers.circl_pdns import CIRCL_PDNS
 from api_app.analyzers_manager.observable_analyzers.dnsdb import DNSdb
@@ -20,6 +18,7 @@ from api_app.analyzers_manager.observable_analyzers.robtex import Robtex
 from api_app.analyzers_manager.observable_analyzers.threatminer import Threatminer
 from api_app.analyzers_manager.observable_analyzers.validin import Validin
 from api_app.models import Job, PythonModule
+from api_app.visualizers_manager.classes import Visualizer
 
 logger = logging.getLogger(__name__)
 
@@ -35,9 +34,10 @@ class PDNSReport:
     source_description: str
 
 
-def _extract_analyzer(analyzer_reports: QuerySet, module: PythonModule, job: Job) -> AnalyzerReport:
+def _extract_analyzer(visualizer: Visualizer, module: PythonModule, job: Job) -> AnalyzerReport:
     try:
-        analyzer_report = analyzer_reports.get(config__python_module=module)
+        # from the analyzer reports index of the visualizer, retrieved once for every extractor
+        analyzer_report = visualizer.get_analyzer_report_by_module(module)
         printable_analyzer_name = analyzer_report.config.name.replace("_", " ")
         logger.debug(f"{printable_analyzer_name=}")
     except AnalyzerReport.DoesNotExist:
@@ -46,8 +46,8 @@ def _extract_analyzer(analyzer_reports: QuerySet, module: PythonModule, job: Job
     return analyzer_report
 
 
-def extract_otxquery_reports(analyzer_reports: QuerySet, job: Job) -> List[PDNSReport]:
-    otx_analyzer = _extract_analyzer(analyzer_reports, OTX.python_module, job)
+def extract_otxquery_reports(visualizer: Visualizer, job: Job) -> List[PDNSReport]:
+    otx_analyzer = _extract_analyzer(visualizer, OTX.python_module, job)
     if otx_analyzer:
         otx_reports = otx_analyzer.report.get("passive_dns", [])
         pdns_reports = []
@@ -66,8 +66,8 @@ def extract_otxquery_reports(analyzer_reports: QuerySet, job: Job) -> List[PDNSR
     return []
 
 
-def extract_threatminer_reports(analyzer_reports: QuerySet, job: Job) -> List[PDNSReport]:
-    threatminer_analyzer = _extract_analyzer(analyzer_reports, Threatminer.python_module, job)
+def extract_threatminer_reports(visualizer: Visualizer, job: Job) -> List[PDNSReport]:
+    threatminer_analyzer = _extract_analyzer(visualizer, Threatminer.python_module, job)
     if threatminer_analyzer:
         threatminer_reports = threatminer_analyzer.report.get("results", [])
         pdns_reports = []
@@ -86,8 +86,8 @@ def extract_threatminer_reports(analyzer_reports: QuerySet, job: Job) -> List[PD
     return []
 
 
-def extract_validin_reports(analyzer_reports: QuerySet, job: Job) -> List[PDNSReport]:
-    validin_analyzer = _extract_analyzer(analyzer_reports, Validin.python_module, job)
+def extract_validin_reports(visualizer: Visualizer, job: Job) -> List[PDNSReport]:
+    validin_analyzer = _extract_analyzer(visualizer, Validin.python_module, job)
     if validin_analyzer:
         records = validin_analyzer.report.get("records", {})
         validin_reports = []
@@ -112,8 +112,8 @@ def extract_validin_reports(analyzer_reports: QuerySet, job: Job) -> List[PDNSRe
     return []
 
 
-def extract_dnsdb_reports(analyzer_reports: QuerySet, job: Job) -> List[PDNSReport]:
-    dnsdb_analyzer = _extract_analyzer(analyzer_reports, DNSdb.python_module, job)
+def extract_dnsdb_reports(visualizer: Visualizer, job: Job) -> List[PDNSReport]:
+    dnsdb_analyzer = _extract_analyzer(visualizer, DNSdb.python_module, job)
     if dnsdb_analyzer:
         dnsdb_reports = dnsdb_analyzer.report.get("data", [])
         pdns_reports = []
@@ -132,8 +132,8 @@ def extract_dnsdb_reports(analyzer_reports: QuerySet, job: Job) -> List[PDNSRepo
     return []
 
 
-def extract_circlpdns_reports(analyzer_reports: QuerySet, job: Job) -> List[PDNSReport]:
-    circlpdns_analyzer = _extract_analyzer(analyzer_reports, CIRCL_PDNS.python_module, job)
+def extract_circlpdns_reports(visualizer: Visualizer, job: Job) -> List[PDNSReport]:
+    circlpdns_analyzer = _extract_analyzer(visualizer, CIRCL_PDNS.python_module, job)
     if circlpdns_analyzer:
         circlpdns_reports = circlpdns_analyzer.report
         pdns_reports = []
@@ -153,8 +153,8 @@ def extract_circlpdns_reports(analyzer_reports: QuerySet, job: Job) -> List[PDNS
     return []
 
 
-def extract_robtex_reports(analyzer_reports: QuerySet, job: Job) -> List[PDNSReport]:
-    robtex_analyzer = _extract_analyzer(analyzer_reports, Robtex.python_module, job)
+def extract_robtex_reports(visualizer: Visualizer, job: Job) -> List[PDNSReport]:
+    robtex_analyzer = _extract_analyzer(visualizer, Robtex.python_module, job)
     if robtex_analyzer:
         robtex_reports = robtex_analyzer.report
         pdns_reports = []
@@ -175,8 +175,8 @@ def extract_robtex_reports(analyzer_reports: QuerySet, job: Job) -> List[PDNSRep
     return []
 
 
-def extract_mnemonicpdns_reports(analyzer_reports: QuerySet, job: Job) -> List[PDNSReport]:
-    mnemonicpdns_analyzer = _extract_analyzer(analyzer_reports, MnemonicPassiveDNS.python_module, job)
+def extract_mnemonicpdns_reports(visualizer: Visualizer, job: Job) -> List[PDNSReport]:
+    mnemonicpdns_analyzer = _extract_analyzer(visualizer, MnemonicPassiveDNS.python_module, job)
     if mnemonicpdns_analyzer:
         mnemonicpdns_reports = mnemonicpdns_analyzer.report
         pdns_reports = []
@@ -1,6 +1,9 @@
 from logging import getLogger
 from typing import Dict, List
 
+from django.utils.functional import cached_property
+
+from api_app.analyzers_manager.models import AnalyzerReport
 from api_app.visualizers_manager.classes import Visualizer
 from api_app.visualizers_manager.visualizers.passive_dns.analyzer_extractor import (
     extract_circlpdns_reports,
@@ -24,15 +27,20 @@ class PassiveDNS(Visualizer):
     def update(cls) -> bool:
         pass
 
+    @cached_property
+    def analyzer_reports_index(self) -> Dict[str, AnalyzerReport]:
+        # only the fields read by the extractors
+        return self.build_reports_index(self.get_analyzer_reports(), fields=["report", "config__description"])
+
     def run(self) -> List[Dict]:
         raw_pdns_data = []
-        raw_pdns_data.extend(extract_otxquery_reports(self.get_analyzer_reports(), self._job))
-        raw_pdns_data.extend(extract_threatminer_reports(self.get_analyzer_reports(), self._job))
-        raw_pdns_data.extend(extract_validin_reports(self.get_analyzer_reports(), self._job))
-        raw_pdns_data.extend(extract_dnsdb_reports(self.get_analyzer_reports(), self._job))
-        raw_pdns_data.extend(extract_circlpdns_reports(self.get_analyzer_reports(), self._job))
-        raw_pdns_data.extend(extract_robtex_reports(self.get_analyzer_reports(), self._job))
-        raw_pdns_data.extend(extract_mnemonicpdns_reports(self.get_analyzer_reports(), self._job))
+        raw_pdns_data.extend(extract_otxquery_reports(self, self._job))
+        raw_pdns_data.extend(extract_threatminer_reports(self, self._job))
+        raw_pdns_data.extend(extract_validin_reports(self, self._job))
+        raw_pdns_data.extend(extract_dnsdb_reports(self, self._job))
+        raw_pdns_data.extend(extract_circlpdns_reports(self, self._job))
+        raw_pdns_data.extend(extract_robtex_reports(self, self._job))
+        raw_pdns_data.extend(extract_mnemonicpdns_reports(self, self._job))
 
         page = self.Page(name="Passive DNS")
         page.add_level(
@@ -32,9 +32,7 @@ class PhishingAnalysis(Visualizer):
     @visualizable_error_handler_with_params("Screenshot")
     def _screenshot(self):
         try:
-            extractor_report = self.get_analyzer_reports().get(
-                config__python_module=PhishingExtractor.python_module
-            )
+            extractor_report = self.get_analyzer_report_by_module(PhishingExtractor.python_module)
         except AnalyzerReport.DoesNotExist:
             return VisualizableBase(value="No screenshot available", disable=True)
         screenshot_base64 = extractor_report.report.get("page_screenshot_base64", "")
@@ -50,9 +48,7 @@ class PhishingAnalysis(Visualizer):
     @visualizable_error_handler_with_params("Page Source Download")
     def _page_source_download(self):
         try:
-            extractor_report = self.get_analyzer_reports().get(
-                config__python_module=PhishingExtractor.python_module
-            )
+            extractor_report = self.get_analyzer_report_by_module(PhishingExtractor.python_module)
         except AnalyzerReport.DoesNotExist:
             return VisualizableBase(value="No page source available", disable=True)
         page_source = extractor_report.report.get("page_source", "")
@@ -66,9 +62,7 @@ class PhishingAnalysis(Visualizer):
     @visualizable_error_handler_with_params("JavaScript Detection")
     def _javascript_detection(self):
         try:
-            form_report = self.get_analyzer_reports().get(
-                config__python_module=PhishingFormCompiler.python_module
-            )
+            form_report = self.get_analyzer_report_by_module(PhishingFormCompiler.python_module)
         except AnalyzerReport.DoesNotExist:
             return VisualizableBase(value="No JavaScript detection data found", disable=True)
         has_js = form_report.report.get("has_javascript", False)
@@ -80,9 +74,7 @@ class PhishingAnalysis(Visualizer):
     @visualizable_error_handler_with_params("Extracted URLs")
     def _extracted_urls(self):
         try:
-            form_report = self.get_analyzer_reports().get(
-                config__python_module=PhishingFormCompiler.python_module
-            )
+            form_report = self.get_analyzer_report_by_module(PhishingFormCompiler.python_module)
         except AnalyzerReport.DoesNotExist:
             return VisualizableBase(value="No extracted URLs found", disable=True)
         extracted_urls = form_report.report.get("extracted_urls", [])
@@ -97,9 +89,7 @@ class PhishingAnalysis(Visualizer):
     @visualizable_error_handler_with_params("Redirection URLs")
     def _redirection_urls(self):
         try:
-            form_report = self.get_analyzer_reports().get(
-                config__python_module=PhishingFormCompiler.python_module
-            )
+            form_report = self.get_analyzer_report_by_module(PhishingFormCompiler.python_module)
         except AnalyzerReport.DoesNotExist:
             return VisualizableBase(value="No redirection URLs found", disable=True)
         redirection_urls = form_report.report.get("redirection_urls", [])
@@ -114,9 +104,7 @@ class PhishingAnalysis(Visualizer):
     @visualizable_error_handler_with_params("HTTP Traffic Download")
     def _http_traffic_download(self):
         try:
-            extractor_report = self.get_analyzer_reports().get(
-                config__python_module=PhishingExtractor.python_module
-            )
+            extractor_report = self.get_analyzer_report_by_module(PhishingExtractor.python_module)
         except AnalyzerReport.DoesNotExist:
             return VisualizableBase(value="No HTTP traffic data available", disable=True)
         http_traffic = extractor_report.report.get("page_http_traffic", [])
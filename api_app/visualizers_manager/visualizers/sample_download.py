@@ -31,9 +31,7 @@ class SampleDownload(Visualizer):
     def _download_button(self):
         # first attempt is download with VT
         try:
-            vt_report = self.get_analyzer_reports().get(
-                config__python_module=VirusTotalv3SampleDownload.python_module
-            )
+            vt_report = self.get_analyzer_report_by_module(VirusTotalv3SampleDownload.python_module)
         except AnalyzerReport.DoesNotExist:
             pass
         else:
@@ -47,9 +45,7 @@ class SampleDownload(Visualizer):
 
         # second attempt is download with VT
         try:
-            uri_report = self.get_analyzer_reports().get(
-                config__python_module=DownloadFileFromUri.python_module
-            )
+            uri_report = self.get_analyzer_report_by_module(DownloadFileFromUri.python_module)
         except AnalyzerReport.DoesNotExist:
             raise Exception("no VirusTotal nor uri analyzer used")
         else:
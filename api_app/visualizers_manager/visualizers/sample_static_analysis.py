@@ -28,7 +28,7 @@ class SampleStaticAnalysis(Visualizer):
     @visualizable_error_handler_with_params("File Info")
     def _file_info(self):
         try:
-            analyzer_report = self.get_analyzer_reports().get(config__name="File_Info")
+            analyzer_report = self.get_analyzer_report("File_Info")
         except AnalyzerReport.DoesNotExist:
             logger.warning("File_Info report does not exist")
             return self.Title(
@@ -49,7 +49,7 @@ class SampleStaticAnalysis(Visualizer):
     @visualizable_error_handler_with_params("Cymru Hash")
     def _cymru_hash(self):
         try:
-            analyzer_report = self.get_analyzer_reports().get(config__name="Cymru_Hash_Registry_Get_File")
+            analyzer_report = self.get_analyzer_report("Cymru_Hash_Registry_Get_File")
         except AnalyzerReport.DoesNotExist:
             logger.warning("Cymru_Hash_Registry_Get_File report does not exist")
             return self.Bool(
@@ -67,7 +67,7 @@ class SampleStaticAnalysis(Visualizer):
     @visualizable_error_handler_with_params("HybridAnalysis")
     def _hybrid_analysis(self):
         try:
-            analyzer_report = self.get_analyzer_reports().get(config__name="HybridAnalysis_Get_File")
+            analyzer_report = self.get_analyzer_report("HybridAnalysis_Get_File")
         except AnalyzerReport.DoesNotExist:
             logger.warning("HybridAnalysis_Get_File report does not exist")
             return self.Title(
@@ -94,7 +94,7 @@ class SampleStaticAnalysis(Visualizer):
     @visualizable_error_handler_with_params("MalwareBazaar")
     def _malware_bazaar(self):
         try:
-            analyzer_report = self.get_analyzer_reports().get(config__name="MalwareBazaar_Get_File")
+            analyzer_report = self.get_analyzer_report("MalwareBazaar_Get_File")
         except AnalyzerReport.DoesNotExist:
             logger.warning("MalwareBazaar_Get_File report does not exist")
             return self.Title(
@@ -116,7 +116,7 @@ class SampleStaticAnalysis(Visualizer):
     @visualizable_error_handler_with_params("OTX Check Hash")
     def _otx_check_hash(self):
         try:
-            analyzer_report = self.get_analyzer_reports().get(config__name="OTX_Check_Hash")
+            analyzer_report = self.get_analyzer_report("OTX_Check_Hash")
         except AnalyzerReport.DoesNotExist:
             logger.warning("OTX_Check_Hash report does not exist")
             return self.Title(
@@ -146,7 +146,7 @@ class SampleStaticAnalysis(Visualizer):
     @visualizable_error_handler_with_params("HashLookup")
     def _hashlookup(self):
         try:
-            analyzer_report = self.get_analyzer_reports().get(config__name="HashLookupServer_Get_File")
+            analyzer_report = self.get_analyzer_report("HashLookupServer_Get_File")
         except AnalyzerReport.DoesNotExist:
             logger.warning("HashLookupServer_Get_File report does not exist")
             return self.Title(
@@ -167,7 +167,7 @@ class SampleStaticAnalysis(Visualizer):
     @visualizable_error_handler_with_params("YARAify")
     def _yaraify(self):
         try:
-            analyzer_report = self.get_analyzer_reports().get(config__name="YARAify_File_Search")
+            analyzer_report = self.get_analyzer_report("YARAify_File_Search")
         except AnalyzerReport.DoesNotExist:
             logger.warning("YARAify_File_Search report does not exist")
             return self.Title(
@@ -191,7 +191,7 @@ class SampleStaticAnalysis(Visualizer):
     @visualizable_error_handler_with_params("PE Info", "Sections")
     def _pe_info(self):
         try:
-            analyzer_report = self.get_analyzer_reports().get(config__name="PE_Info")
+            analyzer_report = self.get_analyzer_report("PE_Info")
         except AnalyzerReport.DoesNotExist:
             logger.warning("PE_Info report does not exist")
             pe_title = self.Title(
@@ -234,7 +234,7 @@ class SampleStaticAnalysis(Visualizer):
     @visualizable_error_handler_with_params("ELF Info")
     def _elf_info(self):
         try:
-            analyzer_report = self.get_analyzer_reports().get(config__name="ELF_Info")
+            analyzer_report = self.get_analyzer_report("ELF_Info")
         except AnalyzerReport.DoesNotExist:
             logger.warning("ELF_Info report does not exist")
             return self.Title(
@@ -256,7 +256,7 @@ class SampleStaticAnalysis(Visualizer):
     @visualizable_error_handler_with_params("APKiD")
     def _apkid(self):
         try:
-            analyzer_report = self.get_analyzer_reports().get(config__name="APKiD")
+            analyzer_report = self.get_analyzer_report("APKiD")
         except AnalyzerReport.DoesNotExist:
             logger.warning("APKiD report does not exist")
             return self.VList(
@@ -293,7 +293,7 @@ class SampleStaticAnalysis(Visualizer):
     @visualizable_error_handler_with_params("GoReSym")
     def _goresym(self):
         try:
-            analyzer_report = self.get_analyzer_reports().get(config__name="GoReSym")
+            analyzer_report = self.get_analyzer_report("GoReSym")
         except AnalyzerReport.DoesNotExist:
             logger.warning("GoReSym report does not exist")
             return self.Title(
@@ -319,7 +319,7 @@ class SampleStaticAnalysis(Visualizer):
     @visualizable_error_handler_with_params("Doc Info")
     def _doc_info(self):
         try:
-            analyzer_report = self.get_analyzer_reports().get(config__name="Doc_Info")
+            analyzer_report = self.get_analyzer_report("Doc_Info")
         except AnalyzerReport.DoesNotExist:
             logger.warning("Doc_Info report does not exist")
             return self.Title(
@@ -348,7 +348,7 @@ class SampleStaticAnalysis(Visualizer):
     @visualizable_error_handler_with_params("PDF Info")
     def _pdf_info(self):
         try:
-            analyzer_report = self.get_analyzer_reports().get(config__name="PDF_Info")
+            analyzer_report = self.get_analyzer_report("PDF_Info")
         except AnalyzerReport.DoesNotExist:
             logger.warning("PDF_Info report does not exist")
             return self.Title(
@@ -380,7 +380,7 @@ class SampleStaticAnalysis(Visualizer):
     @visualizable_error_handler_with_params("OneNote Info")
     def _onenote_info(self):
         try:
-            analyzer_report = self.get_analyzer_reports().get(config__name="OneNote_Info")
+            analyzer_report = self.get_analyzer_report("OneNote_Info")
         except AnalyzerReport.DoesNotExist:
             logger.warning("OneNote_Info report does not exist")
             return self.Title(
@@ -401,7 +401,7 @@ class SampleStaticAnalysis(Visualizer):
     @visualizable_error_handler_with_params("RTF Info")
     def _rtf_info(self):
         try:
-            analyzer_report = self.get_analyzer_reports().get(config__name="Rtf_Info")
+            analyzer_report = self.get_analyzer_report("Rtf_Info")
         except AnalyzerReport.DoesNotExist:
             logger.warning("Rtf_Info report does not exist")
             return self.Title(
@@ -422,7 +422,7 @@ class SampleStaticAnalysis(Visualizer):
     @visualizable_error_handler_with_params("XLM Macro")
     def _xlm_macro(self):
         try:
-            analyzer_report = self.get_analyzer_reports().get(config__name="Xlm_Macro_Deobfuscator")
+            analyzer_report = self.get_analyzer_report("Xlm_Macro_Deobfuscator")
         except AnalyzerReport.DoesNotExist:
             logger.warning("Xlm_Macro_Deobfuscator report does not exist")
             return self.Title(
@@ -449,7 +449,7 @@ class SampleStaticAnalysis(Visualizer):
     @visualizable_error_handler_with_params("Yara", "Yara Signatures")
     def _yara(self):
         try:
-            analyzer_report = self.get_analyzer_reports().get(config__name="Yara")
+            analyzer_report = self.get_analyzer_report("Yara")
         except AnalyzerReport.DoesNotExist:
             logger.warning("Yara report does not exist")
             yara_title = self.Title(
@@ -503,7 +503,7 @@ class SampleStaticAnalysis(Visualizer):
     @visualizable_error_handler_with_params("Signature Info")
     def _signature_info(self):
         try:
-            analyzer_report = self.get_analyzer_reports().get(config__name="Signature_Info")
+            analyzer_report = self.get_analyzer_report("Signature_Info")
         except AnalyzerReport.DoesNotExist:
             logger.warning("Signature_Info report does not exist")
             return self.Title(
@@ -530,7 +530,7 @@ class SampleStaticAnalysis(Visualizer):
     @visualizable_error_handler_with_params("ClamAV", "ClamAV Rules")
     def _clamav(self):
         try:
-            analyzer_report = self.get_analyzer_reports().get(config__name="ClamAV")
+            analyzer_report = self.get_analyzer_report("ClamAV")
         except AnalyzerReport.DoesNotExist:
             logger.warning("ClamAV report does not exist")
             clamav_title = self.Title(
@@ -590,7 +590,7 @@ class SampleStaticAnalysis(Visualizer):
     @visualizable_error_handler_with_params("Quark Engine", "Quark Rules")
     def _quark_engine(self):
         try:
-            analyzer_report = self.get_analyzer_reports().get(config__name="Quark_Engine")
+            analyzer_report = self.get_analyzer_report("Quark_Engine")
         except AnalyzerReport.DoesNotExist:
             logger.warning("Quark_Engine report does not exist")
             quark_title = self.Title(
@@ -644,7 +644,7 @@ class SampleStaticAnalysis(Visualizer):
     @visualizable_error_handler_with_params("Capa", "Capa Capabilities")
     def _capa_info(self):
         try:
-            analyzer_report = self.get_analyzer_reports().get(config__name="Capa_Info")
+            analyzer_report = self.get_analyzer_report("Capa_Info")
         except AnalyzerReport.DoesNotExist:
             logger.warning("Capa_Info report does not exist")
             capa_title = self.Title(
@@ -697,7 +697,7 @@ class SampleStaticAnalysis(Visualizer):
     @visualizable_error_handler_with_params("BoxJS")
     def _boxjs(self):
         try:
-            analyzer_report = self.get_analyzer_reports().get(config__name="BoxJS")
+            analyzer_report = self.get_analyzer_report("BoxJS")
         except AnalyzerReport.DoesNotExist:
             logger.warning("BoxJS report does not exist")
             return self.VList(
@@ -1,16 +1,23 @@
+import datetime
 import logging
-from typing import List
+import uuid
+from typing import Dict, List
+from urllib.parse import parse_qs
 
 from asgiref.sync import async_to_sync
 from channels.generic.websocket import JsonWebsocketConsumer
 from channels.layers import get_channel_layer
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.utils.functional import cached_property
+from django.utils.timezone import now
 
 from api_app.choices import Status
 from api_app.models import Job
 from api_app.serializers.job import WsJobSerializer
 from certego_saas.apps.organization.membership import Membership
+from intel_owl.celery import get_queue_name
 
 User = get_user_model()
 
@@ -73,14 +80,33 @@ class JobConsumer(JsonWebsocketConsumer):
             Returns:
                 List[str]: The list of group names.
             """
-            return [self.job_group_name, self.job_group_perm_name]
+            return [
+                self.job_group_name,
+                self.job_group_perm_name,
+                self.delta_group(self.job_group_name),
+                self.delta_group(self.job_group_perm_name),
+            ]
+
+        @staticmethod
+        def delta_group(group: str) -> str:
+            """
+            Returns the name of the group receiving only the changed reports.
+
+            Args:
+                group (str): The name of the full group.
+
+            Returns:
+                str: The name of the delta group.
+            """
+            return f"{group}-delta"
 
-        def get_group_for_user(self, user: User) -> str:
+        def get_group_for_user(self, user: User, delta: bool = False) -> str:
             """
             Determines the appropriate group for the user based on permissions.
 
             Args:
                 user (User): The user for whom the group is being determined.
+                delta (bool): Whether the user requested the delta updates.
 
             Returns:
                 str: The name of the group the user should join.
@@ -89,7 +115,17 @@ class JobConsumer(JsonWebsocketConsumer):
                 is_member = self._job.user.membership.organization.user_has_membership(user)
             except Membership.DoesNotExist:
                 is_member = False
-            return self.job_group_perm_name if self._job.user == user or is_member else self.job_group_name
+            group = self.job_group_perm_name if self._job.user == user or is_member else self.job_group_name
+            return self.delta_group(group) if delta else group
+
+    @cached_property
+    def delta(self) -> bool:
+        """
+        Whether the client connected with ``?delta=true``:
+        after the first message, it receives only the reports changed since the previous update.
+        """
+        query = parse_qs(self.scope.get("query_string", b"").decode())
+        return query.get("delta", ["false"])[-1].lower() == "true"
 
     def connect(self) -> None:
         """
@@ -110,13 +146,19 @@ class JobConsumer(JsonWebsocketConsumer):
             self.close(code=4040)
         else:
             self.accept()
-            subscribed_group = self.JobChannelGroups(job).get_group_for_user(user)
+            groups = self.JobChannelGroups(job)
+            subscribed_group = groups.get_group_for_user(user, delta=self.delta)
             async_to_sync(self.channel_layer.group_add)(
                 subscribed_group,
                 self.channel_name,
             )
             logger.debug(f"user: {user} added to the group: {subscribed_group}")
-            JobConsumer.serialize_and_send_job(job)
+            # the new client only needs the current state of the job:
+            # there is no reason to send it to every other subscriber too
+            job_data = self.serialize_job(job)
+            self.send_job(
+                {"job": self.get_group_payload(job_data, groups.get_group_for_user(user), since=None)}
+            )
 
     def disconnect(self, close_code) -> None:
         """
@@ -140,7 +182,7 @@ class JobConsumer(JsonWebsocketConsumer):
             )
             subscribed_group = ""
         else:
-            subscribed_group = self.JobChannelGroups(job).get_group_for_user(user)
+            subscribed_group = self.JobChannelGroups(job).get_group_for_user(user, delta=self.delta)
             async_to_sync(self.channel_layer.group_discard)(
                 subscribed_group,
                 self.channel_name,
@@ -168,13 +210,66 @@ class JobConsumer(JsonWebsocketConsumer):
             logger.debug("job sent to the client and terminated, close ws")
             self.close()
 
+    @staticmethod
+    def serialize_job(job: Job) -> Dict:
+        """
+        Serializes the job once, without permissions.
+
+        Args:
+            job (Job): The job instance to be serialized.
+
+        Returns:
+            Dict: The serialized job.
+        """
+        return WsJobSerializer(job, context={"permissions": False}).data
+
+    @staticmethod
+    def get_group_payload(job_data: Dict, group: str, since: datetime.datetime = None) -> Dict:
+        """
+        Builds the payload of a group starting from the serialized job,
+        without serializing it again.
+
+        Args:
+            job_data (Dict): The job serialized by ``serialize_job``.
+            group (str): The group that will receive the payload.
+            since (datetime.datetime): For delta groups, the time of the previous update.
+                If None, every report is sent.
+
+        Returns:
+            Dict: The payload for the group.
+        """
+        has_perm = "perm" in group
+        payload = {
+            **job_data,
+            "permissions": {key: has_perm for key in job_data["permissions"]},
+        }
+        if group.endswith("-delta") and since is not None:
+            payload["delta"] = True
+            for field in ["analyzer_reports", "connector_reports", "pivot_reports", "visualizer_reports"]:
+                payload[field] = [
+                    report
+                    for report in job_data[field]
+                    if max(
+                        datetime.datetime.fromisoformat(report[key])
+                        for key in ["start_time", "end_time"]
+                        if report[key]
+                    )
+                    >= since
+                ]
+        return payload
+
+    @staticmethod
+    def _cache_key(job_id: int, name: str) -> str:
+        return f"websocket_job_{job_id}_{name}"
+
     @classmethod
     def serialize_and_send_job(cls, job: Job) -> None:
         """
         Serializes the job and sends it to the appropriate channel groups.
 
-        This method is called to send the job data to all relevant groups,
-        depending on the job's status and associated permissions.
+        The job is serialized only once: the payloads of the groups
+        differ only for the permissions and, for the delta groups,
+        for the reports that did not change since the previous update.
 
         Args:
             job (Job): The job instance to be serialized and sent.
@@ -183,12 +278,43 @@ class JobConsumer(JsonWebsocketConsumer):
         groups = cls.JobChannelGroups(job)
         groups_list = groups.group_list
         channel_layer = get_channel_layer()
+        sent_key = cls._cache_key(job.pk, "sent")
+        since = cache.get(sent_key)
+        # a small margin covers the clock skew between workers:
+        # the same report sent twice is harmless, a missing one is not
+        cache.set(sent_key, now() - datetime.timedelta(seconds=1), timeout=60 * 60 * 24)
+        job_data = cls.serialize_job(job)
         logger.debug(f"send data for the job: {job.id} to the groups: {groups_list}")
         for group in groups_list:
             logger.debug(f"send data to the group: {group}")
-            job_serializer = WsJobSerializer(job, context={"permissions": "perm" in group})
-            job_data = job_serializer.data
             async_to_sync(channel_layer.group_send)(
                 group,
-                {"type": "send.job", "job": job_data},
+                {"type": "send.job", "job": cls.get_group_payload(job_data, group, since)},
+            )
+
+    @classmethod
+    def publish_job(cls, job_id: int) -> None:
+        """
+        Coalesced version of ``serialize_and_send_job``, used after every plugin run.
+
+        At most one update per job is sent every WEBSOCKET_JOB_UPDATE_INTERVAL seconds:
+        the updates requested inside the interval are merged in a single
+        update, sent when the interval expires.
+        The final status of the job is always sent by ``job_set_final_status``.
+
+        Args:
+            job_id (int): The id of the job to send.
+        """
+        from intel_owl.tasks import send_job_update
+
+        interval = settings.WEBSOCKET_JOB_UPDATE_INTERVAL
+        if not interval or cache.add(cls._cache_key(job_id, "throttle"), True, timeout=interval):
+            cls.serialize_and_send_job(Job.objects.get(pk=job_id))
+        elif cache.add(cls._cache_key(job_id, "pending"), True, timeout=interval):
+            logger.debug(f"coalescing websocket updates for the job {job_id}")
+            send_job_update.apply_async(
+                args=[job_id],
+                countdown=interval,
+                queue=get_queue_name(settings.CONFIG_QUEUE),
+                MessageGroupId=str(uuid.uuid4()),
             )
@@ -0,0 +1,53 @@
+# This file is a part of IntelOwl https://github.com/intelowlproject/IntelOwl
+# See the file 'LICENSE' for copying permission.
+
+"""
+Long polling of the results of the flask-shell2http integrations.
+
+This module is shared by the integrations: it is copied into their images
+from the ``long_polling`` build context.
+"""
+
+import os
+import threading
+
+from flask import Flask, request
+from flask_executor import Executor
+
+# maximum seconds a GET request for a result waits for the command to finish:
+# below the 30 seconds after which gunicorn restarts a busy worker
+LONG_POLL_MAX_TIMEOUT = 20
+# maximum requests of a gunicorn worker waiting at the same time:
+# below its threads, so that the new analyses and the health checks are still served
+LONG_POLL_MAX_WAITING = int(os.getenv("LONG_POLL_MAX_WAITING", "2"))
+
+
+def enable_long_polling(app: Flask, executor: Executor) -> None:
+    """
+    Long polling: ``GET ?key=<key>&wait_timeout=<seconds>`` returns
+    as soon as the command finishes, instead of answering that it is still running.
+    flask-shell2http then returns the result as usual.
+    When too many requests are already waiting, the request is answered right away:
+    the clients poll again later.
+    """
+    waiting = threading.BoundedSemaphore(LONG_POLL_MAX_WAITING)
+
+    @app.before_request
+    def wait_for_result():
+        if request.method != "GET" or "key" not in request.args:
+            return None
+        try:
+            timeout = min(float(request.args.get("wait_timeout", 0)), LONG_POLL_MAX_TIMEOUT)
+        except ValueError:
+            return None
+        future = executor.futures._futures.get(request.args["key"])  # skipcq PYL-W0212
+        if future is None or timeout <= 0 or not waiting.acquire(blocking=False):
+            return None
+        try:
+            finished = threading.Event()
+            # the callbacks run in order: the result is final once this one runs
+            future.add_done_callback(lambda _: finished.set())
+            finished.wait(timeout)
+        finally:
+            waiting.release()
+        return None
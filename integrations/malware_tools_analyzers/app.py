@@ -16,6 +16,7 @@ from flask import Flask
 from flask_executor import Executor
 from flask_executor.futures import Future
 from flask_shell2http import Shell2HTTP
+from long_polling import enable_long_polling
 from werkzeug.utils import safe_join
 
 # get flask-shell2http logger instance
@@ -59,6 +60,9 @@ def too_large(e):
     return {"error": str(e)}, 413
 
 
+enable_long_polling(app, executor)
+
+
 # we are changeing the directory for execution of
 #  artifacts script as it requires us to be in the
 #  same directory
@@ -24,6 +24,7 @@ echo "running gunicorn"
 # start flask server
 exec gosu "${USER}" /opt/deploy/flask/venv/bin/gunicorn 'app:app' \
       --bind '0.0.0.0:4002' \
+      --threads 4 \
       --log-level "${LOG_LEVEL}" \
       --access-logfile "${LOG_PATH}/gunicorn_access.log" \
       --error-logfile "${LOG_PATH}/gunicorn_errors.log"
@@ -5,6 +5,7 @@ import os
 from flask import Flask
 from flask_executor import Executor
 from flask_shell2http import Shell2HTTP
+from long_polling import enable_long_polling
 
 # Logger configuration
 LOG_NAME = "nuclei_scanner"
@@ -58,6 +59,9 @@ def too_large(e):
     return {"error": str(e)}, 413
 
 
+enable_long_polling(app, executor)
+
+
 @app.route("/health", methods=["GET"])
 def health_check():
     return {"status": "healthy"}, 200
@@ -17,5 +17,6 @@ fi
 echo "Templates downloaded successfully. Starting Flask API..."
 exec gosu "${USER}" /app/venv/bin/gunicorn 'app:app' \
     --bind '0.0.0.0:4008' \
+    --threads 4 \
     --access-logfile "${LOG_PATH}"/gunicorn_access.log \
     --error-logfile "${LOG_PATH}"/gunicorn_errors.log
\ No newline at end of file
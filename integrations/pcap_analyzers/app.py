@@ -14,6 +14,7 @@ from flask import Flask
 from flask_executor import Executor
 from flask_executor.futures import Future
 from flask_shell2http import Shell2HTTP
+from long_polling import enable_long_polling
 
 LOG_NAME = "pcap_analyzers"
 
@@ -59,6 +60,9 @@ def too_large(e):
     return {"error": str(e)}, 413
 
 
+enable_long_polling(app, executor)
+
+
 def intercept_suricata_result(context, future: Future) -> None:
     # 1. get current result object
     res = future.result()
@@ -14,6 +14,7 @@ crontab /etc/cron.d/suricata
 suricata --unix-socket=/tmp/suricata.socket &
 exec gosu "${USER}" /usr/local/bin/gunicorn 'app:app' \
     --bind '0.0.0.0:4004' \
+    --threads 4 \
     --log-level "${LOG_LEVEL}" \
     --access-logfile "${LOG_PATH}"/gunicorn_access.log \
     --error-logfile "${LOG_PATH}"/gunicorn_errors.log
@@ -0,0 +1,199 @@
+"""
+Warm pool of headless Chromium processes shared by the Playwright analyses.
+
+flask-shell2http runs every analysis in its own python process: the browsers of the pool
+are started detached from the analyses and reached over CDP, so that they outlive them.
+Every analysis gets a fresh isolated context of a browser of the pool.
+
+Every browser is a slot of the pool, leased with an exclusive lock on the lock file of the slot:
+the locks bound the concurrent analyses and are released by the kernel even if an analysis dies.
+The browser of a slot is started again after BROWSER_POOL_MAX_NAVIGATIONS navigations,
+when it crashes or when it doesn't answer anymore.
+
+Run this module to start the browsers of the pool in advance.
+"""
+
+import fcntl
+import json
+import os
+import random
+import shutil
+import signal
+import subprocess
+import time
+import urllib.request
+from pathlib import Path
+from typing import IO
+
+from logging_setup import setup_file_logger
+
+logger = setup_file_logger("browser_pool")
+
+# 0 disables the pool: every analysis launches its own browser
+BROWSER_POOL_SIZE = int(os.getenv("BROWSER_POOL_SIZE", "4"))
+BROWSER_POOL_MAX_NAVIGATIONS = int(os.getenv("BROWSER_POOL_MAX_NAVIGATIONS", "50"))
+BROWSER_POOL_LEASE_TIMEOUT = int(os.getenv("BROWSER_POOL_LEASE_TIMEOUT", "300"))
+BROWSER_POOL_BASE_PORT = int(os.getenv("BROWSER_POOL_BASE_PORT", "9300"))
+BROWSER_POOL_PATH = Path(os.getenv("BROWSER_POOL_PATH", "/tmp/browser_pool"))
+BROWSER_START_TIMEOUT = 30
+
+
+class BrowserSlot:
+    """
+    A browser of the pool, leased by a single analysis at a time.
+    The pid of the browser and its number of navigations are kept in a json file next to the lock.
+    """
+
+    def __init__(self, index: int, lock_file: IO):
+        self.index = index
+        self.port = BROWSER_POOL_BASE_PORT + index
+        self._lock_file = lock_file
+        self._state_path = BROWSER_POOL_PATH / f"slot_{index}.json"
+        self._profile_path = BROWSER_POOL_PATH / f"slot_{index}_profile"
+        try:
+            self._state = json.loads(self._state_path.read_text())
+        except (OSError, ValueError):
+            self._state = {"pid": 0, "navigations": 0}
+
+    def __repr__(self):
+        return (
+            f"BrowserSlot({self.index}, pid={self._state['pid']}, navigations={self._state['navigations']})"
+        )
+
+    @classmethod
+    def try_lease(cls, index: int) -> "BrowserSlot | None":
+        """Return the slot if it is free, locking it, otherwise None."""
+        BROWSER_POOL_PATH.mkdir(parents=True, exist_ok=True)
+        lock_file = open(BROWSER_POOL_PATH / f"slot_{index}.lock", "a")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            return None
+        return cls(index, lock_file)
+
+    @property
+    def endpoint(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def _write_state(self):
+        self._state_path.write_text(json.dumps(self._state))
+
+    def _is_browser_process(self, pid: int) -> bool:
+        # the pid could have been reused by another process after a crash
+        try:
+            cmdline = Path(f"/proc/{pid}/cmdline").read_bytes()
+        except OSError:
+            return False
+        return f"--remote-debugging-port={self.port}".encode() in cmdline
+
+    def _is_answering(self) -> bool:
+        try:
+            with urllib.request.urlopen(f"{self.endpoint}/json/version", timeout=2):
+                return True
+        except OSError:
+            return False
+
+    def is_alive(self) -> bool:
+        pid = self._state["pid"]
+        return bool(pid) and self._is_browser_process(pid) and self._is_answering()
+
+    def kill_browser(self):
+        """Kill the browser of the slot with its child processes: the next lease starts a new one."""
+        pid = self._state["pid"]
+        if pid and self._is_browser_process(pid):
+            logger.info(f"Killing browser of {self}")
+            try:
+                os.killpg(pid, signal.SIGKILL)
+            except OSError as e:
+                logger.warning(f"Unable to kill browser of {self}: {e}")
+        self._state = {"pid": 0, "navigations": 0}
+        self._write_state()
+
+    def _start_browser(self, executable_path: str):
+        shutil.rmtree(self._profile_path, ignore_errors=True)
+        process = subprocess.Popen(
+            [
+                executable_path,
+                "--headless=new",
+                # no_sandbox=True is a bad practice but it's almost the only way
+                # to run chromium-based browsers in docker
+                "--no-sandbox",
+                "--ignore-certificate-errors",
+                "--disable-dev-shm-usage",
+                "--no-first-run",
+                "--no-default-browser-check",
+                "--window-size=1920,1080",
+                f"--remote-debugging-port={self.port}",
+                f"--user-data-dir={self._profile_path}",
+                "about:blank",
+            ],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            # the browser must outlive the analysis that started it
+            start_new_session=True,
+        )
+        self._state = {"pid": process.pid, "navigations": 0}
+        self._write_state()
+        deadline = time.monotonic() + BROWSER_START_TIMEOUT
+        while not self._is_answering():
+            if process.poll() is not None or time.monotonic() > deadline:
+                self.kill_browser()
+                raise RuntimeError(f"Browser of slot {self.index} did not start")
+            time.sleep(0.1)
+        logger.info(f"Started browser of {self}")
+
+    def ensure_browser(self, executable_path: str) -> str:
+        """Return the CDP endpoint of the browser, starting a new one if needed."""
+        if self._state["navigations"] >= BROWSER_POOL_MAX_NAVIGATIONS:
+            logger.info(f"Recycling browser of {self} after {self._state['navigations']} navigations")
+            self.kill_browser()
+        if not self.is_alive():
+            self._start_browser(executable_path)
+        return self.endpoint
+
+    def count_navigation(self):
+        self._state["navigations"] += 1
+        self._write_state()
+
+    def release(self):
+        """Unlock the slot, leaving its browser running for the next analysis."""
+        self._lock_file.close()
+
+
+def lease() -> BrowserSlot:
+    """Lock a free slot of the pool, waiting up to BROWSER_POOL_LEASE_TIMEOUT seconds for one."""
+    deadline = time.monotonic() + BROWSER_POOL_LEASE_TIMEOUT
+    while True:
+        # random first slot: the browsers are recycled evenly
+        first = random.randrange(BROWSER_POOL_SIZE)
+        for offset in range(BROWSER_POOL_SIZE):
+            slot = BrowserSlot.try_lease((first + offset) % BROWSER_POOL_SIZE)
+            if slot:
+                logger.info(f"Leased {slot}")
+                return slot
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"No free browser in the pool after {BROWSER_POOL_LEASE_TIMEOUT} seconds")
+        time.sleep(0.5)
+
+
+def warm_up():
+    """Start the browsers of the free slots of the pool."""
+    from playwright.sync_api import sync_playwright
+
+    with sync_playwright() as playwright:
+        executable_path = playwright.chromium.executable_path
+    for index in range(BROWSER_POOL_SIZE):
+        slot = BrowserSlot.try_lease(index)
+        if not slot:
+            continue
+        try:
+            slot.ensure_browser(executable_path)
+        except RuntimeError as e:
+            logger.error(e)
+        finally:
+            slot.release()
+
+
+if __name__ == "__main__":
+    warm_up()
@@ -7,6 +7,8 @@ import time
 from collections.abc import Iterator
 from datetime import datetime, timezone
 
+import browser_pool
+from browser_pool import BROWSER_POOL_SIZE, BrowserSlot
 from logging_setup import setup_file_logger
 from playwright.sync_api import (
     Browser,
@@ -126,6 +128,8 @@ class PlaywrightDriverWrapper:
         self._har_path: str = ""
 
         self._playwright_ctx = None
+        # the leased browser of the pool, if the pool is enabled
+        self._slot: BrowserSlot | None = None
         self._browser: Browser | None = None
         self._context: BrowserContext | None = None
         self._page: Page | None = None
@@ -150,24 +154,42 @@ class PlaywrightDriverWrapper:
         """Reset internal per-navigation state (captured requests list)."""
         self._captured_requests = []
 
+    def _launch_browser(self):
+        """Connect to a browser of the pool, leasing it first, or launch a new browser if the pool is disabled."""
+        if not BROWSER_POOL_SIZE:
+            self._browser = self._playwright_ctx.chromium.launch(**self._build_launch_kwargs())
+            return
+        if not self._slot:
+            self._slot = browser_pool.lease()
+        endpoint = self._slot.ensure_browser(self._playwright_ctx.chromium.executable_path)
+        self._browser = self._playwright_ctx.chromium.connect_over_cdp(endpoint)
+
     def _create_context_and_page(self):
         """Create a fresh browser context (with HAR recording) and open a new page with network listeners attached."""
         _har_tmp = tempfile.NamedTemporaryFile(suffix=".har", delete=False)
         self._har_path = _har_tmp.name
         _har_tmp.close()
+        context_kwargs = {}
+        if self._slot and self.proxy:
+            # the browsers of the pool are shared: the proxy is set on the context
+            context_kwargs["proxy"] = {"server": self.proxy}
         self._context = self._browser.new_context(
             viewport={"width": self.window_width, "height": self.window_height},
             user_agent=self.user_agent,
             ignore_https_errors=True,
             record_har_path=self._har_path,
             record_har_content="embed",
+            **context_kwargs,
         )
         self._reset_state()
         self._page = self._context.new_page()
         self._attach_network_listeners(self._page)
 
     def _close_browser(self):
-        """Gracefully close the active page, context, and browser, logging any errors."""
+        """
+        Gracefully close the active page, context, and browser, logging any errors.
+        A browser of the pool is only disconnected: it keeps running for the next analyses.
+        """
         try:
             if self._page:
                 self._page.close()
@@ -182,7 +204,7 @@ class PlaywrightDriverWrapper:
         """Launch the Chromium browser and create the initial context and page."""
         logger.info(f"Initialising Playwright Chromium driver (proxy={self.proxy!r})")
         self._playwright_ctx = sync_playwright().start()
-        self._browser = self._playwright_ctx.chromium.launch(**self._build_launch_kwargs())
+        self._launch_browser()
         self._create_context_and_page()
         logger.info("Playwright driver initialised successfully")
 
@@ -283,7 +305,10 @@ class PlaywrightDriverWrapper:
         """Close and re-launch the browser, then re-navigate to the last visited URL if available."""
         logger.info(f"Restarting Playwright driver: {motivation=}")
         self._close_browser()
-        self._browser = self._playwright_ctx.chromium.launch(**self._build_launch_kwargs())
+        if self._slot:
+            # the browser of the pool may have crashed: the next analyses get the new one too
+            self._slot.kill_browser()
+        self._launch_browser()
         self._create_context_and_page()
 
         if self.last_url:
@@ -298,6 +323,8 @@ class PlaywrightDriverWrapper:
             return
 
         self.last_url = url
+        if self._slot:
+            self._slot.count_navigation()
         logger.info(f"Navigating to {url=}")
         try:
             self._page.goto(url, wait_until="networkidle", timeout=30_000)
@@ -389,6 +416,9 @@ class PlaywrightDriverWrapper:
         try:
             self._close_browser()
         finally:
+            if self._slot:
+                self._slot.release()
+                self._slot = None
             if self._playwright_ctx:
                 self._playwright_ctx.stop()
             try:
@@ -6,6 +6,7 @@ import secrets
 from flask import Flask
 from flask_executor import Executor
 from flask_shell2http import Shell2HTTP
+from long_polling import enable_long_polling
 
 LOG_NAME = "phishing_analyzers"
 
@@ -49,6 +50,9 @@ def too_large(e):
     return {"error": str(e)}, 413
 
 
+enable_long_polling(app, executor)
+
+
 shell2http.register_command(
     endpoint="phishing_extractor",
     command_name="/usr/local/bin/python3 /opt/deploy/phishing_analyzers/analyzers/extract_phishing_site.py",
@@ -5,8 +5,12 @@
 /usr/bin/chown -R phishing-user:phishing-user \
       /opt/deploy/phishing_analyzers /var/log/intel_owl/phishing_analyzers
 
+# start the browsers of the Playwright pool while gunicorn starts
+gosu "${USER}" /usr/local/bin/python3 /opt/deploy/phishing_analyzers/analyzers/browser_pool.py &
+
 exec gosu "${USER}" /usr/local/bin/gunicorn 'app:app' \
     --bind '0.0.0.0:4005' \
+    --threads 4 \
     --log-level "${LOG_LEVEL}" \
     --access-logfile /var/log/intel_owl/phishing_analyzers/gunicorn_access.log \
     --error-logfile /var/log/intel_owl/phishing_analyzers/gunicorn_errors.log
\ No newline at end of file
@@ -14,6 +14,7 @@ from flask import Flask
 from flask_executor import Executor
 from flask_executor.futures import Future
 from flask_shell2http import Shell2HTTP
+from long_polling import enable_long_polling
 
 LOG_NAME = "thug"
 
@@ -58,6 +59,9 @@ def too_large(e):
     return {"error": str(e)}, 413
 
 
+enable_long_polling(app, executor)
+
+
 def intercept_thug_result(context, future: Future) -> None:
     """
     Thug doesn't output result to standard output but to a file,
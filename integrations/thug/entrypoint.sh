@@ -7,6 +7,7 @@ echo "running gunicorn"
 # start flask server
 exec gosu "${USER}" /usr/local/bin/gunicorn 'app:app' \
     --bind '0.0.0.0:4002' \
+    --threads 4 \
     --log-level "${LOG_LEVEL}" \
     --access-logfile "${LOG_PATH}"/gunicorn_access.log \
     --error-logfile "${LOG_PATH}"/gunicorn_errors.log
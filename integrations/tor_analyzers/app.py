@@ -10,6 +10,7 @@ import os
 from flask import Flask
 from flask_executor import Executor
 from flask_shell2http import Shell2HTTP
+from long_polling import enable_long_polling
 
 # Logging configuration
 # get flask-shell2http logger instance
@@ -58,5 +59,8 @@ def too_large(e):
     return {"error": str(e)}, 413
 
 
+enable_long_polling(app, executor)
+
+
 # with this, we can make http calls to the endpoint: /onionscan
 shell2http.register_command(endpoint="onionscan", command_name="./bundled/onionscan")
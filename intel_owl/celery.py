@@ -155,6 +155,14 @@ app.conf.beat_schedule = {
             "MessageGroupId": str(uuid.uuid4()),
         },
     },
+    "create_report_partitions": {
+        "task": "intel_owl.tasks.create_report_partitions",
+        "schedule": crontab(minute="40", hour="1"),
+        "options": {
+            "queue": get_queue_name(settings.DEFAULT_QUEUE),
+            "MessageGroupId": str(uuid.uuid4()),
+        },
+    },
     "check_stuck_analysis": {
         "task": "intel_owl.tasks.check_stuck_analysis",
         "schedule": crontab(minute="*/5"),
@@ -1,10 +1,19 @@
 # This file is a part of IntelOwl https://github.com/intelowlproject/IntelOwl
 # See the file 'LICENSE' for copying permission.
-from typing import Any, Dict
+import pickle
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable
 
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
 from django.core.cache.backends.db import DatabaseCache
+from django.core.cache.backends.redis import RedisCache
 from django.db import ProgrammingError, connections, router
 
+from ._util import get_secret
+
 
 def plain_key(key, key_prefix, version):
     return key  # just return the key without doing anything
@@ -36,11 +45,214 @@ class DatabaseCacheExtended(DatabaseCache):
             return {}
         return self.get_many([row[0] for row in rows], version=version)
 
+    def delete_where(self, starts_with: str, version=None) -> int:
+        """
+        Delete every key starting with starts_with, returning the number of deleted keys
+        """
+        db = router.db_for_write(self.cache_model_class)
+        table = connections[db].ops.quote_name(self._table)
+        query = self.make_and_validate_key(starts_with + "%", version=version)
+        with connections[db].cursor() as cursor:
+            try:
+                cursor.execute(f"DELETE FROM {table} WHERE cache_key LIKE %s", [query])
+            except ProgrammingError:
+                return 0
+            return cursor.rowcount
+
+
+class LocalLRU:
+    """
+    Thread safe, size bounded, in process LRU with a per-entry time to live.
+    Values are stored pickled so that callers can not mutate the cached copy.
+    """
+
+    def __init__(self, max_entries: int, timeout: float):
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
 
-CACHES = {
-    "default": {
-        "BACKEND": "intel_owl.settings.cache.DatabaseCacheExtended",
-        "LOCATION": "intelowl_cache",
-        "KEY_FUNCTION": "intel_owl.settings.cache.plain_key",
+    def get(self, key: str):
+        """
+        Return a (found, value) tuple
+        """
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return False, None
+            expires, value = item
+            if expires < time.monotonic():
+                del self._data[key]
+                return False, None
+            self._data.move_to_end(key)
+        return True, pickle.loads(value)
+
+    def set(self, key: str, value: Any) -> None:
+        value = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.timeout, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, *keys: str) -> None:
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def delete_where(self, starts_with: str) -> None:
+        with self._lock:
+            for key in [key for key in self._data if key.startswith(starts_with)]:
+                del self._data[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+class TieredRedisCache(RedisCache):
+    """
+    Two tier cache: a per process LRU in front of Redis.
+
+    The local tier only keeps entries for LOCAL_TIMEOUT seconds,
+    so a key changed by another process is stale here for at most that long.
+    Prefix invalidation is done with a SCAN on Redis instead of a LIKE query.
+
+    Extra OPTIONS:
+        LOCAL_MAX_ENTRIES: size of the local tier (default 1000, 0 disables it)
+        LOCAL_TIMEOUT: seconds an entry lives in the local tier (default 5)
+    """
+
+    _MISSING = object()
+    _SCAN_BATCH = 1000
+
+    def __init__(self, server, params):
+        params = dict(params)
+        options = dict(params.get("OPTIONS", {}))
+        max_entries = int(options.pop("LOCAL_MAX_ENTRIES", 1000))
+        local_timeout = float(options.pop("LOCAL_TIMEOUT", 5))
+        params["OPTIONS"] = options
+        super().__init__(server, params)
+        self._local = LocalLRU(max_entries, local_timeout) if max_entries > 0 else None
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        if self._local:
+            found, value = self._local.get(key)
+            if found:
+                return value
+        value = self._cache.get(key, self._MISSING)
+        if value is self._MISSING:
+            return default
+        if self._local:
+            self._local.set(key, value)
+        return value
+
+    def get_many(self, keys, version=None):
+        key_map = {self.make_and_validate_key(key, version=version): key for key in keys}
+        result = {}
+        missing = []
+        for key in key_map:
+            found, value = self._local.get(key) if self._local else (False, None)
+            if found:
+                result[key_map[key]] = value
+            else:
+                missing.append(key)
+        if missing:
+            for key, value in self._cache.get_many(missing).items():
+                if self._local:
+                    self._local.set(key, value)
+                result[key_map[key]] = value
+        return result
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        super().set(key, value, timeout=timeout, version=version)
+        if self._local:
+            self._local.delete(self.make_and_validate_key(key, version=version))
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = super().add(key, value, timeout=timeout, version=version)
+        if added and self._local:
+            self._local.delete(self.make_and_validate_key(key, version=version))
+        return added
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed = super().set_many(data, timeout=timeout, version=version)
+        if self._local:
+            self._local.delete(*(self.make_and_validate_key(key, version=version) for key in data))
+        return failed
+
+    def incr(self, key, delta=1, version=None):
+        value = super().incr(key, delta=delta, version=version)
+        if self._local:
+            self._local.delete(self.make_and_validate_key(key, version=version))
+        return value
+
+    def delete(self, key, version=None):
+        if self._local:
+            self._local.delete(self.make_and_validate_key(key, version=version))
+        return super().delete(key, version=version)
+
+    def delete_many(self, keys, version=None):
+        if self._local:
+            self._local.delete(*(self.make_and_validate_key(key, version=version) for key in keys))
+        return super().delete_many(keys, version=version)
+
+    def clear(self):
+        if self._local:
+            self._local.clear()
+        return super().clear()
+
+    def _iter_keys(self, starts_with: str, version=None) -> Iterable[str]:
+        prefix = self.make_and_validate_key(starts_with, version=version)
+        pattern = re.sub(r"([*?\[\]\\])", r"\\\1", prefix) + "*"
+        client = self._cache.get_client(write=False)
+        for key in client.scan_iter(match=pattern, count=self._SCAN_BATCH):
+            yield key.decode() if isinstance(key, bytes) else key
+
+    def get_where(self, starts_with: str, version=None) -> Dict[str, Any]:
+        """
+        Return every key starting with starts_with with its value
+        """
+        keys = list(self._iter_keys(starts_with, version=version))
+        if not keys:
+            return {}
+        return self._cache.get_many(keys)
+
+    def delete_where(self, starts_with: str, version=None) -> int:
+        """
+        Delete every key starting with starts_with, returning the number of deleted keys
+        """
+        if self._local:
+            self._local.delete_where(self.make_and_validate_key(starts_with, version=version))
+        keys = list(self._iter_keys(starts_with, version=version))
+        if not keys:
+            return 0
+        self._cache.delete_many(keys)
+        return len(keys)
+
+
+# "database" (default) or "redis"
+CACHE_BACKEND = get_secret("CACHE_BACKEND", "database")
+
+if CACHE_BACKEND == "redis":
+    # redis db 0 and 1 are used by channels and celery
+    CACHES = {
+        "default": {
+            "BACKEND": "intel_owl.settings.cache.TieredRedisCache",
+            "LOCATION": get_secret("CACHE_REDIS_URL", "redis://redis:6379/2"),
+            "KEY_FUNCTION": "intel_owl.settings.cache.plain_key",
+            "OPTIONS": {
+                "LOCAL_MAX_ENTRIES": int(get_secret("CACHE_LOCAL_MAX_ENTRIES", 1000)),
+                "LOCAL_TIMEOUT": float(get_secret("CACHE_LOCAL_TIMEOUT", 5)),
+            },
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "intel_owl.settings.cache.DatabaseCacheExtended",
+            "LOCATION": "intelowl_cache",
+            "KEY_FUNCTION": "intel_owl.settings.cache.plain_key",
+        }
     }
-}
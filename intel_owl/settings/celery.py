@@ -5,6 +5,7 @@
 
 from ._util import get_secret
 from .aws import AWS_SQS
+from .commons import STAGE_CI
 
 RESULT_BACKEND = "django-db"
 BROKER_URL = get_secret("BROKER_URL", None)
@@ -22,3 +23,15 @@ CELERY_QUEUES = get_secret("CELERY_QUEUES", DEFAULT_QUEUE).split(",")
 for queue in [DEFAULT_QUEUE, CONFIG_QUEUE]:
     if queue not in CELERY_QUEUES:
         CELERY_QUEUES.append(queue)
+
+# multiple observable submissions run the analyzers declaring `supports_batch`
+# with a single task for up to BATCH_PIPELINE_SIZE jobs
+BATCH_PIPELINE_ENABLED = get_secret("BATCH_PIPELINE_ENABLED", "False") == "True"
+BATCH_PIPELINE_SIZE = int(get_secret("BATCH_PIPELINE_SIZE", 500))
+
+# seconds a process keeps plugin classes, configs and parameters in memory,
+# changes are also propagated by broadcast (0 disables the cache, the default in CI)
+PLUGIN_CACHE_TIMEOUT = int(get_secret("PLUGIN_CACHE_TIMEOUT", 0 if STAGE_CI else 300))
+# seconds between the checks of the version of the plugins in the shared cache,
+# the longest a process that missed the broadcast keeps the old plugins
+PLUGIN_CACHE_VERSION_INTERVAL = int(get_secret("PLUGIN_CACHE_VERSION_INTERVAL", 5))
@@ -58,3 +58,18 @@ UPDATE_CHECK_URL = get_secret(
     "https://api.github.com/repos/intelowlproject/IntelOwl/releases/latest",
 )
 INTEL_OWL_VERSION = VERSION
+
+# ingestors create their jobs every INGESTOR_CHUNK_SIZE items
+# or as soon as the pending samples reach INGESTOR_CHUNK_MAX_BYTES
+INGESTOR_CHUNK_SIZE = int(get_secret("INGESTOR_CHUNK_SIZE", 50))
+INGESTOR_CHUNK_MAX_BYTES = int(get_secret("INGESTOR_CHUNK_MAX_BYTES", 50 * 1024 * 1024))
+# maximum number of elements of a multiple submission with the `bulk` parameter
+BULK_JOBS_MAX_ELEMENTS = int(get_secret("BULK_JOBS_MAX_ELEMENTS", 10000))
+# old jobs are deleted JOBS_RETENTION_BATCH_SIZE at a time
+JOBS_RETENTION_BATCH_SIZE = int(get_secret("JOBS_RETENTION_BATCH_SIZE", 1000))
+# plugin reports bigger than REPORT_OFFLOAD_MIN_BYTES are stored compressed in the file storage, 0 to disable
+REPORT_OFFLOAD_MIN_BYTES = int(get_secret("REPORT_OFFLOAD_MIN_BYTES", 1024 * 1024))
+# memory budget, as size of the compiled files, of the yara rules kept loaded by every worker process, 0 to disable
+YARA_RULES_CACHE_MAX_BYTES = int(get_secret("YARA_RULES_CACHE_MAX_BYTES", 512 * 1024 * 1024))
+# days after their last scan the yara rules merged for a set of repositories are deleted by the update
+YARA_MERGED_RULES_MAX_AGE_DAYS = int(get_secret("YARA_MERGED_RULES_MAX_AGE_DAYS", 7))
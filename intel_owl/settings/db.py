@@ -51,3 +51,7 @@ else:
     DATABASES["default"]["PASSWORD"] = PG_PASSWORD
 if PG_SSL:
     DATABASES["default"]["OPTIONS"]["sslmode"] = "require"
+
+# range partitioning of the plugin report tables by start_time, requires postgres >= 11
+REPORTS_PARTITIONING_ENABLED = secrets.get_secret("REPORTS_PARTITIONING_ENABLED", False) == "True"
+REPORTS_PARTITION_DAYS = int(secrets.get_secret("REPORTS_PARTITION_DAYS", 7))
@@ -33,6 +33,12 @@ if ELASTICSEARCH_BI_ENABLED:
 
 # advanced search
 ELASTICSEARCH_DSL_ENABLED = secrets.get_secret("ELASTICSEARCH_DSL_ENABLED", False) == "True"
+# number of reports read from the db and sent to elastic at once
+ELASTICSEARCH_DSL_CHUNK_SIZE = int(secrets.get_secret("ELASTICSEARCH_DSL_CHUNK_SIZE", 500))
+# minutes of missed reports exported in a single run after a downtime
+ELASTICSEARCH_DSL_MAX_BACKFILL = int(secrets.get_secret("ELASTICSEARCH_DSL_MAX_BACKFILL", 60))
+# runs that export again the documents not indexed because of a retryable error before skipping them
+ELASTICSEARCH_DSL_MAX_RETRIES = int(secrets.get_secret("ELASTICSEARCH_DSL_MAX_RETRIES", 5))
 if ELASTICSEARCH_DSL_ENABLED:
     ELASTICSEARCH_DSL_HOST = secrets.get_secret("ELASTICSEARCH_DSL_HOST")
     if ELASTICSEARCH_DSL_HOST:
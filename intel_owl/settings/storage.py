@@ -1,7 +1,14 @@
 # This file is a part of IntelOwl https://github.com/intelowlproject/IntelOwl
 # See the file 'LICENSE' for copying permission.
 
+import contextlib
+import fcntl
 import os
+import shutil
+import socket
+import tempfile
+import time
+from typing import BinaryIO, Callable, List, Tuple
 
 from django.core.files.storage import FileSystemStorage
 
@@ -19,40 +26,193 @@ STATICFILES_DIRS = [
 
 NFS = get_secret("NFS", "False") == "True"
 LOCAL_STORAGE = get_secret("LOCAL_STORAGE", "True") == "True"
+# local copies of the remote samples, shared by every worker of the node
+SAMPLE_CACHE_PATH = get_secret("SAMPLE_CACHE_PATH", str(MEDIA_ROOT / "samples_cache"))
+SAMPLE_CACHE_MAX_BYTES = int(get_secret("SAMPLE_CACHE_MAX_BYTES", 2 * 1024 * 1024 * 1024))
+# references older than this are left by dead workers
+SAMPLE_CACHE_REFERENCE_TIMEOUT = int(get_secret("SAMPLE_CACHE_REFERENCE_TIMEOUT", 60 * 60 * 3))
+
+
+class SampleCache:
+    """
+    Content addressed cache of samples on the local disk, keyed by sha256.
+
+    Every analyzer holding a sample has a reference file inside `<sha256>.refs`,
+    so the cache is shared by all the workers of the node:
+    a sample is downloaded once, streamed to disk, and evicted (least recently used first)
+    only when no one holds it anymore and the cache is over `max_bytes`.
+    """
+
+    CHUNK_SIZE = 1024 * 1024
+
+    def __init__(self, path: str, max_bytes: int, reference_timeout: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.reference_timeout = reference_timeout
+
+    def sample_path(self, sha256: str) -> str:
+        return os.path.join(self.path, sha256)
+
+    def _references_path(self, sha256: str) -> str:
+        return f"{self.sample_path(sha256)}.refs"
+
+    @staticmethod
+    def holder(analyzer: str) -> str:
+        return f"{socket.gethostname()}-{os.getpid()}-{analyzer}"
+
+    @contextlib.contextmanager
+    def _flock(self, name: str):
+        with open(os.path.join(self.path, name), "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _lock(self, sha256: str):
+        # lock files are never removed (that would be racy): stripe them by prefix
+        return self._flock(f".{sha256[:2]}.lock")
+
+    @contextlib.contextmanager
+    def _download_lock(self, sha256: str):
+        # held during the whole download: the other workers waiting for the same sample
+        # do not block the ones retrieving other samples of the stripe
+        try:
+            with self._flock(f".{sha256}.download"):
+                yield
+        finally:
+            # a worker can still lock the removed file: it finds the sample already on disk,
+            # at worst it downloads it again
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(os.path.join(self.path, f".{sha256}.download"))
+
+    def retrieve(self, sha256: str, holder: str, download: Callable[[BinaryIO], None]) -> str:
+        """
+        Return the local path of the sample, downloading it with `download` if missing.
+        The sample is kept until `release` is called with the same holder
+        """
+        os.makedirs(self.path, exist_ok=True)
+        path = self.sample_path(sha256)
+        with self._lock(sha256):
+            references = self._references_path(sha256)
+            os.makedirs(references, exist_ok=True)
+            # the reference is taken before the sample is on disk,
+            # so the eviction can not remove it in the meantime
+            with open(os.path.join(references, holder), "w"):
+                pass
+            cached = os.path.exists(path)
+            if cached:
+                # last access, used for the eviction
+                os.utime(path)
+        if not cached:
+            try:
+                # only one worker downloads a sample, the others wait for it
+                with self._download_lock(sha256):
+                    if not os.path.exists(path):
+                        with tempfile.NamedTemporaryFile(dir=self.path, prefix=".", delete=False) as f:
+                            try:
+                                download(f)
+                            except Exception:
+                                os.remove(f.name)
+                                raise
+                        with self._lock(sha256):
+                            os.replace(f.name, path)
+            except Exception:
+                self._remove_reference(sha256, holder)
+                raise
+        self.evict()
+        return path
+
+    def _remove_reference(self, sha256: str, holder: str) -> None:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(os.path.join(self._references_path(sha256), holder))
+
+    def release(self, sha256: str, holder: str) -> None:
+        self._remove_reference(sha256, holder)
+        self.evict()
+
+    def _is_referenced(self, sha256: str) -> bool:
+        expiration = time.time() - self.reference_timeout
+        try:
+            entries = list(os.scandir(self._references_path(sha256)))
+        except FileNotFoundError:
+            return False
+        referenced = False
+        for entry in entries:
+            if entry.stat().st_mtime >= expiration:
+                referenced = True
+            else:
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(entry.path)
+        return referenced
+
+    def _samples(self) -> List[Tuple[float, int, str]]:
+        samples = []
+        for entry in os.scandir(self.path):
+            if entry.name.startswith(".") or not entry.is_file():
+                continue
+            with contextlib.suppress(FileNotFoundError):
+                stat = entry.stat()
+                samples.append((stat.st_mtime, stat.st_size, entry.name))
+        return samples
+
+    def evict(self) -> int:
+        """
+        Remove the least recently used samples that are not referenced
+        until the cache fits in `max_bytes`. Return the freed bytes
+        """
+        samples = self._samples()
+        size = sum(sample_size for _, sample_size, _ in samples)
+        freed = 0
+        for _, sample_size, sha256 in sorted(samples):
+            if size - freed <= self.max_bytes:
+                break
+            with self._lock(sha256):
+                if self._is_referenced(sha256):
+                    continue
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(self.sample_path(sha256))
+                    freed += sample_size
+                shutil.rmtree(self._references_path(sha256), ignore_errors=True)
+        return freed
+
+
 # Storage settings
 if LOCAL_STORAGE:
 
     class FileSystemStorageWrapper(FileSystemStorage):
         @staticmethod
-        def retrieve(file, analyzer):
+        def retrieve(file, analyzer, sha256=None):
             # we have one single sample for every analyzer
             return file.path
 
+        @staticmethod
+        def release(file, analyzer, sha256=None):
+            # the sample is the one on the server: nothing to remove
+            pass
+
     DEFAULT_FILE_STORAGE = "intel_owl.settings.FileSystemStorageWrapper"
 else:
     from storages.backends.s3boto3 import S3Boto3Storage
+    from storages.utils import clean_name
+
+    sample_cache = SampleCache(SAMPLE_CACHE_PATH, SAMPLE_CACHE_MAX_BYTES, SAMPLE_CACHE_REFERENCE_TIMEOUT)
 
     class S3Boto3StorageWrapper(S3Boto3Storage):
-        def retrieve(self, file, analyzer):
-            # FIXME we can optimize this a lot.
-            #  Right now we are doing an http request FOR analyzer. We can have a
-            #  proxy that will store the content and then save it locally
-
-            # The idea is to download the file in MEDIA_ROOT/analyzer/namefile
-            # if it does not exist
-            path_dir = os.path.join(MEDIA_ROOT, analyzer)
+        def retrieve(self, file, analyzer, sha256):
             name = file.name
-            _path = os.path.join(path_dir, name)
-            if not os.path.exists(_path):
-                os.makedirs(path_dir, exist_ok=True)
+
+            def download(local_file_object):
                 if not self.exists(name):
                     raise AssertionError
-                with self.open(name) as s3_file_object:
-                    content = s3_file_object.read()
-                    s3_file_object.seek(0)
-                    with open(_path, "wb") as local_file_object:
-                        local_file_object.write(content)
-            return _path
+                # multipart download straight to disk
+                self.bucket.download_fileobj(self._normalize_name(clean_name(name)), local_file_object)
+
+            return sample_cache.retrieve(sha256, sample_cache.holder(analyzer), download)
+
+        @staticmethod
+        def release(file, analyzer, sha256):
+            sample_cache.release(sha256, sample_cache.holder(analyzer))
 
     DEFAULT_FILE_STORAGE = "intel_owl.settings.S3Boto3StorageWrapper"
     AWS_STORAGE_BUCKET_NAME = secrets.get_secret("AWS_STORAGE_BUCKET_NAME")
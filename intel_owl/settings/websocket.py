@@ -2,6 +2,10 @@ import socket
 
 from intel_owl import secrets
 
+# at most one update per job every WEBSOCKET_JOB_UPDATE_INTERVAL seconds
+# is sent after the plugin runs, 0 sends an update after every plugin
+WEBSOCKET_JOB_UPDATE_INTERVAL = int(secrets.get_secret("WEBSOCKET_JOB_UPDATE_INTERVAL", 1))
+
 websockets_url = secrets.get_secret("WEBSOCKETS_URL", "redis://redis:6379/0")
 if not websockets_url:
     if socket.gethostname() in ["uwsgi", "daphne"]:
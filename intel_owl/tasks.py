@@ -3,9 +3,12 @@
 
 from __future__ import absolute_import, unicode_literals
 
+import collections
 import datetime
+import itertools
 import json
 import logging
+import time
 import typing
 import uuid
 from typing import Dict, List
@@ -16,9 +19,10 @@ from celery.worker.consumer import Consumer
 from celery.worker.control import control_command
 from celery.worker.request import Request
 from django.conf import settings
+from django.db.models import Min
 from django.utils.timezone import now
 from django_celery_beat.models import PeriodicTask
-from elasticsearch.helpers import bulk
+from elasticsearch.helpers import streaming_bulk
 
 from api_app.choices import ReportStatus, Status
 from api_app.helpers import mask_recursive
@@ -53,9 +57,25 @@ class FailureLoggedTask(Task):
 )
 def update_plugin(state, python_module_pk: int):
     from api_app.models import PythonModule
+    from api_app.plugin_cache import plugin_cache
 
     pm: PythonModule = PythonModule.objects.get(pk=python_module_pk)
     pm.python_class.update()
+    plugin_cache.invalidate(python_module_pk)
+
+
+@control_command()
+def invalidate_plugin_cache(state):
+    from api_app.plugin_cache import plugin_cache
+
+    plugin_cache.invalidate()
+
+
+@control_command()
+def plugin_cache_stats(state):
+    from api_app.plugin_cache import plugin_cache
+
+    return plugin_cache.stats()
 
 
 @shared_task(base=FailureLoggedTask, soft_time_limit=300)
@@ -74,35 +94,38 @@ def execute_ingestor(config_name: str):
 
 
 @shared_task(base=FailureLoggedTask, soft_time_limit=10000)
-def remove_old_jobs():
+def remove_old_jobs(dry_run: bool = False):
     """
     this is to remove old jobs to avoid to fill the database.
     Retention can be modified.
+    With dry_run, the jobs that would be deleted are only counted.
     """
-    from api_app.models import Job
+    from api_app.retention import JobRetention
 
     logger.info("started remove_old_jobs")
 
     retention_days = int(secrets.get_secret("OLD_JOBS_RETENTION_DAYS", 14))
-    date_to_check = now() - datetime.timedelta(days=retention_days)
-    old_jobs = Job.objects.filter(finished_analysis_time__lt=date_to_check)
-    num_jobs_to_delete = old_jobs.count()
-    logger.info(f"found {num_jobs_to_delete} old jobs to delete")
-    for old_job in old_jobs.iterator():
-        analyzable = old_job.analyzable
-        # if the job that we are going to delete is the last one, and it has a file
-        if analyzable.jobs.count() == 1 and analyzable.file:
-            analyzable.file.delete()
-        try:
-            old_job.delete()
-        except Job.DoesNotExist as e:
-            logger.warning(f"job {old_job.id} does not exist. Err: {e}", stack_info=True)
-        # clean up orphaned analyzable if no jobs reference it anymore
-        if not analyzable.jobs.exists():
-            analyzable.delete()
+    retention = JobRetention(retention_days, settings.JOBS_RETENTION_BATCH_SIZE)
+    if dry_run:
+        estimate = retention.estimate()
+        logger.info(f"remove_old_jobs would delete {estimate}")
+        return estimate["jobs"]
+    metrics = retention.run()
+    logger.info(f"finished remove_old_jobs: {metrics}")
+    return metrics.get("jobs", 0)
 
-    logger.info("finished remove_old_jobs")
-    return num_jobs_to_delete
+
+@shared_task(base=FailureLoggedTask)
+def create_report_partitions():
+    """
+    Create in advance the partitions of the plugin report tables,
+    when the report partitioning is enabled.
+    """
+    if not settings.REPORTS_PARTITIONING_ENABLED:
+        return
+    from api_app.partitions import partition_reports
+
+    partition_reports()
 
 
 @shared_task(base=FailureLoggedTask)
@@ -264,6 +287,45 @@ def job_pipeline(
             report.save()
 
 
+@shared_task(base=FailureLoggedTask, name="job_pipeline_batch", soft_time_limit=300)
+def job_pipeline_batch(job_ids: List[int]):
+    from api_app.models import Job
+
+    jobs = list(Job.objects.filter(pk__in=job_ids))
+    try:
+        Job.execute_batch(jobs)
+    except Exception as e:
+        logger.exception(e)
+        for job in jobs:
+            for report in (
+                list(job.analyzerreports.all())
+                + list(job.connectorreports.all())
+                + list(job.pivotreports.all())
+                + list(job.visualizerreports.all())
+            ):
+                report.status = report.STATUSES.FAILED.value
+                report.save()
+
+
+@shared_task(base=FailureLoggedTask, name="job_pipeline_after_batch", soft_time_limit=300)
+def job_pipeline_after_batch(job_ids: List[int]):
+    from api_app.models import Job
+
+    for job in Job.objects.filter(pk__in=job_ids).exclude(status=Job.STATUSES.KILLED.value):
+        try:
+            job.execute_after_batch()
+        except Exception as e:
+            logger.exception(e)
+            for report in (
+                list(job.analyzerreports.all())
+                + list(job.connectorreports.all())
+                + list(job.pivotreports.all())
+                + list(job.visualizerreports.all())
+            ):
+                report.status = report.STATUSES.FAILED.value
+                report.save()
+
+
 @shared_task(base=FailureLoggedTask, name="run_plugin", soft_time_limit=500)
 def run_plugin(
     job_id: int,
@@ -273,12 +335,12 @@ def run_plugin(
     task_id: int,
 ):
     from api_app.classes import Plugin
-    from api_app.models import Job, PythonModule
+    from api_app.plugin_cache import plugin_cache
     from api_app.websocket import JobConsumer
 
     logger.info(f"Configuring plugin {plugin_config_pk} for job {job_id} with task {task_id}")
-    plugin_class: typing.Type[Plugin] = PythonModule.objects.get(pk=python_module_pk).python_class
-    config = plugin_class.config_model.objects.get(pk=plugin_config_pk)
+    plugin_class: typing.Type[Plugin] = plugin_cache.get_class(python_module_pk)
+    config = plugin_cache.get_config(plugin_class, plugin_config_pk)
     plugin = plugin_class(
         config=config,
     )
@@ -292,8 +354,53 @@ def run_plugin(
     except Exception as e:
         logger.exception(e)
         config.reports.filter(job__pk=job_id).update(status=plugin.report_model.STATUSES.FAILED.value)
-    job = Job.objects.get(pk=job_id)
-    JobConsumer.serialize_and_send_job(job)
+    JobConsumer.publish_job(job_id)
+
+
+@shared_task(base=FailureLoggedTask, name="run_plugin_batch", soft_time_limit=500)
+def run_plugin_batch(
+    python_module_pk: int,
+    plugin_config_pk: str,
+    runs: List[list],
+):
+    """
+    Run a plugin supporting batches over many jobs,
+    runs is a list of [job_id, runtime_configuration, task_id]
+    """
+    from api_app.classes import Plugin
+    from api_app.plugin_cache import plugin_cache
+    from api_app.websocket import JobConsumer
+
+    logger.info(f"Configuring plugin {plugin_config_pk} for a batch of {len(runs)} jobs")
+    plugin_class: typing.Type[Plugin] = plugin_cache.get_class(python_module_pk)
+    config = plugin_cache.get_config(plugin_class, plugin_config_pk)
+    try:
+        plugin_class.start_batch(config, runs)
+    except Exception as e:
+        logger.exception(e)
+        # the pending runs are executed by the pipelines of their jobs
+        config.reports.filter(
+            job__pk__in=[job_id for job_id, *_ in runs],
+            status=ReportStatus.RUNNING.value,
+        ).update(status=plugin_class.report_model.STATUSES.FAILED.value)
+    for job_id, *_ in runs:
+        JobConsumer.publish_job(job_id)
+
+
+@shared_task(base=FailureLoggedTask, name="send_job_update", soft_time_limit=30)
+def send_job_update(job_id: int):
+    """
+    Send the updates of a job coalesced by JobConsumer.publish_job
+    """
+    from api_app.models import Job
+    from api_app.websocket import JobConsumer
+
+    try:
+        job = Job.objects.get(pk=job_id)
+    except Job.DoesNotExist:
+        logger.info(f"job {job_id} deleted before sending its update")
+    else:
+        JobConsumer.serialize_and_send_job(job)
 
 
 @shared_task(base=FailureLoggedTask, name="create_caches", soft_time_limit=200)
@@ -376,96 +483,194 @@ def send_bi_to_elastic(max_timeout: int = 60, max_objects: int = 10000):
         ].send_to_elastic_as_bi(max_timeout=max_timeout)
 
 
+def _plugin_report_index_prefix(report_class) -> str:
+    """
+    Prefix of the daily elasticsearch indexes of the reports of report_class
+    """
+    return (
+        f"plugin-report-{get_environment()}-{inflection.underscore(report_class.__name__).replace('_', '-')}"
+    )
+
+
+def _is_retryable(error: Dict) -> bool:
+    """
+    Whether elasticsearch could index the document of the error if it was sent again:
+    the rejected documents, e.g. because of the mapping, are rejected every time
+    """
+    status = next(iter(error.values())).get("status")
+    return status is None or status == 429 or status >= 500
+
+
+def _first_failed_end_time(report_classes: List, errors: List[Dict]) -> typing.Optional[datetime.datetime]:
+    """
+    Return the end time of the first report that elasticsearch failed to index, if any
+    """
+    report_classes = {
+        _plugin_report_index_prefix(report_class): report_class for report_class in report_classes
+    }
+    failed = collections.defaultdict(list)
+    for error in errors:
+        # every error is keyed by the operation type, e.g. {"index": {"_index": ..., "_id": ...}}
+        result = next(iter(error.values()))
+        # the index is the prefix of the report class followed by the date of the report
+        failed[report_classes[result["_index"][: -len("-YYYY-MM-DD")]]].append(result["_id"])
+    end_times = [
+        report_class.objects.filter(pk__in=pks).aggregate(end_time=Min("end_time"))["end_time"]
+        for report_class, pks in failed.items()
+    ]
+    return min((end_time for end_time in end_times if end_time), default=None)
+
+
+def _plugin_report_documents(
+    report_class,
+    start_time: datetime.datetime,
+    end_time: datetime.datetime,
+    counter: typing.Counter,
+    chunk_size: int,
+) -> typing.Generator[Dict, None, None]:
+    """
+    Lazily convert the reports of report_class that ended in [start_time, end_time)
+    into elasticsearch documents, counting them in counter
+    """
+    index_prefix = _plugin_report_index_prefix(report_class)
+    reports = (
+        report_class.objects.filter(
+            status__in=ReportStatus.final_statuses(),
+            end_time__gte=start_time,
+            end_time__lt=end_time,
+            # redundant, but it lets postgres skip the newer partitions of the reports
+            start_time__lt=end_time,
+        )
+        .select_related("config", "job__user__membership__organization")
+        .order_by("end_time", "pk")
+    )
+    for report in reports.iterator(chunk_size=chunk_size):
+        user = report.job.user
+        counter[report_class.__name__] += 1
+        yield {
+            "_op_type": "index",
+            "_index": f"{index_prefix}-{report.end_time.date()}",
+            # the same report is always written to the same document,
+            # so that exporting a window again does not create duplicates
+            "_id": report.pk,
+            "_source": {
+                "user": {"username": user.username},
+                "membership": (
+                    {
+                        "is_owner": user.membership.is_owner,
+                        "is_admin": user.membership.is_admin,
+                        "organization": {
+                            "name": user.membership.organization.name,
+                        },
+                    }
+                    if user.has_membership()
+                    else {}
+                ),
+                "config": {
+                    "name": report.config.name,
+                    "plugin_name": report.config.plugin_name.lower(),
+                },
+                "job": {"id": report.job_id},
+                "start_time": report.start_time,
+                "end_time": report.end_time,
+                "status": report.status,
+                "report": report.report,
+                "errors": report.errors,
+            },
+        }
+
+
 @shared_task(base=FailureLoggedTask, name="send_plugin_report_to_elastic", soft_time_limit=300)
 def send_plugin_report_to_elastic(max_timeout: int = 60, max_objects: int = 10000):
+    """
+    Stream the plugin reports completed since the last export to elasticsearch.
+
+    The end of the exported window is persisted in LastElasticReportUpdate:
+    if some runs are missed, the next ones backfill the missing minutes,
+    at most ELASTICSEARCH_DSL_MAX_BACKFILL minutes per run.
+    If some documents are not indexed because of a retryable error, the window is exported again
+    from the first of them, at most ELASTICSEARCH_DSL_MAX_RETRIES times.
+    The documents rejected by elasticsearch are logged and skipped.
+    max_objects is the size of the chunks read from the db and sent to elasticsearch.
+    """
     from api_app.analyzers_manager.models import AnalyzerReport
     from api_app.connectors_manager.models import ConnectorReport
-    from api_app.models import AbstractReport
+    from api_app.models import LastElasticReportUpdate
     from api_app.pivots_manager.models import PivotReport
 
     if settings.ELASTICSEARCH_DSL_ENABLED and settings.ELASTICSEARCH_DSL_HOST:
+        last_update = LastElasticReportUpdate.get_solo()
         upper_threshold = now().replace(second=0, microsecond=0)
-        lower_threshold = upper_threshold - datetime.timedelta(minutes=1)
+        lower_threshold = last_update.last_update_datetime or upper_threshold - datetime.timedelta(minutes=1)
+        upper_threshold = min(
+            upper_threshold,
+            lower_threshold + datetime.timedelta(minutes=settings.ELASTICSEARCH_DSL_MAX_BACKFILL),
+        )
+        if lower_threshold >= upper_threshold:
+            logger.info(f"reports until {lower_threshold} already added to elastic")
+            return
         logger.info(f"add to elastic reports from: {lower_threshold} to {upper_threshold}")
 
-        def _convert_report_to_elastic_document(
-            _class: AbstractReport,
-            start_time: datetime.datetime,
-            end_time: datetime.datetime,
-        ) -> List[Dict]:
-            report_list: list(AbstractReport) = _class.objects.filter(
-                status__in=ReportStatus.final_statuses(),
-                end_time__gte=start_time,
-                end_time__lt=end_time,
-            )
-            report_document_list = [
-                {
-                    "_op_type": "index",
-                    "_index": (
-                        "plugin-report-"
-                        f"{get_environment()}-"
-                        f"{inflection.underscore(_class.__name__).replace('_', '-')}-"
-                        f"{now().date()}"
-                    ),
-                    "_source": {
-                        "user": {"username": report.user.username},
-                        "membership": (
-                            {
-                                "is_owner": report.user.membership.is_owner,
-                                "is_admin": report.user.membership.is_admin,
-                                "organization": {
-                                    "name": report.user.membership.organization.name,
-                                },
-                            }
-                            if report.user.has_membership()
-                            else {}
-                        ),
-                        "config": {
-                            "name": report.config.name,
-                            "plugin_name": report.config.plugin_name.lower(),
-                        },
-                        "job": {"id": report.job.id},
-                        "start_time": report.start_time,
-                        "end_time": report.end_time,
-                        "status": report.status,
-                        "report": report.report,
-                        "errors": report.errors,
-                    },
-                }
-                for report in report_list
-            ]
-            logger.info(f"{_class.__name__} has {len(report_document_list)} new documents to upload")
-            return report_document_list
-
+        chunk_size = min(max_objects, settings.ELASTICSEARCH_DSL_CHUNK_SIZE)
+        counter = collections.Counter()
         # Add document. Remove ingestors and visualizers because they contain data useless in term of search functionality:
         # ingestors contain samples and visualizers data about organizing the info inside the page.
-        all_report_document_list = (
-            _convert_report_to_elastic_document(AnalyzerReport, lower_threshold, upper_threshold)
-            + _convert_report_to_elastic_document(ConnectorReport, lower_threshold, upper_threshold)
-            + _convert_report_to_elastic_document(PivotReport, lower_threshold, upper_threshold)
+        report_classes = [AnalyzerReport, ConnectorReport, PivotReport]
+        documents = itertools.chain.from_iterable(
+            _plugin_report_documents(report_class, lower_threshold, upper_threshold, counter, chunk_size)
+            for report_class in report_classes
         )
-        logger.info(f"Documents to add to elastic: {len(all_report_document_list)}")
-        if all_report_document_list:
-            logger.info(
-                ", ".join(
-                    [
-                        f"{document['_source']['job']['id']}-{document['_source']['config']['name']}"
-                        for document in all_report_document_list
-                    ]
-                )
-            )
-            _, errors = bulk(  # noqa
-                settings.ELASTICSEARCH_DSL_CLIENT,
-                all_report_document_list,
-                raise_on_error=False,
-                stats_only=False,
-            )
-            if not errors:
-                logger.info("Documents correctly inserted!")
+        errors = []
+        start = time.monotonic()
+        for ok, item in streaming_bulk(
+            settings.ELASTICSEARCH_DSL_CLIENT,
+            documents,
+            chunk_size=chunk_size,
+            raise_on_error=False,
+            request_timeout=max_timeout,
+        ):
+            if not ok:
+                errors.append(item)
+        elapsed = time.monotonic() - start
+        # only reached if elasticsearch was reachable: otherwise the same window is sent again.
+        # The reports are written to the same documents every time,
+        # so the next run starts again from the first report that has not been indexed
+        exported_until = upper_threshold
+        retryable = [error for error in errors if _is_retryable(error)]
+        rejected = [error for error in errors if not _is_retryable(error)]
+        if rejected:
+            logger.error(f"Documents rejected by elastic, not sent again: {rejected}")
+        first_failed = _first_failed_end_time(report_classes, retryable) if retryable else None
+        if first_failed:
+            held_until = max(lower_threshold, min(exported_until, first_failed))
+            retries = last_update.retries + 1 if held_until == lower_threshold else 1
+            if retries <= settings.ELASTICSEARCH_DSL_MAX_RETRIES:
+                exported_until = held_until
+                last_update.retries = retries
             else:
-                logger.error(f"Errors on document indexing: {errors}")
+                logger.error(
+                    f"Documents not indexed after {last_update.retries} retries, skipped: {retryable}"
+                )
+                last_update.retries = 0
         else:
-            logger.info("No documents to add")
+            last_update.retries = 0
+        last_update.last_update_datetime = exported_until
+        last_update.save()
+
+        total = sum(counter.values())
+        logger.info(
+            f"Documents added to elastic: {total} ({dict(counter)}) in {elapsed:.2f}s,"
+            f" {total / elapsed if elapsed else 0:.1f} documents/s, {len(errors)} errors"
+        )
+        if retryable:
+            logger.error(f"Errors on document indexing: {retryable}")
+        return {
+            "documents": total,
+            "errors": len(errors),
+            "seconds": round(elapsed, 2),
+            "from": lower_threshold.isoformat(),
+            "to": exported_until.isoformat(),
+        }
 
 
 @shared_task(
@@ -15,6 +15,7 @@ from api_app.analyzers_manager.models import AnalyzerConfig
 from api_app.choices import Classification
 from api_app.decorators import abstractclassproperty
 from api_app.models import AbstractReport, Job
+from api_app.plugin_cache import plugin_cache
 
 User = get_user_model()
 
@@ -32,6 +33,8 @@ class CustomTestCase(TestCase):
     def setUp(self) -> None:
         super().setUp()
         settings.DEBUG = True
+        # the configs and parameters cached by the previous tests have been rolled back
+        plugin_cache.invalidate()
 
     def tearDown(self):
         super().tearDown()
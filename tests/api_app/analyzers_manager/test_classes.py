@@ -0,0 +1,82 @@
+# This file is a part of IntelOwl https://github.com/intelowlproject/IntelOwl
+# See the file 'LICENSE' for copying permission.
+
+from unittest.mock import MagicMock, patch
+
+from api_app.analyzers_manager.exceptions import AnalyzerRunException
+from api_app.analyzers_manager.file_analyzers.peframe import PEframe
+from api_app.analyzers_manager.models import AnalyzerConfig
+from api_app.models import Job
+from tests import CustomTestCase
+
+
+class DockerBasedAnalyzerTestCase(CustomTestCase):
+    def setUp(self):
+        super().setUp()
+        config = AnalyzerConfig.objects.filter(python_module=PEframe.python_module).first()
+        self.analyzer = PEframe(config)
+        self.analyzer.url = "http://malware_tools_analyzers:4002/peframe"
+        self.analyzer.max_tries = 25
+        self.analyzer.poll_distance = 5
+        self.analyzer._job = Job()
+        self.now = 0
+        self.sleeps = []
+        self.wait_timeouts = []
+        clock = MagicMock()
+        clock.monotonic.side_effect = lambda: self.now
+        clock.sleep.side_effect = self._sleep
+        patcher = patch("api_app.analyzers_manager.classes.time", clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+    def _get(self, long_polling: bool, results_after: int = None):
+        def get(url, headers=None):
+            wait_timeout = int(url.rsplit("wait_timeout=", 1)[1])
+            self.wait_timeouts.append(wait_timeout)
+            response = MagicMock(status_code=200)
+            if results_after is not None and len(self.wait_timeouts) > results_after:
+                response.json.return_value = {"status": "success", "report": {"peframe": "ok"}}
+            else:
+                if long_polling:
+                    self.now += wait_timeout
+                response.json.return_value = {"status": "running"}
+            return response
+
+        return patch("api_app.analyzers_manager.classes.requests.get", side_effect=get)
+
+    def _poll(self) -> dict:
+        return self.analyzer._DockerBasedAnalyzer__poll_for_result("key")
+
+    def test_long_polling(self):
+        with self._get(long_polling=True, results_after=2) as get:
+            result = self._poll()
+        self.assertEqual(result["report"], {"peframe": "ok"})
+        self.assertEqual(get.call_count, 3)
+        self.assertIn("key=key&wait_timeout=15", get.call_args.args[0])
+        self.assertEqual(self.sleeps, [])
+
+    def test_long_polling_deadline(self):
+        with self._get(long_polling=True), self.assertRaises(AnalyzerRunException):
+            self._poll()
+        # the last request waits only up to the deadline
+        self.assertEqual(self.wait_timeouts, [15] * 8 + [5])
+        self.assertEqual(self.sleeps, [])
+        self.assertEqual(self.now, 125)
+
+    def test_running(self):
+        with self._get(long_polling=False, results_after=5):
+            result = self._poll()
+        self.assertEqual(result["report"], {"peframe": "ok"})
+        self.assertEqual(self.sleeps, [1, 2, 4, 5, 5])
+
+    def test_running_deadline(self):
+        with self._get(long_polling=False), self.assertRaises(AnalyzerRunException):
+            self._poll()
+        self.assertEqual(self.sleeps[:5], [1, 2, 4, 5, 5])
+        self.assertEqual(self.sleeps[-1], 3)
+        self.assertEqual(sum(self.sleeps), 125)
+        self.assertEqual(self.now, 125)
@@ -0,0 +1,56 @@
+# This file is a part of IntelOwl https://github.com/intelowlproject/IntelOwl
+# See the file 'LICENSE' for copying permission.
+
+import os
+import tempfile
+from unittest.mock import Mock
+
+from django.test import TestCase
+
+from api_app.analyzers_manager.feed_cache import FeedCache, load_lines
+
+
+class FeedCacheTestCase(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "feed.txt")
+        self.cache = FeedCache()
+
+    def tearDown(self):
+        super().tearDown()
+        self.directory.cleanup()
+
+    def _write(self, content: str, mtime_ns: int):
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write(content)
+        os.utime(self.path, ns=(mtime_ns, mtime_ns))
+
+    def test_missing_file(self):
+        loader = Mock()
+        self.assertIsNone(self.cache.get(self.path, loader))
+        loader.assert_not_called()
+
+    def test_loaded_once(self):
+        self._write("1.1.1.1\n8.8.8.8", 1)
+        loader = Mock(side_effect=load_lines)
+        for _ in range(3):
+            feed = self.cache.get(self.path, loader)
+            self.assertIn("8.8.8.8", feed)
+        loader.assert_called_once_with(self.path)
+        self.assertEqual(self.cache.misses, 1)
+        self.assertEqual(self.cache.hits, 2)
+
+    def test_reload_on_change(self):
+        self._write("1.1.1.1", 1)
+        self.assertNotIn("8.8.8.8", self.cache.get(self.path, load_lines))
+        self._write("8.8.8.8", 2)
+        self.assertIn("8.8.8.8", self.cache.get(self.path, load_lines))
+
+    def test_invalidate(self):
+        self._write("1.1.1.1", 1)
+        loader = Mock(side_effect=load_lines)
+        self.cache.get(self.path, loader)
+        self.cache.invalidate(self.path)
+        self.cache.get(self.path, loader)
+        self.assertEqual(loader.call_count, 2)
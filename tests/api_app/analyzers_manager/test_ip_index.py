@@ -0,0 +1,51 @@
+# This file is a part of IntelOwl https://github.com/intelowlproject/IntelOwl
+# See the file 'LICENSE' for copying permission.
+
+import os
+import tempfile
+
+from django.test import TestCase
+
+from api_app.analyzers_manager.ip_index import IPRangeIndex, get_index
+
+
+class IPRangeIndexTestCase(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.index = IPRangeIndex.from_networks(
+            [
+                ("5.0.0.0/8", "wide"),
+                ("5.1.0.0/16", "narrow"),
+                ("3.90.198.217", "single"),
+                ("2001:678:738::/48", "v6"),
+                ("not an ip", "invalid"),
+            ]
+        )
+
+    def test_from_networks(self):
+        self.assertEqual(len(self.index), 4)
+        self.assertIn("3.90.198.217", self.index)
+        self.assertNotIn("3.90.198.218", self.index)
+        self.assertNotIn("::1", self.index)
+
+    def test_lookup(self):
+        self.assertEqual(self.index.lookup("5.1.2.3"), ["wide", "narrow"])
+        self.assertEqual(self.index.lookup("5.2.0.0"), ["wide"])
+        self.assertEqual(self.index.lookup("2001:678:738::1"), ["v6"])
+        self.assertEqual(self.index.lookup("6.0.0.0"), [])
+
+    def test_dump_and_get_index(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "test.idx")
+            self.assertIsNone(get_index(path))
+            self.index.dump(path)
+            loaded = get_index(path)
+            self.assertEqual(loaded.lookup("5.1.2.3"), ["wide", "narrow"])
+            self.assertEqual(loaded.lookup("2001:678:738::ffff"), ["v6"])
+            # cached until the file changes
+            self.assertIs(get_index(path), loaded)
+            IPRangeIndex.from_networks(["1.1.1.1"]).dump(path)
+            os.utime(path, ns=(0, 0))
+            reloaded = get_index(path)
+            self.assertIsNot(reloaded, loaded)
+            self.assertIn("1.1.1.1", reloaded)
@@ -1,6 +1,17 @@
+import os
+import tempfile
+from pathlib import PosixPath
+from unittest import TestCase
 from unittest.mock import patch
 
-from api_app.analyzers_manager.file_analyzers.yara_scan import YaraScan
+import yara
+from django.test import override_settings
+
+from api_app.analyzers_manager.file_analyzers.yara_scan import (
+    CompiledRulesCache,
+    YaraScan,
+    YaraStorage,
+)
 
 from .base_test_class import BaseFileAnalyzerTest
 
@@ -13,6 +24,7 @@ class TestYaraScan(BaseFileAnalyzerTest):
             "repositories": ["https://example.com/yara_rules.git"],
             "local_rules": "",
             "_private_repositories": {},
+            "merged_scan": False,
         }
 
     def get_mocked_response(self):
@@ -32,3 +44,92 @@ class TestYaraScan(BaseFileAnalyzerTest):
                 ],
             )
         ]
+
+
+class TestCompiledRulesCache(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.cache = CompiledRulesCache()
+
+    def compile(self, name: str, rule: str) -> PosixPath:
+        path = PosixPath(self.directory.name) / name
+        yara.compile(source=rule).save(str(path))
+        return path
+
+    def test_get(self):
+        path = self.compile("a.yas", "rule a { condition: true }")
+        rules = self.cache.get(path)
+        self.assertIs(rules, self.cache.get(path))
+        self.assertEqual(["a"], [match.rule for match in rules.match(data=b"test")])
+
+        # recompiled rules are reloaded
+        path = self.compile("a.yas", "rule b { condition: true }")
+        os.utime(path, ns=(0, 0))
+        rules = self.cache.get(path)
+        self.assertEqual(["b"], [match.rule for match in rules.match(data=b"test")])
+
+        path.unlink()
+        self.assertIsNone(self.cache.get(path))
+
+    def test_max_bytes(self):
+        first = self.compile("a.yas", "rule a { condition: true }")
+        second = self.compile("b.yas", "rule b { condition: true }")
+        with override_settings(YARA_RULES_CACHE_MAX_BYTES=first.stat().st_size):
+            rules = self.cache.get(first)
+            self.cache.get(second)
+            # the least recently used rules have been evicted
+            self.assertIsNot(rules, self.cache.get(first))
+        with override_settings(YARA_RULES_CACHE_MAX_BYTES=0):
+            self.assertIsNot(self.cache.get(first), self.cache.get(first))
+
+
+class TestYaraStorage(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = PosixPath(directory.name)
+        settings = override_settings(YARA_RULES_PATH=self.path)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.storage = YaraStorage()
+        for name, rules in [
+            ("first", {"first.yar": "rule first { condition: true }"}),
+            ("first_nested", {"family/nested.yar": "rule nested { condition: true }"}),
+            ("second", {"second.yar": 'rule second { strings: $a = "missing" condition: $a }'}),
+        ]:
+            for rule_path, rule in rules.items():
+                rule_path = self.path / name / rule_path
+                rule_path.parent.mkdir(parents=True, exist_ok=True)
+                rule_path.write_text(rule)
+            self.storage.add_repo(f"https://example.com/{name}.zip", directory=self.path / name)
+        self.file = self.path / "sample"
+        self.file.write_bytes(b"sample")
+
+    def test_analyze_merged(self):
+        report, errors = self.storage.analyze(str(self.file), "sample", merged=True)
+        self.assertEqual([], errors)
+        self.assertEqual(["first"], [match["match"] for match in report["first"]])
+        self.assertEqual(["nested"], [match["match"] for match in report["first_nested"]])
+        self.assertEqual([], report["second"])
+        self.assertEqual((report, []), self.storage.analyze(str(self.file), "sample"))
+
+        # the merged rules are compiled again with the rules of their repos
+        (self.path / "second" / "second.yar").write_text("rule second { condition: true }")
+        self.storage.repos[-1].compile()
+        os.utime(self.storage.merged_path, ns=(0, 0))
+        report, _ = self.storage.analyze(str(self.file), "sample", merged=True)
+        self.assertEqual(["second"], [match["match"] for match in report["second"]])
+
+    def test_prune_merged(self):
+        self.storage.analyze(str(self.file), "sample", merged=True)
+        path = self.storage.merged_path
+        self.assertEqual([], YaraStorage.prune_merged(3600))
+        # not scanned for two hours
+        os.utime(path, ns=(path.stat().st_atime_ns - 2 * 3600 * 10**9, path.stat().st_mtime_ns))
+        self.assertEqual([path], YaraStorage.prune_merged(3600))
+        self.assertFalse(path.exists())
+        # compiled again by the next scan
+        report, _ = self.storage.analyze(str(self.file), "sample", merged=True)
+        self.assertEqual(["first"], [match["match"] for match in report["first"]])
+        self.assertTrue(path.exists())
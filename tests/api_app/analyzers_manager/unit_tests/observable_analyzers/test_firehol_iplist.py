@@ -34,3 +34,12 @@ class FireHolIPListTestCase(BaseAnalyzerTest):
             FireHol_IPList.update("example.ipset")
         self.assertTrue(FireholIPEntry.objects.filter(list_name="example.ipset").exists())
         self.assertEqual(FireholIPEntry.objects.filter(list_name="example.ipset").count(), 3)
+
+    def test_update_builds_index(self):
+        with self.get_mocked_response():
+            FireHol_IPList.update("example.ipset")
+        index = FireHol_IPList.get_list_index("example.ipset")
+        self.assertEqual(len(index), 3)
+        self.assertIn("3.90.198.217", index)
+        self.assertIn("5.4.3.2", index)
+        self.assertNotIn("3.90.198.218", index)
@@ -22,3 +22,23 @@ class SpamhausDropV4TestCase(BaseAnalyzerTest):
             "requests.get",
             return_value=MockUpResponse(mock_data, 200),
         )
+
+    def test_update_builds_lookup_files(self):
+        feeds = {
+            SpamhausDropV4.ipv4_url: (
+                '{"cidr": "1.10.16.0/20", "sblid": "SBL256894", "rir": "apnic"}\n'
+                '{"cidr": "2.56.192.0/19", "sblid": "SBL459831", "rir": "ripencc"}'
+            ),
+            SpamhausDropV4.ipv6_url: '{"cidr": "2001:678:738::/48", "sblid": "SBL635837", "rir": "ripencc"}',
+            SpamhausDropV4.asn_url: (
+                '{"asn": 6517, "rir": "arin", "domain": "zeromist.net", "cc": "US", "asname": "ZEROMIST-AS-1"}'
+            ),
+        }
+        with patch("requests.get", side_effect=lambda url: MockUpResponse({}, 200, text=feeds[url])):
+            SpamhausDropV4.update()
+        index = SpamhausDropV4.get_ip_index()
+        self.assertEqual(len(index), 3)
+        self.assertEqual(index.lookup("1.10.20.1")[0]["sblid"], "SBL256894")
+        self.assertEqual(index.lookup("2001:678:738::1")[0]["sblid"], "SBL635837")
+        self.assertEqual(index.lookup("8.8.8.8"), [])
+        self.assertEqual(SpamhausDropV4.get_asn_map()["6517"][0]["asname"], "ZEROMIST-AS-1")
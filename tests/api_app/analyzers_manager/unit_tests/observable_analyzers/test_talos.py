@@ -1,4 +1,6 @@
-from unittest.mock import mock_open, patch
+import tempfile
+from pathlib import Path
+from unittest.mock import patch
 
 from api_app.analyzers_manager.observable_analyzers.talos import Talos
 from tests.api_app.analyzers_manager.unit_tests.observable_analyzers.base_test_class import (
@@ -11,11 +13,7 @@ class TalosTestCase(BaseAnalyzerTest):
 
     @staticmethod
     def get_mocked_response():
-        # Simulate Talos IP list containing the test IP
-        fake_file_content = "91.192.100.61\n8.8.8.8\n1.1.1.1"
-
         return [
-            patch("builtins.open", mock_open(read_data=fake_file_content)),
             patch("os.path.isfile", return_value=True),
             patch("os.path.exists", return_value=True),
         ]
@@ -23,3 +21,18 @@ class TalosTestCase(BaseAnalyzerTest):
     @classmethod
     def get_extra_config(cls) -> dict:
         return {}  #
+
+    def setUp(self):
+        super().setUp()
+        # Simulate Talos IP list containing the test IP, outside of the real media root
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        database_location = str(Path(directory.name) / "talos_ip_blacklist.txt")
+        with open(database_location, "w", encoding="utf-8") as f:
+            f.write("91.192.100.61\n8.8.8.8\n1.1.1.1")
+        patcher = patch(
+            "api_app.analyzers_manager.observable_analyzers.talos.database_location",
+            database_location,
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
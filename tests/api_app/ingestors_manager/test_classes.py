@@ -1,4 +1,10 @@
+from unittest.mock import MagicMock, patch
+
+from django.test import override_settings
+
+from api_app.helpers import calculate_sha256
 from api_app.ingestors_manager.classes import Ingestor
+from api_app.ingestors_manager.ingestors.malware_bazaar import MalwareBazaar
 from api_app.ingestors_manager.models import IngestorConfig
 from tests import CustomTestCase
 
@@ -34,3 +40,24 @@ class IngestorTestCase(CustomTestCase):
                     self.fail(f"Ingestor {subclass.__name__} with config {config.name} failed {e}")
                 finally:
                     signal.alarm(0)
+
+    @override_settings(INGESTOR_CHUNK_SIZE=2, INGESTOR_CHUNK_MAX_BYTES=10)
+    def test_after_run_success_chunks(self):
+        ingestor = MalwareBazaar(
+            IngestorConfig.objects.filter(python_module=MalwareBazaar.python_module).first()
+        )
+        ingestor.report = MagicMock()
+        samples = [b"a", b"b", b"c", b"d" * 20, b"e"]
+
+        def content():
+            yield from samples
+
+        with patch.object(MalwareBazaar, "_create_jobs") as create_jobs:
+            ingestor.after_run_success(content())
+        self.assertEqual(
+            [call.args[0] for call in create_jobs.call_args_list],
+            [[b"a", b"b"], [b"c", b"d" * 20], [b"e"]],
+        )
+        # the report contains only the hashes of the samples
+        self.assertEqual(ingestor.report.report, [calculate_sha256(sample) for sample in samples])
+        self.assertEqual(ingestor.report.status, ingestor.report.STATUSES.SUCCESS.value)
@@ -150,3 +150,30 @@ class InvestigationTestCase(CustomTestCase):
         job.delete()
         job2.delete()
         an.delete()
+
+    def test_set_correct_status_nested_child(self):
+        job = Job.objects.create(
+            analyzable=self.an,
+            user=self.user,
+            status="killed",
+        )
+        child = job.add_child(
+            analyzable=self.an,
+            user=self.user,
+            status="killed",
+        )
+        grandchild = child.add_child(
+            analyzable=self.an,
+            user=self.user,
+            status=Job.STATUSES.RUNNING,
+        )
+        an: Investigation = Investigation.objects.create(name="Test", owner=self.user)
+        an.jobs.add(job)
+        an.set_correct_status()
+        self.assertEqual(an.status, "running")
+        grandchild.status = Job.STATUSES.REPORTED_WITHOUT_FAILS
+        grandchild.save()
+        an.set_correct_status()
+        self.assertEqual(an.status, "concluded")
+        job.delete()
+        an.delete()
@@ -70,6 +70,83 @@ class PluginTestCase(CustomTestCase):
             self.assertEqual(1, len(plugin.report.errors))
             self.assertEqual("Test", plugin.report.errors[0])
 
+    def test_start_batch(self):
+        job2 = Job.objects.create(
+            user=self.user,
+            status=Job.STATUSES.RUNNING,
+            analyzable=self.an,
+        )
+        job2.connectors_to_execute.set([self.cc])
+        with patch.multiple(Connector, __abstractmethods__=set()), patch.object(Connector, "run") as run:
+            run.return_value = {}
+            Connector.start_batch(self.cc, [[self.job.pk, {}, uuid()], [job2.pk, {}, uuid()]])
+        self.assertEqual(run.call_count, 2)
+        for job in [self.job, job2]:
+            self.assertEqual(
+                self.cc.reports.get(job=job).status,
+                self.cc.reports.model.STATUSES.SUCCESS,
+            )
+        job2.delete()
+
+    def test_start_batch_skips_killed(self):
+        task_id = uuid()
+        report = self.cc.generate_empty_report(self.job, task_id, "KILLED")
+        with patch.multiple(Connector, __abstractmethods__=set()), patch.object(Connector, "run") as run:
+            Connector.start_batch(self.cc, [[self.job.pk, {}, task_id]])
+        run.assert_not_called()
+        report.refresh_from_db()
+        self.assertEqual(report.status, report.STATUSES.KILLED)
+
+    def test_start_batch_deadline(self):
+        job2 = Job.objects.create(
+            user=self.user,
+            status=Job.STATUSES.RUNNING,
+            analyzable=self.an,
+        )
+        job2.connectors_to_execute.set([self.cc])
+        task_id = uuid()
+        for job in [self.job, job2]:
+            self.cc.generate_empty_report(job, task_id, "PENDING")
+        with (
+            patch.multiple(Connector, __abstractmethods__=set()),
+            patch.object(Connector, "run", return_value={}) as run,
+            patch("api_app.classes.time") as clock,
+        ):
+            # the second run starts after the time limit of the batch
+            clock.monotonic.side_effect = [0, 0, self.cc.soft_time_limit]
+            Connector.start_batch(self.cc, [[self.job.pk, {}, task_id], [job2.pk, {}, task_id]])
+        run.assert_called_once()
+        self.assertEqual(self.cc.reports.get(job=self.job).status, self.cc.reports.model.STATUSES.SUCCESS)
+        # left to the pipeline of the job
+        self.assertEqual(self.cc.reports.get(job=job2).status, self.cc.reports.model.STATUSES.PENDING)
+        job2.delete()
+
+    def test_before_batch(self):
+        job2 = Job.objects.create(
+            user=self.user,
+            status=Job.STATUSES.RUNNING,
+            analyzable=self.an,
+        )
+        job2.connectors_to_execute.set([self.cc])
+
+        def before_batch(plugins):
+            self.assertEqual([self.job.pk, job2.pk], [plugin.job_id for plugin in plugins])
+            for plugin in plugins:
+                plugin.bulk_result = {"job": plugin.job_id}
+
+        def run(plugin):
+            return plugin.bulk_result
+
+        with (
+            patch.multiple(Connector, __abstractmethods__=set(), run=run),
+            patch.object(Connector, "before_batch", side_effect=before_batch) as hook,
+        ):
+            Connector.start_batch(self.cc, [[self.job.pk, {}, uuid()], [job2.pk, {}, uuid()]])
+        hook.assert_called_once()
+        for job in [self.job, job2]:
+            self.assertEqual({"job": job.pk}, self.cc.reports.get(job=job).report)
+        job2.delete()
+
     def test_python_path(self):
         from api_app.analyzers_manager.observable_analyzers.dns.dns_resolvers.classic_dns_resolver import (  # noqa
             ClassicDNSResolver,
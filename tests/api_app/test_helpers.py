@@ -1,10 +1,12 @@
 # This file is a part of IntelOwl https://github.com/intelowlproject/IntelOwl
 # See the file 'LICENSE' for copying permission.
 
+import hashlib
+
 from django.test import TestCase
 
 from api_app.choices import Classification
-from api_app.helpers import mask_recursive, mask_sensitive_data
+from api_app.helpers import calculate_hashes, mask_recursive, mask_sensitive_data
 
 
 class HelperTests(TestCase):
@@ -42,6 +44,51 @@ class HelperTests(TestCase):
         result = Classification.calculate_observable(observable)
         self.assertEqual(result, Classification.GENERIC)
 
+    def test_calculate_observables(self):
+        corpus = {
+            Classification.IP: ["8.8.8.8", "2001:4860:4860::8888", "fe80::1%eth0"],
+            Classification.URL: [
+                "https://www.google.com/search?q=test",
+                "hxxps://evil.com/a/b.php?x=1",
+                "ftp://files.test.com:2121/file.zip",
+            ],
+            Classification.DOMAIN: ["google.com", "www[.]test[.]com", "a" * 63 + ".com", "1.2.3.999"],
+            Classification.HASH: [
+                "d41d8cd98f00b204e9800998ecf8427e",
+                "DA39A3EE5E6B4B0D3255BFEF95601890AFD80709",
+                "e3b0c44298fc1c149afbf4c8996fb92427ae41e4649b934ca495991b7852b855",
+            ],
+            Classification.GENERIC: [
+                "some garbage text",
+                "hxxps://evil[.]com/a/b.php?x=1",
+                "a" * 64 + ".com",
+                "a" * 65,
+                "://test.com",
+                "x" * 10000 + "://",
+            ],
+        }
+        values = [value for classification_values in corpus.values() for value in classification_values]
+        expected = [
+            classification
+            for classification, classification_values in corpus.items()
+            for _ in classification_values
+        ]
+        self.assertEqual(expected, [Classification.calculate_observable(value) for value in values])
+        self.assertEqual(expected + expected, Classification.calculate_observables(values + values))
+
+    def test_calculate_hashes(self):
+        content = bytes(range(256)) * 10
+        hashes = calculate_hashes((content[i : i + 100] for i in range(0, len(content), 100)), head_size=150)
+        self.assertEqual(hashlib.md5(content).hexdigest(), hashes.md5)
+        self.assertEqual(hashlib.sha1(content).hexdigest(), hashes.sha1)
+        self.assertEqual(hashlib.sha256(content).hexdigest(), hashes.sha256)
+        self.assertEqual(len(content), hashes.size)
+        self.assertEqual(content[:150], hashes.head)
+
+        hashes = calculate_hashes([])
+        self.assertEqual(hashlib.md5(b"").hexdigest(), hashes.md5)
+        self.assertEqual(b"", hashes.head)
+
     def test_mask_sensitive_data(self):
         self.assertEqual(mask_sensitive_data("secret123", True), "<redacted>")
         self.assertEqual(mask_sensitive_data("public123", False), "public123")
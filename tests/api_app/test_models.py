@@ -1,23 +1,30 @@
 # This file is a part of IntelOwl https://github.com/intelowlproject/IntelOwl
 # See the file 'LICENSE' for copying permission.
 import datetime
-from json import loads
+from json import dumps, loads
+from unittest.mock import patch
 
 from celery._state import get_current_app
 from celery.canvas import Signature
 from django.core.exceptions import ValidationError
+from django.core.files.storage import default_storage
 from django.db import IntegrityError, transaction
+from django.test import override_settings
 from django_celery_beat.models import PeriodicTask
 from kombu import uuid
 
 from api_app.analyzables_manager.models import Analyzable
 from api_app.analyzers_manager.models import AnalyzerConfig, AnalyzerReport
+from api_app.analyzers_manager.observable_analyzers.tranco import Tranco
 from api_app.choices import Classification, PythonModuleBasePaths
 from api_app.connectors_manager.models import ConnectorConfig
 from api_app.data_model_manager.models import DomainDataModel
+from api_app.fields import OffloadableJSONField
 from api_app.models import (
     AbstractConfig,
     Job,
+    JobReportStatusCounter,
+    JobRollup,
     OrganizationPluginConfiguration,
     Parameter,
     PluginConfig,
@@ -765,3 +772,323 @@ class JobTestCase(CustomTestCase):
         child_job.delete()
         root_job.delete()
         an.delete()
+
+    def test_report_status_counters(self):
+        an = Analyzable.objects.create(
+            name="test.com",
+            classification=Classification.DOMAIN,
+        )
+        job = Job.objects.create(
+            user=self.user,
+            analyzable=an,
+            status=Job.STATUSES.ANALYZERS_RUNNING,
+        )
+        ac, ac2 = AnalyzerConfig.objects.all()[:2]
+        report = AnalyzerReport.objects.create(
+            job=job,
+            config=ac,
+            status=AnalyzerReport.STATUSES.RUNNING.value,
+            task_id=str(uuid()),
+            parameters={},
+        )
+        other = AnalyzerReport.objects.create(
+            job=job,
+            config=ac2,
+            status=AnalyzerReport.STATUSES.PENDING.value,
+            task_id=str(uuid()),
+            parameters={},
+        )
+        stats = job._get_config_reports_stats()
+        self.assertEqual(2, stats["all"])
+        self.assertEqual(1, stats["running"])
+        self.assertEqual(1, stats["pending"])
+
+        report.status = AnalyzerReport.STATUSES.SUCCESS.value
+        report.save(update_fields=["status"])
+        job.analyzerreports.filter(config=ac2).update(status=AnalyzerReport.STATUSES.FAILED.value)
+        stats = job._get_config_reports_stats()
+        self.assertEqual(2, stats["all"])
+        self.assertEqual(0, stats["running"])
+        self.assertEqual(0, stats["pending"])
+        self.assertEqual(1, stats["success"])
+        self.assertEqual(1, stats["failed"])
+
+        job.set_final_status()
+        self.assertEqual(job.status, Job.STATUSES.REPORTED_WITH_FAILS)
+
+        report.delete()
+        stats = job._get_config_reports_stats()
+        self.assertEqual(1, stats["all"])
+        self.assertEqual(0, stats["success"])
+        job.delete()
+        # already deleted with its job
+        other.delete()
+        self.assertFalse(JobReportStatusCounter.objects.filter(job_id=other.job_id).exists())
+        an.delete()
+
+    def test_job_rollups(self):
+        an = Analyzable.objects.create(
+            name="test.com",
+            classification=Classification.DOMAIN,
+        )
+        playbook = PlaybookConfig.objects.get(name="Dns")
+        jobs = [
+            Job.objects.create(user=self.user, analyzable=an, playbook_to_execute=playbook, tlp=Job.TLP.GREEN)
+            for _ in range(3)
+        ]
+        rollups = JobRollup.objects.filter(user=self.user, classification=Classification.DOMAIN)
+        rollup = rollups.get()
+        self.assertEqual(3, rollup.count)
+        self.assertEqual(Job.STATUSES.PENDING, rollup.status)
+        self.assertEqual(playbook.pk, rollup.playbook_id)
+        self.assertEqual(JobRollup.truncate(jobs[0].received_request_time), rollup.hour)
+
+        jobs[0].status = Job.STATUSES.REPORTED_WITHOUT_FAILS
+        jobs[0].save(update_fields=["status"])
+        # status not changed
+        jobs[1].save(update_fields=["tlp"])
+        self.assertEqual(
+            {Job.STATUSES.PENDING: 2, Job.STATUSES.REPORTED_WITHOUT_FAILS: 1},
+            dict(rollups.values_list("status", "count")),
+        )
+
+        Job.objects.filter(pk=jobs[2].pk).delete()
+        self.assertEqual(
+            {Job.STATUSES.PENDING: 1, Job.STATUSES.REPORTED_WITHOUT_FAILS: 1},
+            dict(rollups.values_list("status", "count")),
+        )
+
+        rollups.update(count=0)
+        JobRollup.objects.backfill(jobs[0].received_request_time)
+        self.assertEqual(
+            {Job.STATUSES.PENDING: 1, Job.STATUSES.REPORTED_WITHOUT_FAILS: 1},
+            dict(rollups.values_list("status", "count")),
+        )
+        for job in jobs[:2]:
+            job.delete()
+        self.assertFalse(rollups.filter(count__gt=0).exists())
+        an.delete()
+
+    def test_job_rollups_null_keys(self):
+        an = Analyzable.objects.create(
+            name="test.com",
+            classification=Classification.DOMAIN,
+        )
+        playbook = PlaybookConfig.objects.create(name="Playbook", type=["domain"], description="test")
+        jobs = [
+            Job.objects.create(user=self.user, analyzable=an, playbook_to_execute=playbook_to_execute)
+            for playbook_to_execute in [playbook, None, None]
+        ]
+        rollups = JobRollup.objects.filter(user=self.user, classification=Classification.DOMAIN)
+        self.assertEqual({playbook.pk: 1, None: 2}, dict(rollups.values_list("playbook", "count")))
+        # the rollup without playbook already exists
+        key = dict(zip(JobRollup.KEY_FIELDS, jobs[1].get_rollup_key()))
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            JobRollup.objects.create(**key, count=1)
+
+        # the jobs of the playbook are left without playbook
+        playbook.delete()
+        self.assertEqual({None: 3}, dict(rollups.values_list("playbook", "count")))
+        for job in jobs:
+            job.delete()
+        an.delete()
+
+    def test_job_rollups_key_changes(self):
+        an = Analyzable.objects.create(
+            name="test.com",
+            classification=Classification.DOMAIN,
+        )
+        playbook = PlaybookConfig.objects.get(name="Dns")
+        job = Job.objects.create(user=self.user, analyzable=an, tlp=Job.TLP.GREEN)
+        rollups = JobRollup.objects.filter(user=self.user, classification=Classification.DOMAIN, count__gt=0)
+        job.tlp = Job.TLP.AMBER
+        job.save(update_fields=["tlp"])
+        self.assertEqual([(Job.TLP.AMBER, None, 1)], list(rollups.values_list("tlp", "playbook", "count")))
+        job = Job.objects.get(pk=job.pk)
+        job.playbook_to_execute = playbook
+        job.status = Job.STATUSES.RUNNING
+        job.save()
+        self.assertEqual(
+            [(Job.TLP.AMBER, playbook.pk, Job.STATUSES.RUNNING, 1)],
+            list(rollups.values_list("tlp", "playbook", "status", "count")),
+        )
+        job.delete()
+        self.assertFalse(rollups.exists())
+        an.delete()
+
+    def test_job_rollups_most_frequent(self):
+        an = Analyzable.objects.create(
+            name="test.com",
+            classification=Classification.DOMAIN,
+        )
+        for tlp, number in [(Job.TLP.AMBER, 1), (Job.TLP.RED, 3), (Job.TLP.GREEN, 2)]:
+            for _ in range(number):
+                Job.objects.create(user=self.user, analyzable=an, tlp=tlp)
+        # the most frequent first
+        self.assertEqual(
+            [Job.TLP.RED, Job.TLP.GREEN],
+            JobRollup.objects.filter(user=self.user).most_frequent("tlp", 2),
+        )
+        Job.objects.filter(analyzable=an).delete()
+        an.delete()
+
+    def _batch_jobs(self, number: int):
+        an = Analyzable.objects.create(
+            name="test.com",
+            classification=Classification.DOMAIN,
+        )
+        tranco = AnalyzerConfig.objects.get(name="Tranco")
+        jobs = [Job.objects.create(user=self.user, analyzable=an) for _ in range(number)]
+        for job in jobs:
+            job.analyzers_to_execute.set([tranco])
+        return tranco, jobs
+
+    def test_execute_batch(self):
+        tranco, jobs = self._batch_jobs(3)
+        jobs[2].analyzers_to_execute.clear()
+        with (
+            patch.object(Tranco, "supports_batch", True),
+            patch("api_app.models.group") as group,
+            patch.object(Job, "execute_after_batch", autospec=True) as execute_after_batch,
+        ):
+            Job.execute_batch(jobs)
+        (signature,) = group.call_args.args[0]
+        _, config, runs = signature.args
+        self.assertEqual(tranco.pk, config)
+        self.assertEqual([job.pk for job in jobs[:2]], [job_id for job_id, *_ in runs])
+        # every item has the time limit of a single run
+        self.assertEqual(tranco.soft_time_limit, signature.options["soft_time_limit"])
+        for job in jobs[:2]:
+            job.refresh_from_db()
+            self.assertEqual(Job.STATUSES.RUNNING, job.status)
+            report = tranco.reports.get(job=job)
+            self.assertEqual(AnalyzerReport.STATUSES.PENDING, report.status)
+            # the batch task can be revoked
+            self.assertEqual(signature.id, str(report.task_id))
+        # then every job continues with its own pipeline
+        (after_batch,) = group.return_value.__or__.call_args.args
+        self.assertEqual(([job.pk for job in jobs[:2]],), after_batch.args)
+        # the jobs without batched analyzers do not wait for the batch
+        execute_after_batch.assert_called_once_with(jobs[2])
+        for job in jobs:
+            job.delete()
+
+    def test_execute_batch_single(self):
+        tranco, jobs = self._batch_jobs(1)
+        with (
+            patch.object(Tranco, "supports_batch", True),
+            patch("api_app.models.group") as group,
+            patch.object(Job, "execute_after_batch") as execute_after_batch,
+        ):
+            Job.execute_batch(jobs)
+        group.assert_not_called()
+        execute_after_batch.assert_called_once()
+        self.assertFalse(tranco.reports.filter(job=jobs[0]).exists())
+        jobs[0].delete()
+
+    def test_execute_after_batch(self):
+        tranco, (job,) = self._batch_jobs(1)
+        report = tranco.generate_empty_report(job, uuid(), AnalyzerReport.STATUSES.PENDING.value)
+        with patch.object(Job, "_get_pipeline") as get_pipeline:
+            job.execute_after_batch()
+        # the batch stopped before running it
+        self.assertCountEqual([tranco], get_pipeline.call_args.args[0])
+        get_pipeline.return_value.assert_called_once()
+
+        report.status = AnalyzerReport.STATUSES.SUCCESS.value
+        report.save()
+        with (
+            patch.object(Job, "_get_pipeline") as get_pipeline,
+            patch.object(AnalyzerConfig, "signature_pipeline_running"),
+            patch.object(AnalyzerConfig, "signature_pipeline_completed"),
+            patch.object(Job, "_get_pipeline_after_analyzers") as get_pipeline_after_analyzers,
+        ):
+            job.execute_after_batch()
+        get_pipeline.assert_not_called()
+        get_pipeline_after_analyzers.assert_called_once()
+        job.delete()
+
+    def test_kill_batch(self):
+        tranco, jobs = self._batch_jobs(2)
+        task_id = uuid()
+        for job in jobs:
+            tranco.generate_empty_report(job, task_id, AnalyzerReport.STATUSES.PENDING.value)
+        with (
+            patch("intel_owl.celery.app.control.revoke") as revoke,
+            patch("api_app.websocket.JobConsumer.serialize_and_send_job"),
+        ):
+            jobs[0].kill_if_ongoing()
+        # the batch task still runs for the other job
+        self.assertNotIn(task_id, revoke.call_args_list[0].args[0])
+        self.assertEqual(AnalyzerReport.STATUSES.KILLED, tranco.reports.get(job=jobs[0]).status)
+        self.assertEqual(AnalyzerReport.STATUSES.PENDING, tranco.reports.get(job=jobs[1]).status)
+        for job in jobs:
+            job.delete()
+
+
+class AbstractReportTestCase(CustomTestCase):
+    @override_settings(REPORT_OFFLOAD_MIN_BYTES=100)
+    def test_offload_report(self):
+        an = Analyzable.objects.create(
+            name="test.com",
+            classification=Classification.DOMAIN,
+        )
+        job = Job.objects.create(user=self.user, analyzable=an)
+        report = AnalyzerReport.objects.create(
+            job=job,
+            config=AnalyzerConfig.objects.first(),
+            status=AnalyzerReport.STATUSES.RUNNING.value,
+            task_id=str(uuid()),
+            parameters={},
+        )
+        # small reports are kept in the row
+        self.assertEqual(2, report.report_size)
+        self.assertEqual({}, AnalyzerReport.objects.values_list("report", flat=True).get(pk=report.pk))
+
+        content = {"strings": ["a" * 10] * 100}
+        report.report = content
+        report.status = AnalyzerReport.STATUSES.SUCCESS.value
+        report.save(update_fields=["status", "report"])
+        stub = AnalyzerReport.objects.values_list("report", flat=True).get(pk=report.pk)
+        self.assertEqual({"keys": ["strings"]}, stub["summary"])
+        name = stub[OffloadableJSONField.OFFLOADED_KEY]
+        self.assertTrue(default_storage.exists(name))
+
+        report = AnalyzerReport.objects.get(pk=report.pk)
+        self.assertEqual(len(dumps(content)), report.report_size)
+        self.assertEqual(content, report.report)
+        self.assertEqual(content, AnalyzerReport.objects.defer("report").get(pk=report.pk).report)
+        # the offloaded file is reused if the report has not changed
+        report.save()
+        self.assertEqual(stub, AnalyzerReport.objects.values_list("report", flat=True).get(pk=report.pk))
+
+        # the previous file is deleted only when the transaction is committed
+        with self.captureOnCommitCallbacks(execute=True):
+            report.report = {"strings": []}
+            report.save()
+            self.assertTrue(default_storage.exists(name))
+        self.assertFalse(default_storage.exists(name))
+        self.assertEqual({"strings": []}, AnalyzerReport.objects.get(pk=report.pk).report)
+
+        # the new file is deleted if the transaction is rolled back
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            report.report = content
+            report.save()
+            name = AnalyzerReport.objects.values_list("report", flat=True).get(pk=report.pk)[
+                OffloadableJSONField.OFFLOADED_KEY
+            ]
+            self.assertTrue(default_storage.exists(name))
+            raise RuntimeError()
+        self.assertFalse(default_storage.exists(name))
+        self.assertEqual({"strings": []}, AnalyzerReport.objects.get(pk=report.pk).report)
+
+        report = AnalyzerReport.objects.get(pk=report.pk)
+        report.report = content
+        report.save()
+        name = AnalyzerReport.objects.values_list("report", flat=True).get(pk=report.pk)[
+            OffloadableJSONField.OFFLOADED_KEY
+        ]
+        with self.captureOnCommitCallbacks(execute=True):
+            job.delete()
+        self.assertFalse(default_storage.exists(name))
+        an.delete()
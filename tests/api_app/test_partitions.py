@@ -0,0 +1,107 @@
+# This file is a part of IntelOwl https://github.com/intelowlproject/IntelOwl
+# See the file 'LICENSE' for copying permission.
+
+import datetime
+import uuid
+
+from django.db import IntegrityError, connection, transaction
+from django.utils.timezone import now
+
+from api_app.analyzables_manager.models import Analyzable
+from api_app.analyzers_manager.models import AnalyzerConfig, AnalyzerReport
+from api_app.choices import Classification
+from api_app.models import Job
+from api_app.partitions import ReportPartitions, period_start
+from tests import CustomTestCase
+
+
+class ReportPartitionsTestCase(CustomTestCase):
+    def test_period_start(self):
+        date = datetime.datetime(2024, 10, 29, 10, 49, tzinfo=datetime.timezone.utc)
+        self.assertEqual(datetime.datetime(2024, 10, 29, tzinfo=datetime.timezone.utc), period_start(date, 1))
+        # partitions of a week start on thursday, like the epoch
+        self.assertEqual(datetime.datetime(2024, 10, 24, tzinfo=datetime.timezone.utc), period_start(date, 7))
+
+    def test_partition(self):
+        # the table is altered before any report is written in the test transaction
+        partitions = ReportPartitions(AnalyzerReport._meta.db_table, days=7)
+        self.assertFalse(partitions.is_partitioned())
+        start = period_start(now(), 7)
+        partitions.partition(start)
+        created = partitions.create(now() + datetime.timedelta(days=7))
+        self.assertTrue(partitions.is_partitioned())
+        self.assertEqual(2, len(created))
+        legacy, *current = partitions.partitions()
+        self.assertIsNone(legacy.start)
+        self.assertEqual(start, legacy.end)
+        self.assertEqual(created, current)
+        # nothing to do, the partitions already exist
+        self.assertEqual([], partitions.create(now()))
+
+        analyzable = Analyzable.objects.create(name="test.com", classification=Classification.DOMAIN)
+        old_job = Job.objects.create(
+            user=self.user, analyzable=analyzable, finished_analysis_time=now() - datetime.timedelta(days=30)
+        )
+        report = AnalyzerReport.objects.create(
+            config=AnalyzerConfig.objects.get(name="Classic_DNS"),
+            job=old_job,
+            status=AnalyzerReport.STATUSES.SUCCESS,
+            start_time=now() - datetime.timedelta(days=30),
+            task_id=uuid.uuid4(),
+            parameters={},
+        )
+        self.assertEqual(report, AnalyzerReport.objects.get(pk=report.pk))
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT count(*) FROM "{legacy.name}"')
+            self.assertEqual(1, cursor.fetchone()[0])
+
+        # the deferred constraints of the rows written in the test transaction
+        connection.check_constraints()
+        # the current partitions are not dropped
+        self.assertEqual([legacy], partitions.drop(start))
+        self.assertFalse(AnalyzerReport.objects.filter(pk=report.pk).exists())
+
+    def test_partition_unique(self):
+        partitions = ReportPartitions(AnalyzerReport._meta.db_table, days=7)
+        partitions.partition(period_start(now(), 7))
+        partitions.create(now() + datetime.timedelta(days=7))
+        config = AnalyzerConfig.objects.get(name="Classic_DNS")
+        analyzable = Analyzable.objects.create(name="test.com", classification=Classification.DOMAIN)
+        job = Job.objects.create(user=self.user, analyzable=analyzable)
+        job.analyzers_to_execute.set([config])
+        report = config.generate_empty_report(job, str(uuid.uuid4()), AnalyzerReport.STATUSES.PENDING)
+        # a new run moves the report to the partition of its start
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"UPDATE {AnalyzerReport._meta.db_table} SET start_time = %s WHERE id = %s",
+                [now() - datetime.timedelta(days=30), report.pk],
+            )
+        rerun = config.generate_empty_report(job, str(uuid.uuid4()), AnalyzerReport.STATUSES.RUNNING)
+        self.assertEqual(report.pk, rerun.pk)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT tableoid::regclass::text FROM {AnalyzerReport._meta.db_table} WHERE id = %s",
+                [report.pk],
+            )
+            self.assertEqual(partitions.partitions()[1].name, cursor.fetchone()[0])
+        self.assertEqual(1, AnalyzerReport.objects.filter(config=config, job=job).count())
+        # a report of the same job and config in another partition
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            AnalyzerReport.objects.create(
+                config=config,
+                job=job,
+                status=AnalyzerReport.STATUSES.SUCCESS,
+                start_time=now() + datetime.timedelta(days=7),
+                task_id=uuid.uuid4(),
+                parameters={},
+            )
+        report.delete()
+        AnalyzerReport.objects.create(
+            config=config,
+            job=job,
+            status=AnalyzerReport.STATUSES.SUCCESS,
+            start_time=now() + datetime.timedelta(days=7),
+            task_id=uuid.uuid4(),
+            parameters={},
+        )
+        self.assertEqual(1, AnalyzerReport.objects.filter(config=config, job=job).count())
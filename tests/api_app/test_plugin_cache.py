@@ -0,0 +1,90 @@
+# This file is a part of IntelOwl https://github.com/intelowlproject/IntelOwl
+# See the file 'LICENSE' for copying permission.
+
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import override_settings
+
+from api_app.analyzers_manager.models import AnalyzerConfig
+from api_app.models import Parameter, PluginConfig
+from api_app.plugin_cache import PluginCache, _broadcast, plugin_cache
+from tests import CustomTestCase
+
+
+@override_settings(PLUGIN_CACHE_TIMEOUT=300)
+class PluginCacheTestCase(CustomTestCase):
+    def setUp(self):
+        super().setUp()
+        self.cache = PluginCache()
+        self.config = AnalyzerConfig.objects.get(name="Classic_DNS")
+
+    def test_get_class(self):
+        plugin_class = self.cache.get_class(self.config.python_module_id)
+        self.assertIs(plugin_class, self.config.python_module.python_class)
+        with self.assertNumQueries(0):
+            self.assertIs(self.cache.get_class(self.config.python_module_id), plugin_class)
+        self.assertEqual(self.cache.stats()["class"], {"hits": 1, "misses": 1})
+
+    def test_get_config(self):
+        plugin_class = self.config.python_module.python_class
+        config = self.cache.get_config(plugin_class, self.config.pk)
+        self.assertEqual(config, self.config)
+        with self.assertNumQueries(0):
+            self.cache.get_config(plugin_class, self.config.pk)
+
+    def test_get_params(self):
+        params = self.cache.get_params(self.config, self.user, {})
+        with self.assertNumQueries(0):
+            self.assertEqual(self.cache.get_params(self.config, self.user, {}), params)
+        # different runtime configuration, different entry
+        self.cache.get_params(self.config, self.user, {"query_type": "AAAA"})
+        self.assertEqual(self.cache.stats()["params"], {"hits": 1, "misses": 2})
+
+    def test_get_params_copy(self):
+        params = self.cache.get_params(self.config, self.user, {})
+        params[0].value = "changed"
+        params.pop()
+        self.assertEqual(
+            [param.value for param in self.cache.get_params(self.config, self.user, {})],
+            [param.value for param in self.config.read_configured_params(self.user, {})],
+        )
+
+    @override_settings(PLUGIN_CACHE_VERSION_INTERVAL=0)
+    def test_invalidated_by_version(self):
+        self.cache.get_config(self.config.python_module.python_class, self.config.pk)
+        # another process changed the plugins
+        with override_settings(STAGE_CI=True):
+            _broadcast()
+        self.cache.get_config(self.config.python_module.python_class, self.config.pk)
+        self.assertEqual(self.cache.stats()["config"], {"hits": 0, "misses": 2})
+        cache.delete(PluginCache.VERSION_KEY)
+
+    def test_invalidate(self):
+        self.cache.get_class(self.config.python_module_id)
+        self.cache.get_params(self.config, self.user, {})
+        self.cache.invalidate(self.config.python_module_id)
+        self.cache.get_class(self.config.python_module_id)
+        self.cache.get_params(self.config, self.user, {})
+        self.assertEqual(self.cache.stats()["class"]["misses"], 2)
+        self.assertEqual(self.cache.stats()["params"]["misses"], 2)
+
+    @override_settings(PLUGIN_CACHE_TIMEOUT=0)
+    def test_disabled(self):
+        self.cache.get_class(self.config.python_module_id)
+        self.cache.get_class(self.config.python_module_id)
+        self.assertEqual(self.cache.stats()["class"], {"hits": 0, "misses": 0})
+
+    def test_invalidated_on_plugin_config_change(self):
+        param = Parameter.objects.get(python_module=self.config.python_module, name="query_type")
+        plugin_cache.get_params(self.config, self.user, {})
+        with patch.object(plugin_cache, "invalidate") as invalidate:
+            pc = PluginConfig.objects.create(
+                parameter=param,
+                analyzer_config=self.config,
+                value="AAAA",
+                owner=self.user,
+                for_organization=False,
+            )
+            invalidate.assert_called()
+        pc.delete()
@@ -0,0 +1,93 @@
+# This file is a part of IntelOwl https://github.com/intelowlproject/IntelOwl
+# See the file 'LICENSE' for copying permission.
+
+import datetime
+
+from django.db import connection
+from django.db.models import Sum
+from django.test.utils import CaptureQueriesContext
+from django.utils.timezone import now
+
+from api_app.analyzables_manager.models import Analyzable
+from api_app.choices import Classification
+from api_app.investigations_manager.models import Investigation
+from api_app.models import Job, JobRollup
+from api_app.retention import JobRetention
+from tests import CustomTestCase
+
+
+class JobRetentionTestCase(CustomTestCase):
+    def setUp(self):
+        super().setUp()
+        Job.objects.all().delete()
+        old = now() - datetime.timedelta(days=20)
+        self.shared = Analyzable.objects.create(name="test.com", classification=Classification.DOMAIN)
+        self.orphan = Analyzable.objects.create(name="test.org", classification=Classification.DOMAIN)
+        self.investigation = Investigation.objects.create(name="test", owner=self.user)
+        self.old_root = Job.objects.create(
+            user=self.user,
+            analyzable=self.orphan,
+            status=Job.STATUSES.REPORTED_WITHOUT_FAILS.value,
+            finished_analysis_time=old,
+            investigation=self.investigation,
+        )
+        # descendants are deleted with their ancestors even if they are recent
+        self.recent_child = Job.objects.create(
+            user=self.user,
+            analyzable=self.shared,
+            parent=self.old_root,
+            finished_analysis_time=now(),
+        )
+        self.recent_root = Job.objects.create(
+            user=self.user, analyzable=self.shared, finished_analysis_time=now()
+        )
+        self.old_child = Job.objects.create(
+            user=self.user,
+            analyzable=self.shared,
+            parent=self.recent_root,
+            status=Job.STATUSES.REPORTED_WITHOUT_FAILS.value,
+            finished_analysis_time=old,
+        )
+
+    def test_estimate(self):
+        estimate = JobRetention(14, batch_size=1).estimate()
+        self.assertEqual({"jobs": 2, "analyzables": 1, "files": 0, "batches": 2}, estimate)
+        self.assertEqual(4, Job.objects.count())
+
+    def test_run(self):
+        metrics = JobRetention(14, batch_size=1).run()
+        self.assertEqual(3, metrics["jobs"])
+        self.assertEqual(1, metrics["analyzables"])
+        self.assertEqual(1, metrics["investigations"])
+        self.assertEqual(2, metrics["batches"])
+
+        self.assertCountEqual([self.recent_root], Job.objects.all())
+        self.recent_root.refresh_from_db()
+        self.assertEqual(0, self.recent_root.numchild)
+        self.assertTrue(Analyzable.objects.filter(pk=self.shared.pk).exists())
+        self.assertFalse(Analyzable.objects.filter(pk=self.orphan.pk).exists())
+        self.assertFalse(Investigation.objects.filter(pk=self.investigation.pk).exists())
+        self.assertEqual(1, JobRollup.objects.aggregate(total=Sum("count"))["total"])
+
+    def test_run_queries(self):
+        def create_old_jobs(number: int):
+            analyzable = Analyzable.objects.create(name="test.net", classification=Classification.DOMAIN)
+            for _ in range(number):
+                Job.objects.create(
+                    user=self.user,
+                    analyzable=analyzable,
+                    status=Job.STATUSES.REPORTED_WITHOUT_FAILS.value,
+                    finished_analysis_time=now() - datetime.timedelta(days=20),
+                )
+
+        Job.objects.all().delete()
+        create_old_jobs(1)
+        with CaptureQueriesContext(connection) as single:
+            JobRetention(14).run()
+        create_old_jobs(10)
+        with CaptureQueriesContext(connection) as batch:
+            metrics = JobRetention(14).run()
+        self.assertEqual(10, metrics["jobs"])
+        self.assertEqual(1, metrics["analyzables"])
+        # no query is repeated for every deleted job
+        self.assertEqual(len(single), len(batch))
@@ -1,8 +1,13 @@
 # This file is a part of IntelOwl https://github.com/intelowlproject/IntelOwl
 # See the file 'LICENSE' for copying permission.
 import datetime
+from unittest.mock import patch
 
 from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models import Sum
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from django.utils.timezone import now
 from rest_framework.exceptions import ValidationError
 
@@ -11,7 +16,7 @@ from api_app.analyzers_manager.models import AnalyzerConfig
 from api_app.analyzers_manager.serializers import AnalyzerConfigSerializer
 from api_app.choices import Classification, PythonModuleBasePaths
 from api_app.connectors_manager.models import ConnectorConfig
-from api_app.models import Job, Parameter, PluginConfig, PythonModule
+from api_app.models import Job, JobRollup, Parameter, PluginConfig, PythonModule
 from api_app.playbooks_manager.models import PlaybookConfig
 from api_app.serializers.job import (
     CommentSerializer,
@@ -261,6 +266,88 @@ class AbstractJobCreateSerializerTestCase(CustomTestCase):
         j1.delete()
         an.delete()
 
+    def test_check_previous_job_same_plugins_first(self):
+        Job.objects.all().delete()
+        a1, a2 = AnalyzerConfig.objects.all()[:2]
+        an = Analyzable.objects.create(
+            name="test.com",
+            classification=Classification.DOMAIN,
+        )
+        same = Job.objects.create(
+            analyzable=an,
+            user=self.user,
+            status=Job.STATUSES.REPORTED_WITHOUT_FAILS,
+            received_request_time=now() - datetime.timedelta(hours=3),
+        )
+        same.analyzers_requested.set([a1])
+        superset = Job.objects.create(
+            analyzable=an,
+            user=self.user,
+            status=Job.STATUSES.REPORTED_WITHOUT_FAILS,
+            received_request_time=now() - datetime.timedelta(hours=1),
+        )
+        superset.analyzers_requested.set([a1, a2])
+        same.refresh_from_db()
+        self.assertEqual(same.requested_plugins, [f"a{a1.pk}"])
+        self.assertEqual(same.plugins_fingerprint, Job.get_plugins_fingerprint([f"a{a1.pk}"]))
+
+        validated_data = {
+            "scan_check_time": datetime.timedelta(days=1),
+            "analyzable": an,
+            "analyzers_to_execute": [a1],
+        }
+        self.assertEqual(same, self.ajcs.check_previous_jobs(validated_data=validated_data))
+        same.analyzers_requested.remove(a1)
+        self.assertEqual(superset, self.ajcs.check_previous_jobs(validated_data=validated_data))
+        a1.requested_in_jobs.clear()
+        superset.refresh_from_db()
+        self.assertEqual(superset.requested_plugins, [f"a{a2.pk}"])
+        with self.assertRaises(Job.DoesNotExist):
+            self.ajcs.check_previous_jobs(validated_data=validated_data)
+        same.delete()
+        superset.delete()
+        an.delete()
+
+    def test_check_previous_job_benchmark(self):
+        # the queries do not depend on the number of requested plugins
+        # and never join the plugins tables
+        analyzers = list(AnalyzerConfig.objects.all()[:40])
+        an = Analyzable.objects.create(
+            name="test.com",
+            classification=Classification.DOMAIN,
+        )
+        job = Job.objects.create(
+            analyzable=an,
+            user=self.user,
+            status=Job.STATUSES.REPORTED_WITHOUT_FAILS,
+        )
+        job.analyzers_requested.set(analyzers)
+
+        def check_previous_jobs(requested):
+            return self.ajcs.check_previous_jobs(
+                validated_data={
+                    "scan_check_time": datetime.timedelta(days=1),
+                    "analyzable": an,
+                    "analyzers_to_execute": requested,
+                }
+            )
+
+        # the first lookup loads the membership of the user
+        check_previous_jobs(analyzers)
+        queries = []
+        for requested in [analyzers[:1], analyzers[:20], analyzers, analyzers[:39]]:
+            with CaptureQueriesContext(connection) as context:
+                self.assertEqual(job, check_previous_jobs(requested))
+            for query in context.captured_queries:
+                self.assertNotIn("api_app_job_analyzers_requested", query["sql"])
+            queries.append(len(context))
+        # an exact match saves the superset lookup
+        self.assertEqual(queries[2] + 1, queries[0])
+        self.assertEqual(queries[0], queries[1])
+        self.assertEqual(queries[1], queries[3])
+        job.delete()
+        an.delete()
+
     def test_set_default_value_from_playbook(self):
         data = {"playbook_requested": PlaybookConfig.objects.first()}
         self.ajcs.set_default_value_from_playbook(data)
@@ -537,6 +624,157 @@ class ObservableJobCreateSerializerTestCase(CustomTestCase):
         )
         self.assertCountEqual(analyzers, [a])
 
+    def test_create_requested_plugins(self):
+        serializer = ObservableAnalysisSerializer(
+            data={
+                "observable_name": "test.com",
+                "analyzers_requested": ["Tranco"],
+                "tlp": "CLEAR",
+            },
+            context={"request": MockUpRequest(self.user)},
+        )
+        serializer.is_valid(raise_exception=True)
+        with CaptureQueriesContext(connection) as queries:
+            job = serializer.save(send_task=False)
+        tranco = AnalyzerConfig.objects.get(name="Tranco")
+        job.refresh_from_db()
+        self.assertEqual([f"a{tranco.pk}"], job.requested_plugins)
+        self.assertEqual(Job.get_plugins_fingerprint([f"a{tranco.pk}"]), job.plugins_fingerprint)
+        # the keys are not read again from the many to many relations
+        for query in queries.captured_queries:
+            self.assertNotIn('SET "requested_plugins"', query["sql"])
+        # a change outside the creation still updates them
+        job.analyzers_requested.clear()
+        job.refresh_from_db()
+        self.assertEqual([], job.requested_plugins)
+        self.assertEqual("", job.plugins_fingerprint)
+        job.delete()
+
+
+class MultipleObservableJobSerializerTestCase(CustomTestCase):
+    @staticmethod
+    def _data(observables_number: int, **kwargs):
+        return {
+            "observables": [("domain", f"test{i}.com") for i in range(observables_number)],
+            "analyzers_requested": ["Tranco"],
+            "tlp": "CLEAR",
+            "scan_mode": 1,
+            **kwargs,
+        }
+
+    def test_bulk_create(self):
+        Job.objects.all().delete()
+        serializer = ObservableAnalysisSerializer(
+            data=self._data(3, bulk=True),
+            many=True,
+            context={"request": MockUpRequest(self.user)},
+        )
+        serializer.is_valid(raise_exception=True)
+        with CaptureQueriesContext(connection) as bulk_queries:
+            jobs = serializer.save(send_task=False)
+        self.assertEqual(3, len(jobs))
+        tranco = AnalyzerConfig.objects.get(name="Tranco")
+        for i, job in enumerate(jobs):
+            job.refresh_from_db()
+            self.assertEqual(f"test{i}.com", job.analyzable.name)
+            self.assertEqual(1, job.depth)
+            self.assertCountEqual([tranco], job.analyzers_requested.all())
+            self.assertCountEqual([tranco], job.analyzers_to_execute.all())
+            self.assertEqual([f"a{tranco.pk}"], job.requested_plugins)
+            self.assertIsNotNone(job.investigation)
+        self.assertEqual(3, JobRollup.objects.aggregate(total=Sum("count"))["total"])
+
+        Job.objects.all().delete()
+        serializer = ObservableAnalysisSerializer(
+            data=self._data(3),
+            many=True,
+            context={"request": MockUpRequest(self.user)},
+        )
+        serializer.is_valid(raise_exception=True)
+        with CaptureQueriesContext(connection) as queries:
+            serializer.save(send_task=False)
+        self.assertLess(len(bulk_queries), len(queries))
+
+    def test_bulk_max_elements(self):
+        serializer = ObservableAnalysisSerializer(
+            data=self._data(201),
+            many=True,
+            context={"request": MockUpRequest(self.user)},
+        )
+        self.assertFalse(serializer.is_valid())
+        serializer = ObservableAnalysisSerializer(
+            data=self._data(201, bulk=True),
+            many=True,
+            context={"request": MockUpRequest(self.user)},
+        )
+        with CaptureQueriesContext(connection) as queries:
+            self.assertTrue(serializer.is_valid())
+        serializer = ObservableAnalysisSerializer(
+            data=self._data(1, bulk=True),
+            many=True,
+            context={"request": MockUpRequest(self.user)},
+        )
+        with CaptureQueriesContext(connection) as single_queries:
+            self.assertTrue(serializer.is_valid())
+
+        # the plugins are resolved once for the whole request
+        def plugins_queries(captured):
+            return [
+                query for query in captured if '"analyzers_manager_analyzerconfig"."id" IN' in query["sql"]
+            ]
+
+        self.assertEqual(len(plugins_queries(single_queries)), len(plugins_queries(queries)))
+
+    @override_settings(BATCH_PIPELINE_ENABLED=True)
+    def test_batch_pipeline(self):
+        serializer = ObservableAnalysisSerializer(
+            data=self._data(3),
+            many=True,
+            context={"request": MockUpRequest(self.user)},
+        )
+        serializer.is_valid(raise_exception=True)
+        with (
+            patch("intel_owl.tasks.job_pipeline_batch.apply_async") as job_pipeline_batch,
+            patch("intel_owl.tasks.job_pipeline.apply_async") as job_pipeline,
+        ):
+            jobs = serializer.save(send_task=True)
+        job_pipeline.assert_not_called()
+        job_pipeline_batch.assert_called_once()
+        self.assertEqual([[job.pk for job in jobs]], job_pipeline_batch.call_args.kwargs["args"])
+
+    @override_settings(BATCH_PIPELINE_ENABLED=True, BATCH_PIPELINE_SIZE=2)
+    def test_bulk_batch_pipeline(self):
+        serializer = ObservableAnalysisSerializer(
+            data=self._data(3, bulk=True),
+            many=True,
+            context={"request": MockUpRequest(self.user)},
+        )
+        serializer.is_valid(raise_exception=True)
+        with patch("api_app.serializers.job.group") as group:
+            jobs = serializer.save(send_task=True)
+        signatures = group.call_args.args[0]
+        self.assertEqual(["job_pipeline_batch"] * 2, [signature.task for signature in signatures])
+        self.assertEqual(
+            [([job.pk for job in jobs[:2]],), ([jobs[2].pk],)],
+            [signature.args for signature in signatures],
+        )
+
+    @override_settings(BATCH_PIPELINE_ENABLED=True)
+    def test_batch_pipeline_single(self):
+        serializer = ObservableAnalysisSerializer(
+            data=self._data(1),
+            many=True,
+            context={"request": MockUpRequest(self.user)},
+        )
+        serializer.is_valid(raise_exception=True)
+        with (
+            patch("intel_owl.tasks.job_pipeline_batch.apply_async") as job_pipeline_batch,
+            patch("intel_owl.tasks.job_pipeline.apply_async") as job_pipeline,
+        ):
+            serializer.save(send_task=True)
+        job_pipeline_batch.assert_not_called()
+        job_pipeline.assert_called_once()
+
 
 class CommentSerializerTestCase(CustomTestCase):
     def setUp(self):
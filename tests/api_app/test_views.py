@@ -10,11 +10,12 @@ from django.core.files import File
 from django.test import override_settings
 from django.utils.timezone import now
 from elasticsearch_dsl.query import Bool, Exists, Range, Term
+from kombu import uuid
 from rest_framework.reverse import reverse
 from rest_framework.test import APIClient
 
 from api_app.analyzables_manager.models import Analyzable
-from api_app.analyzers_manager.models import AnalyzerConfig
+from api_app.analyzers_manager.models import AnalyzerConfig, AnalyzerReport
 from api_app.choices import Classification, ReportStatus
 from api_app.investigations_manager.models import Investigation
 from api_app.models import Comment, Job, Parameter, PluginConfig, Tag
@@ -295,6 +296,54 @@ class JobViewSetTests(CustomViewSetTestCase):
         self.assertEqual(content["investigation_name"], self.investigation1.name)
         self.assertEqual(content["analyzable_id"], self.analyzable.pk)
 
+    def test_retrieve_sparse_fields(self):
+        AnalyzerReport.objects.create(
+            job=self.job,
+            config=AnalyzerConfig.objects.get(name="Classic_DNS"),
+            status=ReportStatus.SUCCESS.value,
+            report={"resolutions": []},
+            task_id=uuid(),
+            parameters={},
+        )
+        response = self.client.get(
+            f"{self.jobs_list_uri}/{self.job.id}", {"fields": "id,status,analyzer_reports.status"}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            {"id": self.job.id, "status": self.job.status, "analyzer_reports": [{"status": "SUCCESS"}]},
+            response.json(),
+        )
+
+        response = self.client.get(f"{self.jobs_list_uri}/{self.job.id}", {"exclude_report_bodies": "true"})
+        self.assertEqual(response.status_code, 200)
+        analyzer_report = response.json()["analyzer_reports"][0]
+        self.assertNotIn("report", analyzer_report)
+        self.assertEqual(len('{"resolutions": []}'), analyzer_report["report_size"])
+
+    def test_retrieve_etag(self):
+        uri = f"{self.jobs_list_uri}/{self.job.id}"
+        response = self.client.get(uri)
+        self.assertEqual(response.status_code, 200)
+        etag = response["ETag"]
+
+        response = self.client.get(uri, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(etag, response["ETag"])
+        # the etag depends on the requested fields
+        response = self.client.get(uri, {"fields": "status"}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+        AnalyzerReport.objects.create(
+            job=self.job,
+            config=AnalyzerConfig.objects.get(name="Classic_DNS"),
+            status=ReportStatus.RUNNING.value,
+            task_id=uuid(),
+            parameters={},
+        )
+        response = self.client.get(uri, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(etag, response["ETag"])
+
     def test_delete(self):
         self.assertEqual(Job.objects.count(), 5)
         response = self.client.delete(f"{self.jobs_list_uri}/{self.job.id}")
@@ -458,7 +507,8 @@ class JobViewSetTests(CustomViewSetTestCase):
         self.assertEqual(
             resp.json(),
             {
-                "values": ["AMBER", "CLEAR", "GREEN"],
+                # the most frequent first
+                "values": ["GREEN", "AMBER", "CLEAR"],
                 "aggregation": [{"date": "2024-11-28T00:00:00Z", "CLEAR": 1, "GREEN": 3, "AMBER": 1}],
             },
         )
@@ -0,0 +1,119 @@
+# This file is a part of IntelOwl https://github.com/intelowlproject/IntelOwl
+# See the file 'LICENSE' for copying permission.
+
+import datetime
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import override_settings
+from django.utils.timezone import now
+from kombu import uuid
+
+from api_app.analyzables_manager.models import Analyzable
+from api_app.analyzers_manager.models import AnalyzerConfig, AnalyzerReport
+from api_app.choices import Classification
+from api_app.models import Job
+from api_app.websocket import JobConsumer
+from tests import CustomTestCase
+
+
+class JobConsumerTestCase(CustomTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.an = Analyzable.objects.create(
+            name="8.8.8.8",
+            classification=Classification.IP,
+        )
+        self.job = Job.objects.create(
+            user=self.user,
+            status=Job.STATUSES.RUNNING,
+            analyzable=self.an,
+        )
+        self.old_report = AnalyzerReport.objects.create(
+            job=self.job,
+            config=AnalyzerConfig.objects.get(name="Classic_DNS"),
+            status=AnalyzerReport.STATUSES.SUCCESS,
+            report={},
+            task_id=str(uuid()),
+            parameters={},
+            start_time=now() - datetime.timedelta(minutes=10),
+            end_time=now() - datetime.timedelta(minutes=10),
+        )
+        self.new_report = AnalyzerReport.objects.create(
+            job=self.job,
+            config=AnalyzerConfig.objects.get(name="TorProject"),
+            status=AnalyzerReport.STATUSES.SUCCESS,
+            report={},
+            task_id=str(uuid()),
+            parameters={},
+            start_time=now(),
+            end_time=now(),
+        )
+        cache.clear()
+
+    def tearDown(self) -> None:
+        self.job.delete()
+        self.an.delete()
+        cache.clear()
+
+    def test_get_group_payload(self):
+        groups = JobConsumer.JobChannelGroups(self.job)
+        job_data = JobConsumer.serialize_job(self.job)
+        since = now() - datetime.timedelta(minutes=1)
+
+        payload = JobConsumer.get_group_payload(job_data, groups.job_group_name, since)
+        self.assertFalse(any(payload["permissions"].values()))
+        self.assertEqual(2, len(payload["analyzer_reports"]))
+
+        payload = JobConsumer.get_group_payload(job_data, groups.job_group_perm_name, since)
+        self.assertTrue(all(payload["permissions"].values()))
+
+        payload = JobConsumer.get_group_payload(
+            job_data, groups.delta_group(groups.job_group_perm_name), since
+        )
+        self.assertTrue(payload["delta"])
+        self.assertTrue(all(payload["permissions"].values()))
+        self.assertEqual(
+            ["TorProject"],
+            [report["name"] for report in payload["analyzer_reports"]],
+        )
+
+        payload = JobConsumer.get_group_payload(job_data, groups.delta_group(groups.job_group_name), None)
+        self.assertNotIn("delta", payload)
+        self.assertEqual(2, len(payload["analyzer_reports"]))
+
+    def test_serialize_and_send_job(self):
+        with (
+            patch("api_app.websocket.get_channel_layer"),
+            patch("api_app.websocket.async_to_sync") as async_to_sync,
+            patch.object(JobConsumer, "serialize_job", wraps=JobConsumer.serialize_job) as serialize_job,
+        ):
+            JobConsumer.serialize_and_send_job(self.job)
+        serialize_job.assert_called_once()
+        self.assertEqual(
+            JobConsumer.JobChannelGroups(self.job).group_list,
+            [call.args[0] for call in async_to_sync.return_value.call_args_list],
+        )
+
+    @override_settings(WEBSOCKET_JOB_UPDATE_INTERVAL=10)
+    def test_publish_job_coalesced(self):
+        with (
+            patch.object(JobConsumer, "serialize_and_send_job") as send,
+            patch("intel_owl.tasks.send_job_update.apply_async") as apply_async,
+        ):
+            for _ in range(5):
+                JobConsumer.publish_job(self.job.pk)
+        send.assert_called_once()
+        apply_async.assert_called_once()
+        self.assertEqual(10, apply_async.call_args.kwargs["countdown"])
+
+    @override_settings(WEBSOCKET_JOB_UPDATE_INTERVAL=0)
+    def test_publish_job_not_coalesced(self):
+        with (
+            patch.object(JobConsumer, "serialize_and_send_job") as send,
+            patch("intel_owl.tasks.send_job_update.apply_async") as apply_async,
+        ):
+            for _ in range(5):
+                JobConsumer.publish_job(self.job.pk)
+        self.assertEqual(5, send.call_count)
+        apply_async.assert_not_called()
@@ -1,11 +1,14 @@
 import datetime
 
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from kombu import uuid
 
 from api_app.analyzables_manager.models import Analyzable
 from api_app.analyzers_manager.models import AnalyzerConfig, AnalyzerReport
 from api_app.choices import Classification
 from api_app.models import Job
+from api_app.visualizers_manager.models import VisualizerConfig
 from api_app.visualizers_manager.visualizers.passive_dns.analyzer_extractor import (
     PDNSReport,
     extract_circlpdns_reports,
@@ -16,9 +19,16 @@ from api_app.visualizers_manager.visualizers.passive_dns.analyzer_extractor impo
     extract_threatminer_reports,
     extract_validin_reports,
 )
+from api_app.visualizers_manager.visualizers.passive_dns.visualizer import PassiveDNS
 from tests import CustomTestCase
 
 
+def _visualizer(job: Job) -> PassiveDNS:
+    visualizer = PassiveDNS(VisualizerConfig.objects.get(name="Passive_DNS"))
+    visualizer.job_id = job.pk
+    return visualizer
+
+
 class TestOTXQuery(CustomTestCase):
     @classmethod
     def setUpClass(cls) -> None:
@@ -45,7 +55,7 @@ class TestOTXQuery(CustomTestCase):
         cls.an.delete()
 
     def test_no_report(self):
-        report = extract_otxquery_reports(AnalyzerReport.objects.filter(job=self.job), self.job)
+        report = extract_otxquery_reports(_visualizer(self.job), self.job)
         self.assertEqual([], report)
 
     def test_empty_report(self):
@@ -56,7 +66,7 @@ class TestOTXQuery(CustomTestCase):
             task_id=uuid(),
             config=AnalyzerConfig.objects.get(name="OTXQuery"),
         )
-        report = extract_otxquery_reports(AnalyzerReport.objects.filter(job=self.job), self.job)
+        report = extract_otxquery_reports(_visualizer(self.job), self.job)
         self.assertEqual([], report)
 
     def test_all_data_report(self):
@@ -85,7 +95,7 @@ class TestOTXQuery(CustomTestCase):
             task_id=uuid(),
             config=AnalyzerConfig.objects.get(name="OTXQuery"),
         )
-        report = extract_otxquery_reports(AnalyzerReport.objects.filter(job=self.job), self.job)
+        report = extract_otxquery_reports(_visualizer(self.job), self.job)
         self.assertEqual(
             [
                 PDNSReport(
@@ -128,7 +138,7 @@ class TestThreatminer(CustomTestCase):
         cls.an.delete()
 
     def test_no_report(self):
-        report = extract_threatminer_reports(AnalyzerReport.objects.filter(job=self.job), self.job)
+        report = extract_threatminer_reports(_visualizer(self.job), self.job)
         self.assertEqual([], report)
 
     def test_empty_report(self):
@@ -139,7 +149,7 @@ class TestThreatminer(CustomTestCase):
             task_id=uuid(),
             config=AnalyzerConfig.objects.get(name="Threatminer"),
         )
-        report = extract_threatminer_reports(AnalyzerReport.objects.filter(job=self.job), self.job)
+        report = extract_threatminer_reports(_visualizer(self.job), self.job)
         self.assertEqual([], report)
 
     def test_all_data_report(self):
@@ -165,7 +175,7 @@ class TestThreatminer(CustomTestCase):
             task_id=uuid(),
             config=AnalyzerConfig.objects.get(name="Threatminer"),
         )
-        report = extract_threatminer_reports(AnalyzerReport.objects.filter(job=self.job), self.job)
+        report = extract_threatminer_reports(_visualizer(self.job), self.job)
         self.assertEqual(
             [
                 PDNSReport(
@@ -217,7 +227,7 @@ class TestValidin(CustomTestCase):
         cls.an.delete()
 
     def test_no_report(self):
-        report = extract_validin_reports(AnalyzerReport.objects.filter(job=self.job), self.job)
+        report = extract_validin_reports(_visualizer(self.job), self.job)
         self.assertEqual([], report)
 
     def test_empty_report(self):
@@ -228,7 +238,7 @@ class TestValidin(CustomTestCase):
             task_id=uuid(),
             config=AnalyzerConfig.objects.get(name="Validin"),
         )
-        report = extract_validin_reports(AnalyzerReport.objects.filter(job=self.job), self.job)
+        report = extract_validin_reports(_visualizer(self.job), self.job)
         self.assertEqual([], report)
 
     def test_all_data_report(self):
@@ -271,7 +281,7 @@ class TestValidin(CustomTestCase):
             task_id=uuid(),
             config=AnalyzerConfig.objects.get(name="Validin"),
         )
-        report = extract_validin_reports(AnalyzerReport.objects.filter(job=self.job), self.job)
+        report = extract_validin_reports(_visualizer(self.job), self.job)
 
         self.assertEqual(
             [
@@ -324,7 +334,7 @@ class TestDNSdb(CustomTestCase):
         cls.an.delete()
 
     def test_no_report(self):
-        report = extract_dnsdb_reports(AnalyzerReport.objects.filter(job=self.job), self.job)
+        report = extract_dnsdb_reports(_visualizer(self.job), self.job)
         self.assertEqual([], report)
 
     def test_empty_report(self):
@@ -335,7 +345,7 @@ class TestDNSdb(CustomTestCase):
             task_id=uuid(),
             config=AnalyzerConfig.objects.get(name="DNSDB"),
         )
-        report = extract_dnsdb_reports(AnalyzerReport.objects.filter(job=self.job), self.job)
+        report = extract_dnsdb_reports(_visualizer(self.job), self.job)
         self.assertEqual([], report)
 
     def test_all_data_report(self):
@@ -358,7 +368,7 @@ class TestDNSdb(CustomTestCase):
             task_id=uuid(),
             config=AnalyzerConfig.objects.get(name="DNSDB"),
         )
-        report = extract_dnsdb_reports(AnalyzerReport.objects.filter(job=self.job), self.job)
+        report = extract_dnsdb_reports(_visualizer(self.job), self.job)
         self.assertEqual(
             [
                 PDNSReport(
@@ -401,7 +411,7 @@ class TestRobtex(CustomTestCase):
         cls.an.delete()
 
     def test_no_report(self):
-        report = extract_robtex_reports(AnalyzerReport.objects.filter(job=self.job), self.job)
+        report = extract_robtex_reports(_visualizer(self.job), self.job)
         self.assertEqual([], report)
 
     def test_empty_report(self):
@@ -412,7 +422,7 @@ class TestRobtex(CustomTestCase):
             task_id=uuid(),
             config=AnalyzerConfig.objects.get(name="Robtex"),
         )
-        report = extract_robtex_reports(AnalyzerReport.objects.filter(job=self.job), self.job)
+        report = extract_robtex_reports(_visualizer(self.job), self.job)
         self.assertEqual([], report)
 
     def test_all_data_report(self):
@@ -432,7 +442,7 @@ class TestRobtex(CustomTestCase):
             task_id=uuid(),
             config=AnalyzerConfig.objects.get(name="Robtex"),
         )
-        report = extract_robtex_reports(AnalyzerReport.objects.filter(job=self.job), self.job)
+        report = extract_robtex_reports(_visualizer(self.job), self.job)
         self.assertEqual(
             [
                 PDNSReport(
@@ -464,7 +474,7 @@ class TestRobtex(CustomTestCase):
             task_id=uuid(),
             config=AnalyzerConfig.objects.get(name="Robtex"),
         )
-        report = extract_robtex_reports(AnalyzerReport.objects.filter(job=self.job), self.job)
+        report = extract_robtex_reports(_visualizer(self.job), self.job)
         self.assertEqual([], report)
 
     def test_mixed_items_skips_non_dicts(self):
@@ -488,7 +498,7 @@ class TestRobtex(CustomTestCase):
             task_id=uuid(),
             config=AnalyzerConfig.objects.get(name="Robtex"),
         )
-        report = extract_robtex_reports(AnalyzerReport.objects.filter(job=self.job), self.job)
+        report = extract_robtex_reports(_visualizer(self.job), self.job)
         self.assertEqual(
             [
                 PDNSReport(
@@ -525,7 +535,7 @@ class TestRobtex(CustomTestCase):
             task_id=uuid(),
             config=AnalyzerConfig.objects.get(name="Robtex"),
         )
-        report = extract_robtex_reports(AnalyzerReport.objects.filter(job=self.job), self.job)
+        report = extract_robtex_reports(_visualizer(self.job), self.job)
         self.assertEqual([], report)
 
 
@@ -555,7 +565,7 @@ class TestMnemonicPDNS(CustomTestCase):
         cls.an.delete()
 
     def test_no_report(self):
-        report = extract_mnemonicpdns_reports(AnalyzerReport.objects.filter(job=self.job), self.job)
+        report = extract_mnemonicpdns_reports(_visualizer(self.job), self.job)
         self.assertEqual([], report)
 
     def test_empty_report(self):
@@ -566,7 +576,7 @@ class TestMnemonicPDNS(CustomTestCase):
             task_id=uuid(),
             config=AnalyzerConfig.objects.get(name="Mnemonic_PassiveDNS"),
         )
-        report = extract_mnemonicpdns_reports(AnalyzerReport.objects.filter(job=self.job), self.job)
+        report = extract_mnemonicpdns_reports(_visualizer(self.job), self.job)
         self.assertEqual([], report)
 
     def test_all_data_report(self):
@@ -586,7 +596,7 @@ class TestMnemonicPDNS(CustomTestCase):
             task_id=uuid(),
             config=AnalyzerConfig.objects.get(name="Mnemonic_PassiveDNS"),
         )
-        report = extract_mnemonicpdns_reports(AnalyzerReport.objects.filter(job=self.job), self.job)
+        report = extract_mnemonicpdns_reports(_visualizer(self.job), self.job)
         self.assertEqual(
             [
                 PDNSReport(
@@ -624,7 +634,7 @@ class TestMnemonicPDNS(CustomTestCase):
             task_id=uuid(),
             config=AnalyzerConfig.objects.get(name="Mnemonic_PassiveDNS"),
         )
-        report = extract_mnemonicpdns_reports(AnalyzerReport.objects.filter(job=self.job), self.job)
+        report = extract_mnemonicpdns_reports(_visualizer(self.job), self.job)
         self.assertEqual(
             [
                 PDNSReport(
@@ -667,7 +677,7 @@ class TestCIRCLPassiveDNS(CustomTestCase):
         cls.an.delete()
 
     def test_no_report(self):
-        report = extract_circlpdns_reports(AnalyzerReport.objects.filter(job=self.job), self.job)
+        report = extract_circlpdns_reports(_visualizer(self.job), self.job)
         self.assertEqual([], report)
 
     def test_empty_report(self):
@@ -678,7 +688,7 @@ class TestCIRCLPassiveDNS(CustomTestCase):
             task_id=uuid(),
             config=AnalyzerConfig.objects.get(name="CIRCLPassiveDNS"),
         )
-        report = extract_circlpdns_reports(AnalyzerReport.objects.filter(job=self.job), self.job)
+        report = extract_circlpdns_reports(_visualizer(self.job), self.job)
         self.assertEqual([], report)
 
     def test_all_data_report(self):
@@ -698,7 +708,7 @@ class TestCIRCLPassiveDNS(CustomTestCase):
             task_id=uuid(),
             config=AnalyzerConfig.objects.get(name="CIRCLPassiveDNS"),
         )
-        report = extract_circlpdns_reports(AnalyzerReport.objects.filter(job=self.job), self.job)
+        report = extract_circlpdns_reports(_visualizer(self.job), self.job)
         self.assertEqual(
             [
                 PDNSReport(
@@ -724,5 +734,43 @@ class TestCIRCLPassiveDNS(CustomTestCase):
             task_id=uuid(),
             config=AnalyzerConfig.objects.get(name="CIRCLPassiveDNS"),
         )
-        report = extract_circlpdns_reports(AnalyzerReport.objects.filter(job=self.job), self.job)
+        report = extract_circlpdns_reports(_visualizer(self.job), self.job)
         self.assertEqual([], report)
+
+
+class TestPassiveDNS(CustomTestCase):
+    def test_run(self):
+        an = Analyzable.objects.create(
+            name="195.22.26.248",
+            classification=Classification.IP,
+        )
+        job = Job.objects.create(
+            user=self.user,
+            status=Job.STATUSES.RUNNING.value,
+            analyzable=an,
+        )
+        for name in ["OTXQuery", "Robtex", "Classic_DNS"]:
+            AnalyzerReport.objects.create(
+                parameters={},
+                report={},
+                job=job,
+                task_id=uuid(),
+                config=AnalyzerConfig.objects.get(name=name),
+            )
+        visualizer = _visualizer(job)
+        with CaptureQueriesContext(connection) as context:
+            pages = visualizer.run()
+        self.assertEqual(1, len(pages))
+        # every extractor reads the same reports index
+        self.assertEqual(
+            1,
+            len(
+                [
+                    query
+                    for query in context.captured_queries
+                    if "analyzers_manager_analyzerreport" in query["sql"]
+                ]
+            ),
+        )
+        job.delete()
+        an.delete()
@@ -1,11 +1,13 @@
 # This file is a part of IntelOwl https://github.com/intelowlproject/IntelOwl
 # See the file 'LICENSE' for copying permission.
 
-
+from django.core.files import File
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from kombu import uuid
 
 from api_app.analyzables_manager.models import Analyzable
-from api_app.analyzers_manager.models import AnalyzerReport
+from api_app.analyzers_manager.models import AnalyzerConfig, AnalyzerReport
 from api_app.choices import Classification, PythonModuleBasePaths
 from api_app.models import Job, PythonModule
 from api_app.playbooks_manager.models import PlaybookConfig
@@ -34,6 +36,9 @@ from api_app.visualizers_manager.enums import (
     VisualizableTableColumnSize,
 )
 from api_app.visualizers_manager.models import VisualizerConfig
+from api_app.visualizers_manager.visualizers.sample_static_analysis import (
+    SampleStaticAnalysis,
+)
 from tests import CustomTestCase
 
 
@@ -499,6 +504,90 @@ class VisualizerTestCase(CustomTestCase):
         vc.delete()
         an.delete()
 
+    def test_analyzer_reports_index(self):
+        class MockUpVisualizer(Visualizer):
+            def run(self) -> dict:
+                return {}
+
+        an = Analyzable.objects.create(
+            name="test.com",
+            classification=Classification.DOMAIN,
+        )
+        job = Job.objects.create(
+            analyzable=an,
+            status="reported_without_fails",
+        )
+        vc = VisualizerConfig.objects.create(
+            name="test",
+            python_module=PythonModule.objects.get(
+                base_path=PythonModuleBasePaths.Visualizer.value, module="yara.Yara"
+            ),
+            description="test",
+        )
+        ac = AnalyzerConfig.objects.get(name="Classic_DNS")
+        ar = AnalyzerReport.objects.create(
+            config=ac,
+            job=job,
+            task_id=uuid(),
+            parameters={},
+        )
+        v = MockUpVisualizer(vc)
+        v.job_id = job.pk
+        python_module = ac.python_module
+        self.assertEqual(job, v._job)
+        with self.assertNumQueries(1):
+            self.assertEqual(v.get_analyzer_report("Classic_DNS"), ar)
+            self.assertEqual(v.get_analyzer_report_by_module(python_module), ar)
+            with self.assertRaises(AnalyzerReport.DoesNotExist):
+                v.get_analyzer_report("TorProject")
+        self.assertEqual(
+            ["Classic_DNS"],
+            list(v.build_reports_index(v.get_analyzer_reports(), names=["Classic_DNS", "TorProject"])),
+        )
+        ar.delete()
+        job.delete()
+        vc.delete()
+        an.delete()
+
+    def test_analyzer_reports_index_benchmark(self):
+        with open("test_files/file.exe", "rb") as f:
+            an = Analyzable.objects.create(
+                name="file.exe",
+                classification=Classification.FILE,
+                mimetype="application/vnd.microsoft.portable-executable",
+                file=File(f),
+            )
+        job = Job.objects.create(
+            analyzable=an,
+            status="reported_without_fails",
+            user=self.superuser,
+        )
+        configs = AnalyzerConfig.objects.filter(
+            name__in=["File_Info", "PE_Info", "Yara", "ClamAV", "Capa_Info", "Signature_Info"]
+        )
+        for config in configs:
+            AnalyzerReport.objects.create(
+                config=config,
+                job=job,
+                task_id=uuid(),
+                parameters={},
+                report={},
+                status=AnalyzerReport.STATUSES.SUCCESS,
+            )
+        visualizer = SampleStaticAnalysis(
+            VisualizerConfig.objects.filter(python_module=SampleStaticAnalysis.python_module).first()
+        )
+        visualizer.job_id = job.pk
+        with CaptureQueriesContext(connection) as context:
+            visualizer.run()
+        report_queries = [
+            query for query in context.captured_queries if "analyzers_manager_analyzerreport" in query["sql"]
+        ]
+        # every section reads the reports index
+        self.assertEqual(1, len(report_queries))
+        job.delete()
+        an.delete()
+
     def test_subclasses(self):
         def handler(signum, frame):
             raise TimeoutError("end of time")
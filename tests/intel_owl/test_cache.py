@@ -0,0 +1,130 @@
+# This file is a part of IntelOwl https://github.com/intelowlproject/IntelOwl
+# See the file 'LICENSE' for copying permission.
+
+from unittest.mock import MagicMock, patch
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from intel_owl.settings.cache import LocalLRU, TieredRedisCache, plain_key
+
+
+class DatabaseCacheExtendedTestCase(TestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def test_get_where(self):
+        cache.set("list_AnalyzerConfig_user_1", 1)
+        cache.set("list_AnalyzerConfig_user_2", 2)
+        cache.set("list_ConnectorConfig_user", 3)
+        self.assertEqual(
+            cache.get_where("list_AnalyzerConfig_"),
+            {"list_AnalyzerConfig_user_1": 1, "list_AnalyzerConfig_user_2": 2},
+        )
+
+    def test_delete_where(self):
+        cache.set("list_AnalyzerConfig_user_1", 1)
+        cache.set("list_AnalyzerConfig_user_2", 2)
+        cache.set("list_ConnectorConfig_user", 3)
+        self.assertEqual(cache.delete_where("list_AnalyzerConfig_"), 2)
+        self.assertIsNone(cache.get("list_AnalyzerConfig_user_1"))
+        self.assertEqual(cache.get("list_ConnectorConfig_user"), 3)
+
+
+class LocalLRUTestCase(TestCase):
+    def test_get_set(self):
+        lru = LocalLRU(max_entries=10, timeout=60)
+        self.assertEqual(lru.get("key"), (False, None))
+        value = {"a": [1]}
+        lru.set("key", value)
+        value["a"].append(2)
+        # the cached copy is not affected by changes to the original object
+        self.assertEqual(lru.get("key"), (True, {"a": [1]}))
+
+    def test_eviction(self):
+        lru = LocalLRU(max_entries=2, timeout=60)
+        lru.set("a", 1)
+        lru.set("b", 2)
+        lru.get("a")
+        lru.set("c", 3)
+        self.assertTrue(lru.get("a")[0])
+        self.assertFalse(lru.get("b")[0])
+        self.assertTrue(lru.get("c")[0])
+
+    def test_expiration(self):
+        lru = LocalLRU(max_entries=2, timeout=5)
+        with patch("intel_owl.settings.cache.time.monotonic", return_value=100):
+            lru.set("a", 1)
+        with patch("intel_owl.settings.cache.time.monotonic", return_value=106):
+            self.assertFalse(lru.get("a")[0])
+
+    def test_delete_where(self):
+        lru = LocalLRU(max_entries=10, timeout=60)
+        lru.set("list_a_1", 1)
+        lru.set("list_a_2", 2)
+        lru.set("list_b", 3)
+        lru.delete_where("list_a")
+        self.assertFalse(lru.get("list_a_1")[0])
+        self.assertFalse(lru.get("list_a_2")[0])
+        self.assertTrue(lru.get("list_b")[0])
+
+
+class TieredRedisCacheTestCase(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.cache = TieredRedisCache(
+            "redis://redis:6379/2",
+            {"KEY_FUNCTION": plain_key, "OPTIONS": {"LOCAL_MAX_ENTRIES": 10, "LOCAL_TIMEOUT": 5}},
+        )
+        # redis client, backed by a dict
+        self.redis = {}
+        client = MagicMock()
+        client.get.side_effect = lambda key, default=None: self.redis.get(key, default)
+        client.set.side_effect = lambda key, value, timeout: self.redis.__setitem__(key, value)
+        client.delete.side_effect = lambda key: self.redis.pop(key, None) is not None
+        client.delete_many.side_effect = lambda keys: [self.redis.pop(key, None) for key in keys]
+        client.get_client.return_value.scan_iter.side_effect = lambda match, count: [
+            key.encode() for key in self.redis if key.startswith(match.rstrip("*"))
+        ]
+        self.cache.__dict__["_cache"] = client
+        self.client = client
+
+    def test_local_hit(self):
+        self.redis["key"] = {"a": 1}
+        self.assertEqual(self.cache.get("key"), {"a": 1})
+        self.redis["key"] = {"a": 2}
+        # served by the local tier, without asking redis
+        self.assertEqual(self.cache.get("key"), {"a": 1})
+        self.assertEqual(self.client.get.call_count, 1)
+        self.assertEqual(self.cache.get("missing", "default"), "default")
+
+    def test_expiration(self):
+        self.redis["key"] = 1
+        with patch("intel_owl.settings.cache.time.monotonic", return_value=100):
+            self.assertEqual(self.cache.get("key"), 1)
+        self.redis["key"] = 2
+        with patch("intel_owl.settings.cache.time.monotonic", return_value=104):
+            self.assertEqual(self.cache.get("key"), 1)
+        with patch("intel_owl.settings.cache.time.monotonic", return_value=106):
+            self.assertEqual(self.cache.get("key"), 2)
+        self.assertEqual(self.client.get.call_count, 2)
+
+    def test_invalidation(self):
+        self.cache.set("key", 1)
+        self.assertEqual(self.cache.get("key"), 1)
+        self.cache.set("key", 2)
+        self.assertEqual(self.cache.get("key"), 2)
+        self.cache.delete("key")
+        self.assertIsNone(self.cache.get("key"))
+        self.assertEqual(self.client.get.call_count, 3)
+
+    def test_delete_where(self):
+        self.cache.set("list_a_1", 1)
+        self.cache.set("list_a_2", 2)
+        self.cache.set("list_b", 3)
+        self.assertEqual(self.cache.get("list_a_1"), 1)
+        self.assertEqual(self.cache.delete_where("list_a"), 2)
+        self.assertIsNone(self.cache.get("list_a_1"))
+        self.assertIsNone(self.cache.get("list_a_2"))
+        self.assertEqual(self.cache.get("list_b"), 3)
@@ -0,0 +1,91 @@
+# This file is a part of IntelOwl https://github.com/intelowlproject/IntelOwl
+# See the file 'LICENSE' for copying permission.
+
+import os
+import tempfile
+import threading
+import time
+from unittest.mock import MagicMock
+
+from django.test import TestCase
+
+from intel_owl.settings.storage import SampleCache
+
+
+class SampleCacheTestCase(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache = SampleCache(self.directory.name, max_bytes=10, reference_timeout=60)
+
+    def tearDown(self):
+        super().tearDown()
+        self.directory.cleanup()
+
+    @staticmethod
+    def _download(content: bytes):
+        return MagicMock(side_effect=lambda f: f.write(content))
+
+    def test_retrieve_downloads_once(self):
+        download = self._download(b"1234")
+        path = self.cache.retrieve("a" * 64, "analyzer1", download)
+        self.assertEqual(path, self.cache.retrieve("a" * 64, "analyzer2", download))
+        download.assert_called_once()
+        with open(path, "rb") as f:
+            self.assertEqual(b"1234", f.read())
+
+    def test_retrieve_download_failed(self):
+        download = MagicMock(side_effect=ValueError)
+        with self.assertRaises(ValueError):
+            self.cache.retrieve("a" * 64, "analyzer1", download)
+        self.assertFalse(os.path.exists(self.cache.sample_path("a" * 64)))
+        self.assertFalse(self.cache._is_referenced("a" * 64))
+        self.assertEqual([], self.cache._samples())
+
+    def test_retrieve_download_does_not_lock_stripe(self):
+        started, finish = threading.Event(), threading.Event()
+
+        def slow_download(f):
+            started.set()
+            finish.wait(10)
+            f.write(b"1234")
+
+        thread = threading.Thread(target=self.cache.retrieve, args=("a" * 64, "analyzer1", slow_download))
+        thread.start()
+        self.addCleanup(thread.join)
+        self.addCleanup(finish.set)
+        self.assertTrue(started.wait(10))
+        # same lock stripe of the sample being downloaded
+        path = self.cache.retrieve("a" * 2 + "b" * 62, "analyzer1", self._download(b"5678"))
+        self.assertTrue(thread.is_alive())
+        with open(path, "rb") as f:
+            self.assertEqual(b"5678", f.read())
+
+    def test_evict_referenced(self):
+        first = self.cache.retrieve("a" * 64, "analyzer1", self._download(b"12345678"))
+        # over the cap, but the first sample is still used
+        second = self.cache.retrieve("b" * 64, "analyzer1", self._download(b"12345678"))
+        self.assertTrue(os.path.exists(first))
+        self.assertTrue(os.path.exists(second))
+
+        self.cache.release("b" * 64, "analyzer1")
+        self.assertTrue(os.path.exists(first))
+        self.assertFalse(os.path.exists(second))
+
+    def test_evict_least_recently_used(self):
+        first = self.cache.retrieve("a" * 64, "analyzer1", self._download(b"1234"))
+        second = self.cache.retrieve("b" * 64, "analyzer1", self._download(b"1234"))
+        os.utime(first, (time.time() - 100, time.time() - 100))
+        self.cache.release("a" * 64, "analyzer1")
+        self.cache.release("b" * 64, "analyzer1")
+        self.cache.retrieve("c" * 64, "analyzer1", self._download(b"1234"))
+        self.assertFalse(os.path.exists(first))
+        self.assertTrue(os.path.exists(second))
+
+    def test_stale_reference(self):
+        path = self.cache.retrieve("a" * 64, "analyzer1", self._download(b"12345678901"))
+        self.assertTrue(os.path.exists(path))
+        reference = os.path.join(self.cache._references_path("a" * 64), "analyzer1")
+        os.utime(reference, (time.time() - 100, time.time() - 100))
+        self.assertEqual(11, self.cache.evict())
+        self.assertFalse(os.path.exists(path))
@@ -6,16 +6,22 @@ from kombu import uuid
 
 from api_app.analyzables_manager.models import Analyzable
 from api_app.analyzers_manager.models import AnalyzerConfig, AnalyzerReport
+from api_app.analyzers_manager.observable_analyzers.tranco import Tranco
 from api_app.choices import Classification, PythonModuleBasePaths
 from api_app.connectors_manager.models import ConnectorConfig, ConnectorReport
 from api_app.ingestors_manager.models import IngestorConfig, IngestorReport
-from api_app.models import Job, PythonModule
+from api_app.models import Job, LastElasticReportUpdate, PythonModule
 from api_app.pivots_manager.models import PivotConfig, PivotReport
 from api_app.visualizers_manager.models import VisualizerConfig, VisualizerReport
 from certego_saas.apps.organization.membership import Membership
 from certego_saas.apps.organization.organization import Organization
 from certego_saas.apps.user.models import User
-from intel_owl.tasks import send_plugin_report_to_elastic
+from intel_owl.tasks import (
+    job_pipeline_after_batch,
+    job_pipeline_batch,
+    run_plugin_batch,
+    send_plugin_report_to_elastic,
+)
 from tests import CustomTestCase
 
 _now = datetime.datetime(2024, 10, 29, 11, tzinfo=datetime.UTC)
@@ -154,6 +160,7 @@ class SendElasticTestCase(CustomTestCase):
         )
 
     def tearDown(self):
+        LastElasticReportUpdate.objects.all().delete()
         AnalyzerReport.objects.all().delete()
         ConnectorReport.objects.all().delete()
         IngestorReport.objects.all().delete()
@@ -165,246 +172,272 @@ class SendElasticTestCase(CustomTestCase):
         self.job.delete()
         self.analyzable.delete()
 
+    @staticmethod
+    def _send(failed_index: str = None, status: int = 503):
+        documents = []
+
+        def _streaming_bulk(client, actions, **kwargs):
+            for action in actions:
+                documents.append(action)
+                if action["_index"] == failed_index:
+                    yield (
+                        False,
+                        {"index": {"_index": action["_index"], "_id": action["_id"], "status": status}},
+                    )
+                else:
+                    yield True, {}
+
+        with patch("intel_owl.tasks.streaming_bulk", side_effect=_streaming_bulk):
+            send_plugin_report_to_elastic()
+        return documents
+
     @override_settings(ELASTICSEARCH_DSL_ENABLED=True)
     @override_settings(ELASTICSEARCH_DSL_HOST="https://elasticsearch:9200")
     def test_initial(self, *args, **kwargs):
-        with patch(
-            "intel_owl.tasks.bulk",
-            return_value=(4, []),
-        ) as mocked_elastic_bulk:
-            send_plugin_report_to_elastic()
-            self.assertTrue(mocked_elastic_bulk.assert_called_once)
-            mocked_bulk_param = mocked_elastic_bulk.call_args.args[1]
-            self.assertEqual(
-                mocked_bulk_param,
-                [
-                    {
-                        "_op_type": "index",
-                        "_index": "plugin-report-unittest-analyzer-report-2024-10-29",
-                        "_source": {
-                            "user": {"username": "test_elastic_user"},
-                            "membership": {
-                                "is_admin": False,
-                                "is_owner": True,
-                                "organization": {"name": "test_elastic_org"},
-                            },
-                            "config": {
-                                "name": "DNS4EU_Malicious_Detector",
-                                "plugin_name": "analyzer",
-                            },
-                            "job": {"id": self.job.id},
-                            "start_time": datetime.datetime(
-                                2024, 10, 29, 10, 49, tzinfo=datetime.timezone.utc
-                            ),
-                            "end_time": datetime.datetime(2024, 10, 29, 10, 59, tzinfo=datetime.timezone.utc),
-                            "status": "FAILED",
-                            "report": {},
-                            "errors": ["error1", "error2"],
+        mocked_bulk_param = self._send()
+        self.assertEqual(
+            [document.pop("_id") for document in mocked_bulk_param],
+            [
+                AnalyzerReport.objects.get(config__name="DNS4EU_Malicious_Detector").pk,
+                AnalyzerReport.objects.get(config__name="Quad9_Malicious_Detector").pk,
+                ConnectorReport.objects.get().pk,
+                PivotReport.objects.get().pk,
+            ],
+        )
+        self.assertEqual(
+            mocked_bulk_param,
+            [
+                {
+                    "_op_type": "index",
+                    "_index": "plugin-report-unittest-analyzer-report-2024-10-29",
+                    "_source": {
+                        "user": {"username": "test_elastic_user"},
+                        "membership": {
+                            "is_admin": False,
+                            "is_owner": True,
+                            "organization": {"name": "test_elastic_org"},
+                        },
+                        "config": {
+                            "name": "DNS4EU_Malicious_Detector",
+                            "plugin_name": "analyzer",
                         },
+                        "job": {"id": self.job.id},
+                        "start_time": datetime.datetime(2024, 10, 29, 10, 49, tzinfo=datetime.timezone.utc),
+                        "end_time": datetime.datetime(2024, 10, 29, 10, 59, tzinfo=datetime.timezone.utc),
+                        "status": "FAILED",
+                        "report": {},
+                        "errors": ["error1", "error2"],
                     },
-                    {
-                        "_op_type": "index",
-                        "_index": "plugin-report-unittest-analyzer-report-2024-10-29",
-                        "_source": {
-                            "user": {"username": "test_elastic_user"},
-                            "membership": {
-                                "is_admin": False,
-                                "is_owner": True,
-                                "organization": {"name": "test_elastic_org"},
-                            },
-                            "config": {
-                                "name": "Quad9_Malicious_Detector",
-                                "plugin_name": "analyzer",
-                            },
-                            "job": {"id": self.job.id},
-                            "start_time": datetime.datetime(
-                                2024, 10, 29, 10, 49, tzinfo=datetime.timezone.utc
-                            ),
-                            "end_time": datetime.datetime(2024, 10, 29, 10, 59, tzinfo=datetime.timezone.utc),
-                            "status": "KILLED",
-                            "report": {},
-                            "errors": [],
+                },
+                {
+                    "_op_type": "index",
+                    "_index": "plugin-report-unittest-analyzer-report-2024-10-29",
+                    "_source": {
+                        "user": {"username": "test_elastic_user"},
+                        "membership": {
+                            "is_admin": False,
+                            "is_owner": True,
+                            "organization": {"name": "test_elastic_org"},
+                        },
+                        "config": {
+                            "name": "Quad9_Malicious_Detector",
+                            "plugin_name": "analyzer",
                         },
+                        "job": {"id": self.job.id},
+                        "start_time": datetime.datetime(2024, 10, 29, 10, 49, tzinfo=datetime.timezone.utc),
+                        "end_time": datetime.datetime(2024, 10, 29, 10, 59, tzinfo=datetime.timezone.utc),
+                        "status": "KILLED",
+                        "report": {},
+                        "errors": [],
                     },
-                    {
-                        "_op_type": "index",
-                        "_index": "plugin-report-unittest-connector-report-2024-10-29",
-                        "_source": {
-                            "user": {"username": "test_elastic_user"},
-                            "membership": {
-                                "is_admin": False,
-                                "is_owner": True,
-                                "organization": {"name": "test_elastic_org"},
-                            },
-                            "config": {
-                                "name": "AbuseSubmitter",
-                                "plugin_name": "connector",
-                            },
-                            "job": {"id": self.job.id},
-                            "start_time": datetime.datetime(
-                                2024, 10, 29, 10, 49, tzinfo=datetime.timezone.utc
-                            ),
-                            "end_time": datetime.datetime(2024, 10, 29, 10, 59, tzinfo=datetime.timezone.utc),
-                            "status": "SUCCESS",
-                            "report": {
-                                "to": "receiver@gmail.com",
-                                "body": "hello world",
-                                "from": "sender@gmail.com",
-                                "subject": "Subject",
-                            },
-                            "errors": [],
+                },
+                {
+                    "_op_type": "index",
+                    "_index": "plugin-report-unittest-connector-report-2024-10-29",
+                    "_source": {
+                        "user": {"username": "test_elastic_user"},
+                        "membership": {
+                            "is_admin": False,
+                            "is_owner": True,
+                            "organization": {"name": "test_elastic_org"},
+                        },
+                        "config": {
+                            "name": "AbuseSubmitter",
+                            "plugin_name": "connector",
                         },
+                        "job": {"id": self.job.id},
+                        "start_time": datetime.datetime(2024, 10, 29, 10, 49, tzinfo=datetime.timezone.utc),
+                        "end_time": datetime.datetime(2024, 10, 29, 10, 59, tzinfo=datetime.timezone.utc),
+                        "status": "SUCCESS",
+                        "report": {
+                            "to": "receiver@gmail.com",
+                            "body": "hello world",
+                            "from": "sender@gmail.com",
+                            "subject": "Subject",
+                        },
+                        "errors": [],
                     },
-                    {
-                        "_op_type": "index",
-                        "_index": "plugin-report-unittest-pivot-report-2024-10-29",
-                        "_source": {
-                            "user": {
-                                "username": "test_elastic_user",
-                            },
-                            "membership": {
-                                "is_owner": True,
-                                "is_admin": False,
-                                "organization": {"name": "test_elastic_org"},
-                            },
-                            "config": {
-                                "name": "AbuseIpToSubmission",
-                                "plugin_name": "pivot",
-                            },
-                            "job": {"id": self.job.id},
-                            "start_time": datetime.datetime(
-                                2024, 10, 29, 10, 49, tzinfo=datetime.timezone.utc
-                            ),
-                            "end_time": datetime.datetime(2024, 10, 29, 10, 59, tzinfo=datetime.timezone.utc),
-                            "status": "SUCCESS",
-                            "report": {
-                                "job_id": [1],
-                                "created": True,
-                                "motivation": None,
-                            },
-                            "errors": [],
+                },
+                {
+                    "_op_type": "index",
+                    "_index": "plugin-report-unittest-pivot-report-2024-10-29",
+                    "_source": {
+                        "user": {
+                            "username": "test_elastic_user",
+                        },
+                        "membership": {
+                            "is_owner": True,
+                            "is_admin": False,
+                            "organization": {"name": "test_elastic_org"},
                         },
+                        "config": {
+                            "name": "AbuseIpToSubmission",
+                            "plugin_name": "pivot",
+                        },
+                        "job": {"id": self.job.id},
+                        "start_time": datetime.datetime(2024, 10, 29, 10, 49, tzinfo=datetime.timezone.utc),
+                        "end_time": datetime.datetime(2024, 10, 29, 10, 59, tzinfo=datetime.timezone.utc),
+                        "status": "SUCCESS",
+                        "report": {
+                            "job_id": [1],
+                            "created": True,
+                            "motivation": None,
+                        },
+                        "errors": [],
                     },
-                ],
-            )
+                },
+            ],
+        )
 
     @override_settings(ELASTICSEARCH_DSL_ENABLED=True)
     @override_settings(ELASTICSEARCH_DSL_HOST="https://elasticsearch:9200")
     def test_update(self, *args, **kwargs):
-        with patch(
-            "intel_owl.tasks.bulk",
-            return_value=(4, []),
-        ) as mocked_elastic_bulk:
+        self.assertEqual(4, len(self._send()))
+        self.assertEqual(
+            LastElasticReportUpdate.get_solo().last_update_datetime,
+            _now,
+        )
+        # the window has already been exported
+        with patch("intel_owl.tasks.streaming_bulk") as mocked_streaming_bulk:
             send_plugin_report_to_elastic()
-            self.assertTrue(mocked_elastic_bulk.assert_called_once)
-            mocked_bulk_param = mocked_elastic_bulk.call_args.args[1]
-            self.assertEqual(
-                mocked_bulk_param,
-                [
-                    {
-                        "_index": "plugin-report-unittest-analyzer-report-2024-10-29",
-                        "_op_type": "index",
-                        "_source": {
-                            "user": {"username": "test_elastic_user"},
-                            "membership": {
-                                "is_admin": False,
-                                "is_owner": True,
-                                "organization": {"name": "test_elastic_org"},
-                            },
-                            "config": {
-                                "name": "DNS4EU_Malicious_Detector",
-                                "plugin_name": "analyzer",
-                            },
-                            "end_time": datetime.datetime(2024, 10, 29, 10, 59, tzinfo=datetime.timezone.utc),
-                            "job": {"id": self.job.id},
-                            "report": {},
-                            "start_time": datetime.datetime(
-                                2024, 10, 29, 10, 49, tzinfo=datetime.timezone.utc
-                            ),
-                            "status": "FAILED",
-                            "errors": ["error1", "error2"],
-                        },
-                    },
-                    {
-                        "_index": "plugin-report-unittest-analyzer-report-2024-10-29",
-                        "_op_type": "index",
-                        "_source": {
-                            "user": {"username": "test_elastic_user"},
-                            "membership": {
-                                "is_admin": False,
-                                "is_owner": True,
-                                "organization": {"name": "test_elastic_org"},
-                            },
-                            "config": {
-                                "name": "Quad9_Malicious_Detector",
-                                "plugin_name": "analyzer",
-                            },
-                            "end_time": datetime.datetime(2024, 10, 29, 10, 59, tzinfo=datetime.timezone.utc),
-                            "job": {"id": self.job.id},
-                            "report": {},
-                            "start_time": datetime.datetime(
-                                2024, 10, 29, 10, 49, tzinfo=datetime.timezone.utc
-                            ),
-                            "status": "KILLED",
-                            "errors": [],
-                        },
-                    },
-                    {
-                        "_index": "plugin-report-unittest-connector-report-2024-10-29",
-                        "_op_type": "index",
-                        "_source": {
-                            "user": {"username": "test_elastic_user"},
-                            "membership": {
-                                "is_admin": False,
-                                "is_owner": True,
-                                "organization": {"name": "test_elastic_org"},
-                            },
-                            "config": {
-                                "name": "AbuseSubmitter",
-                                "plugin_name": "connector",
-                            },
-                            "end_time": datetime.datetime(2024, 10, 29, 10, 59, tzinfo=datetime.timezone.utc),
-                            "job": {"id": self.job.id},
-                            "report": {
-                                "body": "hello world",
-                                "from": "sender@gmail.com",
-                                "subject": "Subject",
-                                "to": "receiver@gmail.com",
-                            },
-                            "start_time": datetime.datetime(
-                                2024, 10, 29, 10, 49, tzinfo=datetime.timezone.utc
-                            ),
-                            "status": "SUCCESS",
-                            "errors": [],
-                        },
-                    },
-                    {
-                        "_index": "plugin-report-unittest-pivot-report-2024-10-29",
-                        "_op_type": "index",
-                        "_source": {
-                            "user": {"username": "test_elastic_user"},
-                            "membership": {
-                                "is_admin": False,
-                                "is_owner": True,
-                                "organization": {"name": "test_elastic_org"},
-                            },
-                            "config": {
-                                "name": "AbuseIpToSubmission",
-                                "plugin_name": "pivot",
-                            },
-                            "end_time": datetime.datetime(2024, 10, 29, 10, 59, tzinfo=datetime.timezone.utc),
-                            "job": {"id": self.job.id},
-                            "report": {
-                                "created": True,
-                                "job_id": [1],
-                                "motivation": None,
-                            },
-                            "start_time": datetime.datetime(
-                                2024, 10, 29, 10, 49, tzinfo=datetime.timezone.utc
-                            ),
-                            "status": "SUCCESS",
-                            "errors": [],
-                        },
-                    },
-                ],
+        mocked_streaming_bulk.assert_not_called()
+
+    @override_settings(ELASTICSEARCH_DSL_ENABLED=True)
+    @override_settings(ELASTICSEARCH_DSL_HOST="https://elasticsearch:9200")
+    @override_settings(ELASTICSEARCH_DSL_MAX_BACKFILL=60 * 24 * 60)
+    def test_backfill(self, *args, **kwargs):
+        last_update = LastElasticReportUpdate.get_solo()
+        last_update.last_update_datetime = datetime.datetime(2024, 9, 1, tzinfo=datetime.UTC)
+        last_update.save()
+        documents = self._send()
+        self.assertEqual(5, len(documents))
+        self.assertIn("plugin-report-unittest-analyzer-report-2024-09-29", [d["_index"] for d in documents])
+
+    @override_settings(ELASTICSEARCH_DSL_ENABLED=True)
+    @override_settings(ELASTICSEARCH_DSL_HOST="https://elasticsearch:9200")
+    def test_indexing_errors(self, *args, **kwargs):
+        self.assertEqual(
+            4, len(self._send(failed_index="plugin-report-unittest-connector-report-2024-10-29"))
+        )
+        # the window is exported again from the report that has not been indexed
+        self.assertEqual(
+            LastElasticReportUpdate.get_solo().last_update_datetime,
+            datetime.datetime(2024, 10, 29, 10, 59, tzinfo=datetime.UTC),
+        )
+        self.assertEqual(4, len(self._send()))
+        self.assertEqual(LastElasticReportUpdate.get_solo().last_update_datetime, _now)
+
+    @override_settings(ELASTICSEARCH_DSL_ENABLED=True)
+    @override_settings(ELASTICSEARCH_DSL_HOST="https://elasticsearch:9200")
+    @override_settings(ELASTICSEARCH_DSL_MAX_RETRIES=1)
+    def test_indexing_errors_retries(self, *args, **kwargs):
+        failed_index = "plugin-report-unittest-connector-report-2024-10-29"
+        self._send(failed_index=failed_index)
+        last_update = LastElasticReportUpdate.get_solo()
+        self.assertEqual(
+            last_update.last_update_datetime, datetime.datetime(2024, 10, 29, 10, 59, tzinfo=datetime.UTC)
+        )
+        self.assertEqual(1, last_update.retries)
+        # the documents are skipped once the retries are over
+        self._send(failed_index=failed_index)
+        last_update.refresh_from_db()
+        self.assertEqual(last_update.last_update_datetime, _now)
+        self.assertEqual(0, last_update.retries)
+
+    @override_settings(ELASTICSEARCH_DSL_ENABLED=True)
+    @override_settings(ELASTICSEARCH_DSL_HOST="https://elasticsearch:9200")
+    def test_rejected_documents(self, *args, **kwargs):
+        # a document rejected by elastic is not sent again
+        self._send(failed_index="plugin-report-unittest-connector-report-2024-10-29", status=400)
+        last_update = LastElasticReportUpdate.get_solo()
+        self.assertEqual(last_update.last_update_datetime, _now)
+        self.assertEqual(0, last_update.retries)
+
+
+class BatchPipelineTestCase(CustomTestCase):
+    def setUp(self):
+        super().setUp()
+        self.an = Analyzable.objects.create(name="test.com", classification=Classification.DOMAIN)
+        self.tranco = AnalyzerConfig.objects.get(name="Tranco")
+        self.jobs = [Job.objects.create(user=self.user, analyzable=self.an) for _ in range(2)]
+        for job in self.jobs:
+            job.analyzers_to_execute.set([self.tranco])
+
+    def tearDown(self):
+        for job in self.jobs:
+            job.delete()
+        self.an.delete()
+        super().tearDown()
+
+    def test_job_pipeline_batch(self):
+        with patch.object(Job, "execute_batch") as execute_batch:
+            job_pipeline_batch([job.pk for job in self.jobs])
+        self.assertCountEqual(self.jobs, execute_batch.call_args.args[0])
+
+        report = self.tranco.generate_empty_report(
+            self.jobs[0], uuid(), AnalyzerReport.STATUSES.PENDING.value
+        )
+        with patch.object(Job, "execute_batch", side_effect=RuntimeError):
+            job_pipeline_batch([job.pk for job in self.jobs])
+        report.refresh_from_db()
+        self.assertEqual(AnalyzerReport.STATUSES.FAILED, report.status)
+
+    def test_job_pipeline_after_batch(self):
+        self.jobs[1].status = Job.STATUSES.KILLED
+        self.jobs[1].save()
+        with patch.object(Job, "execute_after_batch", autospec=True) as execute_after_batch:
+            job_pipeline_after_batch([job.pk for job in self.jobs])
+        # the killed jobs do not continue
+        execute_after_batch.assert_called_once_with(self.jobs[0])
+
+    def test_run_plugin_batch(self):
+        task_id = uuid()
+        runs = [[job.pk, {}, task_id] for job in self.jobs]
+        with (
+            patch.object(Tranco, "start_batch") as start_batch,
+            patch("api_app.websocket.JobConsumer.publish_job") as publish_job,
+        ):
+            run_plugin_batch(self.tranco.python_module_id, self.tranco.pk, runs)
+        start_batch.assert_called_once_with(self.tranco, runs)
+        self.assertEqual(2, publish_job.call_count)
+
+    def test_run_plugin_batch_errors(self):
+        task_id = uuid()
+        running = self.tranco.generate_empty_report(
+            self.jobs[0], task_id, AnalyzerReport.STATUSES.RUNNING.value
+        )
+        pending = self.tranco.generate_empty_report(
+            self.jobs[1], task_id, AnalyzerReport.STATUSES.PENDING.value
+        )
+        with (
+            patch.object(Tranco, "start_batch", side_effect=RuntimeError),
+            patch("api_app.websocket.JobConsumer.publish_job"),
+        ):
+            run_plugin_batch(
+                self.tranco.python_module_id, self.tranco.pk, [[job.pk, {}, task_id] for job in self.jobs]
             )
+        running.refresh_from_db()
+        pending.refresh_from_db()
+        self.assertEqual(AnalyzerReport.STATUSES.FAILED, running.status)
+        # left to the pipeline of the job
+        self.assertEqual(AnalyzerReport.STATUSES.PENDING, pending.status)